@@ -1,8 +1,8 @@
 import os
-import re # <--- Keep the import for the module
 import traceback
 from flask import Flask, render_template, request, flash, redirect, url_for
 from datetime import datetime
+import symbol_index # Local symbol index: format, listing status and known-bad symbols
 
 # --- Import your report generation function ---
 try:
@@ -43,10 +43,9 @@ def generate():
     site_name = request.form.get('site_name', '').strip()
 
     # --- Basic Input Validation ---
-    valid_ticker_pattern = r'^[A-Z0-9\^.-]+$'
-    # Use the imported 're' module here
-    if not ticker or not re.match(valid_ticker_pattern, ticker):
-        flash('Invalid or missing ticker symbol format.', 'error')
+    ticker_ok, ticker_reason = symbol_index.check_symbol(ticker) # Format, delisted, known-bad (O(1) local index)
+    if not ticker_ok:
+        flash(f'Invalid or unusable ticker symbol: {ticker_reason}.', 'error')
         return redirect(url_for('index'))
     if not site_name or site_name not in SITE_CHOICES:
         flash('Invalid or missing site name selected.', 'error')
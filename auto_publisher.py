@@ -1,7 +1,7 @@
-import pandas as pd
 import time
 from datetime import datetime, timedelta, timezone # Added timezone
 import os
+import sys
 import re
 import pickle
 import random
@@ -13,25 +13,18 @@ import requests
 import base64
 import json
 import io # For handling in-memory file objects for custom uploads
+from concurrent.futures import ThreadPoolExecutor
 
 load_dotenv()
 
-try:
-    # Expects new signature: generate_wordpress_report(profile_name, ticker, app_root, report_sections_to_include)
-    from wordpress_reporter import generate_wordpress_report, ALL_REPORT_SECTIONS
-except ImportError:
-    logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
-    logging.error("CRITICAL: Failed to import 'generate_wordpress_report' or 'ALL_REPORT_SECTIONS'. Ensure it's accessible.")
-    ALL_REPORT_SECTIONS = {
-        "introduction": None, "metrics_summary": None, "detailed_forecast_table": None,
-        "company_profile": None, "valuation_metrics": None, "total_valuation": None,
-        "profitability_growth": None, "analyst_insights": None, "financial_health": None,
-        "technical_analysis_summary": None, "short_selling_info": None,
-        "stock_price_statistics": None, "dividends_shareholder_returns": None,
-        "conclusion_outlook": None, "risk_factors": None, "faq": None
-    }
-    if __name__ == '__main__': exit(1)
-    else: raise
+# The report pipeline (wordpress_reporter -> Prophet, yfinance, Plotly, Matplotlib) is imported on
+# first use inside the run functions, so the portal can import this module cheaply.
+import site_themes
+import ticker_sources
+import symbol_index
+import retry_queue
+import worker_pool
+from manifest import DEFAULT_FORECAST_ENGINE, REPORT_SECTION_KEYS
 
 # --- Logging Setup ---
 LOG_FILE = "auto_publisher.log"
@@ -96,12 +89,14 @@ def load_state(user_uid=None, current_profile_ids_from_run=None):
     # Define default structure for new state entries
     default_factories = {
         'pending_tickers_by_profile': list,
-        'failed_tickers_by_profile': list,
+        'failed_tickers_by_profile': list, # Legacy; migrated into retry_queue_by_profile on load
+        'retry_queue_by_profile': dict,
         'last_successful_schedule_time_by_profile': lambda: None,
         'posts_today_by_profile': lambda: 0,
         'published_tickers_log_by_profile': set,
         'processed_tickers_detailed_log_by_profile': list,
-        'last_author_index_by_profile': lambda: -1
+        'last_author_index_by_profile': lambda: -1,
+        'installed_theme_hash_by_profile': lambda: None
     }
 
     # Initialize default state structure for all active profiles
@@ -148,6 +143,8 @@ def load_state(user_uid=None, current_profile_ids_from_run=None):
             for pid in active_profile_ids:
                 state.setdefault('posts_today_by_profile', {})[pid] = state.get('posts_today_by_profile', {}).get(pid, 0)
                 state.setdefault('processed_tickers_detailed_log_by_profile', {})[pid] = state.get('processed_tickers_detailed_log_by_profile', {}).get(pid, [])
+                migrated = retry_queue.migrate_failed_list(state, pid)
+                if migrated: app_logger.info(f"Moved {migrated} tickers from the old failed list into the retry queue for profile '{pid}'.")
 
 
             return state
@@ -243,6 +240,47 @@ def upload_image_to_wordpress(image_path, site_url, author_details, image_title=
         response.raise_for_status(); media_data = response.json(); return media_data.get('id')
     except Exception as e_upload: app_logger.error(f"Image upload error to {site_url} for {image_title}: {e_upload}"); return None
 
+def build_chart_images_html(ticker, historical_data, profile_config, author_details):
+    """
+    Chart figures for a post. profile_config['chart_images'] lists chart types (see chart_service.CHART_TYPES).
+    Images come from the chart asset store, so a chart already on this site is reused instead of re-uploaded.
+    """
+    if historical_data is None or historical_data.empty: return ""
+    try:
+        import chart_assets # Matplotlib is only loaded for profiles that embed charts
+        published = chart_assets.publish_chart_assets(
+            ticker, historical_data, profile_config['site_url'], author_details,
+            site_name=profile_config.get("profile_name"), chart_types=profile_config["chart_images"])
+    except Exception as e_charts:
+        app_logger.error(f"Chart images failed for {ticker}: {e_charts}", exc_info=True)
+        return ""
+    figures = [f'<figure class="report-chart"><img src="{m["url"]}" alt="{ticker} {ct.replace("_", " ")} chart" loading="lazy"/></figure>'
+               for ct, m in published.items() if m.get('url')]
+    app_logger.info(f"Attached {len(figures)} chart image(s) for {ticker}.")
+    return "".join(figures)
+
+def prerender_chart_assets(profile_plans, work_plan, report_data_by_key):
+    """
+    Renders the run's missing chart assets for every profile that embeds charts in one batch over the chart
+    process pool (chart_assets.prerender_assets), so build_chart_images_html only uploads or reuses them.
+    """
+    plans_by_id = {plan["profile_id"]: plan for plan in profile_plans}
+    requests = []
+    for key, profile_ids in work_plan.items():
+        historical_data = (report_data_by_key.get(key) or {}).get('historical_data')
+        if historical_data is None or historical_data.empty: continue
+        for profile_id in profile_ids:
+            profile_config = plans_by_id[profile_id]["profile_config"]
+            if profile_config.get("chart_images"):
+                requests.append((key[0], historical_data, profile_config.get("profile_name"), profile_config["chart_images"]))
+    if not requests: return
+    try:
+        import chart_assets # Matplotlib is only loaded for profiles that embed charts
+        rendered = chart_assets.prerender_assets(requests)
+        app_logger.info(f"Pre-rendered {rendered} chart asset(s) for {len(requests)} post(s).")
+    except Exception as e_charts: # Posts still render any missing chart on their own
+        app_logger.error(f"Chart pre-render failed: {e_charts}", exc_info=True)
+
 def create_wordpress_post(site_url, author_details, title, content_html, scheduled_time, category_id_str=None, featured_media_id=None):
     posts_api_url = f"{site_url.rstrip('/')}/wp-json/wp/v2/posts"
     api_username = author_details['wp_username']
@@ -266,52 +304,47 @@ def create_wordpress_post(site_url, author_details, title, content_html, schedul
 
 def load_tickers_from_excel(profile_config_entry):
     sheet_name = profile_config_entry.get('sheet_name') # Get from passed profile_config
-    excel_path = os.getenv("EXCEL_FILE_PATH")
-    ticker_col_name = os.getenv("EXCEL_TICKER_COLUMN_NAME", "Keyword")
-    
     if not sheet_name: app_logger.warning(f"No sheet_name in profile {profile_config_entry.get('profile_name')}, cannot load Excel tickers."); return []
-    if not excel_path or not os.path.exists(excel_path): app_logger.error(f"EXCEL_FILE_PATH not set or file not found: {excel_path}"); return []
-    
-    try:
-        df = pd.read_excel(excel_path, sheet_name=sheet_name)
-        if ticker_col_name not in df.columns:
-            app_logger.error(f"Ticker column '{ticker_col_name}' not found in sheet '{sheet_name}' of '{excel_path}'.")
-            return []
-        tickers = df[ticker_col_name].dropna().astype(str).str.strip().str.upper().tolist()
-        app_logger.info(f"Loaded {len(tickers)} tickers from Excel sheet '{sheet_name}'.")
-        return tickers
-    except Exception as e_excel: app_logger.error(f"Excel read error for sheet '{sheet_name}': {e_excel}"); return []
-
-def load_tickers_from_uploaded_file(file_content_bytes, filename):
-    try:
-        if filename.lower().endswith('.csv'):
-            try: content_str = file_content_bytes.decode('utf-8')
-            except UnicodeDecodeError: content_str = file_content_bytes.decode('latin1')
-            df = pd.read_csv(io.StringIO(content_str))
-        elif filename.lower().endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(io.BytesIO(file_content_bytes))
-        else:
-            app_logger.error(f"Unsupported file type for custom tickers: {filename}")
-            return []
-
-        possible_ticker_cols = ['Ticker', 'Tickers', 'Symbol', 'Symbols', 'Keyword', 'Keywords']
-        ticker_col_name = None
-        for col in df.columns:
-            if str(col).strip().lower() in [ptc.lower() for ptc in possible_ticker_cols]:
-                ticker_col_name = col; break
-        
-        if not ticker_col_name:
-            app_logger.error(f"Could not find a standard ticker column in uploaded file '{filename}'. Checked for: {possible_ticker_cols}")
-            return []
-            
-        tickers = df[ticker_col_name].dropna().astype(str).str.strip().str.upper().tolist()
-        app_logger.info(f"Loaded {len(tickers)} tickers from uploaded file '{filename}'.")
-        return tickers
-    except Exception as e:
-        app_logger.error(f"Error processing uploaded ticker file '{filename}': {e}", exc_info=True)
-        return []
+    # Parsed sheets are indexed by file mtime/size, so an unchanged workbook is not re-read
+    tickers = ticker_sources.get_sheet_tickers([sheet_name]).get(sheet_name, [])
+    app_logger.info(f"Loaded {len(tickers)} tickers from Excel sheet '{sheet_name}'.")
+    return tickers
 
-def generate_dynamic_headline(ticker_symbol, site_profile_name):
+def build_reload_list(profile_config, state):
+    """
+    Tickers a profile reloads when its pending queue is empty: retries whose back-off has passed
+    (see retry_queue), then Excel tickers that are not published, backing off or parked.
+    """
+    profile_id = profile_config.get("profile_id")
+    published = state.get('published_tickers_log_by_profile', {}).get(profile_id, set())
+    blocked = retry_queue.blocked_tickers(state, profile_id)
+    combined, seen = [], set()
+    for ticker in retry_queue.eligible_tickers(state, profile_id) + load_tickers_from_excel(profile_config):
+        if ticker not in published and ticker not in blocked and ticker not in seen:
+            combined.append(ticker); seen.add(ticker)
+    return combined
+
+def preload_excel_sheets(profile_configs):
+    """Parses every profile's sheet in one workbook open (a no-op for sheets already indexed)."""
+    sheet_names = [p.get('sheet_name') for p in profile_configs if p.get('sheet_name')]
+    if sheet_names:
+        ticker_sources.get_sheet_tickers(sheet_names)
+
+def load_tickers_from_uploaded_file(file_content, filename):
+    """Tickers from an uploaded csv/xls/xlsx (bytes or a binary file object), streamed and de-duplicated."""
+    stream = io.BytesIO(file_content) if isinstance(file_content, (bytes, bytearray)) else file_content
+    tickers, stats = ticker_sources.read_upload_tickers(stream, filename)
+    if stats['error']:
+        app_logger.error(f"Error processing uploaded ticker file '{filename}': {stats['error']}")
+    if stats['truncated']:
+        app_logger.warning(f"Uploaded file '{filename}' has more than {ticker_sources.MAX_UPLOAD_TICKERS} tickers; the rest were ignored.")
+    app_logger.info(f"Loaded {len(tickers)} tickers from uploaded file '{filename}' "
+                    f"({stats['rows']} rows, {stats['invalid']} invalid, {stats['duplicates']} duplicates).")
+    return tickers
+
+def generate_dynamic_headline(ticker_symbol, site_profile_name, rng=None):
+    # Pass the report's seeded rng (rdata['rng']) to get the same headline for the same report
+    if rng is None: rng = random
     yr = f"{datetime.now(timezone.utc).year}-{datetime.now(timezone.utc).year+1}"
     templates = [
         f"{ticker_symbol} Stock Forecast: Price Prediction for {site_profile_name} ({yr})",
@@ -320,7 +353,144 @@ def generate_dynamic_headline(ticker_symbol, site_profile_name):
         f"{ticker_symbol} ({site_profile_name}): {yr} Investment Outlook and Price Targets",
         f"Future of {ticker_symbol}: {site_profile_name} Analysis and {yr} Forecast",
     ]
-    return random.choice(templates)
+    return rng.choice(templates)
+
+
+def install_site_themes(user_uid, profiles_data_list, force=False):
+    """
+    One-time action: pushes each profile's compiled theme CSS to its WordPress site.
+    Skips profiles whose installed theme hash already matches unless force=True.
+    Returns {profile_id: status_message}.
+    """
+    site_themes.register_themes_from_profiles(profiles_data_list)
+    profile_ids = [p.get("profile_id") for p in profiles_data_list if p.get("profile_id")]
+    state = load_state(user_uid=user_uid, current_profile_ids_from_run=profile_ids)
+    installed_hashes = state.setdefault('installed_theme_hash_by_profile', {})
+    results = {}
+    for profile_config in profiles_data_list:
+        profile_id = profile_config.get("profile_id")
+        if not profile_id: continue
+        profile_name = profile_config.get("profile_name", profile_id)
+        theme = site_themes.get_site_theme(profile_name)
+        if not force and installed_hashes.get(profile_id) == theme['hash']:
+            results[profile_id] = f"Theme {theme['class_name']} ({theme['hash']}) already installed."
+            continue
+        authors_list = profile_config.get('authors', [])
+        if not authors_list or not profile_config.get('site_url'):
+            results[profile_id] = "Missing site_url or authors; theme not installed."
+            app_logger.warning(f"Cannot install theme for '{profile_name}': {results[profile_id]}")
+            continue
+        installed_hash = site_themes.install_theme_to_wordpress(profile_config['site_url'], authors_list[0], profile_name)
+        if installed_hash:
+            installed_hashes[profile_id] = installed_hash
+            results[profile_id] = f"Installed theme {theme['class_name']} ({installed_hash})."
+        else:
+            results[profile_id] = "Theme install failed (see log)."
+        app_logger.info(f"Theme install for '{profile_name}': {results[profile_id]}")
+    save_state(state)
+    return results
+
+
+ANALYSIS_WORKERS = int(os.getenv("PUBLISH_ANALYSIS_WORKERS", "4"))
+
+
+def plan_ticker_work(profile_plans, state):
+    """
+    Expected work for a run: each profile is expected to use its first num_new_posts_to_attempt
+    tickers that it has not published yet. Items are grouped by (ticker, forecast engine), because
+    the analysis does not depend on the site. Returns {(ticker, engine): [profile_id, ...]} in first-seen order.
+    """
+    work = {}
+    for plan in profile_plans:
+        published = state.get('published_tickers_log_by_profile', {}).get(plan["profile_id"], set())
+        engine = plan["profile_config"].get("forecast_engine") or DEFAULT_FORECAST_ENGINE
+        expected = []
+        for ticker in plan["tickers"]:
+            if len(expected) >= plan["num_new_posts_to_attempt"]: break
+            if ticker not in published and ticker not in expected: expected.append(ticker)
+        for ticker in expected:
+            work.setdefault((ticker, engine), []).append(plan["profile_id"])
+    return work
+
+
+def compute_ticker_analyses(work_plan, workers=None):
+    """
+    Runs prepare_report_data once per planned (ticker, engine). When a worker pool is running
+    (worker_pool.py) the analyses go to its pre-forked workers. Otherwise the first one runs alone so
+    that the shared caches (macro data) are written once and the rest run in a thread pool (the work
+    is mostly network I/O and Prophet's cmdstan subprocess). Returns (report_data_by_key, stats).
+    A failed analysis is stored as None.
+    """
+    workers = workers or ANALYSIS_WORKERS
+    keys = list(work_plan)
+    stats = {'work_items': sum(len(pids) for pids in work_plan.values()), 'planned_computations': len(keys),
+             'actual_computations': 0, 'on_demand': 0, 'failed': 0, 'uses': 0, 'saved': 0}
+    results = {}
+
+    stats['failure_types'] = {} # (ticker, engine) -> (failure type, message) for the retry queue
+
+    pooled = worker_pool.run_analyses(keys)
+    if pooled is not None:
+        results, errors = pooled
+        for key, error in errors.items():
+            app_logger.error(f"Analysis failed for {key[0]} (engine {key[1]}) on the worker pool: {error}")
+            stats['failure_types'][key] = (retry_queue.classify_analysis_error(error), error)
+    else:
+        _analyse_in_process(keys, workers, results, stats)
+    stats['actual_computations'] = len(keys)
+    stats['failed'] = sum(1 for v in results.values() if v is None)
+    app_logger.info(f"Run plan: {stats['work_items']} work items across profiles share {len(keys)} distinct analyses.")
+    return results, stats
+
+
+def _analyse_in_process(keys, workers, results, stats):
+    """Fallback without a worker pool: the first key alone, the rest in a thread pool."""
+    from wordpress_reporter import prepare_report_data # Heavy: first job pays the import
+
+    def analyse(key):
+        ticker, engine = key
+        try:
+            return prepare_report_data(ticker, APP_ROOT, forecast_engine=engine)
+        except Exception as e_analysis:
+            app_logger.error(f"Analysis failed for {ticker} (engine {engine}): {e_analysis}", exc_info=True)
+            stats['failure_types'][key] = (retry_queue.classify_analysis_error(e_analysis), str(e_analysis))
+            return None
+
+    if keys:
+        results[keys[0]] = analyse(keys[0])
+    if len(keys) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(keys) - 1)) as pool:
+            for key, report_data in zip(keys[1:], pool.map(analyse, keys[1:])):
+                results[key] = report_data
+
+
+def get_ticker_analysis(report_data_by_key, stats, ticker, engine):
+    """
+    Analysis for a ticker from the run's shared results. Tickers outside the plan (a profile moved
+    past skipped or failed tickers) are computed on demand and cached for later profiles.
+    """
+    key = (ticker, engine or DEFAULT_FORECAST_ENGINE)
+    stats['uses'] += 1
+    if key in report_data_by_key:
+        return report_data_by_key[key]
+    app_logger.info(f"Unplanned analysis for {ticker}; computing on demand.")
+    pooled = worker_pool.run_analyses([key])
+    if pooled is not None:
+        report_data, error = pooled[0][key], pooled[1].get(key)
+    else:
+        from wordpress_reporter import prepare_report_data
+        try:
+            report_data, error = prepare_report_data(ticker, APP_ROOT, forecast_engine=key[1]), None
+        except Exception as e_analysis:
+            app_logger.error(f"Analysis failed for {ticker} (engine {key[1]}): {e_analysis}", exc_info=True)
+            report_data, error = None, str(e_analysis)
+    if report_data is None:
+        stats['failed'] += 1
+        stats.setdefault('failure_types', {})[key] = (retry_queue.classify_analysis_error(error), error)
+    report_data_by_key[key] = report_data
+    stats['actual_computations'] += 1
+    stats['on_demand'] += 1
+    return report_data
 
 
 # Modified function signature to accept list of profile data dicts
@@ -332,8 +502,16 @@ def trigger_publishing_run(user_uid, profiles_to_process_data_list, articles_to_
         if profile_data.get("profile_id") # Ensure profile_id exists
     ]
     state = load_state(user_uid=user_uid, current_profile_ids_from_run=profile_ids_for_this_run)
+    site_themes.register_themes_from_profiles(profiles_to_process_data_list)
+    preload_excel_sheets([ # Profiles that will reload from Excel: open the workbook once for all of them
+        p for p in profiles_to_process_data_list
+        if p.get("profile_id") and not state['pending_tickers_by_profile'].get(p.get("profile_id"))
+        and not (custom_tickers_by_profile_id or {}).get(p.get("profile_id"))
+        and p.get("profile_id") not in (uploaded_file_details_by_profile_id or {})
+    ])
 
     run_results_summary = {}
+    profile_plans = [] # Profiles that passed setup checks, published in a second pass
     # The detailed log will be appended to state['processed_tickers_detailed_log_by_profile'][profile_id]
 
     for profile_config in profiles_to_process_data_list: # Iterate over the provided list of profile data
@@ -346,6 +524,9 @@ def trigger_publishing_run(user_uid, profiles_to_process_data_list, articles_to_
             
         profile_name = profile_config.get("profile_name", profile_id)
         app_logger.info(f"\n--- Processing Profile: {profile_name} (ID: {profile_id}) ---")
+        site_theme = site_themes.get_site_theme(profile_name)
+        if state.get('installed_theme_hash_by_profile', {}).get(profile_id) != site_theme['hash']:
+            app_logger.warning(f"Theme {site_theme['class_name']} ({site_theme['hash']}) is not installed on '{profile_name}'; posts will render unstyled until install_site_themes() is run.")
         
         authors_list = profile_config.get('authors', [])
         if not authors_list:
@@ -387,32 +568,35 @@ def trigger_publishing_run(user_uid, profiles_to_process_data_list, articles_to_
             app_logger.info(f"Using {len(tickers_for_this_profile)} custom text input tickers for profile '{profile_name}'.")
         elif uploaded_file_details_by_profile_id and profile_id in uploaded_file_details_by_profile_id:
             file_details = uploaded_file_details_by_profile_id[profile_id]
-            # Expects {'original_filename': str, 'content_bytes': bytes}
-            tickers_for_this_profile = load_tickers_from_uploaded_file(file_details['content_bytes'], file_details['original_filename'])
+            # Expects {'original_filename': str, 'tickers': [...]} (parsed at upload) or {'original_filename', 'content_bytes'}
+            if file_details.get('tickers') is not None:
+                tickers_for_this_profile = list(file_details['tickers'])
+            else:
+                tickers_for_this_profile = load_tickers_from_uploaded_file(file_details['content_bytes'], file_details['original_filename'])
             app_logger.info(f"Using {len(tickers_for_this_profile)} tickers from uploaded file '{file_details['original_filename']}' for profile '{profile_name}'.")
         else:
             # Fallback to Excel sheet defined in profile or pending list
             pending_tickers = state['pending_tickers_by_profile'].get(profile_id, [])
             if not pending_tickers:
-                excel_tickers = load_tickers_from_excel(profile_config) # Uses the passed profile_config
-                failed_tickers = list(state['failed_tickers_by_profile'].get(profile_id, []))
-                published_log_for_profile = state['published_tickers_log_by_profile'].get(profile_id, set())
-                
-                combined_tickers = []
-                seen_for_reload = set()
-                for ft in failed_tickers:
-                    if ft not in published_log_for_profile and ft not in seen_for_reload: combined_tickers.append(ft); seen_for_reload.add(ft)
-                for et in excel_tickers:
-                    if et not in published_log_for_profile and et not in seen_for_reload: combined_tickers.append(et); seen_for_reload.add(et)
-                
+                combined_tickers = build_reload_list(profile_config, state) # Eligible retries first, then Excel
                 state['pending_tickers_by_profile'][profile_id] = combined_tickers
-                state['failed_tickers_by_profile'][profile_id] = [] 
                 tickers_for_this_profile = combined_tickers
-                app_logger.info(f"Loaded {len(tickers_for_this_profile)} tickers from Excel/failed list for '{profile_name}'.")
+                app_logger.info(f"Loaded {len(tickers_for_this_profile)} tickers from retry queue/Excel for '{profile_name}' "
+                                f"(retry queue: {retry_queue.queue_summary(state, profile_id)}).")
             else:
                 tickers_for_this_profile = pending_tickers
                 app_logger.info(f"Using {len(tickers_for_this_profile)} pending tickers for profile '{profile_name}'.")
 
+        # Drop delisted / known-bad symbols before any download or analysis (O(1) lookups in the local index)
+        tickers_for_this_profile, rejected_tickers = symbol_index.filter_symbols(tickers_for_this_profile)
+        if rejected_tickers:
+            app_logger.info(f"Skipping {len(rejected_tickers)} unusable tickers for '{profile_name}': "
+                            + ", ".join(f"{t} ({r})" for t, r in list(rejected_tickers.items())[:10]))
+            for rejected_ticker, reason in rejected_tickers.items():
+                profile_run_details.append({"ticker": rejected_ticker, "status": "skipped_invalid", "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'), "message": reason})
+            if profile_id in state['pending_tickers_by_profile']:
+                state['pending_tickers_by_profile'][profile_id] = [t for t in state['pending_tickers_by_profile'][profile_id] if t not in rejected_tickers]
+
         if not tickers_for_this_profile:
             msg = f"No tickers available (custom, uploaded, Excel, or pending) for profile '{profile_name}'. Cannot publish."
             app_logger.warning(msg)
@@ -421,6 +605,25 @@ def trigger_publishing_run(user_uid, profiles_to_process_data_list, articles_to_
             state['processed_tickers_detailed_log_by_profile'].setdefault(profile_id, []).extend(profile_run_details)
             continue
 
+        profile_plans.append({
+            "profile_config": profile_config, "profile_id": profile_id, "profile_name": profile_name,
+            "profile_run_details": profile_run_details, "authors_list": authors_list, "author_cycle": author_cycle,
+            "min_gap": min_gap, "max_gap": max_gap, "num_new_posts_to_attempt": num_new_posts_to_attempt,
+            "tickers": tickers_for_this_profile,
+        })
+
+    # --- Run planning: analyse each distinct ticker once, then fan out per profile ---
+    from wordpress_reporter import generate_wordpress_report # Loaded on the first run, not at import
+    work_plan = plan_ticker_work(profile_plans, state)
+    report_data_by_key, plan_stats = compute_ticker_analyses(work_plan)
+    prerender_chart_assets(profile_plans, work_plan, report_data_by_key)
+
+    for plan in profile_plans:
+        profile_config, profile_id, profile_name = plan["profile_config"], plan["profile_id"], plan["profile_name"]
+        profile_run_details, authors_list, author_cycle = plan["profile_run_details"], plan["authors_list"], plan["author_cycle"]
+        min_gap, max_gap, num_new_posts_to_attempt = plan["min_gap"], plan["max_gap"], plan["num_new_posts_to_attempt"]
+        tickers_for_this_profile = plan["tickers"]
+
         # --- Scheduling Logic ---
         current_schedule_time_utc = datetime.now(timezone.utc) # Start with now in UTC
         last_sched_iso = state.get('last_successful_schedule_time_by_profile', {}).get(profile_id)
@@ -472,23 +675,36 @@ def trigger_publishing_run(user_uid, profiles_to_process_data_list, articles_to_
                 continue
             state['last_author_index_by_profile'][profile_id] = authors_list.index(current_author_details)
 
-            report_sections = profile_config.get("report_sections_to_include", list(ALL_REPORT_SECTIONS.keys()))
+            report_sections = profile_config.get("report_sections_to_include", list(REPORT_SECTION_KEYS))
             
-            rdata_dict, html_content, css_content_unused = generate_wordpress_report(
-                profile_name, ticker_to_process, APP_ROOT, report_sections
-            )
+            report_data = get_ticker_analysis(report_data_by_key, plan_stats, ticker_to_process, profile_config.get("forecast_engine"))
+            if report_data is None:
+                rdata_dict, html_content = {}, "" # Analysis failed (logged once per ticker); handled below
+            else:
+                rdata_dict, html_content, _theme_css = generate_wordpress_report( # CSS lives in the installed site theme
+                    profile_name, ticker_to_process, APP_ROOT, report_sections, report_data=report_data
+                )
 
             if "Error generating report" in html_content or not html_content or not rdata_dict:
                 err_msg = f"Report generation failed for {ticker_to_process} on {profile_name}."
                 app_logger.error(err_msg)
-                state.get('failed_tickers_by_profile',{}).setdefault(profile_id, []).append(ticker_to_process)
+                if report_data is None: # Analysis failed: data or model
+                    engine_key = (ticker_to_process, profile_config.get("forecast_engine") or DEFAULT_FORECAST_ENGINE)
+                    failure_type, error_text = plan_stats.get('failure_types', {}).get(engine_key, ('model', 'analysis failed'))
+                else:
+                    failure_type, error_text = 'report', err_msg
+                # Park only delisted/malformed symbols; a negative-cache entry expires, so it only delays the retry
+                permanent = failure_type == 'data' and symbol_index.is_permanently_bad(ticker_to_process)
+                retry_entry = retry_queue.record_failure(state, profile_id, ticker_to_process, failure_type, error_text, permanent=permanent,
+                                                         not_before=symbol_index.bad_until(ticker_to_process))
                 profile_run_details.append({
                     "ticker": ticker_to_process, "status": "failure", 
-                    "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'), "message": "Report generation failed."
+                    "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+                    "message": f"Report generation failed ({failure_type}); " + ("parked." if retry_entry['parked'] else f"retry {retry_entry['attempts']} after {datetime.fromtimestamp(retry_entry['next_eligible'], timezone.utc):%Y-%m-%d %H:%M} UTC.")
                 })
                 continue
 
-            post_title = generate_dynamic_headline(ticker_to_process, profile_name)
+            post_title = generate_dynamic_headline(ticker_to_process, profile_name, rng=rdata_dict.get('rng'))
             
             temp_image_dir = os.path.join(APP_ROOT, "temp_images", profile_id)
             os.makedirs(temp_image_dir, exist_ok=True)
@@ -504,6 +720,9 @@ def trigger_publishing_run(user_uid, profiles_to_process_data_list, articles_to_
             else:
                 app_logger.warning(f"Feature image generation failed for {post_title}, proceeding without it.")
 
+            if profile_config.get("chart_images"):
+                html_content += build_chart_images_html(ticker_to_process, rdata_dict.get('historical_data'), profile_config, current_author_details)
+
             if posts_published_this_session > 0:
                 current_schedule_time_utc += timedelta(minutes=random.randint(min_gap, max_gap))
             if current_schedule_time_utc < datetime.now(timezone.utc):
@@ -520,6 +739,7 @@ def trigger_publishing_run(user_uid, profiles_to_process_data_list, articles_to_
                 state.get('last_successful_schedule_time_by_profile', {})[profile_id] = current_schedule_time_utc.isoformat()
                 state.get('posts_today_by_profile', {})[profile_id] = state.get('posts_today_by_profile', {}).get(profile_id, 0) + 1
                 state.get('published_tickers_log_by_profile', {}).setdefault(profile_id, set()).add(ticker_to_process)
+                retry_queue.record_success(state, profile_id, ticker_to_process)
                 posts_published_this_session += 1
                 app_logger.info(f"Successfully scheduled '{ticker_to_process}' for '{profile_name}' at {current_schedule_time_utc.strftime('%Y-%m-%d %H:%M')} UTC. Total today: {state['posts_today_by_profile'][profile_id]}.")
                 profile_run_details.append({
@@ -528,10 +748,11 @@ def trigger_publishing_run(user_uid, profiles_to_process_data_list, articles_to_
                 })
             else:
                 app_logger.error(f"Failed to create WordPress post for '{ticker_to_process}' on '{profile_name}'.")
-                state.get('failed_tickers_by_profile', {}).setdefault(profile_id, []).append(ticker_to_process)
+                retry_entry = retry_queue.record_failure(state, profile_id, ticker_to_process, 'wordpress', "WordPress post creation failed")
                 profile_run_details.append({
                     "ticker": ticker_to_process, "status": "failure", 
-                    "timestamp": current_time_str_utc, "message": "WordPress post creation failed."
+                    "timestamp": current_time_str_utc,
+                    "message": "WordPress post creation failed; " + ("parked." if retry_entry['parked'] else f"retry {retry_entry['attempts']} after {datetime.fromtimestamp(retry_entry['next_eligible'], timezone.utc):%Y-%m-%d %H:%M} UTC.")
                 })
         
         # Update pending list for this profile if tickers were not from custom/uploaded source
@@ -545,9 +766,15 @@ def trigger_publishing_run(user_uid, profiles_to_process_data_list, articles_to_
         # Append this run's details to the persistent daily log in state
         state.get('processed_tickers_detailed_log_by_profile', {}).setdefault(profile_id, []).extend(profile_run_details)
 
-        summary_msg = f"Attempted {num_new_posts_to_attempt}. Published {posts_published_this_session} new posts for '{profile_name}'. Total today: {state.get('posts_today_by_profile',{}).get(profile_id, 0)}."
-        run_results_summary[profile_id] = {"profile_name": profile_name, "status_summary": summary_msg, "tickers_processed": profile_run_details} # Pass back details of this run
-    
+        retry_counts = retry_queue.queue_summary(state, profile_id)
+        summary_msg = (f"Attempted {num_new_posts_to_attempt}. Published {posts_published_this_session} new posts for '{profile_name}'. Total today: {state.get('posts_today_by_profile',{}).get(profile_id, 0)}. "
+                       f"Retry queue: {retry_counts['eligible']} eligible, {retry_counts['backing_off']} backing off, {retry_counts['parked']} parked.")
+        run_results_summary[profile_id] = {"profile_name": profile_name, "status_summary": summary_msg, "tickers_processed": profile_run_details, "run_plan": plan_stats, "retry_queue": retry_counts} # Pass back details of this run
+
+    plan_stats['saved'] = max(0, plan_stats['uses'] - plan_stats['actual_computations']) # Analyses a per-profile loop would have repeated
+    app_logger.info(f"Run plan: {plan_stats['work_items']} (profile, ticker) work items -> {plan_stats['planned_computations']} planned analyses; "
+                    f"actual: {plan_stats['actual_computations']} ({plan_stats['on_demand']} on demand, {plan_stats['failed']} failed) "
+                    f"for {plan_stats['uses']} reports, {plan_stats['saved']} saved.")
     save_state(state)
     app_logger.info("Triggered publishing run finished.")
     return run_results_summary
@@ -562,6 +789,11 @@ if __name__ == '__main__':
         exit(1)
     
     mock_user_uid_cli = "cli_user_standalone"
+
+    if '--install-themes' in sys.argv:
+        for pid_res, msg in install_site_themes(mock_user_uid_cli, cli_profiles_data_list, force='--force' in sys.argv).items():
+            app_logger.info(f"Profile {pid_res}: {msg}")
+        exit(0)
     # Prepare articles_map based on profile_id from the loaded data
     articles_map_cli = {profile.get('profile_id'): 1 for profile in cli_profiles_data_list if profile.get('profile_id')}
     
@@ -0,0 +1,63 @@
+# bench_formatting.py
+# Compares the old string round-trip (format in fundamental_analysis -> parse back in html_components)
+# with typed Metric values and the batch API in formatting.py.
+# Usage: python bench_formatting.py [iterations]
+import sys
+import timeit
+import logging
+import numpy as np
+
+import fundamental_analysis as fa
+import html_components as hc
+from formatting import format_many, render_metrics
+
+logging.disable(logging.WARNING)
+
+SAMPLE = [ # (raw value, extraction type, render type) as used by the report sections
+    (2.5e12, 'large_number', 'large_number'), (28.456, 'ratio', 'ratio'), (0.1567, 'percent', 'percent_direct'),
+    (1.8, 'ratio', 'ratio'), (1.1, 'ratio', 'ratio'), (0.12, 'percent', 'percent_direct'),
+    (1.2e8, 'large_number', 'integer'), (0.07, 'percent', 'percent_direct'), (187.23, 'currency', 'currency'),
+    (45_000_000, 'integer', 'integer'),
+]
+
+
+def round_trip_strings():
+    # Previous behaviour: extraction produced display strings, rendering parsed them back
+    for raw, extract_type, render_type in SAMPLE:
+        text = str(fa.format_value(raw, extract_type))
+        hc.format_html_value(text, render_type)
+        hc._safe_float(text)
+
+
+def typed_metrics():
+    for raw, extract_type, render_type in SAMPLE:
+        metric = fa.format_value(raw, extract_type)
+        hc.format_html_value(metric, render_type)
+        hc._safe_float(metric)
+
+
+def batch_render():
+    metrics = {i: fa.format_value(raw, extract_type) for i, (raw, extract_type, _) in enumerate(SAMPLE)}
+    render_metrics(metrics)
+
+
+def batch_column(values=np.random.default_rng(0).uniform(-1e4, 1e6, 1000)):
+    format_many(values, 'currency')
+
+
+def per_cell_column(values=np.random.default_rng(0).uniform(-1e4, 1e6, 1000)):
+    for v in values:
+        hc.format_html_value(v, 'currency')
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for name, fn, reps in [
+        ("string round-trip (10 values)", round_trip_strings, n),
+        ("typed Metric (10 values)", typed_metrics, n),
+        ("render_metrics batch (10 values)", batch_render, n),
+        ("format_html_value per cell (1000 values)", per_cell_column, max(1, n // 100)),
+        ("format_many batch (1000 values)", batch_column, max(1, n // 100)),
+    ]:
+        secs = min(timeit.repeat(fn, number=reps, repeat=3))
+        print(f"{name:<44} {secs / reps * 1e6:10.1f} us/call")
@@ -0,0 +1,73 @@
+# bench_imports.py
+# Cold-start import times for the web tier and the job modules. Each module is imported in a fresh
+# interpreter (python -X importtime) so nothing is cached between measurements, and the heavy
+# analytics packages it pulled in are listed. The web tier (manifest, auto_publisher, main_portal_app)
+# should load none of them; they belong to the first job.
+# Usage: python bench_imports.py [runs] [--max-ms N]   (exit code 1 if a web-tier module fails to import,
+#        loads a heavy package or its median import time exceeds N ms)
+import os
+import re
+import sys
+import json
+import statistics
+import subprocess
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+WEB_TIER = ["manifest", "auto_publisher", "main_portal_app"]
+JOB_MODULES = ["wordpress_reporter", "prewarm_daemon"]
+HEAVY_PACKAGES = ["prophet", "cmdstanpy", "yfinance", "pandas_datareader", "plotly", "matplotlib", "ta",
+                  "html_components", "pandas", "numpy"]
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def measure(module):
+    """(cumulative import time in ms, heavy packages loaded) for one cold import, or (None, error)."""
+    code = (f"import sys, json; import {module}; "
+            f"print(json.dumps([m for m in {HEAVY_PACKAGES!r} if m in sys.modules]))")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=APP_ROOT,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+    cumulative_us = None
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match and match.group(3) == module:
+            cumulative_us = int(match.group(2))
+    heavy = json.loads(proc.stdout.strip().splitlines()[-1])
+    return (cumulative_us or 0) / 1000.0, heavy
+
+
+def main(runs=5, max_ms=None):
+    failed = False
+    print(f"{'module':<22} {'median ms':>10} {'min ms':>8}  heavy packages loaded")
+    for module in WEB_TIER + JOB_MODULES:
+        times, heavy, error = [], [], None
+        for _ in range(runs):
+            elapsed, info = measure(module)
+            if elapsed is None:
+                error = info
+                break
+            times.append(elapsed)
+            heavy = info
+        if error:
+            print(f"{module:<22} {'n/a':>10} {'':>8}  import failed: {error}")
+            if module in WEB_TIER:
+                failed = True
+            continue
+        print(f"{module:<22} {statistics.median(times):>10.1f} {min(times):>8.1f}  {', '.join(heavy) or '-'}")
+        if module in WEB_TIER:
+            if heavy:
+                failed = True
+            if max_ms is not None and statistics.median(times) > max_ms:
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    max_ms = None
+    if "--max-ms" in args:
+        i = args.index("--max-ms")
+        max_ms = float(args[i + 1])
+        del args[i:i + 2]
+    sys.exit(main(int(args[0]) if args else 5, max_ms))
@@ -0,0 +1,252 @@
+# chart_assets.py
+# Content-addressed store for rendered report charts. An asset is keyed by
+# (ticker, chart type, data fingerprint, theme, format). Its bytes are rendered once and kept
+# under data_cache/chart_assets/. The first time a site needs it, it is uploaded to that site's
+# media library and the WordPress media id/URL is recorded per site in index.json.
+# Re-publishing the same chart (same data, same theme) reuses the recorded media instead of
+# rendering or uploading again. New data gives a new fingerprint, and so a new asset.
+# A publishing run renders its missing assets up front in chart_service's process pool (prerender_assets).
+import os
+import re
+import json
+import time
+import base64
+import hashlib
+import logging
+import threading
+import numpy as np
+
+import chart_service
+import site_themes
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+ASSET_DIR = os.getenv("CHART_ASSET_DIR", os.path.join(APP_ROOT, "data_cache", "chart_assets"))
+INDEX_PATH = os.path.join(ASSET_DIR, "index.json")
+ASSET_MAX_AGE_DAYS = int(os.getenv("CHART_ASSET_MAX_AGE_DAYS", "30")) # prune_assets() default
+MIME_TYPES = {"png": "image/png", "webp": "image/webp", "svg": "image/svg+xml"}
+
+_index_lock = threading.Lock()
+_index_cache = {'mtime': None, 'data': {}}
+
+
+# ------------------ Keys ------------------
+def data_fingerprint(chart_data):
+    """Short content hash of the arrays a chart is drawn from (see chart_service.compute_chart_data)."""
+    h = hashlib.sha1()
+    h.update(str(chart_data.get('period_years')).encode())
+    for key in sorted(chart_data):
+        value = chart_data[key]
+        if isinstance(value, np.ndarray):
+            h.update(key.encode())
+            h.update(np.ascontiguousarray(value).tobytes())
+    return h.hexdigest()[:16]
+
+
+def asset_key(ticker, chart_type, fingerprint, theme="default", fmt="png"):
+    safe_ticker = re.sub(r'[^\w\-.]', '_', ticker)
+    return f"{safe_ticker}_{chart_type}_{theme}_{fingerprint}.{fmt}"
+
+
+# ------------------ Index ------------------
+def load_index():
+    """The asset index (key -> record); re-read only when the file changes."""
+    try:
+        mtime = os.path.getmtime(INDEX_PATH)
+    except OSError:
+        return {}
+    if _index_cache['mtime'] != mtime:
+        try:
+            with open(INDEX_PATH, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read chart asset index {INDEX_PATH}: {e}")
+            data = {}
+        _index_cache.update(mtime=mtime, data=data)
+    return _index_cache['data']
+
+
+def _update_index(key, record):
+    """Read-modify-write of one record (record=None deletes it). Swapped in atomically."""
+    with _index_lock:
+        index = dict(load_index())
+        if record is None:
+            index.pop(key, None)
+        else:
+            index[key] = record
+        os.makedirs(ASSET_DIR, exist_ok=True)
+        tmp_path = f"{INDEX_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, INDEX_PATH)
+        _index_cache.update(mtime=os.path.getmtime(INDEX_PATH), data=index)
+
+
+# ------------------ Local Assets ------------------
+def get_chart_asset(ticker, chart_type, chart_data, theme=None, fmt="png"):
+    """
+    Returns the asset record for a chart, rendering and saving it only if this exact
+    (data, theme, format) has not been rendered before. None if the chart cannot be drawn.
+    theme is a site name; its chart colour comes from site_themes.
+    """
+    theme_slug = site_themes.site_slug(theme) if theme else "default"
+    key = asset_key(ticker, chart_type, data_fingerprint(chart_data), theme_slug, fmt)
+    path = os.path.join(ASSET_DIR, key)
+    record = load_index().get(key)
+    if record and os.path.exists(path):
+        return dict(record, key=key, path=path)
+
+    color = site_themes.get_chart_color(theme) if theme else None
+    image = chart_service.render_chart(chart_data, chart_type, fmt, color=color)
+    if image is None:
+        return None
+    record = _store_asset(key, image, ticker, chart_type, theme_slug, fmt)
+    return dict(record, key=key, path=path)
+
+
+def _store_asset(key, image, ticker, chart_type, theme_slug, fmt):
+    """Writes rendered bytes under key and records them in the index (keeping any media already recorded)."""
+    path = os.path.join(ASSET_DIR, key)
+    os.makedirs(ASSET_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(image)
+    os.replace(tmp_path, path)
+
+    record = {'ticker': ticker, 'chart_type': chart_type, 'theme': theme_slug, 'format': fmt,
+              'bytes': len(image), 'created': time.time(), 'media': (load_index().get(key) or {}).get('media', {})}
+    _update_index(key, record)
+    logger.info(f"Rendered chart asset {key} ({len(image)} bytes)")
+    return record
+
+
+def prerender_assets(requests, fmt="png", plot_period_years=3, workers=None):
+    """
+    Renders every missing asset of a run in one batch over chart_service's process pool, so the
+    per-post publish_chart_assets calls only find stored assets. requests: iterable of
+    (ticker, historical_data, site_name, chart_types). Returns the number of assets rendered.
+    """
+    chart_data_by_ticker = {}
+    index = load_index()
+    jobs, misses = [], {}
+    for ticker, historical_data, site_name, chart_types in requests:
+        if ticker not in chart_data_by_ticker: # Same data and window as publish_chart_assets, so the keys match
+            chart_data = chart_service.compute_chart_data(historical_data, ticker, plot_period_years)
+            chart_data_by_ticker[ticker] = (chart_data, data_fingerprint(chart_data))
+        chart_data, fingerprint = chart_data_by_ticker[ticker]
+        theme_slug = site_themes.site_slug(site_name) if site_name else "default"
+        color = site_themes.get_chart_color(site_name) if site_name else None
+        for chart_type in chart_types:
+            key = asset_key(ticker, chart_type, fingerprint, theme_slug, fmt)
+            if key in misses or (key in index and os.path.exists(os.path.join(ASSET_DIR, key))):
+                continue
+            misses[key] = (ticker, chart_type, theme_slug)
+            jobs.append((key, chart_data, chart_type, fmt, color))
+    rendered = 0
+    for key, image in chart_service.render_chart_jobs(jobs, workers).items():
+        if image is not None:
+            _store_asset(key, image, *misses[key], fmt)
+            rendered += 1
+    return rendered
+
+
+# ------------------ WordPress Media ------------------
+def _upload_media(path, site_url, author_details, title, mime_type, timeout=120):
+    """Uploads a file to the site's media library. Returns (media_id, source_url) or (None, None)."""
+    import requests # Only needed when publishing
+
+    media_api_url = f"{site_url.rstrip('/')}/wp-json/wp/v2/media"
+    credentials = f"{author_details['wp_username']}:{author_details['app_password']}"
+    token = base64.b64encode(credentials.encode()).decode('utf-8')
+    filename = os.path.basename(path)
+    headers = {"Authorization": f"Basic {token}", "Content-Disposition": f'attachment; filename="{filename}"'}
+    try:
+        with open(path, 'rb') as f:
+            files = {'file': (filename, f, mime_type)}
+            response = requests.post(media_api_url, headers=headers, files=files,
+                                     data={'title': title, 'alt_text': title}, timeout=timeout)
+        response.raise_for_status()
+        media = response.json()
+        return media.get('id'), media.get('source_url')
+    except Exception as e:
+        logger.error(f"Chart upload to {site_url} failed for {filename}: {e}")
+        return None, None
+
+
+def get_site_media(asset, site_url, author_details, title=None):
+    """
+    (media_id, source_url) of an asset on a site. Uploads it the first time only and records the
+    result in the index, so later posts on that site reference the same media item.
+    """
+    site_key = site_url.rstrip('/')
+    record = load_index().get(asset['key'], asset)
+    media = (record.get('media') or {}).get(site_key)
+    if media and media.get('id'):
+        return media['id'], media.get('url')
+
+    media_id, source_url = _upload_media(asset['path'], site_url, author_details,
+                                         title or f"{asset['ticker']} {asset['chart_type']} chart",
+                                         MIME_TYPES.get(asset['format'], 'application/octet-stream'))
+    if media_id:
+        record = dict(load_index().get(asset['key'], record)) # Re-read: another site may have been added meanwhile
+        record['media'] = dict(record.get('media') or {})
+        record['media'][site_key] = {'id': media_id, 'url': source_url, 'uploaded': time.time()}
+        record.pop('key', None); record.pop('path', None)
+        _update_index(asset['key'], record)
+    return media_id, source_url
+
+
+def publish_chart_assets(ticker, historical_data, site_url, author_details, site_name=None,
+                         chart_types=chart_service.CHART_TYPES, fmt="png", plot_period_years=3):
+    """
+    Makes the ticker's charts available on a site. Indicators are computed once, only missing
+    assets are rendered and only assets new to the site are uploaded.
+    Returns {chart_type: {'id': media_id, 'url': source_url}}.
+    """
+    chart_data = chart_service.compute_chart_data(historical_data, ticker, plot_period_years)
+    published = {}
+    for chart_type in chart_types:
+        try:
+            asset = get_chart_asset(ticker, chart_type, chart_data, theme=site_name, fmt=fmt)
+        except Exception as e:
+            logger.error(f"Chart asset {chart_type} for {ticker} failed: {e}", exc_info=True)
+            continue
+        if asset is None:
+            continue
+        media_id, url = get_site_media(asset, site_url, author_details)
+        if media_id:
+            published[chart_type] = {'id': media_id, 'url': url}
+    return published
+
+
+def forget_site_media(site_url):
+    """Drops every recorded media id for a site (e.g. after its media library was wiped). Returns the count."""
+    site_key = site_url.rstrip('/')
+    dropped = 0
+    for key, record in list(load_index().items()):
+        if site_key in (record.get('media') or {}):
+            record = dict(record, media={s: m for s, m in record['media'].items() if s != site_key})
+            _update_index(key, record)
+            dropped += 1
+    return dropped
+
+
+def prune_assets(max_age_days=None):
+    """
+    Removes local files of assets older than max_age_days that no site references. Uploaded assets
+    keep their index entry so they are never uploaded twice. Returns the number of files removed.
+    """
+    max_age_days = ASSET_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for key, record in list(load_index().items()):
+        if record.get('created', 0) >= cutoff or record.get('media'):
+            continue
+        try:
+            os.remove(os.path.join(ASSET_DIR, key))
+        except OSError:
+            pass
+        _update_index(key, None)
+        removed += 1
+    return removed
@@ -0,0 +1,345 @@
+# chart_service.py
+# Static chart rendering for reports (the Matplotlib charts in technical_analysis, as a service).
+#  - Indicators are computed once per ticker from (Date, Close, Volume); the caller's df is never modified.
+#  - Each process keeps one Figure per chart type and updates its artists (set_data) for every render
+#    instead of building a new figure. Figures use the object-oriented API with an Agg canvas, so
+#    no pyplot global state is involved.
+#  - Series are thinned to a point budget first (see downsampling): LTTB for lines, calendar buckets for volume.
+#  - Output is an in-memory PNG/WebP/SVG buffer.
+#  - render_chart_jobs() spreads renders over a dedicated process pool. Publishing uses it through
+#    chart_assets.prerender_assets: after the run's analyses, every asset-store miss of every profile is
+#    rendered in one batch, so the per-post publish_chart_assets only finds stored assets.
+#  - Ported: the five price/indicator plotters (historical, Bollinger, RSI, MACD lines, MACD histogram).
+#    technical_analysis.plot_forecast_mpl is not ported. It draws the aggregated forecast tables (categorical
+#    periods) rather than the (Date, Close, Volume) series precomputed here, and no report path uses it.
+import io
+import os
+import atexit
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import matplotlib.dates as mdates
+
+from technical_analysis import (calculate_bollinger_bands, calculate_rsi, calculate_macd,
+                                calculate_volume_sma)
+from downsampling import downsample_lines, bucket_ohlcv, bucket_extremes, LINE_POINT_BUDGET, BAR_BUDGET
+
+logger = logging.getLogger(__name__)
+
+CHART_TYPES = ("historical", "bollinger", "rsi", "macd_lines", "macd_hist")
+CHART_FORMATS = ("png", "webp", "svg")
+CHART_DPI = int(os.getenv("CHART_DPI", "100"))
+CHART_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", "0")) or None # None -> CPU count
+MIN_ROWS = {"bollinger": 20, "rsi": 15, "macd_lines": 35, "macd_hist": 35} # Same guards as technical_analysis
+# Main series per chart type and its default colour; a site theme may override the colour (see render_chart)
+PRIMARY_SERIES = {"historical": ("close", "navy"), "bollinger": ("close", "navy"), "rsi": ("rsi", "purple"),
+                  "macd_lines": ("macd_line", "navy")}
+
+
+# ------------------ Indicator Precompute ------------------
+def compute_chart_data(df, ticker, plot_period_years=3):
+    """
+    Computes every indicator once on the full history and slices it to the plot window.
+    Returns a dict of plain NumPy arrays (cheap to pickle to pool workers); df is not modified.
+    """
+    dates = pd.to_datetime(df['Date'], errors='coerce')
+    frame = pd.DataFrame({'Date': dates.to_numpy(), 'Close': pd.to_numeric(df['Close'], errors='coerce').to_numpy()})
+    if 'Volume' in df.columns:
+        frame['Volume'] = pd.to_numeric(df['Volume'], errors='coerce').to_numpy()
+    frame = frame.dropna(subset=['Date']).sort_values('Date').reset_index(drop=True)
+    if frame.empty:
+        return {'ticker': ticker, 'period_years': plot_period_years, 'n_full': 0, 'date': np.array([], dtype='datetime64[ns]')}
+
+    close = frame['Close']
+    bb_upper, bb_middle, bb_lower = calculate_bollinger_bands(close)
+    macd_line, macd_signal, macd_hist = calculate_macd(close)
+    series = {
+        'close': close, 'bb_upper': bb_upper, 'bb_middle': bb_middle, 'bb_lower': bb_lower,
+        'rsi': calculate_rsi(close), 'macd_line': macd_line, 'macd_signal': macd_signal, 'macd_hist': macd_hist,
+    }
+    if 'Volume' in frame.columns and not frame['Volume'].isnull().all():
+        series['volume'] = frame['Volume']
+        series['volume_sma20'] = calculate_volume_sma(frame, 20)
+
+    start = max(frame['Date'].iloc[-1] - pd.DateOffset(years=plot_period_years), frame['Date'].iloc[0])
+    mask = (frame['Date'] >= start).to_numpy()
+    data = {'ticker': ticker, 'period_years': plot_period_years, 'n_full': len(frame),
+            'date': frame['Date'].to_numpy()[mask]}
+    for key, s in series.items():
+        data[key] = pd.Series(s).reindex(frame.index).to_numpy(dtype=float)[mask]
+    return data
+
+
+# ------------------ Figure Templates (one per chart type per process) ------------------
+_FIGURES = {}
+
+
+def _date_axis(ax):
+    ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %Y'))
+    ax.tick_params(axis='x', labelrotation=30)
+
+
+def _build_figure(chart_type):
+    """Creates the figure, axes and persistent artists for a chart type."""
+    height = 6 if chart_type in ("historical", "bollinger") else 4
+    fig = Figure(figsize=(12, height), dpi=CHART_DPI, layout='tight')
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    art = {'ax': ax, 'dynamic': []} # 'dynamic' artists (bars, fills) are replaced on every render
+    empty = ([], [])
+
+    if chart_type == "historical":
+        art['title'] = fig.suptitle('', fontsize=14)
+        ax.set_xlabel('Date')
+        ax.set_ylabel('Price ($)', color='navy')
+        art['close'], = ax.plot(*empty, color='navy', linewidth=1.5, label='Close Price')
+        ax.tick_params(axis='y', labelcolor='navy')
+        ax.grid(True, axis='y', linestyle='--', alpha=0.6)
+        ax2 = ax.twinx()
+        ax2.set_ylabel('Volume', color='darkorange')
+        ax2.tick_params(axis='y', labelcolor='darkorange')
+        art['ax2'] = ax2
+        art['volume_sma20'], = ax2.plot(*empty, color='saddlebrown', linewidth=1, linestyle='dotted', label='Volume SMA20')
+    elif chart_type == "bollinger":
+        art['title'] = ax.set_title('', fontsize=14)
+        ax.set_ylabel('Price ($)')
+        art['bb_upper'], = ax.plot(*empty, color='darkgrey', linewidth=1, label='Upper Band')
+        art['bb_lower'], = ax.plot(*empty, color='darkgrey', linewidth=1, label='Lower Band')
+        art['bb_middle'], = ax.plot(*empty, color='darkorange', linewidth=1, linestyle='--', label='SMA20')
+        art['close'], = ax.plot(*empty, color='navy', linewidth=1.5, label='Close Price')
+        ax.legend(loc='upper left', fontsize='small')
+        ax.grid(True, linestyle='--', alpha=0.6)
+    elif chart_type == "rsi":
+        art['title'] = ax.set_title('', fontsize=14)
+        art['rsi'], = ax.plot(*empty, color='purple', linewidth=1.5, label='RSI (14)')
+        ax.axhline(70, color='red', linestyle='--', linewidth=1, alpha=0.8, label='Overbought (70)')
+        ax.axhline(30, color='green', linestyle='--', linewidth=1, alpha=0.8, label='Oversold (30)')
+        ax.set_ylabel('RSI')
+        ax.set_ylim(0, 100)
+        ax.legend(loc='upper left', fontsize='small')
+        ax.grid(True, linestyle='--', alpha=0.6)
+    elif chart_type == "macd_lines":
+        art['title'] = ax.set_title('', fontsize=14)
+        art['macd_line'], = ax.plot(*empty, color='navy', linewidth=1.5, label='MACD Line')
+        art['macd_signal'], = ax.plot(*empty, color='orangered', linewidth=1.5, label='Signal Line')
+        ax.axhline(0, color='grey', linestyle='--', linewidth=1, alpha=0.5)
+        ax.set_ylabel('MACD Value')
+        ax.legend(loc='upper left', fontsize='small')
+        ax.grid(True, linestyle='--', alpha=0.6)
+    elif chart_type == "macd_hist":
+        art['title'] = ax.set_title('', fontsize=14)
+        ax.axhline(0, color='grey', linestyle='--', linewidth=1, alpha=0.5)
+        ax.set_ylabel('Histogram Value')
+        ax.grid(True, axis='y', linestyle='--', alpha=0.6)
+    else:
+        raise ValueError(f"Unknown chart type '{chart_type}'. Available: {', '.join(CHART_TYPES)}")
+    _date_axis(ax)
+    return fig, art
+
+
+def _get_figure(chart_type):
+    if chart_type not in _FIGURES:
+        _FIGURES[chart_type] = _build_figure(chart_type)
+    return _FIGURES[chart_type]
+
+
+def _clear_dynamic(art):
+    for artist in art['dynamic']:
+        artist.remove()
+    art['dynamic'] = []
+
+
+def _update_figure(chart_type, data, color=None):
+    """Points the persistent artists at this ticker's data. Returns the figure, or None if there is too little data."""
+    if data['n_full'] < MIN_ROWS.get(chart_type, 1):
+        return None
+    fig, art = _get_figure(chart_type)
+    ax = art['ax']
+    _clear_dynamic(art)
+    if chart_type in PRIMARY_SERIES: # Reset every render; figures are shared between themes
+        key, default_color = PRIMARY_SERIES[chart_type]
+        art[key].set_color(color or default_color)
+    ticker, years = data['ticker'], data['period_years']
+    x_all = mdates.date2num(data['date'])
+
+    def valid(*keys):
+        mask = np.ones(len(x_all), dtype=bool)
+        for key in keys:
+            mask &= ~np.isnan(data[key])
+        return mask
+
+    def thin(mask, *keys):
+        # Shared x for all keys (LTTB union), so fills between series stay aligned
+        frame = pd.DataFrame({key: data[key][mask] for key in keys})
+        frame['x'] = x_all[mask]
+        frame = downsample_lines(frame, 'x', list(keys), LINE_POINT_BUDGET)
+        return frame['x'].to_numpy(), {key: frame[key].to_numpy() for key in keys}
+
+    if chart_type == "historical":
+        if not len(x_all):
+            return None
+        art['title'].set_text(f'{ticker} Historical Price & Volume ({years}Y)')
+        x, ys = thin(valid('close'), 'close')
+        art['close'].set_data(x, ys['close'])
+        ax2 = art['ax2']
+        if 'volume' in data:
+            bars = bucket_ohlcv(pd.DataFrame({'Date': data['date'], 'Volume': data['volume']}), BAR_BUDGET)
+            art['dynamic'].append(ax2.bar(mdates.date2num(bars['Date']), bars['Volume'], width=bars['Width'] * 0.9,
+                                          align='edge', color='darkorange', alpha=0.3, label='Volume'))
+            x, ys = thin(valid('volume_sma20'), 'volume_sma20')
+            art['volume_sma20'].set_data(x, ys['volume_sma20'])
+        else:
+            art['volume_sma20'].set_data([], [])
+        ax2.relim()
+        ax2.autoscale_view()
+        ax2.set_ylim(bottom=0)
+        lines, labels = ax.get_legend_handles_labels()
+        lines2, labels2 = ax2.get_legend_handles_labels()
+        art['dynamic'].append(ax2.legend(lines + lines2, labels + labels2, loc='upper left', fontsize='small'))
+    elif chart_type == "bollinger":
+        m = valid('bb_upper', 'bb_middle', 'bb_lower', 'close')
+        if not m.any():
+            return None
+        x, ys = thin(m, 'bb_upper', 'bb_lower', 'bb_middle', 'close')
+        for key in ('bb_upper', 'bb_lower', 'bb_middle', 'close'):
+            art[key].set_data(x, ys[key])
+        art['dynamic'].append(ax.fill_between(x, ys['bb_lower'], ys['bb_upper'], color='lightgrey', alpha=0.3))
+        art['title'].set_text(f'{ticker} Price & Bollinger Bands ({years}Y)')
+    elif chart_type == "rsi":
+        m = valid('rsi')
+        if not m.any():
+            return None
+        x, ys = thin(m, 'rsi')
+        art['rsi'].set_data(x, ys['rsi'])
+        art['title'].set_text(f'{ticker} Relative Strength Index (RSI 14) ({years}Y)')
+    elif chart_type == "macd_lines":
+        m = valid('macd_line', 'macd_signal')
+        if m.sum() < 2:
+            return None
+        x, ys = thin(m, 'macd_line', 'macd_signal')
+        art['macd_line'].set_data(x, ys['macd_line'])
+        art['macd_signal'].set_data(x, ys['macd_signal'])
+        art['title'].set_text(f'{ticker} MACD Line vs Signal Line ({years}Y)')
+    elif chart_type == "macd_hist":
+        m = valid('macd_hist')
+        if m.sum() < 2:
+            return None
+        bars = bucket_extremes(pd.DataFrame({'x': x_all[m], 'hist': data['macd_hist'][m]}), 'hist', BAR_BUDGET)
+        x, hist = bars['x'].to_numpy(), bars['hist'].to_numpy()
+        width = (x[-1] - x[0]) / max(len(x) - 1, 1) * 0.8 # 80% of the mean spacing (kept bars are unevenly spaced)
+        colors = np.where(hist >= 0, 'green', 'red')
+        art['dynamic'].append(ax.bar(x, hist, color=colors, width=width, label='MACD Histogram'))
+        art['dynamic'].append(ax.legend(loc='upper left', fontsize='small'))
+        art['title'].set_text(f'{ticker} MACD Histogram ({years}Y)')
+
+    if chart_type != "rsi": # RSI keeps its fixed 0-100 range
+        ax.relim()
+        ax.autoscale_view()
+    return fig
+
+
+def figure_to_bytes(fig, fmt="png"):
+    """Renders a figure to an in-memory buffer. WebP goes through Pillow from a PNG render."""
+    fmt = fmt.lower()
+    if fmt not in CHART_FORMATS:
+        raise ValueError(f"Unsupported chart format '{fmt}'. Use one of: {', '.join(CHART_FORMATS)}")
+    buf = io.BytesIO()
+    if fmt == "webp":
+        from PIL import Image
+        png = io.BytesIO()
+        fig.savefig(png, format="png", dpi=CHART_DPI)
+        png.seek(0)
+        Image.open(png).save(buf, format="WEBP", quality=85, method=4)
+    else:
+        fig.savefig(buf, format=fmt, dpi=CHART_DPI)
+    return buf.getvalue()
+
+
+def render_chart(data, chart_type, fmt="png", color=None):
+    """One chart for precomputed chart data -> bytes (None if the data is insufficient). color overrides the main series colour."""
+    fig = _update_figure(chart_type, data, color)
+    return figure_to_bytes(fig, fmt) if fig is not None else None
+
+
+def render_charts(df, ticker, chart_types=CHART_TYPES, fmt="png", plot_period_years=3):
+    """All requested charts for one ticker: indicators computed once, figures reused. Returns {chart_type: bytes}."""
+    data = compute_chart_data(df, ticker, plot_period_years)
+    out = {}
+    for chart_type in chart_types:
+        try:
+            image = render_chart(data, chart_type, fmt)
+        except Exception as e:
+            logger.error(f"Rendering {chart_type} chart for {ticker} failed: {e}", exc_info=True)
+            image = None
+        if image is not None:
+            out[chart_type] = image
+    return out
+
+
+# ------------------ Process Pool ------------------
+_pool = None
+_pool_workers = None
+
+
+def _render_chart_job(job):
+    key, data, chart_type, fmt, color = job
+    try:
+        return key, render_chart(data, chart_type, fmt, color)
+    except Exception as e: # One bad chart must not fail the batch
+        logger.error(f"Rendering {chart_type} chart for {data.get('ticker')} failed: {e}", exc_info=True)
+        return key, None
+
+
+def get_render_pool(workers=None):
+    """The dedicated chart process pool (created on first use, reused across batches)."""
+    global _pool, _pool_workers
+    workers = workers or CHART_WORKERS
+    if _pool is None or workers != _pool_workers:
+        shutdown_render_pool()
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_render_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+atexit.register(shutdown_render_pool)
+
+
+def render_chart_jobs(jobs, workers=None):
+    """
+    Renders (key, chart_data, chart_type, fmt, color) jobs across the process pool; chart_data comes from
+    compute_chart_data (plain arrays, cheap to pickle). workers=1 or a single job renders in this process.
+    Returns {key: bytes or None}.
+    """
+    jobs = list(jobs)
+    if workers == 1 or len(jobs) <= 1:
+        return dict(_render_chart_job(job) for job in jobs)
+    n_workers = workers or CHART_WORKERS or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (4 * n_workers))
+    return dict(get_render_pool(workers).map(_render_chart_job, jobs, chunksize=chunksize))
+
+
+def render_batch(frames_by_ticker, chart_types=CHART_TYPES, fmt="png", plot_period_years=3, workers=None):
+    """
+    Renders default-colour charts for many tickers across the process pool (see render_chart_jobs).
+    Indicators are computed here, once per ticker. Returns {ticker: {chart_type: bytes}}.
+    """
+    jobs = []
+    for ticker, df in frames_by_ticker.items():
+        data = compute_chart_data(df, ticker, plot_period_years)
+        jobs.extend(((ticker, chart_type), data, chart_type, fmt, None) for chart_type in chart_types)
+    results = {ticker: {} for ticker in frames_by_ticker}
+    for (ticker, chart_type), image in render_chart_jobs(jobs, workers).items():
+        if image is not None:
+            results[ticker][chart_type] = image
+    return results
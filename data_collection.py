@@ -1,18 +1,75 @@
 # data_collection.py (MODIFIED with improved caching path and logging)
 
 import time
+import pickle
 import logging
+import threading
 import yfinance as yf
 import pandas as pd
 from datetime import datetime
 import os
 
+import symbol_index
+import rate_limiter
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Removed CACHE_DIR definition here, will be constructed using app_root
 
+# Fundamentals (info/recommendations/news) change slowly; cached copies younger than this are used as-is
+FUNDAMENTALS_CACHE_HOURS = float(os.getenv("FUNDAMENTALS_CACHE_HOURS", "24"))
+
+# yfinance errors that say the symbol itself is unknown (checked after the rate-limit test, so a throttle never matches)
+DEFINITIVE_SYMBOL_ERRORS = ("quote not found", "symbol not found", "404")
+# yfinance reports "possibly delisted; no price data found" for transient Yahoo failures as well as for
+# delisted symbols: not negative-cached (delistings come from the symbol index) and not counted by the breaker
+AMBIGUOUS_SYMBOL_ERRORS = ("possibly delisted",)
+
+# yf.download resets and reads the module-level yf.shared._DFS/_ERRORS on every call, so concurrent downloads in
+# one process (the publisher's analysis threads, the pre-warm daemon) can drop or swap each other's frames
+_download_lock = threading.Lock()
+
+
+def yfinance_error(ticker):
+    """The error yf.download recorded for ticker, or None. download() logs per-ticker failures
+    (throttling, network errors, unknown symbols) into yf.shared._ERRORS and returns an empty frame."""
+    errors = getattr(getattr(yf, 'shared', None), '_ERRORS', None) or {}
+    error = errors.get(ticker) or errors.get(str(ticker).upper())
+    return str(error) if error else None
+
+
+def check_empty_download(ticker):
+    """
+    Called by download (under its lock) when yf.download returned an empty frame. Raises for a
+    recorded throttle or transient error, so the breaker counts it and the caller's retry logic sees it.
+    Returns the recorded error when it says the symbol is unknown, else None (nothing or an ambiguous error recorded).
+    """
+    error = yfinance_error(ticker)
+    if error is None:
+        return None
+    if not rate_limiter.is_rate_limit_error(RuntimeError(error)):
+        if any(word in error.lower() for word in DEFINITIVE_SYMBOL_ERRORS):
+            return error
+        if any(word in error.lower() for word in AMBIGUOUS_SYMBOL_ERRORS):
+            logger.warning(f"yfinance: {error} (not negative-cached)")
+            return None
+    raise RuntimeError(f"Could not fetch '{ticker}' from yfinance: {error}")
+
+
+def download(ticker, **kwargs):
+    """
+    yf.download(tickers=ticker, **kwargs) -> (frame, symbol error or None). Call inside rate_limiter.market_data_call.
+    Downloads in this process are serialized so the frame and the recorded error belong to this ticker;
+    raises like check_empty_download for a swallowed throttle.
+    """
+    with _download_lock:
+        data = yf.download(tickers=ticker, **kwargs)
+        symbol_error = check_empty_download(ticker) if data.empty else None
+    return data, symbol_error
+
+
 def fetch_stock_data(
     ticker,
     app_root, # Added app_root argument
@@ -20,7 +77,7 @@ def fetch_stock_data(
     end_date=None,
     max_retries=3,
     pause_secs=2,
-    throttle_secs=0.3,
+    throttle_secs=0.3, # Unused: pacing is done by the shared rate_limiter bucket
     timeout=30  
 ):
     """
@@ -66,6 +123,10 @@ def fetch_stock_data(
 
     # --- Download Logic (If Cache Miss or Invalid) ---
     logger.info(f"Cache miss or invalid for {ticker}. Proceeding to download.")
+    ticker_ok, ticker_reason = symbol_index.check_symbol(ticker)
+    if not ticker_ok: # Known-bad or delisted: skip the download and its retries
+        logger.warning(f"Not downloading '{ticker}': {ticker_reason}.")
+        return None
     # (Rest of the download and processing logic remains the same as previous version)
     # ... (yf.download call, processing, validation) ...
 
@@ -84,21 +145,23 @@ def fetch_stock_data(
     data = None
     while attempt < max_retries:
         try:
-            time.sleep(throttle_secs)
-            data = yf.download(
-                tickers=ticker, start=start_date, end=end_date, period=period,
-                auto_adjust=True, progress=False, threads=False
-            )
+            with rate_limiter.market_data_call('yfinance'): # Shared token bucket + circuit breaker
+                # yfinance swallows throttles into an empty frame; download raises for them, keeping them out of record_success
+                data, symbol_error = download(
+                    ticker, start=start_date, end=end_date, period=period,
+                    auto_adjust=True, progress=False, threads=False
+                )
             if data.empty:
                 logger.warning(f"No data found for ticker: {ticker} via yfinance.")
+                if symbol_error: # Only a definitive "not found"; a bare empty frame may be a Yahoo hiccup
+                    symbol_index.mark_bad(ticker, symbol_error[:120]) # Negative-cached for BAD_SYMBOL_TTL_HOURS
                 data = None
                 break
             break
         except Exception as e:
-            msg = str(e).lower()
-            if "rate limit" in msg or "too many requests" in msg:
+            if rate_limiter.is_rate_limit_error(e):
                 attempt += 1
-                wait = pause_secs * attempt
+                wait = pause_secs * 2 ** (attempt - 1) # Exponential; the breaker also holds back other callers
                 logger.warning(f"Rate limit on '{ticker}', retry {attempt}/{max_retries} in {wait}s: {e}")
                 time.sleep(wait); continue
             logger.error(f"Error fetching '{ticker}': {e}")
@@ -147,10 +210,70 @@ def fetch_stock_data(
     except Exception as e:
         logger.error(f"Failed to save data for {ticker} to cache file {cache_filename}: {e}")
 
+    symbol_index.record_seen(ticker)
     logger.info(f"Successfully fetched and processed {len(data)} rows for '{ticker}'.")
     return data[required]
 
 
+def fetch_fundamentals(ticker, app_root, max_age_hours=None):
+    """
+    yfinance fundamentals for a ticker: {'info': dict, 'recommendations': DataFrame, 'news': list}.
+    Cached as a pickle under data_cache/fundamentals/ for max_age_hours (FUNDAMENTALS_CACHE_HOURS).
+    If a refresh fails, a stale cached copy is preferred over empty fundamentals.
+    """
+    if not app_root:
+        raise ValueError("app_root is required for cache path construction.")
+    max_age_hours = FUNDAMENTALS_CACHE_HOURS if max_age_hours is None else max_age_hours
+    cache_dir = os.path.join(app_root, 'data_cache', 'fundamentals')
+    cache_filepath = os.path.join(cache_dir, f"{ticker}_fundamentals.pkl")
+
+    cached = None
+    if os.path.exists(cache_filepath):
+        try:
+            with open(cache_filepath, 'rb') as f:
+                cached = pickle.load(f)
+            age_hours = (time.time() - os.path.getmtime(cache_filepath)) / 3600
+            if age_hours <= max_age_hours and cached.get('info'):
+                logger.info(f"Loaded fundamentals for '{ticker}' from cache ({age_hours:.1f}h old).")
+                return cached
+        except Exception as e:
+            logger.warning(f"Failed to load cached fundamentals for {ticker}: {e}. Re-fetching.")
+            cached = None
+
+    try:
+        with rate_limiter.market_data_call('yfinance', tokens=3): # info, recommendations and news are separate requests
+            yf_ticker_obj = yf.Ticker(ticker)
+            recommendations = getattr(yf_ticker_obj, 'recommendations', None)
+            news = getattr(yf_ticker_obj, 'news', None)
+            fundamentals = {
+                'info': yf_ticker_obj.info or {},
+                'recommendations': recommendations if recommendations is not None else pd.DataFrame(),
+                'news': news if news is not None else []
+            }
+    except Exception as e:
+        logger.warning(f"Failed to fetch yfinance fundamentals for {ticker}: {e}")
+        if cached:
+            logger.info(f"Using stale cached fundamentals for '{ticker}'.")
+            return cached
+        return {'info': {}, 'recommendations': pd.DataFrame(), 'news': []}
+
+    if not fundamentals['info']:
+        logger.warning(f"yfinance info data for {ticker} is empty.")
+        if cached and cached.get('info'):
+            return cached
+        return fundamentals # Not cached, so the next call retries
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_filepath}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(fundamentals, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_filepath)
+    except Exception as e:
+        logger.error(f"Failed to save fundamentals for {ticker} to cache: {e}")
+    return fundamentals
+
+
 # Example usage (if run directly, needs a placeholder app_root)
 if __name__ == "__main__":
     try:
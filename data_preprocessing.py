@@ -1,15 +1,19 @@
-import yfinance as yf
 import pandas as pd
 
+import rate_limiter
+import data_collection
+
 def fetch_stock_data(ticker):
     """Fetch and process maximum historical stock data for a single ticker"""
     # Fetch data with maximum history
-    data = yf.download(
-        ticker,
-        period="max",
-        auto_adjust=True,
-        progress=False
-    )
+    with rate_limiter.market_data_call('yfinance'):
+        # Serialized with the other downloads in this process; raises for a swallowed throttle so the breaker sees it
+        data, _ = data_collection.download(
+            ticker,
+            period="max",
+            auto_adjust=True,
+            progress=False
+        )
     
     if data.empty:
         raise ValueError(f"No data found for ticker: {ticker}")
@@ -93,7 +97,11 @@ def preprocess_data(stock_df, macro_df):
     """Merge and align stock data with macroeconomic data"""
     # Standardize both datasets
     stock = enforce_date_column(stock_df.copy(), "Stock")
-    macro = enforce_date_column(macro_df.copy(), "Macro")
+    macro_version = macro_df.attrs.get('macro_version') if isinstance(macro_df, pd.DataFrame) else None
+    if macro_version is not None:
+        macro = macro_df # Shared macro_store frame: already normalized and sorted, read-only, never modified below
+    else:
+        macro = enforce_date_column(macro_df.copy(), "Macro")
 
     # Rename stock columns (ensure consistency)
     stock = stock.rename(columns={
@@ -172,4 +180,6 @@ def preprocess_data(stock_df, macro_df):
          raise ValueError("Core 'Date' or 'Close' column missing from final features.")
 
     print(f"Final features selected: {final_features}")
-    return merged[final_features] # Return only existing required features
\ No newline at end of file
+    result = merged[final_features] # Return only existing required features
+    result.attrs['macro_version'] = macro_version # Downstream caches key on it (forecast cache)
+    return result
\ No newline at end of file
@@ -0,0 +1,106 @@
+# downsampling.py
+# Point budgets for charts. Three years of daily (calendar-reindexed) data is over 1,000 rows per
+# series and the full history several thousand, far more than a chart's pixel width can show.
+#  - Line series: Largest-Triangle-Three-Buckets (LTTB) keeps the points that define the visible shape
+#    (peaks, troughs, turns), unlike every-nth sampling.
+#  - Volume bars: OHLC-aware calendar bucketing (day -> week -> month -> quarter, the finest that fits).
+#    Each bar covers whole periods: Open first, High max, Low min, Close last, Volume mean per trading day.
+#    Volume stays on the same scale as its daily SMA.
+#  - Oscillator bars (MACD histogram): the largest-magnitude bar per bucket, so sign flips and spikes survive.
+import os
+import numpy as np
+import pandas as pd
+
+LINE_POINT_BUDGET = int(os.getenv("CHART_LINE_POINTS", "700"))       # Static (Matplotlib) charts
+PLOTLY_POINT_BUDGET = int(os.getenv("PLOTLY_LINE_POINTS", "1000"))   # Interactive charts keep more for zooming
+BAR_BUDGET = int(os.getenv("CHART_BAR_POINTS", "260"))
+BUCKET_PERIODS = ('D', 'W', 'M', 'Q')
+
+
+def _as_float(x):
+    """Dates -> float days; numbers as-is (LTTB only needs relative distances)."""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[s]').astype(np.int64) / 86400.0
+    return x.astype(float)
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the n_out points LTTB keeps (first and last always included). x must be sorted."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _as_float(x)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (n_out - 2)
+    edges = np.floor(np.arange(n_out - 1) * every).astype(int) + 1 # Bucket i is [edges[i], edges[i+1])
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        # Twice the triangle area (a, candidate, next-bucket average); the constant factor does not matter
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def downsample_lines(df, x_col, y_cols, n_out=None):
+    """
+    Rows of df to keep so every column in y_cols stays within the budget. The budget is split
+    across the columns, LTTB runs on each column's non-NaN rows, and the union of kept rows is
+    returned, so all traces share x values (band fills stay aligned). Returns a new frame.
+    """
+    n_out = LINE_POINT_BUDGET if n_out is None else n_out
+    if len(df) <= n_out:
+        return df
+    per_series = max(3, n_out // max(1, len(y_cols)))
+    x = df[x_col].to_numpy()
+    keep = np.zeros(len(df), dtype=bool)
+    for col in y_cols:
+        y = df[col].to_numpy(dtype=float)
+        valid = np.flatnonzero(~np.isnan(y))
+        if len(valid):
+            keep[valid[lttb_indices(x[valid], y[valid], per_series)]] = True
+    return df.iloc[np.flatnonzero(keep)]
+
+
+def bucket_ohlcv(df, n_out=None, date_col='Date'):
+    """
+    Calendar buckets for bar charts: the finest of day/week/month/quarter with at most n_out
+    buckets. Returns a frame with date_col (bucket start; draw bars left-aligned), 'Width' (bucket
+    span in days), and whichever of Open/High/Low/Close/Volume df has.
+    """
+    n_out = BAR_BUDGET if n_out is None else n_out
+    dates = pd.to_datetime(df[date_col])
+    aggs = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'mean'}
+    aggs = {col: how for col, how in aggs.items() if col in df.columns}
+    for freq in BUCKET_PERIODS:
+        periods = dates.dt.to_period(freq)
+        if periods.nunique() <= n_out or freq == BUCKET_PERIODS[-1]:
+            break
+    if freq == 'D':
+        out = df[[date_col] + list(aggs)].copy()
+        out['Width'] = 1.0
+        return out.reset_index(drop=True)
+    out = df[list(aggs)].groupby(periods.to_numpy(), sort=True).agg(aggs)
+    spans = pd.PeriodIndex(out.index)
+    out.insert(0, date_col, spans.start_time)
+    out['Width'] = ((spans.end_time - spans.start_time).days + 1).to_numpy(dtype=float)
+    return out.reset_index(drop=True)
+
+
+def bucket_extremes(df, y_col, n_out=None):
+    """Equal-count buckets keeping the row with the largest |y| in each (for signed bar series). Returns a new frame."""
+    n_out = BAR_BUDGET if n_out is None else n_out
+    n = len(df)
+    if n <= n_out:
+        return df
+    y = np.abs(df[y_col].to_numpy(dtype=float))
+    y = np.where(np.isnan(y), -1.0, y)
+    edges = np.linspace(0, n, n_out + 1).astype(int)
+    keep = [lo + int(np.argmax(y[lo:hi])) for lo, hi in zip(edges[:-1], edges[1:]) if hi > lo]
+    return df.iloc[keep]
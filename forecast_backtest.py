@@ -0,0 +1,264 @@
+# forecast_backtest.py
+# Rolling-origin backtest of forecast engines (see forecast_engines) on the cached price
+# histories in data_cache/. For every ticker, engine, parameter set and origin the data up to the
+# origin goes through preprocess_data with the cached macro indicators, as in production (calendar-daily,
+# forward-filled, with the RSI/MACD/Interest_Rate regressors), the engine is fitted on it and its daily
+# forecast is scored on the actual closes of the following horizon.
+# Fits run in a process pool; results and a per-(engine, parameter set) leaderboard are written
+# to data_cache/.
+# Usage: python forecast_backtest.py [--engines prophet,numpy,global] [--grid grid.json] [--horizon 3m]
+#                                    [--origins 4] [--step 1m] [--workers N] [--use-tuned] [TICKER ...]
+#        python forecast_backtest.py --check-bands [--engines numpy,global] [TICKER ...]
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import logging
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from forecast_engines import get_forecast_engine, parse_time_period
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_CACHE_DIR = os.path.join(APP_ROOT, "data_cache")
+LEADERBOARD_CSV = os.path.join(DATA_CACHE_DIR, "forecast_leaderboard.csv")
+RESULTS_CSV = os.path.join(DATA_CACHE_DIR, "forecast_backtest_results.csv")
+MIN_TRAIN_ROWS = 250 # Origins leaving less history than this are skipped
+BAND_SCALING_TOLERANCE = 0.05 # --check-bands: allowed relative difference of the final band width
+
+# Parameter sets per engine: name -> params passed to the engine. Override with --grid.
+DEFAULT_PARAM_GRID = {
+    'prophet': {
+        'default': {},
+        'cps0.02': {'changepoint_prior_scale': 0.02},
+        'additive': {'seasonality_mode': 'additive'},
+    },
+    'numpy': {
+        'default': {},
+        'window2y': {'window_days': 730},
+        'undamped': {'trend_damping': 1.0},
+        'no_seasonality': {'yearly_order': 0},
+    },
+    'global': {
+        'default': {},
+        'no_seasonality': {'yearly_order': 0},
+    },
+}
+
+
+def cached_history_paths(tickers=None, cache_dir=DATA_CACHE_DIR):
+    """Returns dict ticker -> path of data_cache/<TICKER>_stock_data.csv."""
+    paths = {}
+    for path in sorted(glob.glob(os.path.join(cache_dir, "*_stock_data.csv"))):
+        ticker = os.path.basename(path)[:-len("_stock_data.csv")]
+        if not tickers or ticker in tickers:
+            paths[ticker] = path
+    return paths
+
+
+@lru_cache(maxsize=64) # Per process: each worker reads a CSV once however many tasks use it
+def load_history(path):
+    df = pd.read_csv(path, parse_dates=['Date'])
+    return df.dropna(subset=['Date', 'Close']).sort_values('Date').reset_index(drop=True)
+
+
+@lru_cache(maxsize=1) # Per process, like load_history
+def load_macro():
+    """Macro indicators as prepare_report_data gets them, with the same all-zero fallback when there are none."""
+    from macro_data import fetch_macro_indicators # Imported lazily: pulls in pandas_datareader
+    macro = fetch_macro_indicators(app_root=APP_ROOT)
+    if macro is None or macro.empty:
+        logger.warning("No macro data; backtesting with zero macro regressors.")
+        return None
+    return macro
+
+
+def training_frame(data, origin):
+    """The history up to origin, preprocessed like production's processed_data."""
+    from data_preprocessing import preprocess_data # Imported lazily: pulls in ta/yfinance
+    train = data[data['Date'] <= origin].copy()
+    macro = load_macro()
+    if macro is None:
+        macro = pd.DataFrame({'Date': pd.date_range(train['Date'].min(), train['Date'].max(), freq='D')})
+        for col in ('Interest_Rate', 'SP500', 'Interest_Rate_MA30', 'SP500_MA30'):
+            macro[col] = 0.0
+    return preprocess_data(train, macro)
+
+
+def load_cached_histories(tickers=None, cache_dir=DATA_CACHE_DIR):
+    """Returns dict ticker -> DataFrame(Date, Close, ...) for the cached histories."""
+    return {ticker: load_history(path) for ticker, path in cached_history_paths(tickers, cache_dir).items()}
+
+
+def rolling_origins(dates, horizon_days, n_origins=4, step_days=30):
+    """
+    Origins counted back from the end: the latest leaves exactly horizon_days of data to score,
+    each earlier one is step_days before it. Returns them oldest first.
+    """
+    last = dates.iloc[-1]
+    origins = [last - pd.Timedelta(days=horizon_days + i * step_days) for i in range(n_origins)]
+    return sorted(o for o in origins if (dates <= o).sum() >= MIN_TRAIN_ROWS)
+
+
+def score_forecast(forecast, actual):
+    """
+    Scores a forecast frame (ds, yhat, yhat_lower, yhat_upper) against actual closes (Date, Close)
+    on the dates both have. Returns {'mape', 'coverage', 'n_points'} (mape/coverage in percent).
+    """
+    merged = actual[['Date', 'Close']].merge(forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']],
+                                             left_on='Date', right_on='ds', how='inner')
+    if merged.empty:
+        return {'mape': np.nan, 'coverage': np.nan, 'n_points': 0}
+    y = merged['Close'].to_numpy(dtype=float)
+    ape = np.abs(merged['yhat'].to_numpy(dtype=float) - y) / np.abs(y)
+    inside = (y >= merged['yhat_lower'].to_numpy(dtype=float)) & (y <= merged['yhat_upper'].to_numpy(dtype=float))
+    return {'mape': float(ape.mean() * 100), 'coverage': float(inside.mean() * 100), 'n_points': len(merged)}
+
+
+def evaluate_task(task):
+    """
+    Runs one fit + score. task: dict with path, ticker, engine, param_set, params, origin, horizon and
+    optionally use_tuned (default False: parameter sets start from the built-in defaults, not the tuned
+    params store). Top-level so it can be sent to pool workers. Never raises; failures go in 'error'.
+    """
+    row = {'ticker': task['ticker'], 'engine': task['engine'], 'param_set': task['param_set'],
+           'origin': task['origin'], 'mape': np.nan, 'coverage': np.nan, 'n_points': 0,
+           'fit_seconds': np.nan, 'error': None}
+    try:
+        data = load_history(task['path'])
+        origin = pd.Timestamp(task['origin'])
+        horizon_days = parse_time_period(task['horizon'])
+        train = training_frame(data, origin)
+        test = data[(data['Date'] > origin) & (data['Date'] <= origin + pd.Timedelta(days=horizon_days))]
+        start = time.perf_counter()
+        _, forecast, _, _ = get_forecast_engine(task['engine'])(
+            train, ticker=task['ticker'], forecast_horizon=task['horizon'], use_tuned=task.get('use_tuned', False),
+            **task['params'])
+        row['fit_seconds'] = time.perf_counter() - start
+        row.update(score_forecast(forecast, test))
+    except Exception as e: # One failing engine/ticker must not stop the run
+        row['error'] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def calendar_daily(data):
+    """Trading-day history reindexed to every calendar day and forward-filled, the shape of processed_data."""
+    daily = data.set_index('Date').sort_index()
+    return daily.reindex(pd.date_range(daily.index[0], daily.index[-1], freq='D')).ffill().rename_axis('Date').reset_index()
+
+
+def check_band_scaling(data, engine, ticker='STOCK', horizon="3m"):
+    """
+    Fits engine on a trading-day history and on its calendar-daily version and returns the relative
+    difference of the final forecast band width (log(yhat_upper / yhat_lower)). Near zero when the engine
+    scales volatility the same way for both inputs.
+    """
+    widths = []
+    for frame in (data[['Date', 'Close']], calendar_daily(data[['Date', 'Close']])):
+        _, forecast, _, _ = get_forecast_engine(engine)(frame, ticker=ticker, forecast_horizon=horizon, use_tuned=False)
+        last = forecast.iloc[-1]
+        widths.append(float(np.log(last['yhat_upper'] / last['yhat_lower'])))
+    return abs(widths[1] - widths[0]) / widths[0]
+
+
+def build_tasks(paths, param_grid, horizon="3m", n_origins=4, step="1m", use_tuned=False):
+    """Cartesian product of tickers x rolling origins x engines x parameter sets."""
+    horizon_days, step_days = parse_time_period(horizon), parse_time_period(step)
+    tasks = []
+    for ticker, path in paths.items():
+        for origin in rolling_origins(load_history(path)['Date'], horizon_days, n_origins, step_days):
+            for engine, param_sets in param_grid.items():
+                for param_set, params in param_sets.items():
+                    tasks.append({'path': path, 'ticker': ticker, 'engine': engine, 'param_set': param_set,
+                                  'params': params, 'origin': origin.strftime('%Y-%m-%d'), 'horizon': horizon,
+                                  'use_tuned': use_tuned})
+    return tasks
+
+
+def run_backtest(tasks, workers=None):
+    """Evaluates tasks in a process pool (workers=1 runs inline). Returns a results DataFrame."""
+    if workers == 1 or len(tasks) <= 1:
+        rows = [evaluate_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(evaluate_task, tasks, chunksize=max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1)))))
+    return pd.DataFrame(rows)
+
+
+def leaderboard(results):
+    """
+    One row per (engine, param_set), best mean MAPE first. Coverage is the share of actual closes
+    inside [yhat_lower, yhat_upper]; the bands are nominally 80%.
+    """
+    ok = results[results['error'].isna()]
+    board = ok.groupby(['engine', 'param_set']).agg(
+        mape=('mape', 'mean'), median_mape=('mape', 'median'), coverage=('coverage', 'mean'),
+        fit_seconds=('fit_seconds', 'mean'), fits=('mape', 'size'), tickers=('ticker', 'nunique')).reset_index()
+    errors = results[results['error'].notna()].groupby(['engine', 'param_set']).size().rename('errors').reset_index()
+    board = board.merge(errors, on=['engine', 'param_set'], how='outer').fillna({'errors': 0, 'fits': 0, 'tickers': 0})
+    board[['errors', 'fits', 'tickers']] = board[['errors', 'fits', 'tickers']].astype(int)
+    return board.sort_values(['mape', 'fit_seconds'], na_position='last').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of forecast engines on cached histories.")
+    parser.add_argument("tickers", nargs="*", help="Tickers to include (default: all cached)")
+    parser.add_argument("--engines", default="prophet,numpy,global", help="Comma-separated engines from the grid")
+    parser.add_argument("--grid", help="JSON file {engine: {param_set_name: {param: value}}}")
+    parser.add_argument("--horizon", default="3m")
+    parser.add_argument("--origins", type=int, default=4, help="Rolling origins per ticker")
+    parser.add_argument("--step", default="1m", help="Spacing between origins")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--use-tuned", action="store_true",
+                        help="Apply the tuned params store under each parameter set (default: built-in defaults)")
+    parser.add_argument("--check-bands", action="store_true",
+                        help="Only check that bands match for trading-day and calendar-daily input (exit 1 if not)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+
+    if args.check_bands:
+        failed = False
+        for ticker, path in cached_history_paths(set(args.tickers) or None).items():
+            for engine in args.engines.split(","):
+                if engine == 'prophet':
+                    continue # Prophet's bands come from its own sampling, not from the return volatility
+                try:
+                    diff = check_band_scaling(load_history(path), engine, ticker, args.horizon)
+                except Exception as e:
+                    print(f"{ticker:<10} {engine:<8} error: {e}")
+                    failed = True
+                    continue
+                ok = diff <= BAND_SCALING_TOLERANCE
+                failed = failed or not ok
+                print(f"{ticker:<10} {engine:<8} band width differs by {diff:.1%}{'' if ok else '  FAIL'}")
+        sys.exit(1 if failed else 0)
+
+    grid = DEFAULT_PARAM_GRID
+    if args.grid:
+        with open(args.grid, 'r') as f:
+            grid = json.load(f)
+    grid = {engine: sets for engine, sets in grid.items() if engine in args.engines.split(",")}
+
+    paths = cached_history_paths(set(args.tickers) or None)
+    if not paths:
+        print(f"No cached histories found in {DATA_CACHE_DIR}")
+        sys.exit(1)
+    tasks = build_tasks(paths, grid, args.horizon, args.origins, args.step, use_tuned=args.use_tuned)
+    logger.info(f"Running {len(tasks)} fits ({len(paths)} tickers, {sum(len(s) for s in grid.values())} parameter sets)...")
+    start = time.perf_counter()
+    results = run_backtest(tasks, args.workers)
+    logger.info(f"Backtest finished in {time.perf_counter() - start:.1f}s")
+
+    for err in results['error'].dropna().unique()[:5]:
+        logger.warning(f"Fit error: {err}")
+    results.to_csv(RESULTS_CSV, index=False)
+    board = leaderboard(results)
+    board.to_csv(LEADERBOARD_CSV, index=False)
+    print(board.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"\nLeaderboard -> {LEADERBOARD_CSV}\nPer-fit results -> {RESULTS_CSV}")
@@ -0,0 +1,422 @@
+# forecast_engines.py
+# Pluggable forecasting backends behind the train_prophet_model contract:
+#   engine(data, ticker, forecast_horizon, ...) -> (model, forecast, agg_actual, agg_forecast)
+# 'prophet' is the original Stan-based model; 'numpy' is a log-linear trend + Fourier seasonality
+# model solved by least squares (many tickers in one solve). Its forecast starts at the last close,
+# follows the damped fitted slope plus seasonality and uses 80% bands (Prophet's default
+# interval_width) that widen with the daily return volatility. 'global' is one pooled model over
+# all cached tickers (see global_forecast).
+import os
+import re
+import glob
+import json
+import hashlib
+import logging
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+
+from forecast_result import ForecastResult
+
+logger = logging.getLogger(__name__)
+
+from manifest import DEFAULT_FORECAST_ENGINE, FORECAST_ENGINE_NAMES # FORECAST_ENGINE env, default 'prophet'
+
+DATA_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_cache")
+
+# Tuned per-ticker parameters written by tune_forecast_params.py: {engine: {ticker: {'params': {...}, ...}}}
+PARAMS_STORE_PATH = os.getenv("FORECAST_PARAMS_STORE", os.path.join(DATA_CACHE_DIR, "forecast_params.json"))
+_params_store_cache = {'mtime': None, 'data': {}}
+
+# Trained results keyed by a hash of the input closes and the effective parameters, so a ticker whose
+# prices have not changed since the last run (e.g. warmed overnight by prewarm_daemon) skips training.
+FORECAST_CACHE_DIR = os.getenv("FORECAST_CACHE_DIR", os.path.join(DATA_CACHE_DIR, "forecasts"))
+FORECAST_CACHE_ENABLED = os.getenv("FORECAST_CACHE", "true").lower() in ("1", "true", "yes")
+UNCACHED_ENGINES = ('global',) # The pooled model also depends on every other ticker's data
+
+# NumPy engine settings
+NUMPY_FIT_WINDOW_DAYS = int(os.getenv("NUMPY_FORECAST_WINDOW_DAYS", "365")) # Fit on the last year
+NUMPY_YEARLY_ORDER = 3      # Fourier pairs for yearly seasonality
+NUMPY_TREND_DAMPING = 0.995 # Per calendar day; 1.0 extrapolates the fitted slope undamped
+NUMPY_CAP_MULTIPLIER = 2.0  # Same role as Prophet's logistic cap (max close * multiplier)
+INTERVAL_Z = 1.2816         # 80% two-sided band
+TRADING_DAYS_PER_DAY = 252 / 365.25 # Volatility is per trading day, the horizon is in calendar days
+
+
+# ------------------ Helper Functions ------------------
+def parse_time_period(time_period: str) -> int:
+    """Converts a time-period string ('15d', '2w', '3m', '1y') into a number of days."""
+    time_period = time_period.lower().strip()
+    match = re.match(r"(\d+)([dwmy])", time_period)
+    if not match:
+        raise ValueError("Invalid time period format. Please use e.g., '15d', '1m', '1y'.")
+    value = int(match.group(1))
+    return value * {'d': 1, 'w': 7, 'm': 30, 'y': 365}[match.group(2)]
+
+
+def report_window_start(last_date, forecast_days):
+    """First date of the recent actuals shown next to the forecast (see aggregate_for_report)."""
+    if forecast_days <= 30:
+        return last_date - pd.Timedelta(days=15)
+    if forecast_days <= 90:
+        return last_date - pd.DateOffset(months=3)
+    return last_date - pd.DateOffset(months=8)
+
+
+def aggregate_for_report(df, forecast, forecast_days):
+    """
+    Groups recent actuals and the future part of a forecast into report periods.
+    df has 'ds'/'y'; forecast has 'ds', 'yhat', 'yhat_lower', 'yhat_upper'.
+    Daily periods for horizons up to 30 days, weekly up to 90, monthly beyond.
+    Returns (agg_actual[Period, Average], agg_forecast[Period, Low, Average, High]).
+    """
+    df = df[['ds', 'y']]
+    last_date = df['ds'].max()
+    df_recent = df[df['ds'] >= report_window_start(last_date, forecast_days)].copy()
+
+    if forecast_days <= 30:
+        # Daily grouping: last 15 days of history
+        agg_format = 'daily'
+        df_recent['Period'] = df_recent['ds'].dt.strftime('%Y-%m-%d')
+    elif forecast_days <= 90:
+        # Weekly grouping: roughly the last 3 months
+        agg_format = 'weekly'
+        df_recent = df_recent.set_index('ds').resample('W').mean().reset_index()
+        df_recent['Period'] = df_recent['ds'].dt.strftime('%Y-%m-%d')
+    else:
+        # Monthly grouping: roughly the last 8 months
+        agg_format = 'monthly'
+        df_recent['Period'] = df_recent['ds'].dt.to_period('M').dt.strftime('%Y-%m')
+
+    agg_actual = df_recent.groupby('Period').agg({'y': 'mean'}).reset_index()
+    agg_actual.rename(columns={'y': 'Average'}, inplace=True)
+
+    forecast_future = forecast.loc[forecast['ds'] >= last_date, ['ds', 'yhat_lower', 'yhat', 'yhat_upper']].copy()
+    if agg_format == 'daily':
+        forecast_future['Period'] = forecast_future['ds'].dt.strftime('%Y-%m-%d')
+    elif agg_format == 'weekly':
+        forecast_future = forecast_future.set_index('ds').resample('W').mean().reset_index()
+        forecast_future['Period'] = forecast_future['ds'].dt.strftime('%Y-%m-%d')
+    else:
+        forecast_future['Period'] = forecast_future['ds'].dt.to_period('M').dt.strftime('%Y-%m')
+
+    agg_forecast = forecast_future.groupby('Period').agg({
+        'yhat_lower': 'min',
+        'yhat': 'mean',
+        'yhat_upper': 'max'
+    }).reset_index()
+    agg_forecast.rename(columns={'yhat_lower': 'Low', 'yhat': 'Average', 'yhat_upper': 'High'}, inplace=True)
+
+    # Smooth the transition: set the first forecast period equal to last actual average.
+    if not agg_actual.empty and not agg_forecast.empty:
+        last_actual_value = agg_actual['Average'].iloc[-1]
+        agg_forecast.loc[agg_forecast.index[0], ['Low', 'Average', 'High']] = last_actual_value
+
+    return agg_actual, agg_forecast
+
+
+def load_params_store(path=None):
+    """Returns the tuned params store; re-read only when the file changes. Missing/bad file -> {}."""
+    path = path or PARAMS_STORE_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    if path != PARAMS_STORE_PATH:
+        mtime = None # Only the default store is cached
+    elif _params_store_cache['mtime'] == mtime:
+        return _params_store_cache['data']
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read forecast params store {path}: {e}")
+        data = {}
+    if mtime is not None:
+        _params_store_cache.update(mtime=mtime, data=data)
+    return data
+
+
+def get_tuned_params(engine, ticker):
+    """Tuned parameter overrides for (engine, ticker), or {} if none were stored."""
+    entry = load_params_store().get(engine, {}).get(ticker)
+    return dict(entry.get('params', {})) if entry else {}
+
+
+def save_tuned_params(engine, results, path=None):
+    """
+    Merges tuning results into the store. results: ticker -> {'params': {...}, plus any metrics}.
+    Written to a temp file and swapped in so readers never see a partial file.
+    """
+    path = path or PARAMS_STORE_PATH
+    store = dict(load_params_store(path))
+    tuned_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    engine_store = dict(store.get(engine, {}))
+    for ticker, entry in results.items():
+        engine_store[ticker] = dict(entry, tuned_at=tuned_at)
+    store[engine] = engine_store
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(store, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return store
+
+
+def _history_frame(data):
+    """Validates data and returns a clean, date-sorted frame with 'ds'/'y' (positive closes only)."""
+    missing_columns = [col for col in ('Date', 'Close') if col not in data.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+    df = pd.DataFrame({'ds': pd.to_datetime(data['Date'], errors='coerce'),
+                       'y': pd.to_numeric(data['Close'], errors='coerce')})
+    df = df.dropna()
+    df = df[df['y'] > 0].sort_values('ds').drop_duplicates('ds', keep='last').reset_index(drop=True)
+    if len(df) < 30:
+        raise ValueError(f"Need at least 30 valid closes for forecasting (got {len(df)})")
+    return df
+
+
+def _trading_day_step_sigma(log_y):
+    """
+    Standard deviation of daily log returns per column of log_y, per trading day. Zero changes are left out:
+    calendar-daily input (processed_data, forward-filled over weekends and holidays) would otherwise count
+    them as trading days and understate the volatility before TRADING_DAYS_PER_DAY scales it again.
+    """
+    returns = np.diff(log_y, axis=0)
+    out = np.zeros(returns.shape[1])
+    for j in range(returns.shape[1]):
+        moved = returns[:, j][returns[:, j] != 0]
+        if len(moved) > 1:
+            out[j] = moved.std(ddof=1)
+    return out
+
+
+# ------------------ NumPy Engine ------------------
+def _design_matrix(ds, origin, yearly_order):
+    """[1, t (years since origin), yearly sin/cos pairs] for a DatetimeIndex/array of dates."""
+    days = (pd.DatetimeIndex(ds) - origin).days.to_numpy(dtype=float)
+    t = days / 365.25
+    cols = [np.ones_like(t), t]
+    doy = pd.DatetimeIndex(ds).dayofyear.to_numpy(dtype=float) / 365.25
+    for k in range(1, yearly_order + 1):
+        cols.append(np.sin(2 * np.pi * k * doy))
+        cols.append(np.cos(2 * np.pi * k * doy))
+    return np.column_stack(cols)
+
+
+def fit_numpy_batch(histories, forecast_days, window_days=None, yearly_order=None,
+                    trend_damping=None, cap_multiplier=None):
+    """
+    Fits the NumPy engine for several tickers at once.
+    histories: dict ticker -> frame with 'ds'/'y' (see _history_frame).
+    Tickers whose fit windows share the same dates (same exchange calendar and last date) are
+    solved together in a single np.linalg.lstsq call with one right-hand side per ticker.
+    Returns dict ticker -> (model, forecast) where forecast covers the fit window plus horizon.
+    """
+    window_days = NUMPY_FIT_WINDOW_DAYS if window_days is None else window_days
+    yearly_order = NUMPY_YEARLY_ORDER if yearly_order is None else yearly_order
+    trend_damping = NUMPY_TREND_DAMPING if trend_damping is None else trend_damping
+    cap_multiplier = NUMPY_CAP_MULTIPLIER if cap_multiplier is None else cap_multiplier
+
+    # Group tickers by identical fit-window dates so they can share one design matrix
+    groups = {}
+    for ticker, df in histories.items():
+        window = df[df['ds'] > df['ds'].iloc[-1] - pd.Timedelta(days=window_days)]
+        ds = pd.DatetimeIndex(window['ds'])
+        groups.setdefault(ds.asi8.tobytes(), (ds, {}))[1][ticker] = (window['y'].to_numpy(dtype=float), df['y'].max())
+
+    results = {}
+    h = np.arange(1, forecast_days + 1, dtype=float)
+    for ds, members in groups.values():
+        tickers = list(members)
+        origin = ds[0]
+        X = _design_matrix(ds, origin, yearly_order)
+        Y = np.log(np.column_stack([members[t][0] for t in tickers])) # (n_obs, n_tickers)
+        coef, _, _, _ = np.linalg.lstsq(X, Y, rcond=None)
+
+        fitted = X @ coef
+        resid = Y - fitted
+        sigma = resid.std(axis=0, ddof=X.shape[1])
+        # Daily log-return volatility drives the forecast bands (random-walk style widening)
+        step_sigma = _trading_day_step_sigma(Y)
+
+        future_ds = pd.date_range(ds[-1] + pd.Timedelta(days=1), periods=forecast_days, freq='D')
+        X_future = _design_matrix(future_ds, origin, yearly_order)
+        # Damped trend: the slope contributes phi + phi^2 + ... + phi^h days instead of h
+        if trend_damping < 1.0:
+            damped = trend_damping * (1 - trend_damping ** h) / (1 - trend_damping)
+        else:
+            damped = h
+        # Anchor at the last observed price; add the damped slope and the change in seasonality
+        seasonal_future = X_future[:, 2:] @ coef[2:]
+        seasonal_last = X[-1, 2:] @ coef[2:]
+        mu = Y[-1][None, :] + np.outer(damped / 365.25, coef[1]) + (seasonal_future - seasonal_last[None, :])
+        band_sigma = np.outer(np.sqrt(h * TRADING_DAYS_PER_DAY), step_sigma)
+
+        for j, ticker in enumerate(tickers):
+            cap = members[ticker][1] * cap_multiplier
+            hist_yhat = np.exp(fitted[:, j])
+            hist_band = INTERVAL_Z * sigma[j]
+            forecast = pd.DataFrame({
+                'ds': ds.append(future_ds),
+                'yhat': np.concatenate([hist_yhat, np.exp(mu[:, j])]),
+                'yhat_lower': np.concatenate([hist_yhat * np.exp(-hist_band), np.exp(mu[:, j] - INTERVAL_Z * band_sigma[:, j])]),
+                'yhat_upper': np.concatenate([hist_yhat * np.exp(hist_band), np.exp(mu[:, j] + INTERVAL_Z * band_sigma[:, j])]),
+            })
+            for col in ('yhat', 'yhat_lower', 'yhat_upper'):
+                forecast[col] = forecast[col].clip(lower=0, upper=cap)
+            model = {
+                'engine': 'numpy', 'ticker': ticker, 'origin': origin, 'coef': coef[:, j].copy(),
+                'sigma': float(sigma[j]), 'step_sigma': float(step_sigma[j]), 'cap': float(cap),
+                'params': {'window_days': window_days, 'yearly_order': yearly_order,
+                           'trend_damping': trend_damping, 'cap_multiplier': cap_multiplier},
+                'batch_size': len(tickers),
+            }
+            results[ticker] = (model, forecast)
+    return results
+
+
+def train_numpy_model(data, ticker='STOCK', forecast_horizon='1y', timestamp=None, macro_data=None, use_tuned=True, **params):
+    """
+    NumPy engine for a single ticker, same contract as train_prophet_model. Tuned params apply unless
+    overridden; use_tuned=False starts from the built-in defaults (backtests and tuning).
+    """
+    params = dict(get_tuned_params('numpy', ticker) if use_tuned else {}, **params)
+    df = _history_frame(data)
+    forecast_days = parse_time_period(forecast_horizon)
+    model, forecast = fit_numpy_batch({ticker: df}, forecast_days, **params)[ticker]
+    agg_actual, agg_forecast = aggregate_for_report(df, forecast, forecast_days)
+    return model, forecast, agg_actual, agg_forecast
+
+
+def train_numpy_models_batch(data_by_ticker, forecast_horizon='1y', **params):
+    """
+    NumPy engine for many tickers. data_by_ticker maps ticker -> frame with 'Date'/'Close'.
+    Returns dict ticker -> (model, forecast, agg_actual, agg_forecast); tickers that fail
+    validation are logged and left out.
+    """
+    forecast_days = parse_time_period(forecast_horizon)
+    histories = {}
+    for ticker, data in data_by_ticker.items():
+        try:
+            histories[ticker] = _history_frame(data)
+        except ValueError as e:
+            logger.warning(f"Skipping {ticker} in NumPy batch forecast: {e}")
+    out = {}
+    for ticker, (model, forecast) in fit_numpy_batch(histories, forecast_days, **params).items():
+        agg_actual, agg_forecast = aggregate_for_report(histories[ticker], forecast, forecast_days)
+        out[ticker] = (model, forecast, agg_actual, agg_forecast)
+    return out
+
+
+# ------------------ Engine Registry ------------------
+def _train_prophet(data, ticker='STOCK', forecast_horizon='1y', timestamp=None, macro_data=None, use_tuned=True, **params):
+    from prophet_model import train_prophet_model # Imported lazily: pulls in Prophet/Stan
+    return train_prophet_model(data, ticker=ticker, forecast_horizon=forecast_horizon,
+                               timestamp=timestamp, macro_data=macro_data, engine='prophet', params=params, use_tuned=use_tuned)
+
+
+def _train_global(data, ticker='STOCK', forecast_horizon='1y', timestamp=None, macro_data=None, use_tuned=True, **params):
+    # use_tuned is accepted for the common engine contract; the global engine has no per-ticker tuned params
+    from global_forecast import train_global_model # Imported lazily: global_forecast builds on this module
+    return train_global_model(data, ticker=ticker, forecast_horizon=forecast_horizon,
+                              timestamp=timestamp, macro_data=macro_data, **params)
+
+
+FORECAST_ENGINES = {
+    'prophet': _train_prophet,
+    'numpy': train_numpy_model,
+    'global': _train_global,
+}
+if set(FORECAST_ENGINES) != set(FORECAST_ENGINE_NAMES):
+    logger.warning(f"manifest.FORECAST_ENGINE_NAMES {FORECAST_ENGINE_NAMES} does not match the registered engines {sorted(FORECAST_ENGINES)}")
+
+
+def get_forecast_engine(name=None):
+    """Returns the training function for an engine name (None -> FORECAST_ENGINE env, default 'prophet')."""
+    name = (name or DEFAULT_FORECAST_ENGINE).lower()
+    if name not in FORECAST_ENGINES:
+        raise ValueError(f"Unknown forecast engine '{name}'. Available: {', '.join(sorted(FORECAST_ENGINES))}")
+    return FORECAST_ENGINES[name]
+
+
+# ------------------ Forecast Cache ------------------
+def _cache_prefix(ticker, engine, forecast_horizon):
+    safe_ticker = re.sub(r'[^\w\-.]', '_', ticker)
+    return f"{safe_ticker}_{engine}_{forecast_horizon}_"
+
+
+def forecast_cache_key(data, ticker, engine, forecast_horizon, params=None):
+    """Hash of the Date/Close history, the macro dataset version, the stored tuned params and the explicit params."""
+    h = hashlib.sha1()
+    history = data[['Date', 'Close']].reset_index(drop=True)
+    h.update(pd.util.hash_pandas_object(history, index=False).to_numpy().tobytes())
+    # Interest_Rate is a Prophet regressor: a new macro version (macro_store) must not reuse old forecasts
+    h.update(json.dumps([engine, forecast_horizon, get_tuned_params(engine, ticker), params or {},
+                         data.attrs.get('macro_version')], sort_keys=True, default=str).encode())
+    return h.hexdigest()[:20]
+
+
+def forecast_cache_path(data, ticker, engine, forecast_horizon, params=None):
+    key = forecast_cache_key(data, ticker, engine, forecast_horizon, params)
+    return os.path.join(FORECAST_CACHE_DIR, f"{_cache_prefix(ticker, engine, forecast_horizon)}{key}.pkl")
+
+
+def load_cached_forecast(path):
+    """The cached ForecastResult at path, or None if missing/unreadable."""
+    try:
+        with open(path, 'rb') as f:
+            return ForecastResult.from_bytes(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable forecast cache {path}: {e}")
+        return None
+
+
+def save_cached_forecast(result, path):
+    """Writes the result atomically and removes older entries for the same ticker/engine/horizon."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(result.to_bytes())
+    os.replace(tmp_path, path)
+    prefix = os.path.join(os.path.dirname(path), _cache_prefix(result.ticker, result.engine, result.horizon))
+    for old_path in glob.glob(glob.escape(prefix) + "*.pkl"):
+        if old_path != path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+
+def train_forecast_result(data, ticker='STOCK', forecast_horizon='1y', timestamp=None, macro_data=None,
+                          engine=None, keep_model=False, use_cache=False, **params):
+    """
+    Trains with the selected engine and returns a slim ForecastResult instead of the full tuple.
+    The fitted model is dropped unless keep_model=True (see ForecastResult.release_model to spill it to disk).
+    use_cache=True returns a stored result for identical input data and parameters instead of training
+    (ignored with keep_model, for the 'global' engine, or when FORECAST_CACHE is off).
+    """
+    engine = (engine or DEFAULT_FORECAST_ENGINE).lower()
+    cache_path = None
+    if use_cache and FORECAST_CACHE_ENABLED and not keep_model and engine not in UNCACHED_ENGINES:
+        cache_path = forecast_cache_path(data, ticker, engine, forecast_horizon, params)
+        cached = load_cached_forecast(cache_path)
+        if cached is not None:
+            logger.info(f"Forecast cache hit for {ticker} ({engine}, {forecast_horizon})")
+            return cached
+    model, forecast, agg_actual, agg_forecast = get_forecast_engine(engine)(
+        data, ticker=ticker, forecast_horizon=forecast_horizon, timestamp=timestamp, macro_data=macro_data, **params)
+    if forecast is None or agg_actual is None or agg_forecast is None:
+        raise ValueError(f"{engine} engine returned no forecast for {ticker}")
+    last_date = pd.to_datetime(data['Date'], errors='coerce').max()
+    result = ForecastResult.from_forecast(model, forecast, agg_actual, agg_forecast, ticker, engine, forecast_horizon,
+                                          last_date=last_date, keep_model=keep_model, params=params)
+    if cache_path:
+        try:
+            save_cached_forecast(result, cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write forecast cache for {ticker}: {e}")
+    return result
@@ -0,0 +1,129 @@
+# forecast_result.py
+# Slim container for a trained forecast. Holds only what reports use: the aggregated tables, the
+# daily ds/yhat/yhat_lower/yhat_upper series as compact NumPy arrays and a few scalars. The fitted
+# model is optional and can be released to disk and reloaded on demand.
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+class ForecastResult:
+    """
+    ds is stored as int32 days since 1970-01-01 (exact, 4 bytes), the values as float32.
+    Pickles without the in-memory model (the on-disk model path is kept), so results can be
+    cached or sent between worker processes cheaply.
+    """
+    __slots__ = ("ticker", "engine", "horizon", "ds", "yhat", "yhat_lower", "yhat_upper",
+                 "agg_actual", "agg_forecast", "last_date", "params", "_model", "_model_path")
+
+    def __init__(self, ticker, engine, horizon, ds, yhat, yhat_lower, yhat_upper,
+                 agg_actual, agg_forecast, last_date=None, params=None, model=None, model_path=None):
+        self.ticker = ticker
+        self.engine = engine
+        self.horizon = horizon
+        self.ds = np.asarray(ds, dtype=np.int32)
+        self.yhat = np.asarray(yhat, dtype=np.float32)
+        self.yhat_lower = np.asarray(yhat_lower, dtype=np.float32)
+        self.yhat_upper = np.asarray(yhat_upper, dtype=np.float32)
+        self.agg_actual = agg_actual
+        self.agg_forecast = agg_forecast
+        self.last_date = last_date
+        self.params = params or {}
+        self._model = model
+        self._model_path = model_path
+
+    @classmethod
+    def from_forecast(cls, model, forecast, agg_actual, agg_forecast, ticker, engine, horizon,
+                      last_date=None, keep_model=False, params=None):
+        """Builds a result from the (model, forecast, agg_actual, agg_forecast) tuple of train_prophet_model."""
+        ds_days = (pd.to_datetime(forecast['ds']).to_numpy().astype('datetime64[D]') - _EPOCH).astype(np.int64)
+        return cls(ticker, engine, horizon, ds_days, forecast['yhat'].to_numpy(), forecast['yhat_lower'].to_numpy(),
+                   forecast['yhat_upper'].to_numpy(), agg_actual, agg_forecast, last_date=last_date,
+                   params=params, model=model if keep_model else None)
+
+    # --- Model handle ---
+    @property
+    def model(self):
+        """The fitted model; loaded from disk if it was released with release_model(path). None if dropped."""
+        if self._model is None and self._model_path and os.path.exists(self._model_path):
+            self._model = _load_model(self._model_path, self.engine)
+        return self._model
+
+    def release_model(self, path=None):
+        """Drops the in-memory model. With a path it is saved there first and reloaded lazily via .model."""
+        if self._model is not None and path:
+            _save_model(self._model, path, self.engine)
+            self._model_path = path
+        self._model = None
+
+    # --- Views ---
+    @property
+    def dates(self):
+        return pd.to_datetime(_EPOCH + self.ds.astype('timedelta64[D]'))
+
+    @property
+    def forecast(self):
+        """Daily forecast as a DataFrame (ds, yhat, yhat_lower, yhat_upper); built on each access, not stored."""
+        return pd.DataFrame({'ds': self.dates, 'yhat': self.yhat, 'yhat_lower': self.yhat_lower,
+                             'yhat_upper': self.yhat_upper})
+
+    @property
+    def final_forecast(self):
+        """(yhat, yhat_lower, yhat_upper) at the end of the horizon."""
+        if not len(self.yhat):
+            return None
+        return float(self.yhat[-1]), float(self.yhat_lower[-1]), float(self.yhat_upper[-1])
+
+    def as_tuple(self):
+        """Old train_prophet_model contract: (model, forecast, agg_actual, agg_forecast)."""
+        return self.model, self.forecast, self.agg_actual, self.agg_forecast
+
+    def nbytes(self):
+        """Approximate memory held by the arrays and aggregated tables (model excluded)."""
+        size = self.ds.nbytes + self.yhat.nbytes + self.yhat_lower.nbytes + self.yhat_upper.nbytes
+        for frame in (self.agg_actual, self.agg_forecast):
+            if frame is not None:
+                size += int(frame.memory_usage(index=True, deep=True).sum())
+        return size
+
+    def __repr__(self):
+        return f"ForecastResult({self.ticker!r}, engine={self.engine!r}, horizon={self.horizon!r}, points={len(self.ds)})"
+
+    # --- Serialization ---
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot != "_model"}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+        self._model = None
+
+    def to_bytes(self):
+        return pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def from_bytes(blob):
+        return pickle.loads(blob)
+
+
+def _save_model(model, path, engine):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if engine == 'prophet':
+        from prophet.serialize import model_to_json # Prophet's supported format
+        with open(path, 'w') as f:
+            f.write(model_to_json(model))
+    else:
+        with open(path, 'wb') as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _load_model(path, engine):
+    if engine == 'prophet':
+        from prophet.serialize import model_from_json
+        with open(path, 'r') as f:
+            return model_from_json(f.read())
+    with open(path, 'rb') as f:
+        return pickle.load(f)
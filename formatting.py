@@ -0,0 +1,138 @@
+# formatting.py
+# Shared display formatting for fundamental_analysis and html_components.
+# Numbers stay numbers (wrapped in Metric) through the pipeline and are only turned into text when
+# rendered, so the HTML layer no longer parses "$1.20 B" / "15.00%" strings back into floats.
+from functools import lru_cache
+import numpy as np
+
+NUMERIC_KINDS = ("currency", "percent", "percent_direct", "ratio", "large_number", "integer", "number")
+
+_LARGE_STEPS = ((1e12, " T"), (1e9, " B"), (1e6, " M"), (1e3, " K"))
+
+
+@lru_cache(maxsize=None)
+def get_formatter(kind, precision=2, currency='$'):
+    """
+    Returns a compiled float -> str function for a format kind. Format specs are built once per
+    (kind, precision, currency) and reused.
+    """
+    if kind == "currency":
+        return f"{currency}{{:,.{precision}f}}".format
+    if kind == "percent": # Input is a fraction (0.25 -> 25.00%)
+        spec = f"{{:.{precision}f}}%".format
+        return lambda v: spec(v * 100)
+    if kind == "percent_direct": # Input is already a percentage (25 -> 25.00%)
+        return f"{{:.{precision}f}}%".format
+    if kind == "ratio":
+        fixed = f"{{:.{precision}f}}x".format
+        sci = f"{{:.{precision}e}}x".format # Scientific notation for extremes
+        return lambda v: sci(v) if abs(v) > 1e6 or (abs(v) < 1e-3 and v != 0) else fixed(v)
+    if kind == "large_number":
+        scaled = f"{currency}{{:.{precision}f}}{{}}".format
+        small = f"{currency}{{:,.0f}}".format # No decimals for small "large" numbers
+        def _large(v):
+            av = abs(v)
+            for step, suffix in _LARGE_STEPS:
+                if av >= step: return scaled(v / step, suffix)
+            return small(v)
+        return _large
+    if kind == "integer":
+        return lambda v: f"{int(v):,}"
+    return f"{{:,.{precision}f}}".format # Default 'number'
+
+
+def format_number(value, kind="number", precision=2, currency='$'):
+    """Formats a single numeric value. None/NaN -> 'N/A'."""
+    if value is None:
+        return "N/A"
+    value = float(value)
+    if value != value: # NaN
+        return "N/A"
+    return get_formatter(kind, precision, currency)(value)
+
+
+def format_many(values, kind="number", precision=2, currency='$'):
+    """
+    Batch formatting: one compiled formatter applied over a float array; NaN/None -> 'N/A'.
+    Returns a list of strings in input order.
+    """
+    arr = np.asarray(values, dtype=float)
+    fmt = get_formatter(kind, precision, currency)
+    out = ["N/A"] * len(arr)
+    valid = np.flatnonzero(~np.isnan(arr))
+    if kind == "percent":
+        # Scale once for the whole batch instead of per value
+        fmt = get_formatter("percent_direct", precision, currency)
+        arr = arr * 100
+    for i, text in zip(valid, map(fmt, arr[valid].tolist())):
+        out[i] = text
+    return out
+
+
+class Metric:
+    """
+    A raw number plus how it should be displayed. Renders lazily (str/format) and caches the text;
+    compares (and hashes) as its rendered text, so existing `!= "N/A"` style checks keep working.
+    """
+    __slots__ = ("raw", "kind", "precision", "currency", "_text")
+
+    def __init__(self, raw, kind="number", precision=2, currency='$'):
+        self.raw = float(raw)
+        self.kind = kind
+        self.precision = precision
+        self.currency = currency
+        self._text = None
+
+    @property
+    def number(self):
+        """Value in display units (fractions shown as percent become 0-100), as the HTML layer expects."""
+        return self.raw * 100 if self.kind == "percent" else self.raw
+
+    def __str__(self):
+        if self._text is None:
+            self._text = get_formatter(self.kind, self.precision, self.currency)(self.raw)
+        return self._text
+
+    def __repr__(self):
+        return f"Metric({self.raw!r}, {self.kind!r}, {self.precision})"
+
+    def __format__(self, spec):
+        return format(str(self), spec)
+
+    def __eq__(self, other):
+        # Identity is the rendered text (same as __hash__), so Metric == Metric and Metric == str agree
+        if isinstance(other, (Metric, str)):
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __float__(self):
+        return self.raw
+
+    def __bool__(self):
+        return True
+
+    def __getstate__(self):
+        return (self.raw, self.kind, self.precision, self.currency)
+
+    def __setstate__(self, state):
+        self.raw, self.kind, self.precision, self.currency = state
+        self._text = None
+
+
+def render_metrics(metrics):
+    """Batch-renders a dict of Metric/other values to display strings, one formatter call per (kind, precision)."""
+    out = {}
+    groups = {}
+    for key, value in metrics.items():
+        if isinstance(value, Metric):
+            groups.setdefault((value.kind, value.precision, value.currency), []).append(key)
+        else:
+            out[key] = str(value)
+    for (kind, precision, currency), keys in groups.items():
+        fmt = get_formatter(kind, precision, currency)
+        for key in keys:
+            out[key] = fmt(metrics[key].raw)
+    return {key: out[key] for key in metrics} # Keep original order
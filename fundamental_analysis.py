@@ -2,6 +2,7 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime # Import datetime
+from formatting import Metric, NUMERIC_KINDS
 
 # --- Helpers ---
 
@@ -20,57 +21,32 @@ def safe_get(data_dict, key, default="N/A"):
     return value
 
 def format_value(value, value_type="number", precision=2, currency='$'):
-    """Formats values for display, handling 'N/A' and potential errors."""
+    """
+    Formats values for display, handling 'N/A' and potential errors.
+    Numeric types return a formatting.Metric (raw number + display spec) that renders on str();
+    dates, factors and strings are returned as text.
+    """
     if value == "N/A" or value is None or (isinstance(value, float) and np.isnan(value)):
         return "N/A"
 
     try:
-        # Attempt to convert to float, except for date/string types
-        if value_type not in ["date", "string", "factor"]:
-            num = float(value)
-        else:
-            num = value # Keep as original type for date/string
-
-        if value_type == "currency":
-            return f"{currency}{num:,.{precision}f}"
-        elif value_type == "percent":
-            # Assumes input is a fraction (e.g., 0.25 for 25%)
-            return f"{num * 100:.{precision}f}%"
-        elif value_type == "percent_direct":
-            # Assumes input is already a percentage number (e.g., 25 for 25%)
-            return f"{num:.{precision}f}%"
-        elif value_type == "ratio":
-             # Check if number is extremely large or small before formatting
-             if abs(num) > 1e6 or (abs(num) < 1e-3 and num != 0):
-                 return f"{num:.{precision}e}x" # Use scientific notation for extremes
-             return f"{num:.{precision}f}x"
-        elif value_type == "large_number":
-            # Handles formatting large numbers with B, M, K suffixes
-            # If currency symbol needed, apply it here or pass formatted string
-            num = float(value) # Ensure it's float for comparison
-            if abs(num) >= 1e12: return f"{currency}{num / 1e12:.{precision}f} T"
-            elif abs(num) >= 1e9: return f"{currency}{num / 1e9:.{precision}f} B"
-            elif abs(num) >= 1e6: return f"{currency}{num / 1e6:.{precision}f} M"
-            elif abs(num) >= 1e3: return f"{currency}{num / 1e3:.{precision}f} K"
-            else: return f"{currency}{num:,.0f}" # No decimals for small large numbers
-        elif value_type == "integer":
-             return f"{int(float(num)):,}" # Convert via float first for safety
+        if value_type in NUMERIC_KINDS:
+            # Keep the number; formatting happens when the HTML layer renders it
+            return Metric(float(value), value_type, precision, currency)
         elif value_type == "date":
              # Assuming value might be epoch seconds (common in yfinance)
              try:
                  # Check if it's already a datetime object
-                 if isinstance(num, datetime):
-                     return num.strftime('%Y-%m-%d')
+                 if isinstance(value, datetime):
+                     return value.strftime('%Y-%m-%d')
                  # Otherwise, assume it's a timestamp (integer or float)
-                 return pd.to_datetime(num, unit='s').strftime('%Y-%m-%d')
+                 return pd.to_datetime(value, unit='s').strftime('%Y-%m-%d')
              except (ValueError, TypeError, OverflowError):
                  return str(value) # Fallback if conversion fails
         elif value_type == "factor": # For split factors like '2:1'
              return str(value)
-        elif value_type == "string":
+        else: # "string" and unknown types
             return str(value)
-        else: # Default number format
-            return f"{num:,.{precision}f}"
     except (ValueError, TypeError):
         # Fallback for values that cannot be converted to float (like split factors)
         return str(value)
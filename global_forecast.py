@@ -0,0 +1,246 @@
+# global_forecast.py
+# Global (pooled) forecasting engine: one linear model of volatility-normalized daily log returns,
+# fitted on every cached ticker at once, with per-ticker level (last close) and scale (return
+# volatility). Features are lagged return momentum over a few windows plus yearly Fourier terms.
+# The cached histories are read once per process and day (the universe snapshot) and fitted models are
+# kept per (snapshot, as_of date, params), so after the first fit a ticker's forecast is a cheap vectorized
+# pass. forecast_universe() forecasts many tickers in a single pass.
+# Registered as engine 'global' in forecast_engines (same contract as train_prophet_model).
+import os
+import glob
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date
+import numpy as np
+import pandas as pd
+
+from forecast_engines import (parse_time_period, aggregate_for_report, _history_frame,
+                              INTERVAL_Z, DATA_CACHE_DIR)
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_FIT_WINDOW_DAYS = int(os.getenv("GLOBAL_FORECAST_WINDOW_DAYS", "1095")) # Per-ticker history used for pooling
+GLOBAL_MOMENTUM_WINDOWS = (5, 21, 63)  # Trading-day windows of mean normalized return
+GLOBAL_YEARLY_ORDER = 2
+GLOBAL_SCALE_WINDOW = 252              # Trading days used for each ticker's volatility
+GLOBAL_CAP_MULTIPLIER = 2.0
+GLOBAL_RIDGE = 1.0                     # Small ridge penalty; the pooled fit has many rows and few columns
+
+GLOBAL_MODEL_CACHE_SIZE = int(os.getenv("GLOBAL_MODEL_CACHE_SIZE", "8")) # Fitted models kept (one per as_of date)
+
+_global_lock = threading.Lock() # Analysis threads needing the same model wait for one fit
+_universe = {'key': None, 'histories': {}} # (cache dir, day read) -> ticker -> ds/y frame
+_global_model_cache = OrderedDict() # (cache dir, day read, as_of date, params) -> fitted model dict, LRU
+
+
+def _load_universe(cache_dir):
+    """
+    Histories of data_cache/*_stock_data.csv, read once per process and day. Files written later that day
+    (a ticker downloaded during a run) join the pool the next day instead of forcing a refit now.
+    Call with _global_lock held.
+    """
+    key = (cache_dir, date.today())
+    if _universe['key'] != key:
+        histories = {}
+        for path in sorted(glob.glob(os.path.join(cache_dir, "*_stock_data.csv"))):
+            ticker = os.path.basename(path)[:-len("_stock_data.csv")]
+            try:
+                histories[ticker] = _history_frame(pd.read_csv(path))
+            except (ValueError, OSError) as e:
+                logger.warning(f"Skipping cached history {path}: {e}")
+        _universe.update(key=key, histories=histories)
+    return _universe['key'], _universe['histories']
+
+
+def _normalized_returns(df, window_days, scale_window):
+    """
+    (dates of returns, z = log return / scale, scale, last log price) for one ticker's ds/y frame.
+    Unchanged closes are dropped first, so calendar-daily input (forward-filled weekends and holidays)
+    gives the same per-trading-day returns and scale as the cached trading-day histories.
+    """
+    df = df[df['ds'] > df['ds'].iloc[-1] - pd.Timedelta(days=window_days)]
+    df = df[df['y'].diff().ne(0)]
+    log_p = np.log(df['y'].to_numpy(dtype=float))
+    r = np.diff(log_p)
+    if len(r) < max(GLOBAL_MOMENTUM_WINDOWS) + 10:
+        raise ValueError(f"Need at least {max(GLOBAL_MOMENTUM_WINDOWS) + 11} closes in the global fit window (got {len(log_p)})")
+    scale = float(np.std(r[-scale_window:], ddof=1)) or 1e-4
+    return pd.DatetimeIndex(df['ds'].iloc[1:]), r / scale, scale, float(log_p[-1])
+
+
+def _seasonal_features(dates, yearly_order):
+    doy = pd.DatetimeIndex(dates).dayofyear.to_numpy(dtype=float) / 365.25
+    cols = []
+    for k in range(1, yearly_order + 1):
+        cols.append(np.sin(2 * np.pi * k * doy))
+        cols.append(np.cos(2 * np.pi * k * doy))
+    return np.column_stack(cols) if cols else np.empty((len(doy), 0))
+
+
+def _momentum_features(z):
+    """Row t holds the mean of z over the previous w values (t excluded) for each window w."""
+    csum = np.concatenate([[0.0], np.cumsum(z)])
+    t = np.arange(len(z))
+    cols = []
+    for w in GLOBAL_MOMENTUM_WINDOWS:
+        lo = np.maximum(t - w, 0)
+        cols.append((csum[t] - csum[lo]) / np.maximum(t - lo, 1))
+    return np.column_stack(cols)
+
+
+def fit_global_model(histories, window_days=None, yearly_order=None, ridge=None):
+    """
+    Fits the pooled model. histories: dict ticker -> ds/y frame. All tickers' rows are stacked into
+    one design matrix and solved with a single (ridge) least-squares solve.
+    """
+    window_days = GLOBAL_FIT_WINDOW_DAYS if window_days is None else window_days
+    yearly_order = GLOBAL_YEARLY_ORDER if yearly_order is None else yearly_order
+    ridge = GLOBAL_RIDGE if ridge is None else ridge
+    warmup = max(GLOBAL_MOMENTUM_WINDOWS)
+
+    X_parts, y_parts = [], []
+    for ticker, df in histories.items():
+        try:
+            dates, z, _, _ = _normalized_returns(df, window_days, GLOBAL_SCALE_WINDOW)
+        except ValueError as e:
+            logger.warning(f"Leaving {ticker} out of the global fit: {e}")
+            continue
+        X = np.column_stack([np.ones(len(z)), _momentum_features(z), _seasonal_features(dates, yearly_order)])
+        X_parts.append(X[warmup:])
+        y_parts.append(np.clip(z[warmup:], -8, 8)) # Clip extreme days so a few crashes do not dominate
+    if not X_parts:
+        raise ValueError("No usable histories for the global forecast model")
+
+    X = np.vstack(X_parts)
+    y = np.concatenate(y_parts)
+    penalty = ridge * np.eye(X.shape[1])
+    penalty[0, 0] = 0.0 # Do not shrink the intercept
+    coef = np.linalg.solve(X.T @ X + penalty, X.T @ y)
+    resid_sigma = float(np.std(y - X @ coef, ddof=X.shape[1]))
+    return {'engine': 'global', 'coef': coef, 'resid_sigma': resid_sigma, 'n_tickers': len(X_parts),
+            'n_rows': len(y), 'params': {'window_days': window_days, 'yearly_order': yearly_order, 'ridge': ridge}}
+
+
+def get_global_model(as_of=None, cache_dir=DATA_CACHE_DIR, **params):
+    """
+    Pooled model over the day's universe snapshot (see _load_universe), fitted once per as_of date and params.
+    as_of cuts every history at that date so a forecast never pools data from after its own last close.
+    """
+    as_of = pd.Timestamp(as_of).normalize() if as_of is not None else None
+    with _global_lock:
+        universe_key, universe = _load_universe(cache_dir)
+        key = universe_key + (as_of, tuple(sorted(params.items())))
+        model = _global_model_cache.get(key)
+        if model is not None:
+            _global_model_cache.move_to_end(key)
+            return model
+        histories = {}
+        for ticker, df in universe.items():
+            if as_of is not None:
+                df = df[df['ds'] < as_of + pd.Timedelta(days=1)]
+            if len(df):
+                histories[ticker] = df
+        model = fit_global_model(histories, **params)
+        _global_model_cache[key] = model
+        while len(_global_model_cache) > GLOBAL_MODEL_CACHE_SIZE:
+            _global_model_cache.popitem(last=False)
+    logger.info(f"Fitted global forecast model on {model['n_tickers']} tickers ({model['n_rows']} rows)")
+    return model
+
+
+def forecast_universe(model, histories, forecast_days, cap_multiplier=None):
+    """
+    One vectorized inference pass for many tickers. histories: dict ticker -> ds/y frame.
+    Expected normalized returns are propagated day by day (business days) for all tickers at once.
+    Returns dict ticker -> forecast frame (last date + horizon; ds, yhat, yhat_lower, yhat_upper).
+    """
+    cap_multiplier = GLOBAL_CAP_MULTIPLIER if cap_multiplier is None else cap_multiplier
+    window_days, yearly_order = model['params']['window_days'], model['params']['yearly_order']
+    warmup = max(GLOBAL_MOMENTUM_WINDOWS)
+
+    tickers, buffers, scales, levels, last_dates, caps = [], [], [], [], [], []
+    for ticker, df in histories.items():
+        try:
+            _, z, scale, level = _normalized_returns(df, window_days, GLOBAL_SCALE_WINDOW)
+        except ValueError as e:
+            logger.warning(f"No global forecast for {ticker}: {e}")
+            continue
+        tickers.append(ticker)
+        buffers.append(z[-warmup:])
+        scales.append(scale)
+        levels.append(level)
+        last_dates.append(df['ds'].iloc[-1])
+        caps.append(df['y'].max() * cap_multiplier)
+    if not tickers:
+        return {}
+
+    # Tickers can end on different dates; simulate on a shared business-day grid from the earliest
+    start = min(last_dates)
+    bdays = pd.bdate_range(start + pd.Timedelta(days=1), max(last_dates) + pd.Timedelta(days=forecast_days))
+    seasonal = _seasonal_features(bdays, yearly_order)
+    coef = model['coef']
+    n_mom = len(GLOBAL_MOMENTUM_WINDOWS)
+
+    buf = np.vstack(buffers) # (n_tickers, warmup), most recent last
+    last_np = np.array(last_dates, dtype='datetime64[ns]')
+    active = np.zeros((len(bdays), len(tickers)), dtype=bool)
+    mu = np.zeros((len(bdays), len(tickers)))
+    for i, day in enumerate(bdays.to_numpy()):
+        feats = np.column_stack([np.ones(len(tickers))] + [buf[:, -w:].mean(axis=1) for w in GLOBAL_MOMENTUM_WINDOWS])
+        step = feats @ coef[:1 + n_mom] + seasonal[i] @ coef[1 + n_mom:]
+        is_future = day > last_np # Tickers whose history ends later are still "in sample" here
+        mu[i] = np.where(is_future, step, 0.0)
+        active[i] = is_future
+        shifted = np.concatenate([buf[:, 1:], step[:, None]], axis=1)
+        buf = np.where(is_future[:, None], shifted, buf)
+
+    scales = np.array(scales)
+    cum_mu = np.cumsum(mu, axis=0) * scales                          # Expected log-price change
+    cum_var = np.cumsum(active, axis=0) * (model['resid_sigma'] * scales) ** 2
+    levels = np.array(levels)
+
+    out = {}
+    for j, ticker in enumerate(tickers):
+        ds = pd.date_range(last_dates[j], periods=forecast_days + 1, freq='D')
+        # Calendar days take the value of the latest business day on or before them
+        idx = np.searchsorted(bdays.to_numpy(), ds.to_numpy(), side='right') - 1
+        valid = idx >= 0
+        log_mu = levels[j] + np.where(valid, cum_mu[np.maximum(idx, 0), j], 0.0)
+        band = INTERVAL_Z * np.sqrt(np.where(valid, cum_var[np.maximum(idx, 0), j], 0.0))
+        forecast = pd.DataFrame({'ds': ds, 'yhat': np.exp(log_mu),
+                                 'yhat_lower': np.exp(log_mu - band), 'yhat_upper': np.exp(log_mu + band)})
+        for col in ('yhat', 'yhat_lower', 'yhat_upper'):
+            forecast[col] = forecast[col].clip(lower=0, upper=caps[j])
+        out[ticker] = forecast
+    return out
+
+
+def train_global_model(data, ticker='STOCK', forecast_horizon='1y', timestamp=None, macro_data=None,
+                       cap_multiplier=None, **params):
+    """Global engine for one ticker, same contract as train_prophet_model. The pooled fit is shared and cached."""
+    df = _history_frame(data)
+    forecast_days = parse_time_period(forecast_horizon)
+    model = get_global_model(as_of=df['ds'].iloc[-1], **params)
+    forecasts = forecast_universe(model, {ticker: df}, forecast_days, cap_multiplier)
+    if ticker not in forecasts:
+        raise ValueError(f"Global model could not forecast {ticker}")
+    agg_actual, agg_forecast = aggregate_for_report(df, forecasts[ticker], forecast_days)
+    return model, forecasts[ticker], agg_actual, agg_forecast
+
+
+def train_global_models_batch(data_by_ticker, forecast_horizon='1y', cap_multiplier=None, **params):
+    """Global engine for many tickers in one inference pass. Returns ticker -> (model, forecast, agg_actual, agg_forecast)."""
+    forecast_days = parse_time_period(forecast_horizon)
+    histories = {}
+    for ticker, data in data_by_ticker.items():
+        try:
+            histories[ticker] = _history_frame(data)
+        except ValueError as e:
+            logger.warning(f"Skipping {ticker} in global batch forecast: {e}")
+    model = get_global_model(as_of=max(df['ds'].iloc[-1] for df in histories.values()) if histories else None, **params)
+    out = {}
+    for ticker, forecast in forecast_universe(model, histories, forecast_days, cap_multiplier).items():
+        agg_actual, agg_forecast = aggregate_for_report(histories[ticker], forecast, forecast_days)
+        out[ticker] = (model, forecast, agg_actual, agg_forecast)
+    return out
@@ -3,49 +3,74 @@ import pandas as pd
 import numpy as np
 import re
 from datetime import datetime
+import hashlib
 import random # Used for slight text variations to ensure uniqueness
 import logging # Import logging for better error tracking
+from formatting import Metric, get_formatter, format_many, render_metrics
 
 # Setup basic logging - logs errors and warnings
 logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(funcName)s - %(message)s')
 
 # --- HELPER FUNCTIONS (Added Robustness) ---
 
+def make_report_rng(ticker, site_name, report_date, salt=""):
+    """
+    Returns a random.Random seeded from a stable hash of (ticker, site, date, salt).
+    The same inputs always pick the same narrative variants, so reports can be cached and diffed.
+    """
+    try:
+        date_key = pd.to_datetime(report_date).strftime('%Y-%m-%d')
+    except Exception:
+        date_key = str(report_date)
+    seed_key = f"{str(ticker).upper()}|{str(site_name).strip().lower()}|{date_key}|{salt}"
+    # sha256 rather than hash(): str hashes are randomized per process (PYTHONHASHSEED)
+    seed = int.from_bytes(hashlib.sha256(seed_key.encode('utf-8')).digest()[:8], 'big')
+    return random.Random(seed)
+
+def _get_rng(rdata):
+    """Returns the per-report RNG stored in rdata['rng'], falling back to the global random module."""
+    rng = rdata.get('rng') if isinstance(rdata, dict) else None
+    return rng if rng is not None else random
+
 def _generate_error_html(section_name, error_message="Error generating section content."):
-    """Generates a standard error message HTML block."""
+    """Generates a standard error message HTML block (styled by .error-section in the site theme)."""
     logging.error(f"Error in section '{section_name}': {error_message}")
     # Simple HTML structure for the error message
     return f"""
-    <div class='error-section' style='border: 1px solid red; padding: 10px; margin: 10px 0; background-color: #ffeeee;'>
+    <div class='error-section'>
         <p><strong>{get_icon('warning')} Error generating {section_name}:</strong></p>
-        <p style='font-family: monospace; font-size: 0.9em;'>{error_message}</p>
+        <p class='error-detail'>{error_message}</p>
         <p><i>Section content could not be generated due to the error above.</i></p>
     </div>"""
 
+# Icon spans are built once at import; get_icon and the table renderers just look them up.
+_ICONS = {
+    'up': ('icon-up', '▲'), 'down': ('icon-down', '▼'), 'neutral': ('icon-neutral', '●'),
+    'warning': ('icon-warning', '⚠️'), 'positive': ('icon-positive', '➕'), 'negative': ('icon-negative', '➖'),
+    'info': ('icon-info', 'ℹ️'), 'money': ('icon-money', '💰'), 'chart': ('icon-chart', '📊'),
+    'health': ('icon-health', '⚕️'), 'efficiency': ('icon-efficiency', '⚙️'), 'growth': ('icon-growth', '📈'),
+    'tax': ('icon-tax', '🧾'), 'dividend': ('icon-dividend', '💸'), 'stats': ('icon-stats', '📉'),
+    'news': ('icon-news', '📰'), 'faq': ('icon-faq', '❓'), 'peer': ('icon-peer', '👥'),
+    'history': ('icon-history', '📜'), 'cash': ('icon-cash', '💵'), 'volume': ('icon-volume', '🔊'),
+    'divergence': ('icon-divergence', '↔️')
+}
+ICON_SPANS = {
+    icon_type: f'<span class="icon {css_class}" title="{icon_type.capitalize()}">{symbol}</span>'
+    for icon_type, (css_class, symbol) in _ICONS.items()
+}
+
 def get_icon(type_input):
     """Returns an HTML span element for common icons. Handles None input."""
     icon_type = str(type_input).lower() if type_input is not None else ''
-    try:
-        icons = {
-            'up': ('icon-up', '▲'), 'down': ('icon-down', '▼'), 'neutral': ('icon-neutral', '●'),
-            'warning': ('icon-warning', '⚠️'), 'positive': ('icon-positive', '➕'), 'negative': ('icon-negative', '➖'),
-            'info': ('icon-info', 'ℹ️'), 'money': ('icon-money', '💰'), 'chart': ('icon-chart', '📊'),
-            'health': ('icon-health', '⚕️'), 'efficiency': ('icon-efficiency', '⚙️'), 'growth': ('icon-growth', '📈'),
-            'tax': ('icon-tax', '🧾'), 'dividend': ('icon-dividend', '💸'), 'stats': ('icon-stats', '📉'),
-            'news': ('icon-news', '📰'), 'faq': ('icon-faq', '❓'), 'peer': ('icon-peer', '👥'),
-            'history': ('icon-history', '📜'), 'cash': ('icon-cash', '💵'), 'volume': ('icon-volume', '🔊'),
-            'divergence': ('icon-divergence', '↔️')
-        }
-        css_class, symbol = icons.get(icon_type, ('', ''))
-        if css_class:
-            return f'<span class="icon {css_class}" title="{icon_type.capitalize()}">{symbol}</span>'
-        return '' # Return empty string if type not found
-    except Exception as e:
-        logging.error(f"Error in get_icon for type '{type_input}': {e}")
-        return '' # Return empty string on error
+    return ICON_SPANS.get(icon_type, '') # Return empty string if type not found
 
 def _safe_float(value, default=None):
     """Helper to safely convert value to float, handling common string formats."""
+    # Fast paths: typed metrics and plain numbers need no string cleanup
+    if isinstance(value, Metric):
+        return value.number
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_)):
+        return default if pd.isna(value) else float(value)
     if value is None or pd.isna(value):
         return default
     try:
@@ -60,6 +85,12 @@ def _safe_float(value, default=None):
 
 def format_html_value(value, format_type="number", precision=2, currency='$'):
     """Safely formats values for HTML display with enhanced error handling."""
+    if isinstance(value, Metric):
+        # Money amounts render with their own spec (same as the old pre-formatted "$..." passthrough);
+        # other metrics are reformatted from the raw number without a string round-trip.
+        if format_type in ("string", "factor", "date") or value.kind in ("currency", "large_number"):
+            return str(value)
+        return get_formatter(format_type, precision, currency)(value.number)
     original_value_repr = repr(value) # For logging
     if value is None or value == "N/A" or (isinstance(value, float) and pd.isna(value)):
         return "N/A"
@@ -109,12 +140,69 @@ def format_html_value(value, format_type="number", precision=2, currency='$'):
         logging.warning(f"Formatting error for value {original_value_repr} (type: {format_type}): {e}", exc_info=False)
         return str(value) # Fallback if any unexpected formatting error occurs
 
+# --- VECTORIZED TABLE HELPERS ---
+# Format whole columns at once and build rows with object-array string ops, so table cost grows with
+# the number of columns rather than cells x per-call overhead.
+
+_NUMERIC_FORMAT_TYPES = {"currency", "percent", "percent_direct", "ratio", "large_number", "integer", "number"}
+
+def format_column(values, format_type="number", precision=2, currency='$'):
+    """
+    Vectorized counterpart of format_html_value for a whole column (list, ndarray or Series).
+    Numeric values take the fast path; anything that isn't a plain number (pre-formatted strings,
+    dates) falls back to format_html_value so output matches cell-by-cell formatting.
+    Returns an object ndarray of strings.
+    """
+    values = pd.Series(values, dtype=object) if not isinstance(values, pd.Series) else values.reset_index(drop=True)
+    # Metrics go through format_html_value's typed fast path (pd.to_numeric can't read them)
+    out = np.full(len(values), "N/A", dtype=object)
+    if len(values) == 0:
+        return out
+    if format_type not in _NUMERIC_FORMAT_TYPES:
+        out[:] = [format_html_value(v, format_type, precision, currency) for v in values]
+        return out
+
+    nums = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+    missing = values.isna().to_numpy()
+    not_plain = np.zeros(len(values), dtype=bool)
+    if values.dtype == object: # to_numeric turns True into 1.0; format_html_value doesn't
+        not_plain = values.map(lambda v: isinstance(v, (bool, np.bool_))).to_numpy(dtype=bool)
+    fast = ~np.isnan(nums) & ~missing & ~not_plain
+    if fast.any():
+        out[fast] = format_many(nums[fast], format_type, precision, currency)
+    slow = ~fast & ~missing
+    if slow.any():
+        out[slow] = [format_html_value(v, format_type, precision, currency) for v in values[slow]]
+    return out
+
+def render_table_rows(columns, td_attrs=None, row_sep=""):
+    """
+    Builds <tr> rows from equally long columns of already formatted cell strings.
+    td_attrs: optional list (one per column) of None, a str applied to every cell, or a per-row
+    sequence of attribute strings (e.g. " class='action-buy'").
+    """
+    if not columns or len(columns[0]) == 0:
+        return ""
+    td_attrs = td_attrs or [None] * len(columns)
+    rows = np.full(len(columns[0]), "<tr>", dtype=object)
+    for col, attrs in zip(columns, td_attrs):
+        col = np.asarray(col, dtype=object).astype(str).astype(object)
+        if attrs is None:
+            rows = rows + "<td>" + col + "</td>"
+        else:
+            attrs = np.asarray(attrs, dtype=object) if not isinstance(attrs, str) else attrs
+            rows = rows + "<td" + attrs + ">" + col + "</td>"
+    rows = rows + "</tr>"
+    return row_sep.join(rows.tolist())
+
+
 # --- WRAPPED Component Functions with Site Variations & Deeper Analysis ---
 
 # Wrap EACH generate_..._html function in a try-except block
 
 def generate_introduction_html(ticker, rdata):
     """Generates the Introduction and Overview section with enhanced site variations and context."""
+    rng = _get_rng(rdata)
     try:
         profile_data = rdata.get('profile_data', {})
         site_name = rdata.get('site_name', '').lower()
@@ -140,7 +228,7 @@ def generate_introduction_html(ticker, rdata):
             f"Our report delves into <strong>{company_name} ({ticker})</strong>, a company active in the {industry} field ({sector} sector).",
             f"We turn our attention to <strong>{company_name} ({ticker})</strong>, situated in the {industry} industry within the {sector} sector."
         ]
-        intro_phrase = random.choice(intro_phrase_options)
+        intro_phrase = rng.choice(intro_phrase_options)
 
         # Varying ways to introduce the price and date
         price_phrase_options = [
@@ -149,52 +237,52 @@ def generate_introduction_html(ticker, rdata):
             f"On {last_date_fmt}, {ticker}'s shares were valued at <strong>{current_price_fmt}</strong>,",
             f"Trading activity on {last_date_fmt} placed the stock price at <strong>{current_price_fmt}</strong>,"
         ]
-        price_phrase = random.choice(price_phrase_options)
+        price_phrase = rng.choice(price_phrase_options)
 
         # Varying ways to describe the technical picture based on MAs
         dynamic_sentiment_text = "its current market position"
         trend_context = ""
         if price is not None and sma50 is not None and sma200 is not None:
             if price < sma50 and price < sma200:
-                dynamic_sentiment_text = random.choice([
+                dynamic_sentiment_text = rng.choice([
                     "a potentially challenging technical posture below key moving averages",
                     "a technically weaker stance, positioned under its main moving averages",
                     "a bearish technical signal, trading beneath significant moving averages"
                 ])
-                trend_context = random.choice([
+                trend_context = rng.choice([
                     "This position below both the 50-day and 200-day Simple Moving Averages (SMAs) often signals short-to-medium term weakness.",
                     "Being under both the 50-day and 200-day SMAs typically suggests prevailing downward pressure.",
                     "Trading beneath these key SMAs usually points towards negative momentum in the near to medium term."
                 ])
             elif price > sma50 and price > sma200:
-                dynamic_sentiment_text = random.choice([
+                dynamic_sentiment_text = rng.choice([
                     "apparent technical strength, trading above its key moving averages",
                     "a robust technical setup, holding above primary moving averages",
                     "a bullish technical indication, positioned over its main moving averages"
                 ])
-                trend_context = random.choice([
+                trend_context = rng.choice([
                     "Trading above both the 50-day and 200-day SMAs is typically viewed as a bullish signal, indicating positive short-to-medium term momentum.",
                     "Staying above these critical SMAs generally signifies positive market sentiment and upward momentum.",
                     "A position over both the 50-day and 200-day SMAs often confirms an ongoing uptrend."
                 ])
             elif price > sma50 and price < sma200:
-                 dynamic_sentiment_text = random.choice([
+                 dynamic_sentiment_text = rng.choice([
                      "a mixed technical picture, positioned between its key moving averages",
                      "a conflicted technical stance, caught between major moving averages",
                      "an ambiguous technical signal, trading above the 50-day but below the 200-day SMA"
                  ])
-                 trend_context = random.choice([
+                 trend_context = rng.choice([
                      "Being above the 50-day SMA but below the 200-day SMA suggests potential short-term strength conflicting with the longer-term trend, often requiring further confirmation.",
                      "This placement indicates short-term momentum might be positive, but the longer-term downtrend (vs. SMA200) remains a factor.",
                      "Such positioning often points to a period of consolidation or a potential battle between short-term buyers and long-term sellers."
                  ])
             else: # Below 50, Above 200
-                 dynamic_sentiment_text = random.choice([
+                 dynamic_sentiment_text = rng.choice([
                      "an interesting technical juncture near its key moving averages",
                      "a notable technical position relative to its moving averages",
                      "a potentially pivotal technical spot, interacting with its SMAs"
                  ])
-                 trend_context = random.choice([
+                 trend_context = rng.choice([
                      "Positioned below the 50-day SMA but above the 200-day SMA indicates potential short-term consolidation or pullback within a longer-term uptrend.",
                      "This setup might suggest a temporary dip or consolidation phase within an established longer-term positive trend.",
                      "Trading below the short-term average but above the long-term one can signal weakening momentum that needs monitoring."
@@ -207,12 +295,12 @@ def generate_introduction_html(ticker, rdata):
             f"Valued by the market at roughly <strong>{market_cap_fmt}</strong>,",
             f"Its market capitalization stands near <strong>{market_cap_fmt}</strong>,"
         ]
-        market_cap_phrase = random.choice(market_cap_phrase_options)
+        market_cap_phrase = rng.choice(market_cap_phrase_options)
 
         # --- Enhanced Site Specific Variations ---
         report_purpose_intro = ""
         if "finances forecast" in site_name:
-            report_purpose_intro = random.choice([
+            report_purpose_intro = rng.choice([
                 (
                     f"This <strong>Finances Forecast</strong> analysis delves into {company_name}'s ({ticker}) potential financial trajectory through 2025-2026. "
                     f"Our objective is to project future performance by examining quantitative forecasts, underlying financial health (see Financial Health section), key valuation metrics (discussed under Valuation), and potential catalysts derived from its business profile. "
@@ -224,7 +312,7 @@ def generate_introduction_html(ticker, rdata):
                 )
             ])
         elif "radar stocks" in site_name:
-             report_purpose_intro = random.choice([
+             report_purpose_intro = rng.choice([
                 (
                     f"Welcome to the <strong>Radar Stocks</strong> technical deep dive on {company_name} ({ticker}). "
                     f"This report focuses on identifying actionable trading insights by scrutinizing technical indicators (see Technical Analysis), current price momentum ({trend_context}), market sentiment, and key support/resistance levels. "
@@ -236,7 +324,7 @@ def generate_introduction_html(ticker, rdata):
                 )
              ])
         elif "bernini capital" in site_name:
-            report_purpose_intro = random.choice([
+            report_purpose_intro = rng.choice([
                 (
                     f"This <strong>Bernini Capital</strong> assessment provides a comprehensive evaluation of {company_name} ({ticker}) from a long-term, value-oriented perspective. "
                     f"We meticulously analyze its fundamental strength, including financial health (debt, liquidity), profitability trends (margins, ROE), cash flow generation (see Financial Health/Efficiency), and valuation attractiveness relative to peers and intrinsic estimates. Dividend sustainability (see Dividends section) is also a key consideration."
@@ -247,7 +335,7 @@ def generate_introduction_html(ticker, rdata):
                 )
             ])
         else: # Default (Balanced Approach)
-            report_purpose_intro = random.choice([
+            report_purpose_intro = rng.choice([
                  (
                      f"This report offers a multi-faceted analysis of {company_name} ({ticker}), integrating technical signals, fundamental data, and forward-looking forecasts. "
                      f"The aim is to provide investors with a balanced perspective on the stock's current market standing, potential risks (see Risk Factors), and future performance outlook."
@@ -269,7 +357,7 @@ def generate_introduction_html(ticker, rdata):
         summary_str = str(summary) if summary is not None else ''
         if summary_str and summary_str != 'No summary available.':
             # Add context based on summary length or keywords if desired
-            summary_focus = random.choice([
+            summary_focus = rng.choice([
                 "Key aspects of its operations include:",
                 "Its business model centers around:",
                 "The company primarily focuses on:",
@@ -285,6 +373,7 @@ def generate_introduction_html(ticker, rdata):
 
 def generate_metrics_summary_html(ticker, rdata):
     """Generates the key metrics summary box with enhanced site-specific interpretations and context."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         current_price = rdata.get('current_price')
@@ -356,82 +445,82 @@ def generate_metrics_summary_html(ticker, rdata):
         elif overall_pct_change_val < -1: forecast_direction = "potential downside"
 
         # Random phrasing options for narrative components
-        phrase_forecast_intro = random.choice([
+        phrase_forecast_intro = rng.choice([
             f"The quantitative outlook points towards a 1-year target of {forecast_1y_fmt}, implying",
             f"Our model projects a 1-year average price near {forecast_1y_fmt}, suggesting",
             f"Looking ahead one year, the forecast indicates a target around {forecast_1y_fmt}, representing"
         ])
-        phrase_forecast_near = random.choice([
+        phrase_forecast_near = rng.choice([
             f"The shorter-term {period_label} forecast of {forecast_1m_fmt} provides a nearer milestone.",
             f"As a closer benchmark, the {period_label} projection is {forecast_1m_fmt}.",
             f"In the near term ({period_label}), the model anticipates a price around {forecast_1m_fmt}."
         ])
-        phrase_factors_depend = random.choice([
+        phrase_factors_depend = rng.choice([
             "However, achieving these targets depends on factors discussed later, such as sustained growth (see Profitability) and market conditions.",
             "Reaching these projected levels is contingent upon elements examined elsewhere, including ongoing growth (view Profitability) and the broader market environment.",
             "Realization of these forecasts relies on various inputs detailed further, like consistent growth (refer to Profitability) and prevailing market dynamics."
         ])
-        phrase_tech_context = random.choice([
+        phrase_tech_context = rng.choice([
              f"The current {sentiment_str} technical stance ({price_vs_sma50_text}, {price_vs_sma200_text}) and recent volatility ({volatility_fmt}) shape the immediate path.",
              f"Presently, the technical picture ({sentiment_str}, {price_vs_sma50_text}, {price_vs_sma200_text}) combined with volatility ({volatility_fmt}) sets the near-term stage.",
              f"The immediate trajectory is influenced by the technical sentiment ({sentiment_str}), price vs MAs ({price_vs_sma50_text}, {price_vs_sma200_text}), and observed volatility ({volatility_fmt})."
         ])
-        phrase_trading_focus = random.choice([
+        phrase_trading_focus = rng.choice([
             f"From a trading perspective, the technical landscape currently shows a <strong>{sentiment_str}</strong> bias.",
             f"For traders, the immediate technical setup presents a <strong>{sentiment_str}</strong> sentiment.",
             f"Technically speaking, the current market leans towards a <strong>{sentiment_str}</strong> view for traders."
         ])
-        phrase_ma_importance = random.choice([
+        phrase_ma_importance = rng.choice([
             f"Price ({current_price_fmt}) is {price_vs_sma50_text} ({sma50_fmt}) and {price_vs_sma200_text} ({sma200_fmt}) – critical levels watched by trend followers.",
             f"The stock's position ({current_price_fmt}) relative to its 50-day ({sma50_fmt} - {price_vs_sma50_text}) and 200-day ({sma200_fmt} - {price_vs_sma200_text}) averages is key for trend analysis.",
             f"Observing the price ({current_price_fmt}) versus the SMAs ({sma50_fmt} - {price_vs_sma50_text}; {sma200_fmt} - {price_vs_sma200_text}) is crucial for identifying the prevailing trend."
         ])
-        phrase_volatility_note = random.choice([
+        phrase_volatility_note = rng.choice([
             f"Recent volatility stands at {volatility_fmt}, suggesting potential for price swings.",
             f"The measured volatility of {volatility_fmt} indicates the recent degree of price fluctuation.",
             f"Price movement intensity, measured by volatility, is currently {volatility_fmt}."
         ])
-        phrase_trader_priority = random.choice([
+        phrase_trader_priority = rng.choice([
             f"While the model projects a 1-year target of {forecast_1y_fmt}, active traders should prioritize confirming technical signals (see TA section) and managing risk around the near-term ({period_label}) forecast of {forecast_1m_fmt}.",
             f"Although the long-term forecast is {forecast_1y_fmt}, traders must focus on validating technical entries/exits (refer to TA section) and controlling risk, keeping the {period_label} forecast ({forecast_1m_fmt}) in mind.",
             f"The 1-year projection ({forecast_1y_fmt}) offers context, but traders need to emphasize confirming technical setups (view TA section) and risk mitigation, considering the {period_label} outlook ({forecast_1m_fmt})."
         ])
-        phrase_valuation_context = random.choice([
+        phrase_valuation_context = rng.choice([
             f"Key metrics provide context for {ticker}'s current valuation.",
             f"These summary metrics help frame {ticker}'s present market valuation.",
             f"Understanding {ticker}'s valuation starts with these key data points."
         ])
-        phrase_ma_context_long = random.choice([
+        phrase_ma_context_long = rng.choice([
              f"The price ({current_price_fmt}) relative to its medium-term (SMA50: {sma50_fmt} - {price_vs_sma50_text}) and long-term (SMA200: {sma200_fmt} - {price_vs_sma200_text}) trends is a starting point.",
              f"Comparing the current price ({current_price_fmt}) to its 50-day ({sma50_fmt} - {price_vs_sma50_text}) and 200-day ({sma200_fmt} - {price_vs_sma200_text}) moving averages offers initial trend perspective.",
              f"The relationship between price ({current_price_fmt}) and its key SMAs (50-day: {sma50_fmt} - {price_vs_sma50_text}; 200-day: {sma200_fmt} - {price_vs_sma200_text}) provides basic trend information."
         ])
-        phrase_long_term_focus = random.choice([
+        phrase_long_term_focus = rng.choice([
             f"While models estimate a 1-year average price near {forecast_1y_fmt}, long-term investment decisions hinge more critically on fundamental strength (financial health, profitability) and whether the current price offers an adequate margin of safety relative to intrinsic value.",
             f"Although the 1-year forecast targets {forecast_1y_fmt}, enduring investment choices depend more significantly on core fundamentals (like financial stability and earnings power) and if the price represents good value compared to its estimated worth.",
             f"The model's 1-year outlook ({forecast_1y_fmt}) is one piece of data, but sustainable investing prioritizes fundamental quality (health, profits) and ensuring the purchase price is attractive relative to the company's intrinsic value."
         ])
-        phrase_default_intro = random.choice([
+        phrase_default_intro = rng.choice([
             f"This snapshot summarizes {ticker}'s current position.",
             f"Here's a quick overview of {ticker}'s key metrics.",
             f"The following data points provide a summary of {ticker}'s current status."
         ])
-        phrase_default_forecast = random.choice([
+        phrase_default_forecast = rng.choice([
              f"The stock trades at {current_price_fmt}, with models forecasting a 1-year average target near {forecast_1y_fmt} ({overall_pct_change_fmt}).",
              f"Currently priced at {current_price_fmt}, {ticker} has a model-based 1-year forecast around {forecast_1y_fmt} (a {overall_pct_change_fmt} potential change).",
              f"With a price of {current_price_fmt}, the 1-year projection aims for approximately {forecast_1y_fmt} ({overall_pct_change_fmt})."
         ])
-        phrase_default_tech = random.choice([
+        phrase_default_tech = rng.choice([
             f"Technical indicators currently reflect a {sentiment_str} sentiment ({price_vs_sma50_text} / {price_vs_sma200_text}).",
             f"The technical picture shows a {sentiment_str} bias ({price_vs_sma50_text}, {price_vs_sma200_text}).",
             f"Sentiment derived from technicals is {sentiment_str} ({price_vs_sma50_text} / {price_vs_sma200_text})."
         ])
-        phrase_default_vol = random.choice([
+        phrase_default_vol = rng.choice([
             f"Recent volatility ({volatility_fmt}) quantifies price fluctuations.",
             f"Price swing intensity is measured by volatility at {volatility_fmt}.",
             f"The stock's recent volatility stands at {volatility_fmt}."
         ])
-        phrase_default_outro = random.choice([
+        phrase_default_outro = rng.choice([
             "The following sections provide deeper analysis into the underlying technicals and fundamentals.",
             "Further details on the technical and fundamental aspects are explored below.",
             "We delve into more specific technical and fundamental analysis in the subsequent sections."
@@ -461,29 +550,39 @@ def generate_metrics_section_content(metrics):
     # (Code remains the same as V3)
     rows = ""
     try:
-        if isinstance(metrics, dict):
-            # Iterate safely, format each value, skip if format result is "N/A"
-            row_parts = []
-            for k, v in metrics.items():
-                # Decide format type based on key name heuristics (can be expanded)
+        if isinstance(metrics, dict) and metrics:
+            keys = [str(k) for k in metrics.keys()] # Ensure key is string
+            values = list(metrics.values())
+            # Decide format type based on key name heuristics (can be expanded)
+            format_types = []
+            for k_lower in (k.lower() for k in keys):
                 format_type = "string" # Default
-                k_lower = str(k).lower()
                 if "date" in k_lower: format_type = "date"
                 elif "yield" in k_lower or "ratio" in k_lower or "beta" in k_lower: format_type = "ratio"
                 elif "margin" in k_lower or "ownership" in k_lower or "growth" in k_lower or "%" in k_lower: format_type = "percent_direct"
                 elif "price" in k_lower or "value" in k_lower or "dividend rate" in k_lower: format_type = "currency"
                 elif "volume" in k_lower or "shares" in k_lower or "employees" in k_lower: format_type = "integer"
                 elif "market cap" in k_lower: format_type = "large_number"
-
-                formatted_v = format_html_value(v, format_type)
-                if formatted_v != "N/A":
-                    row_parts.append(f"<tr><td>{str(k)}</td><td>{formatted_v}</td></tr>") # Ensure key is string
-
-            rows = "".join(row_parts)
+                format_types.append(format_type)
+
+            # Typed metrics render with the spec they were extracted with; key heuristics only apply to untyped values
+            format_types = ["typed" if isinstance(v, Metric) else ft for v, ft in zip(values, format_types)]
+
+            # Format each group of same-typed values in one batch, then drop rows that came out "N/A"
+            formatted = np.empty(len(values), dtype=object)
+            format_types_arr = np.array(format_types, dtype=object)
+            for format_type in set(format_types):
+                idx = np.flatnonzero(format_types_arr == format_type)
+                if format_type == "typed":
+                    formatted[idx] = list(render_metrics({i: values[i] for i in idx}).values())
+                else:
+                    formatted[idx] = format_column([values[i] for i in idx], format_type)
+            keep = formatted != "N/A"
+            rows = render_table_rows([np.array(keys, dtype=object)[keep], formatted[keep]])
 
         if not rows:
             # Provide a more informative message if no valid data was found
-            rows = "<tr><td colspan='2' style='text-align: center; font-style: italic;'>No displayable data available for this category.</td></tr>"
+            rows = "<tr><td colspan='2' class='empty-row'>No displayable data available for this category.</td></tr>"
 
         return f"""<div class="table-container">
                        <table class="metrics-table">
@@ -496,7 +595,7 @@ def generate_metrics_section_content(metrics):
         return f"""<div class="table-container">
                        <table class="metrics-table">
                            <tbody>
-                               <tr><td colspan='2' style='text-align: center; color: red;'>Error displaying metric data.</td></tr>
+                               <tr><td colspan='2' class='empty-row error-row'>Error displaying metric data.</td></tr>
                            </tbody>
                        </table>
                    </div>"""
@@ -504,6 +603,7 @@ def generate_metrics_section_content(metrics):
 # Example: Adding variation to generate_total_valuation_html narrative
 def generate_total_valuation_html(ticker, rdata):
     """Generates Total Valuation section with enhanced site-specific narrative focus."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         valuation_data = rdata.get('total_valuation_data')
@@ -527,14 +627,14 @@ def generate_total_valuation_html(ticker, rdata):
             f"Looking beyond market cap, the Enterprise Value (EV), currently <strong>{ev_ttm}</strong>, offers a broader view of {ticker}'s value by including debt and cash.",
             f"At <strong>{ev_ttm}</strong>, the Enterprise Value (EV) presents a fuller picture of {ticker}'s aggregate value, accounting for both equity and net debt."
         ]
-        ev_explanation = random.choice(ev_explanation_options)
+        ev_explanation = rng.choice(ev_explanation_options)
 
         ratio_explanation_options = [
             f"The EV/Revenue ratio ({ev_rev}) compares this total value to sales, while EV/EBITDA ({ev_ebitda}) relates it to operating profitability before interest, taxes, depreciation, and amortization.",
             f"Relating this EV to performance, the EV/Revenue multiple stands at {ev_rev}, and the EV/EBITDA multiple is {ev_ebitda}, gauging value against sales and core operational earnings respectively.",
             f"Key ratios derived from EV include EV/Revenue ({ev_rev}) and EV/EBITDA ({ev_ebitda}), which assess valuation relative to top-line revenue and operating profit (pre-deductions)."
         ]
-        ratio_explanation = random.choice(ratio_explanation_options)
+        ratio_explanation = rng.choice(ratio_explanation_options)
 
         if "finances forecast" in site_name:
             narrative_options = [
@@ -547,7 +647,7 @@ def generate_total_valuation_html(ticker, rdata):
                     f"Keep an eye on the next earnings date ({next_earn_date}), as results can shift these valuation metrics and forecast inputs."
                 )
             ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         elif "radar stocks" in site_name:
             narrative_options = [
                 (
@@ -560,7 +660,7 @@ def generate_total_valuation_html(ticker, rdata):
                      f"Also, be aware of the Ex-Dividend Date ({ex_div_date}) for potential price impacts."
                 )
             ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         elif "bernini capital" in site_name:
             narrative_options = [
                 (
@@ -572,7 +672,7 @@ def generate_total_valuation_html(ticker, rdata):
                     f"Benchmarking these EV multiples against past performance {get_icon('history')} and competitors {get_icon('peer')} helps gauge if {ticker} is currently priced attractively relative to its operational footprint and earnings power."
                 )
             ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         else: # Default
              narrative_options = [
                  (
@@ -584,7 +684,7 @@ def generate_total_valuation_html(ticker, rdata):
                     f"These figures help evaluate {ticker}'s price relative to its business scale and operational results. Note the upcoming earnings (Est: {next_earn_date}) and ex-dividend ({ex_div_date}) dates."
                  )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
 
         return f'<div class="narrative"><p>{narrative}</p></div>' + content
     except Exception as e:
@@ -602,7 +702,7 @@ def generate_total_valuation_html(ticker, rdata):
 # generate_analyst_insights_html
 # (Implementation omitted for brevity, but follow the pattern above:
 #  1. Define multiple phrasing options for sentences/concepts.
-#  2. Use random.choice() to select one.
+#  2. Use rng.choice() to select one.
 #  3. Integrate these choices into the site-specific narrative logic.)
 
 
@@ -610,6 +710,7 @@ def generate_total_valuation_html(ticker, rdata):
 
 def generate_conclusion_outlook_html(ticker, rdata):
     """Generates the Conclusion and Outlook section with enhanced synthesis and site variations."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
 
@@ -896,7 +997,7 @@ def generate_conclusion_outlook_html(ticker, rdata):
             "Building a long-term position requires confidence in the company's fundamentals, its market position, and buying at a price that provides sufficient margin for error."
         ]
         phrase_default_synthesis_options = [
-            f"{random.choice(phrase_link_tech_fund_options)} {ticker} exhibits <strong>{sentiment_narrative}</strong> technical sentiment alongside <strong>{fundamental_strength_summary.lower()}</strong> fundamental health.",
+            f"{rng.choice(phrase_link_tech_fund_options)} {ticker} exhibits <strong>{sentiment_narrative}</strong> technical sentiment alongside <strong>{fundamental_strength_summary.lower()}</strong> fundamental health.",
             f"Overall, {ticker} combines a technical picture leaning {sentiment_narrative} with a fundamental health assessment of {fundamental_strength_summary.lower()}.",
             f"Synthesizing the data, {ticker} currently shows {sentiment_narrative} technicals coupled with {fundamental_strength_summary.lower()} fundamentals."
         ]
@@ -910,10 +1011,10 @@ def generate_conclusion_outlook_html(ticker, rdata):
 
         if "finances forecast" in site_name:
             overall_assessment = (
-                f"{random.choice(phrase_forecast_intro_options)} <strong>{forecast_direction_summary}</strong> towards ≈{forecast_1y_fmt}. "
-                f"This projection appears {random.choice(phrase_supported_by_options)} by {random.choice(phrase_recent_options)} {growth_narrative} and a valuation considered {valuation_narrative}. "
-                f"{random.choice(phrase_however_options)} the {sentiment_narrative} technical sentiment and {trend_narrative} indicate {random.choice(phrase_near_term_hurdles_options)}. "
-                f"{random.choice(phrase_achieving_forecast_options)} {random.choice(phrase_investor_consider_options)} {random.choice(phrase_risks_horizon_options)}"
+                f"{rng.choice(phrase_forecast_intro_options)} <strong>{forecast_direction_summary}</strong> towards ≈{forecast_1y_fmt}. "
+                f"This projection appears {rng.choice(phrase_supported_by_options)} by {rng.choice(phrase_recent_options)} {growth_narrative} and a valuation considered {valuation_narrative}. "
+                f"{rng.choice(phrase_however_options)} the {sentiment_narrative} technical sentiment and {trend_narrative} indicate {rng.choice(phrase_near_term_hurdles_options)}. "
+                f"{rng.choice(phrase_achieving_forecast_options)} {rng.choice(phrase_investor_consider_options)} {rng.choice(phrase_risks_horizon_options)}"
             )
         elif "radar stocks" in site_name:
              macd_narrative = st_points_data.get('macd',{}).get('value','N/A MACD')
@@ -921,25 +1022,25 @@ def generate_conclusion_outlook_html(ticker, rdata):
              bbands_narrative = st_points_data.get('bbands',{}).get('value','N/A BBands')
              sr_narrative = st_points_data.get('sr',{}).get('value','N/A')
              overall_assessment = (
-                 f"{random.choice(phrase_trading_standpoint_options)} {ticker}'s {random.choice(phrase_technicals_lean_options)} <strong>{sentiment_narrative}</strong>, primarily driven by {trend_narrative} and {macd_narrative}. "
-                 f"Momentum ({rsi_narrative}) and volatility ({bbands_narrative}) {random.choice(phrase_momentum_vol_suggest_options)} {random.choice(phrase_potential_for_options)}. "
-                 f"{random.choice(phrase_key_levels_options)} {sr_narrative}. While the longer-term forecast ({forecast_direction_summary}) and analyst views ({analyst_narrative}) provide context, {random.choice(phrase_trader_focus_options)}"
+                 f"{rng.choice(phrase_trading_standpoint_options)} {ticker}'s {rng.choice(phrase_technicals_lean_options)} <strong>{sentiment_narrative}</strong>, primarily driven by {trend_narrative} and {macd_narrative}. "
+                 f"Momentum ({rsi_narrative}) and volatility ({bbands_narrative}) {rng.choice(phrase_momentum_vol_suggest_options)} {rng.choice(phrase_potential_for_options)}. "
+                 f"{rng.choice(phrase_key_levels_options)} {sr_narrative}. While the longer-term forecast ({forecast_direction_summary}) and analyst views ({analyst_narrative}) provide context, {rng.choice(phrase_trader_focus_options)}"
              )
         elif "bernini capital" in site_name:
             overall_assessment = (
-                f"{random.choice(phrase_fundamental_perspective_options)} {ticker} {random.choice(phrase_presents_profile_options)} a <strong>{fundamental_strength_summary.lower()}</strong> financial health profile ({health_narrative}) and a valuation currently assessed as {valuation_narrative}. "
-                f"{random.choice(phrase_dividend_mention_options)} {random.choice(phrase_recent_options)} growth stands at {growth_narrative}. {random.choice(phrase_link_tech_fund_options)} the {sentiment_narrative} technicals offer context on current market perception. "
-                f"{random.choice(phrase_long_term_case_options)} {random.choice(phrase_investor_consider_options)} {random.choice(phrase_risks_horizon_options)}"
+                f"{rng.choice(phrase_fundamental_perspective_options)} {ticker} {rng.choice(phrase_presents_profile_options)} a <strong>{fundamental_strength_summary.lower()}</strong> financial health profile ({health_narrative}) and a valuation currently assessed as {valuation_narrative}. "
+                f"{rng.choice(phrase_dividend_mention_options)} {rng.choice(phrase_recent_options)} growth stands at {growth_narrative}. {rng.choice(phrase_link_tech_fund_options)} the {sentiment_narrative} technicals offer context on current market perception. "
+                f"{rng.choice(phrase_long_term_case_options)} {rng.choice(phrase_investor_consider_options)} {rng.choice(phrase_risks_horizon_options)}"
              )
         else: # Default
             overall_assessment = (
-                f"{random.choice(phrase_default_synthesis_options)} "
-                f"{random.choice(phrase_default_valuation_options)} {random.choice(phrase_default_forecast_summary_options)} "
-                f"{random.choice(phrase_investor_consider_options)} {random.choice(phrase_risks_horizon_options)}"
+                f"{rng.choice(phrase_default_synthesis_options)} "
+                f"{rng.choice(phrase_default_valuation_options)} {rng.choice(phrase_default_forecast_summary_options)} "
+                f"{rng.choice(phrase_investor_consider_options)} {rng.choice(phrase_risks_horizon_options)}"
             )
 
         # Add the disclaimer with slight variation possibility
-        disclaimer_intro = random.choice([
+        disclaimer_intro = rng.choice([
             "<strong>Important:</strong> This analysis synthesizes model outputs and publicly available data for informational purposes only.",
             "<strong>Note:</strong> This report combines model projections and public data for educational use.",
             "<strong>Reminder:</strong> The following assessment is based on model data and public information, intended for informational use."
@@ -958,6 +1059,7 @@ def generate_conclusion_outlook_html(ticker, rdata):
 
 def generate_detailed_forecast_table_html(ticker, rdata):
     """Generates the detailed forecast table with enhanced site-specific commentary and insights."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         monthly_forecast_table_data = rdata.get('monthly_forecast_table_data', pd.DataFrame())
@@ -1020,9 +1122,9 @@ def generate_detailed_forecast_table_html(ticker, rdata):
                         ]
                 }
 
-                if width_change_ratio > 1.2: range_trend_comment = random.choice(range_trend_options['widening'])
-                elif width_change_ratio < 0.8: range_trend_comment = random.choice(range_trend_options['narrowing'])
-                else: range_trend_comment = random.choice(range_trend_options['stable'])
+                if width_change_ratio > 1.2: range_trend_comment = rng.choice(range_trend_options['widening'])
+                elif width_change_ratio < 0.8: range_trend_comment = rng.choice(range_trend_options['narrowing'])
+                else: range_trend_comment = rng.choice(range_trend_options['stable'])
 
 
                 # Calculate Average if missing or ensure numeric
@@ -1051,29 +1153,26 @@ def generate_detailed_forecast_table_html(ticker, rdata):
                 # Generate table rows (Safely access columns)
                 required_cols = [forecast_time_col, 'Low', 'Average', 'High', 'Potential ROI', 'Action']
                 if all(col in forecast_df.columns for col in required_cols):
-                    for _, row in forecast_df.iterrows():
-                        action_class = str(row.get('Action', 'N/A')).lower().split(" ")[-1].split("/")[0] # e.g., buy, short, neutral
-                        roi_val = row.get('Potential ROI', np.nan)
-                        roi_icon = get_icon('neutral')
-                        roi_fmt = "N/A"
-                        if not pd.isna(roi_val):
-                           roi_icon = get_icon('up' if roi_val > 1 else ('down' if roi_val < -1 else 'neutral'))
-                           roi_fmt = format_html_value(roi_val, 'percent_direct', 1)
-
-                        low_fmt = format_html_value(row.get('Low'), 'currency')
-                        avg_fmt = format_html_value(row.get('Average'), 'currency')
-                        high_fmt = format_html_value(row.get('High'), 'currency')
-                        action_display = row.get('Action', 'N/A')
-                        time_period_fmt = str(row.get(forecast_time_col, 'N/A')) # Ensure time period is string
-
-                        table_rows += (
-                            f"<tr><td>{time_period_fmt}</td><td>{low_fmt}</td><td>{avg_fmt}</td><td>{high_fmt}</td>"
-                            f"<td>{roi_icon} {roi_fmt}</td><td class='action-{action_class}'>{action_display}</td></tr>\n"
-                        )
+                    # Column-wise formatting; see format_column / render_table_rows
+                    roi_vals = forecast_df['Potential ROI'].to_numpy(dtype=float)
+                    roi_icons = np.select([roi_vals > 1, roi_vals < -1], [ICON_SPANS['up'], ICON_SPANS['down']], default=ICON_SPANS['neutral']).astype(object)
+                    roi_cells = roi_icons + " " + format_column(roi_vals, 'percent_direct', 1) # NaN ROI -> neutral icon + N/A
+                    action_display = forecast_df['Action'].astype(str)
+                    action_class = action_display.str.lower().str.split(" ").str[-1].str.split("/").str[0] # e.g., buy, short, neutral
+                    table_rows = render_table_rows(
+                        [forecast_df[forecast_time_col].astype(str).to_numpy(dtype=object),
+                         format_column(forecast_df['Low'], 'currency'),
+                         format_column(forecast_df['Average'], 'currency'),
+                         format_column(forecast_df['High'], 'currency'),
+                         roi_cells,
+                         action_display.to_numpy(dtype=object)],
+                        td_attrs=[None, None, None, None, None, (" class='action-" + action_class + "'").to_numpy(dtype=object)],
+                        row_sep="\n"
+                    ) + "\n"
                 else:
                      missing_cols = [col for col in required_cols if col not in forecast_df.columns]
                      logging.warning(f"Missing required columns in forecast data: {missing_cols}")
-                     table_rows = f"<tr><td colspan='6' style='text-align:center;'>Detailed forecast data incomplete.</td></tr>"
+                     table_rows = f"<tr><td colspan='6' class='empty-row'>Detailed forecast data incomplete.</td></tr>"
 
             # Define HTML after processing
             min_max_summary = f"""<p>Over the forecast horizon ({forecast_df[forecast_time_col].iloc[0]} to {forecast_df[forecast_time_col].iloc[-1]}), {ticker}'s price is projected by the model to fluctuate between approximately <strong>{format_html_value(min_price_overall, 'currency')}</strong> and <strong>{format_html_value(max_price_overall, 'currency')}</strong>.</p>""" if min_price_overall is not None else "<p>Overall forecast range could not be determined.</p>"
@@ -1101,7 +1200,7 @@ def generate_detailed_forecast_table_html(ticker, rdata):
                  f"These figures offer a model-based guide, reflecting assumptions on growth and financial performance."
                 )
             ]
-            narrative_intro = random.choice(narrative_options)
+            narrative_intro = rng.choice(narrative_options)
         elif "radar stocks" in site_name:
              narrative_options = [
                 (
@@ -1113,7 +1212,7 @@ def generate_detailed_forecast_table_html(ticker, rdata):
                  f"These forecast bands ({range_narrative}) can inform traders about potential price zones, but should be used with confirmation from live technicals and volume. The 'Model Signal' is ROI-based, not direct trading advice."
                 )
              ]
-             narrative_intro = random.choice(narrative_options)
+             narrative_intro = rng.choice(narrative_options)
         elif "bernini capital" in site_name:
             narrative_options = [
                 (
@@ -1125,15 +1224,15 @@ def generate_detailed_forecast_table_html(ticker, rdata):
                  f"Although these price estimates ({range_narrative}) provide a quantitative outlook, value investors must rely primarily on fundamental assessment, comparing intrinsic value calculations to these levels and acknowledging forecast limitations."
                 )
             ]
-            narrative_intro = random.choice(narrative_options)
+            narrative_intro = rng.choice(narrative_options)
         else: # Default
              narrative_options = [
                 (f"The detailed {period_label.lower()} forecast below outlines the model's expectations for {ticker}'s price evolution ({range_narrative}). It includes projected ranges (Min, Avg, Max), potential ROI based on the average projection versus the current price, and a derived model signal for each period."),
                 (f"Here's the breakdown of the {period_label.lower()} forecast for {ticker} ({range_narrative} overall range). The table shows projected price bands, potential ROI against the current price, and the resulting model signal per period.")
              ]
-             narrative_intro = random.choice(narrative_options)
+             narrative_intro = rng.choice(narrative_options)
 
-        disclaimer_forecast = random.choice([
+        disclaimer_forecast = rng.choice([
             "Forecasts are model-based estimates, inherently uncertain, and subject to change based on evolving data and market conditions. They do not guarantee future prices.",
             "Remember that these forecasts are generated by models, carry inherent uncertainty, and can change with new data or market shifts. Future prices are not guaranteed.",
             "Model forecasts like these are estimates with built-in uncertainty. They depend on current data and assumptions, which can change. Actual prices are not guaranteed."
@@ -1154,6 +1253,7 @@ def generate_detailed_forecast_table_html(ticker, rdata):
 
 def generate_company_profile_html(ticker, rdata):
     """Generates the Company Profile section with enhanced detail and site variations."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         profile_data = rdata.get('profile_data', {})
@@ -1195,7 +1295,7 @@ def generate_company_profile_html(ticker, rdata):
             'bernini capital': ["Fundamental Business Profile & Industry Standing", "Core Operations & Competitive Landscape"],
             'default': ["Business Overview", "Company Description"]
         }
-        summary_title = random.choice(summary_title_options.get(site_name, summary_title_options['default']))
+        summary_title = rng.choice(summary_title_options.get(site_name, summary_title_options['default']))
 
 
         narrative_focus_options = {
@@ -1216,7 +1316,7 @@ def generate_company_profile_html(ticker, rdata):
                 " Understanding the core business provides context for the following analysis."
                 ]
         }
-        narrative_focus = random.choice(narrative_focus_options.get(site_name, narrative_focus_options['default']))
+        narrative_focus = rng.choice(narrative_focus_options.get(site_name, narrative_focus_options['default']))
 
 
         summary_text = str(profile_data.get('Summary', 'No detailed business summary available.')) # Ensure string
@@ -1228,6 +1328,7 @@ def generate_company_profile_html(ticker, rdata):
 
 def generate_valuation_metrics_html(ticker, rdata):
     """Generates Valuation Metrics with enhanced site-specific narrative focus and comparative context."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         valuation_data = rdata.get('valuation_data')
@@ -1253,12 +1354,12 @@ def generate_valuation_metrics_html(ticker, rdata):
 
         # Valuation interpretation helper
         def interpret_pe(pe_val, pe_fmt):
-            if pe_val is None: return pe_fmt, random.choice(["cannot be determined", "is unavailable", "is not applicable"])
-            if pe_val <= 0: return pe_fmt, random.choice(["negative (indicating loss or requires context)", "below zero (suggesting no profit or data anomaly)", "negative (check earnings details)"])
-            if pe_val < 15: return pe_fmt, random.choice(["relatively low (potentially undervalued or low growth expectations)", "quite low (possibly undervalued or facing slow growth)", "modest (could be value or low expectations)"])
-            if pe_val < 25: return pe_fmt, random.choice(["moderate", "average", "in a typical range"])
-            if pe_val < 40: return pe_fmt, random.choice(["elevated (suggesting growth expectations)", "somewhat high (implying growth is priced in)", "above average (reflecting positive outlook)"])
-            return pe_fmt, random.choice(["high (implying significant growth expectations or potential overvaluation)", "very high (indicating strong growth needed or possible richness)", "significantly elevated (suggesting premium valuation or high growth assumptions)"])
+            if pe_val is None: return pe_fmt, rng.choice(["cannot be determined", "is unavailable", "is not applicable"])
+            if pe_val <= 0: return pe_fmt, rng.choice(["negative (indicating loss or requires context)", "below zero (suggesting no profit or data anomaly)", "negative (check earnings details)"])
+            if pe_val < 15: return pe_fmt, rng.choice(["relatively low (potentially undervalued or low growth expectations)", "quite low (possibly undervalued or facing slow growth)", "modest (could be value or low expectations)"])
+            if pe_val < 25: return pe_fmt, rng.choice(["moderate", "average", "in a typical range"])
+            if pe_val < 40: return pe_fmt, rng.choice(["elevated (suggesting growth expectations)", "somewhat high (implying growth is priced in)", "above average (reflecting positive outlook)"])
+            return pe_fmt, rng.choice(["high (implying significant growth expectations or potential overvaluation)", "very high (indicating strong growth needed or possible richness)", "significantly elevated (suggesting premium valuation or high growth assumptions)"])
 
         fwd_pe_disp, fwd_pe_interp = interpret_pe(forward_pe_val, forward_pe_fmt)
         trail_pe_disp, trail_pe_interp = interpret_pe(trailing_pe_val, trailing_pe_fmt)
@@ -1268,7 +1369,7 @@ def generate_valuation_metrics_html(ticker, rdata):
             f"Comparing these multiples to {ticker}'s past levels {get_icon('history')} and industry competitors {get_icon('peer')} is essential for proper valuation context.",
             f"For meaningful assessment, these valuation metrics need comparison with {ticker}'s historical data {get_icon('history')} and relevant industry peers {get_icon('peer')}."
             ]
-        peer_hist_prompt = random.choice(peer_hist_prompt_options)
+        peer_hist_prompt = rng.choice(peer_hist_prompt_options)
 
         if "finances forecast" in site_name:
             narrative_options = [
@@ -1281,7 +1382,7 @@ def generate_valuation_metrics_html(ticker, rdata):
                 f"The PEG ratio ({peg_ratio_fmt}) relates this to growth; around 1 can imply fair value. The Price/Sales ratio ({ps_ratio_fmt}) provides a revenue-based comparison. {peer_hist_prompt}"
                 )
              ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         elif "radar stocks" in site_name:
              narrative_options = [
                 (
@@ -1293,7 +1394,7 @@ def generate_valuation_metrics_html(ticker, rdata):
                 f"P/S ({ps_ratio_fmt}) and P/B ({pb_ratio_fmt}) offer wider context. The key is price behavior around these valuation levels, not just the absolute numbers."
                 )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
         elif "bernini capital" in site_name:
             narrative_options = [
                 (
@@ -1305,7 +1406,7 @@ def generate_valuation_metrics_html(ticker, rdata):
                 f"We emphasize Price/Free Cash Flow ({pfcf_ratio_fmt}) {get_icon('cash')} as it reflects true cash earnings power. {peer_hist_prompt} A notable discount relative to benchmarks could signal value, assuming solid fundamentals (refer to Financial Health)."
                 )
             ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         else: # Default
              narrative_options = [
                 (
@@ -1317,7 +1418,7 @@ def generate_valuation_metrics_html(ticker, rdata):
                 f"{peer_hist_prompt}"
                 )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
 
         return f'<div class="narrative"><p>{narrative}</p></div>' + content
     except Exception as e:
@@ -1326,6 +1427,7 @@ def generate_valuation_metrics_html(ticker, rdata):
 
 def generate_financial_health_html(ticker, rdata):
     """Generates Financial Health section with enhanced site-specific narratives and trend context."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         health_data = rdata.get('financial_health_data')
@@ -1352,7 +1454,7 @@ def generate_financial_health_html(ticker, rdata):
             f"Financial stability is gauged by ROE ({roe_fmt}), leverage ({debt_equity_fmt}), liquidity (Current: {current_ratio_fmt}, Quick: {quick_ratio_fmt}), and cash generation (Op Cash Flow: {op_cash_flow_fmt}).",
             f"We assess health via ROE ({roe_fmt}), D/E ratio ({debt_equity_fmt}), liquidity measures (Current: {current_ratio_fmt}, Quick: {quick_ratio_fmt}), and operating cash flow ({op_cash_flow_fmt})."
             ]
-        health_summary = random.choice(health_summary_options)
+        health_summary = rng.choice(health_summary_options)
 
         trend_comments = []
         if roe_trend: trend_comments.append(f"ROE trend appears {str(roe_trend).lower()}.")
@@ -1369,7 +1471,7 @@ def generate_financial_health_html(ticker, rdata):
                     f" {get_icon('warning')} Note: The relatively high Debt/Equity ({debt_equity_fmt}) aligns with identified risks related to leverage or interest rates (see Risk Factors).",
                     f" {get_icon('warning')} Caution: Elevated Debt/Equity ({debt_equity_fmt}) connects to potential leverage/rate risks mentioned elsewhere (view Risk Factors)."
                     ]
-                risk_link = random.choice(risk_link_options)
+                risk_link = rng.choice(risk_link_options)
 
 
         # Liquidity Interpretation
@@ -1379,10 +1481,10 @@ def generate_financial_health_html(ticker, rdata):
             'medium': ["adequately covered", "sufficiently covered", "reasonably covered"],
             'low': ["tightly covered", "barely covered", "minimally covered"]
             }
-        liquidity_desc = random.choice(liquidity_desc_options['low']) # Default
+        liquidity_desc = rng.choice(liquidity_desc_options['low']) # Default
         if current_ratio_val is not None:
-            if current_ratio_val > 1.5: liquidity_desc = random.choice(liquidity_desc_options['high'])
-            elif current_ratio_val > 1.0: liquidity_desc = random.choice(liquidity_desc_options['medium'])
+            if current_ratio_val > 1.5: liquidity_desc = rng.choice(liquidity_desc_options['high'])
+            elif current_ratio_val > 1.0: liquidity_desc = rng.choice(liquidity_desc_options['medium'])
 
 
         if "finances forecast" in site_name:
@@ -1396,7 +1498,7 @@ def generate_financial_health_html(ticker, rdata):
                 f"Liquidity seems {liquidity_desc} (Current Ratio: {current_ratio_fmt}). Robust Operating Cash Flow ({op_cash_flow_fmt}) is vital for operations and shareholder returns. {trend_context}{risk_link}"
                 )
             ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         elif "radar stocks" in site_name:
             narrative_options = [
                 (
@@ -1408,7 +1510,7 @@ def generate_financial_health_html(ticker, rdata):
                  f"Positive cash flow ({op_cash_flow_fmt}) {get_icon('cash')} adds a layer of safety. Deteriorating trends ({trend_context}) might eventually pressure the stock.{risk_link}"
                 )
              ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         elif "bernini capital" in site_name:
             narrative_options = [
                 (
@@ -1420,7 +1522,7 @@ def generate_financial_health_html(ticker, rdata):
                  f"Reliable positive cash flow from operations ({op_cash_flow_fmt}) is essential for business health and shareholder returns. {risk_link} Benchmarking against peers {get_icon('peer')} is vital."
                 )
             ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         else: # Default
              narrative_options = [
                 (
@@ -1432,7 +1534,7 @@ def generate_financial_health_html(ticker, rdata):
                 f"The data reflects leverage, liquidity, and returns on equity. Strong cash flow is typically viewed favorably.{risk_link}"
                 )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
 
         return f'<div class="narrative"><p>{narrative}</p></div>' + content
     except Exception as e:
@@ -1440,6 +1542,7 @@ def generate_financial_health_html(ticker, rdata):
 
 def generate_financial_efficiency_html(ticker, rdata):
     """Generates Financial Efficiency section with enhanced site-specific narratives."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         efficiency_data = rdata.get('financial_efficiency_data')
@@ -1461,7 +1564,7 @@ def generate_financial_efficiency_html(ticker, rdata):
             f"Operational effectiveness can be seen in asset utilization (Asset Turnover: {asset_turnover_fmt})",
             f"{ticker}'s efficiency in using its assets to generate sales is measured by Asset Turnover ({asset_turnover_fmt})"
             ]
-        efficiency_summary = random.choice(efficiency_summary_options)
+        efficiency_summary = rng.choice(efficiency_summary_options)
 
         if inventory_turnover_fmt != 'N/A': efficiency_summary += f", manages inventory (Inventory Turnover: {inventory_turnover_fmt})"
         if receivables_turnover_fmt != 'N/A': efficiency_summary += f", and collects payments (Receivables Turnover: {receivables_turnover_fmt})."
@@ -1472,7 +1575,7 @@ def generate_financial_efficiency_html(ticker, rdata):
             f"Benchmarking these efficiency metrics with industry peers {get_icon('peer')} and the company's own history {get_icon('history')} provides valuable context.",
             f"Relative performance in these turnover figures, compared to peers {get_icon('peer')} and past results {get_icon('history')}, indicates efficiency levels."
             ]
-        comparison_prompt = random.choice(comparison_prompt_options)
+        comparison_prompt = rng.choice(comparison_prompt_options)
 
 
         # Inventory/Receivables Text Snippets
@@ -1490,7 +1593,7 @@ def generate_financial_efficiency_html(ticker, rdata):
                 f"{inv_text} {rec_text} Better efficiency can lead to higher returns. {comparison_prompt}"
                 )
              ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         elif "radar stocks" in site_name:
             narrative_options = [
                 (
@@ -1502,7 +1605,7 @@ def generate_financial_efficiency_html(ticker, rdata):
                 f"Sudden negative shifts, like slow inventory turnover, can sometimes affect market sentiment and price. {comparison_prompt}"
                 )
             ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         elif "bernini capital" in site_name:
             narrative_options = [
                 (
@@ -1514,7 +1617,7 @@ def generate_financial_efficiency_html(ticker, rdata):
                 f"High turnover generally points to competitive strength and smart capital use. {comparison_prompt} Lagging peers could indicate operational issues."
                 )
             ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         else: # Default
              narrative_options = [
                 (
@@ -1524,7 +1627,7 @@ def generate_financial_efficiency_html(ticker, rdata):
                 f"This section examines {ticker}'s operational efficiency in asset usage and working capital management. {efficiency_summary} {comparison_prompt}"
                 )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
 
         return f'<div class="narrative"><p>{narrative}</p></div>' + content
     except Exception as e:
@@ -1533,6 +1636,7 @@ def generate_financial_efficiency_html(ticker, rdata):
 
 def generate_profitability_growth_html(ticker, rdata):
     """Generates Profitability & Growth section with enhanced narratives and context."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         profit_data = rdata.get('profitability_data')
@@ -1564,14 +1668,14 @@ def generate_profitability_growth_html(ticker, rdata):
             f"Profitability is reflected in margins: Gross ({gross_margin_fmt}), Operating ({op_margin_fmt}), and Net ({net_margin_fmt}).",
             f"Core profitability measures are Gross Margin ({gross_margin_fmt}), Operating Margin ({op_margin_fmt}), and Net Margin ({net_margin_fmt})."
             ]
-        profit_summary = random.choice(profit_summary_options)
+        profit_summary = rng.choice(profit_summary_options)
 
         growth_summary_options = [
              f"Recent expansion is reflected in Year-over-Year Revenue Growth ({rev_growth_fmt}) and Earnings Growth ({earn_growth_fmt}).",
              f"Growth trends are indicated by YoY Revenue ({rev_growth_fmt}) and Earnings ({earn_growth_fmt}) increases.",
              f"The company's recent growth trajectory shows Revenue up {rev_growth_fmt} and Earnings up {earn_growth_fmt} YoY."
             ]
-        growth_summary = random.choice(growth_summary_options)
+        growth_summary = rng.choice(growth_summary_options)
 
 
         comparison_prompt_options = [
@@ -1579,7 +1683,7 @@ def generate_profitability_growth_html(ticker, rdata):
             f"Benchmarking these profit and growth figures against the past {get_icon('history')} and peers {get_icon('peer')} is vital for interpretation.",
             f"Context for these margin and growth numbers comes from comparing them to historical data {get_icon('history')} and industry rivals {get_icon('peer')}."
             ]
-        comparison_prompt = random.choice(comparison_prompt_options)
+        comparison_prompt = rng.choice(comparison_prompt_options)
 
         trend_comments = []
         if margin_trend: trend_comments.append(f"Margin trend appears {str(margin_trend).lower()}.")
@@ -1597,7 +1701,7 @@ def generate_profitability_growth_html(ticker, rdata):
                      f" {get_icon('warning')} Note: Contracting margins could be linked to competitive pressures mentioned in the Risk Factors.",
                      f" {get_icon('warning')} Declining margins might reflect competitive challenges highlighted under Risk Factors."
                      ]
-                 risk_link = random.choice(risk_link_options)
+                 risk_link = rng.choice(risk_link_options)
 
 
         if "finances forecast" in site_name:
@@ -1611,7 +1715,7 @@ def generate_profitability_growth_html(ticker, rdata):
                 f"Healthy margins suggest efficiency, while growth indicates market traction. {trend_context} Maintaining these positive trends is key for forecast achievement. {comparison_prompt}{risk_link}"
                 )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
         elif "radar stocks" in site_name:
              narrative_options = [
                 (
@@ -1623,7 +1727,7 @@ def generate_profitability_growth_html(ticker, rdata):
                 f"Positive earnings surprises can boost momentum; margin misses can cause dips. These act as catalysts alongside technicals. {trend_context} {comparison_prompt}{risk_link}"
                 )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
         elif "bernini capital" in site_name:
              narrative_options = [
                  (
@@ -1635,7 +1739,7 @@ def generate_profitability_growth_html(ticker, rdata):
                  f"{trend_context} Steady margins and consistent earnings growth, particularly versus competitors {get_icon('peer')}, support a positive long-term view.{risk_link}"
                  )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
         else: # Default
              narrative_options = [
                 (
@@ -1645,7 +1749,7 @@ def generate_profitability_growth_html(ticker, rdata):
                 f"Here we look at {ticker}'s profit generation and growth trajectory. {profit_summary} {growth_summary} {trend_context} {comparison_prompt} These metrics reflect financial success and expansion capacity.{risk_link}"
                 )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
 
         return f'<div class="narrative"><p>{narrative}</p></div>' + content
     except Exception as e:
@@ -1654,6 +1758,7 @@ def generate_profitability_growth_html(ticker, rdata):
 
 def generate_dividends_shareholder_returns_html(ticker, rdata):
     """Generates Dividends & Shareholder Returns section with enhanced context and sustainability focus."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         dividend_data = rdata.get('dividends_data')
@@ -1688,26 +1793,26 @@ def generate_dividends_shareholder_returns_html(ticker, rdata):
                 'low': ["low (potential for growth)", "conservative (room for increases)", "low (prioritizing reinvestment?)"],
                 'mid': ["moderate", "reasonable", "sustainable based on current earnings"]
                 }
-            payout_level = random.choice(payout_level_options['mid']) # Default assumption
+            payout_level = rng.choice(payout_level_options['mid']) # Default assumption
             payout_ratio_val = _safe_float(dividend_data.get('Payout Ratio'))
             if payout_ratio_val is not None:
-                 if payout_ratio_val > 80: payout_level = random.choice(payout_level_options['high'])
-                 elif payout_ratio_val < 0: payout_level = random.choice(payout_level_options['neg'])
-                 elif payout_ratio_val < 30: payout_level = random.choice(payout_level_options['low'])
+                 if payout_ratio_val > 80: payout_level = rng.choice(payout_level_options['high'])
+                 elif payout_ratio_val < 0: payout_level = rng.choice(payout_level_options['neg'])
+                 elif payout_ratio_val < 30: payout_level = rng.choice(payout_level_options['low'])
 
             dividend_summary_options = [
                 f"{ticker} currently offers a forward dividend yield of <strong>{fwd_yield_fmt}</strong> (representing {fwd_dividend_fmt} annually per share). The Payout Ratio of {payout_ratio_fmt} suggests the dividend is currently {payout_level}. Last relevant date ({dividend_date_label}): {dividend_date_fmt}.",
                 f"Shareholders receive a dividend yielding <strong>{fwd_yield_fmt}</strong> (equivalent to {fwd_dividend_fmt} per year). With a Payout Ratio of {payout_ratio_fmt}, its coverage appears {payout_level}. Last key date ({dividend_date_label}): {dividend_date_fmt}.",
                 f"The current forward dividend yield is <strong>{fwd_yield_fmt}</strong> ({fwd_dividend_fmt}/year). The payout ratio ({payout_ratio_fmt}) indicates {payout_level} coverage. Most recent event date ({dividend_date_label}) was {dividend_date_fmt}."
             ]
-            dividend_summary = random.choice(dividend_summary_options)
+            dividend_summary = rng.choice(dividend_summary_options)
         else:
             dividend_summary_options = [
                 f"{ticker} does not currently pay a significant regular dividend or data is unavailable.",
                 f"No substantial regular dividend payment is indicated for {ticker} based on available data.",
                 f"Regular dividend distributions do not appear to be a current practice for {ticker}."
             ]
-            dividend_summary = random.choice(dividend_summary_options)
+            dividend_summary = rng.choice(dividend_summary_options)
 
         buyback_summary = ""
         buyback_yield_val = _safe_float(dividend_data.get('Buyback Yield (Est.)'))
@@ -1730,9 +1835,9 @@ def generate_dividends_shareholder_returns_html(ticker, rdata):
                      f" Capital is also returned via buybacks, evidenced by a falling share count (refer to Share Statistics)."
                     ])
             if buyback_summary_options: # Ensure we have options before choosing
-                 buyback_summary = random.choice(buyback_summary_options)
+                 buyback_summary = rng.choice(buyback_summary_options)
         else:
-             buyback_summary = random.choice([
+             buyback_summary = rng.choice([
                  " Significant share repurchases are not indicated by available data.",
                  " Share buybacks do not appear to be a major component of current capital returns.",
                  " Focus seems to be primarily on dividends (if any) rather than buybacks."
@@ -1750,7 +1855,7 @@ def generate_dividends_shareholder_returns_html(ticker, rdata):
                 f"Dividend safety ({payout_ratio_fmt} Payout Ratio) and buyback potential rely on future financial performance (view Financial Health), affecting forecast achievement."
                 )
             ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         elif "radar stocks" in site_name:
             narrative_options = [
                 (
@@ -1762,7 +1867,7 @@ def generate_dividends_shareholder_returns_html(ticker, rdata):
                 f"An excessive Payout Ratio ({payout_ratio_fmt}) might hint at risk if fundamentals weaken, affecting sentiment. {buyback_summary}"
                 )
             ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         elif "bernini capital" in site_name:
             narrative_options = [
                 (
@@ -1772,7 +1877,7 @@ def generate_dividends_shareholder_returns_html(ticker, rdata):
                 f"Evaluating shareholder returns is key for income investors. {dividend_summary} Yield, safety (Payout Ratio: {payout_ratio_fmt}), and growth history {get_icon('history')} are important dividend aspects. {buyback_summary} The combination of dividends and buybacks constitutes the total yield."
                 )
             ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         else: # Default
              narrative_options = [
                  (
@@ -1782,7 +1887,7 @@ def generate_dividends_shareholder_returns_html(ticker, rdata):
                  f"Here we examine {ticker}'s capital return policy via dividends and share repurchases. {dividend_summary}{buyback_summary}"
                  )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
 
         return f'<div class="narrative"><p>{narrative}</p></div>' + content
     except Exception as e:
@@ -1790,6 +1895,7 @@ def generate_dividends_shareholder_returns_html(ticker, rdata):
 
 def generate_share_statistics_html(ticker, rdata):
     """Generates Share Statistics with enhanced site-specific narrative focus and ownership insights."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         share_data = rdata.get('share_statistics_data')
@@ -1825,8 +1931,8 @@ def generate_share_statistics_html(ticker, rdata):
             }
 
         if insider_val is not None:
-            insider_level = random.choice(insider_options['high']) if insider_val > 10 else random.choice(insider_options['mid']) if insider_val > 2 else random.choice(insider_options['low'])
-            ownership_implication += f"The {insider_level} insider ownership ({insider_own_fmt}) {random.choice(insider_alignment_options[insider_level if insider_val > 10 else ('mid' if insider_val > 2 else 'low')])}"
+            insider_level = rng.choice(insider_options['high']) if insider_val > 10 else rng.choice(insider_options['mid']) if insider_val > 2 else rng.choice(insider_options['low'])
+            ownership_implication += f"The {insider_level} insider ownership ({insider_own_fmt}) {rng.choice(insider_alignment_options[insider_level if insider_val > 10 else ('mid' if insider_val > 2 else 'low')])}"
 
         inst_options = {
              'high': ["very high", "dominant", "substantial"],
@@ -1840,10 +1946,10 @@ def generate_share_statistics_html(ticker, rdata):
             }
 
         if inst_val is not None:
-            inst_level = random.choice(inst_options['high']) if inst_val > 75 else random.choice(inst_options['mid']) if inst_val > 50 else random.choice(inst_options['low'])
+            inst_level = rng.choice(inst_options['high']) if inst_val > 75 else rng.choice(inst_options['mid']) if inst_val > 50 else rng.choice(inst_options['low'])
             # Added space if insider text exists
             if ownership_implication: ownership_implication += " "
-            ownership_implication += f"Institutional ownership stands at a {inst_level} level ({inst_own_fmt}), {random.choice(inst_conviction_options[inst_level if inst_val > 75 else ('mid' if inst_val > 50 else 'low')])}"
+            ownership_implication += f"Institutional ownership stands at a {inst_level} level ({inst_own_fmt}), {rng.choice(inst_conviction_options[inst_level if inst_val > 75 else ('mid' if inst_val > 50 else 'low')])}"
 
         # Float Context
         float_context_options = [
@@ -1851,7 +1957,7 @@ def generate_share_statistics_html(ticker, rdata):
             f"With <strong>{float_shares}</strong> shares floating (vs. {shares_outstanding} total), this portion is actively traded, affecting liquidity and susceptibility to large order impacts.",
             f"Trading liquidity is influenced by the <strong>{float_shares}</strong> shares in the public float (compared to {shares_outstanding} total outstanding), which impacts how easily large blocks can be traded."
             ]
-        float_context = random.choice(float_context_options)
+        float_context = rng.choice(float_context_options)
 
         # Shares Change Context
         shares_change_context = ""
@@ -1864,7 +1970,7 @@ def generate_share_statistics_html(ticker, rdata):
                  f"The {shares_change_yoy_fmt} YoY change in share count ({change_desc}) has implications for EPS ({change_impact}) and needs consideration in forecasts.",
                  f"Variations in share count ({shares_change_yoy_fmt} YoY) affect per-share calculations and future estimates, whether through {change_desc}."
                 ]
-            shares_change_context = random.choice(shares_change_context_options)
+            shares_change_context = rng.choice(shares_change_context_options)
 
 
         if "finances forecast" in site_name:
@@ -1878,7 +1984,7 @@ def generate_share_statistics_html(ticker, rdata):
                 f"{shares_change_context}"
                 )
              ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         elif "radar stocks" in site_name:
             narrative_options = [
                 (
@@ -1890,7 +1996,7 @@ def generate_share_statistics_html(ticker, rdata):
                  f"Heavy institutional presence can reduce volatility; insider activity (check external sources) provides sentiment clues. Short interest ({shares_short_fmt}) contributes to volatility potential (view Short Selling info)."
                 )
             ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         elif "bernini capital" in site_name:
             # Determine buyback info string outside the f-string
             buyback_info = "N/A" # Default
@@ -1907,7 +2013,7 @@ def generate_share_statistics_html(ticker, rdata):
                 f"Long-term investors typically prefer high insider/institutional presence. Buybacks resulting in share reduction ({buyback_info}) boost per-share metrics."
                 )
              ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         else: # Default
              narrative_options = [
                  (
@@ -1919,7 +2025,7 @@ def generate_share_statistics_html(ticker, rdata):
                  f"Tracking share count ({shares_change_yoy_fmt}) and ownership shifts provides insight into corporate actions and market sentiment."
                  )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
 
         return f'<div class="narrative"><p>{narrative}</p></div>' + content
     except Exception as e:
@@ -1928,6 +2034,7 @@ def generate_share_statistics_html(ticker, rdata):
 
 def generate_stock_price_statistics_html(ticker, rdata):
     """Generates Stock Price Statistics section with enhanced narrative and volatility context."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         stats_data = rdata.get('stock_price_stats_data')
@@ -1962,7 +2069,7 @@ def generate_stock_price_statistics_html(ticker, rdata):
             f"Price characteristics are summarized by Beta ({beta_fmt}), the annual range ({fifty_two_wk_low_fmt} to {fifty_two_wk_high_fmt}), recent volatility ({volatility_fmt}), and typical volume ({avg_vol_3m_fmt} avg over 3m).",
             f"Understanding price action involves Beta ({beta_fmt}), the 52-week span ({fifty_two_wk_low_fmt} - {fifty_two_wk_high_fmt}), current volatility ({volatility_fmt}), and trading volume (3m Avg: {avg_vol_3m_fmt})."
             ]
-        stats_summary = random.choice(stats_summary_options)
+        stats_summary = rng.choice(stats_summary_options)
 
 
         # Volatility Interpretation
@@ -1992,7 +2099,7 @@ def generate_stock_price_statistics_html(ticker, rdata):
                 f"The annual trading range ({fifty_two_wk_low_fmt} - {fifty_two_wk_high_fmt}) defines historical price boundaries. This volatility profile is relevant for forecast modeling."
                 )
              ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         elif "radar stocks" in site_name:
             narrative_options = [
                 (
@@ -2004,7 +2111,7 @@ def generate_stock_price_statistics_html(ticker, rdata):
                 f"Yearly highs/lows ({fifty_two_wk_high_fmt}, {fifty_two_wk_low_fmt}) are key psychological levels. Good volume ({avg_vol_3m_fmt}) facilitates easier trading."
                 )
             ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         elif "bernini capital" in site_name:
              narrative_options = [
                 (
@@ -2016,7 +2123,7 @@ def generate_stock_price_statistics_html(ticker, rdata):
                 f"The annual range ({fifty_two_wk_low_fmt} - {fifty_two_wk_high_fmt}) shows historical extremes, useful for judging current price levels against past sentiment."
                 )
             ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
         else: # Default
              narrative_options = [
                  (
@@ -2026,7 +2133,7 @@ def generate_stock_price_statistics_html(ticker, rdata):
                  f"Here we detail {ticker}'s price behavior: market sensitivity, historical range, recent volatility, and volume. {stats_summary} {beta_interp} {vol_interp}"
                  )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
 
         return f'<div class="narrative"><p>{narrative}</p></div>' + content
     except Exception as e:
@@ -2035,6 +2142,7 @@ def generate_stock_price_statistics_html(ticker, rdata):
 
 def generate_short_selling_info_html(ticker, rdata):
     """Generates Short Selling Info section with enhanced narrative on sentiment and squeeze potential."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         short_data = rdata.get('short_selling_data')
@@ -2064,7 +2172,7 @@ def generate_short_selling_info_html(ticker, rdata):
             f"Short selling activity is measured by Short % of Float ({short_percent_float_fmt}) and Days to Cover ({short_ratio_fmt}).",
             f"Relevant short data includes Short % of Float ({short_percent_float_fmt}) and the Short Ratio ({short_ratio_fmt})."
             ]
-        short_summary = random.choice(short_summary_options)
+        short_summary = rng.choice(short_summary_options)
 
         level_interp_options = {'high': ["very high", "extremely high", "significant"], 'mid_high':["high", "elevated", "notable"], 'mid_low':["moderate", "medium", "reasonable"], 'low':["low", "minimal", "limited"]}
         sentiment_interp_options = {'high': ["significant bearish sentiment", "strong negative bets", "widespread bearish positioning"], 'mid_high': ["notable bearish sentiment", "meaningful negative speculation", "considerable short interest"], 'mid_low': ["moderate bearish sentiment", "some negative expectations", "a degree of short positioning"], 'low': ["low bearish sentiment", "minimal shorting activity", "little negative pressure from shorts"]}
@@ -2074,13 +2182,13 @@ def generate_short_selling_info_html(ticker, rdata):
         spf_val = _safe_float(short_data.get('Short % of Float'))
         if spf_val is not None:
             if spf_val > 20:
-                level_interp = random.choice(level_interp_options['high']); sentiment_implication = random.choice(sentiment_interp_options['high']); squeeze_potential = random.choice(squeeze_interp_options['high'])
+                level_interp = rng.choice(level_interp_options['high']); sentiment_implication = rng.choice(sentiment_interp_options['high']); squeeze_potential = rng.choice(squeeze_interp_options['high'])
             elif spf_val > 10:
-                level_interp = random.choice(level_interp_options['mid_high']); sentiment_implication = random.choice(sentiment_interp_options['mid_high']); squeeze_potential = random.choice(squeeze_interp_options['mid_high'])
+                level_interp = rng.choice(level_interp_options['mid_high']); sentiment_implication = rng.choice(sentiment_interp_options['mid_high']); squeeze_potential = rng.choice(squeeze_interp_options['mid_high'])
             elif spf_val > 5:
-                level_interp = random.choice(level_interp_options['mid_low']); sentiment_implication = random.choice(sentiment_interp_options['mid_low']); squeeze_potential = random.choice(squeeze_interp_options['mid_low'])
+                level_interp = rng.choice(level_interp_options['mid_low']); sentiment_implication = rng.choice(sentiment_interp_options['mid_low']); squeeze_potential = rng.choice(squeeze_interp_options['mid_low'])
             else:
-                level_interp = random.choice(level_interp_options['low']); sentiment_implication = random.choice(sentiment_interp_options['low']); squeeze_potential = random.choice(squeeze_interp_options['low'])
+                level_interp = rng.choice(level_interp_options['low']); sentiment_implication = rng.choice(sentiment_interp_options['low']); squeeze_potential = rng.choice(squeeze_interp_options['low'])
 
 
         short_ratio_interp = ""
@@ -2092,14 +2200,14 @@ def generate_short_selling_info_html(ticker, rdata):
                     f"With {short_ratio_fmt} Days to Cover, shorts face a lengthy exit, potentially fueling a stronger squeeze.",
                     f"A high Short Ratio ({short_ratio_fmt}) suggests covering would take many days, increasing squeeze risk/potential."
                  ]
-                 short_ratio_interp = random.choice(short_ratio_interp_options)
+                 short_ratio_interp = rng.choice(short_ratio_interp_options)
              elif sr_val > 5:
                  short_ratio_interp_options = [
                     f"The moderate Days to Cover ({short_ratio_fmt}) suggests a reasonable time needed for shorts to exit, contributing to {squeeze_potential} squeeze potential.",
                     f"{short_ratio_fmt} Days to Cover indicates shorts need some time to cover, supporting {squeeze_potential} squeeze possibilities.",
                     f"A medium Short Ratio ({short_ratio_fmt}) implies covering takes multiple days, adding to the {squeeze_potential} squeeze outlook."
                  ]
-                 short_ratio_interp = random.choice(short_ratio_interp_options)
+                 short_ratio_interp = rng.choice(short_ratio_interp_options)
 
              else:
                  short_ratio_interp_options = [
@@ -2107,7 +2215,7 @@ def generate_short_selling_info_html(ticker, rdata):
                     f"With only {short_ratio_fmt} Days to Cover, shorts can exit rapidly, possibly capping squeeze momentum.",
                     f"A low Short Ratio ({short_ratio_fmt}) means covering is fast, which might reduce the impact of any squeeze."
                  ]
-                 short_ratio_interp = random.choice(short_ratio_interp_options)
+                 short_ratio_interp = rng.choice(short_ratio_interp_options)
 
 
         if "finances forecast" in site_name:
@@ -2121,7 +2229,7 @@ def generate_short_selling_info_html(ticker, rdata):
                  f"{short_ratio_interp} High short interest creates resistance but also fuels potential squeezes if the outlook improves, possibly speeding up price gains."
                 )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
         elif "radar stocks" in site_name:
              narrative_options = [
                 (
@@ -2133,7 +2241,7 @@ def generate_short_selling_info_html(ticker, rdata):
                  f"{short_ratio_interp} Changes in short levels ({shares_short_fmt} shares) can signal sentiment shifts or volatility triggers. A technical breakout on high short interest is a classic squeeze setup."
                 )
             ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
         elif "bernini capital" in site_name:
             narrative_options = [
                 (
@@ -2145,7 +2253,7 @@ def generate_short_selling_info_html(ticker, rdata):
                  f"It's important to understand *why* shorts are present - are there fundamental concerns or just valuation disagreements? {short_ratio_interp} Ongoing high short interest could signal underlying issues needing investigation."
                 )
             ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         else: # Default
              narrative_options = [
                  (
@@ -2157,7 +2265,7 @@ def generate_short_selling_info_html(ticker, rdata):
                  f"This indicates {sentiment_implication} and carries {squeeze_potential} potential for a short squeeze. {short_ratio_interp}"
                  )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
 
         return f'<div class="narrative"><p>{narrative}</p></div>' + content
     except Exception as e:
@@ -2214,6 +2322,7 @@ def generate_analyst_grid_html(analyst_data):
 
 def generate_analyst_insights_html(ticker, rdata):
     """Generates Analyst Insights with enhanced narrative focus and potential calculation."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         analyst_data = rdata.get('analyst_info_data')
@@ -2247,7 +2356,7 @@ def generate_analyst_insights_html(ticker, rdata):
                 f" The average target ({mean_target_fmt}) suggests roughly <strong>{mean_potential_fmt} potential {potential_direction}</strong> compared to the current price ({current_price_fmt}).",
                 f" Relative to the current price ({current_price_fmt}), the mean analyst target ({mean_target_fmt}) points to approximately <strong>{mean_potential_fmt} {potential_direction}</strong>."
              ]
-             potential_summary = random.choice(potential_summary_options)
+             potential_summary = rng.choice(potential_summary_options)
 
 
         # --- Enhanced Narrative ---
@@ -2257,7 +2366,7 @@ def generate_analyst_insights_html(ticker, rdata):
              f"{num_analysts_fmt} analyst(s) contributed to this consensus view." if num_analysts_fmt != 'N/A' else "The analyst count for this consensus is not available.",
              f"Data reflects input from {num_analysts_fmt} analyst(s)." if num_analysts_fmt != 'N/A' else "Analyst participation count is unknown."
             ]
-        analyst_count_context = random.choice(analyst_count_context_options)
+        analyst_count_context = rng.choice(analyst_count_context_options)
 
 
         if "finances forecast" in site_name:
@@ -2271,7 +2380,7 @@ def generate_analyst_insights_html(ticker, rdata):
                  f"Their average target is {mean_target_fmt} (range: {target_range_fmt}).{potential_summary} Changes in ratings or targets can act as market movers, potentially validating or contradicting forecasts."
                 )
              ]
-            narrative = random.choice(narrative_options)
+            narrative = rng.choice(narrative_options)
         elif "radar stocks" in site_name:
              narrative_options = [
                 (
@@ -2283,7 +2392,7 @@ def generate_analyst_insights_html(ticker, rdata):
                  f"Targets (Avg: {mean_target_fmt}, Range: {target_range_fmt}) can influence trading algorithms and sentiment.{potential_summary} Upgrades, downgrades, or target changes frequently spark price volatility."
                 )
             ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
         elif "bernini capital" in site_name:
              narrative_options = [
                 (
@@ -2295,7 +2404,7 @@ def generate_analyst_insights_html(ticker, rdata):
                  f"Value investors must compare these targets against their own intrinsic value estimates and required safety margin. Understanding the analysts' reasoning is beneficial."
                 )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
         else: # Default
              narrative_options = [
                 (
@@ -2307,7 +2416,7 @@ def generate_analyst_insights_html(ticker, rdata):
                  f"Targets average {mean_target_fmt} (within a range of {target_range_fmt}).{potential_summary} This reflects overall analyst sentiment on the stock's outlook."
                  )
              ]
-             narrative = random.choice(narrative_options)
+             narrative = rng.choice(narrative_options)
 
         return f'<div class="narrative"><p>{narrative}</p></div>' + grid_html
     except Exception as e:
@@ -2316,6 +2425,7 @@ def generate_analyst_insights_html(ticker, rdata):
 
 def generate_technical_analysis_summary_html(ticker, rdata):
     """Generates the TECHNICAL ANALYSIS summary section (Enhanced with interpretations)."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         sentiment = rdata.get('sentiment', 'Neutral')
@@ -2360,36 +2470,36 @@ def generate_technical_analysis_summary_html(ticker, rdata):
         price_fmt = format_html_value(current_price, 'currency')
 
         # 1. Trend Analysis (Price vs MAs) - Using random choice for phrasing
-        trend_desc = random.choice(["Mixed Trend Signals.", "Unclear Trend Direction.", "Conflicting Trend Indicators."])
-        trend_implication = random.choice([
+        trend_desc = rng.choice(["Mixed Trend Signals.", "Unclear Trend Direction.", "Conflicting Trend Indicators."])
+        trend_implication = rng.choice([
             "suggesting conflicting short-term and long-term momentum requiring careful monitoring.",
             "indicating a battle between short-term and long-term forces.",
             "pointing to indecision in the trend across different timeframes."
             ])
         if sma50_pos == 'Above' and sma200_pos == 'Above':
-            trend_desc = random.choice(["Bullish Trend Confirmation", "Positive Trend Alignment", "Uptrend Intact"])
-            trend_implication = random.choice([
+            trend_desc = rng.choice(["Bullish Trend Confirmation", "Positive Trend Alignment", "Uptrend Intact"])
+            trend_implication = rng.choice([
                 f"as price ({price_fmt}) holds above both the key 50-day and 200-day SMAs, indicating positive momentum across timeframes.",
                 f"with price ({price_fmt}) over the crucial 50d and 200d averages, signaling broad positive momentum.",
                 f"since the price ({price_fmt}) remains above both primary SMAs, confirming bullish sentiment."
             ])
         elif sma50_pos == 'Below' and sma200_pos == 'Below':
-            trend_desc = random.choice(["Bearish Trend Confirmation", "Negative Trend Alignment", "Downtrend Intact"])
-            trend_implication = random.choice([
+            trend_desc = rng.choice(["Bearish Trend Confirmation", "Negative Trend Alignment", "Downtrend Intact"])
+            trend_implication = rng.choice([
                 f"with price ({price_fmt}) below both the 50-day and 200-day SMAs, signaling prevailing weakness.",
                 f"as the price ({price_fmt}) trades under the key 50d and 200d averages, indicating bearish control.",
                 f"since the price ({price_fmt}) is beneath both major SMAs, confirming negative momentum."
             ])
         elif sma50_pos == 'Above' and sma200_pos == 'Below':
-             trend_desc = random.choice(["Potential Trend Reversal / Short-term Strength", "Possible Bottoming / Near-term Upside", "Short-term Bullish vs Long-term Bearish"])
-             trend_implication = random.choice([
+             trend_desc = rng.choice(["Potential Trend Reversal / Short-term Strength", "Possible Bottoming / Near-term Upside", "Short-term Bullish vs Long-term Bearish"])
+             trend_implication = rng.choice([
                  f"showing price ({price_fmt}) above the 50-day SMA but still below the 200-day SMA, possibly indicating early signs of a turnaround or a rally within a longer downtrend.",
                  f"with price ({price_fmt}) over the 50d but under the 200d average, suggesting a potential shift or temporary strength against the main trend.",
                  f"as the price ({price_fmt}) crosses the 50d SMA but faces resistance near the 200d, hinting at a possible reversal attempt."
              ])
         elif sma50_pos == 'Below' and sma200_pos == 'Above':
-             trend_desc = random.choice(["Potential Pullback / Short-term Weakness", "Possible Consolidation in Uptrend", "Short-term Bearish vs Long-term Bullish"])
-             trend_implication = random.choice([
+             trend_desc = rng.choice(["Potential Pullback / Short-term Weakness", "Possible Consolidation in Uptrend", "Short-term Bearish vs Long-term Bullish"])
+             trend_implication = rng.choice([
                  f"as price ({price_fmt}) dips below the 50-day SMA while remaining above the 200-day SMA, suggesting a possible consolidation or pullback within a longer uptrend.",
                  f"with price ({price_fmt}) under the 50d but over the 200d average, indicating a potential pause or dip within the primary uptrend.",
                  f"since the price ({price_fmt}) breaks the 50d SMA support but holds above the 200d, pointing to short-term weakness in a longer bull phase."
@@ -2399,23 +2509,23 @@ def generate_technical_analysis_summary_html(ticker, rdata):
         # 2. Momentum (RSI) + Divergence Check
         rsi_text = "Momentum (RSI): Data N/A."
         if latest_rsi is not None:
-            rsi_level = random.choice(["Neutral", "Balanced", "Inconclusive"])
+            rsi_level = rng.choice(["Neutral", "Balanced", "Inconclusive"])
             rsi_icon = get_icon('neutral')
-            rsi_implication = random.choice([
+            rsi_implication = rng.choice([
                 "indicating balanced momentum with no immediate overbought/oversold pressure.",
                 "suggesting neither excessive buying nor selling force currently.",
                 "showing momentum is not at an extreme, offering few immediate reversal signals."
                 ])
             if latest_rsi > 70:
-                rsi_level = random.choice(["Overbought", "Extended", "Stretched"]); rsi_icon = get_icon('warning')
-                rsi_implication = random.choice([
+                rsi_level = rng.choice(["Overbought", "Extended", "Stretched"]); rsi_icon = get_icon('warning')
+                rsi_implication = rng.choice([
                     f"suggesting the rally might be overextended and vulnerable to a pullback.",
                     f"indicating buying pressure may be excessive, raising pullback risks.",
                     f"warning that the recent gains could be unsustainable short-term."
                     ])
             elif latest_rsi < 30:
-                rsi_level = random.choice(["Oversold", "Depressed", "Washed Out"]); rsi_icon = get_icon('positive')
-                rsi_implication = random.choice([
+                rsi_level = rng.choice(["Oversold", "Depressed", "Washed Out"]); rsi_icon = get_icon('positive')
+                rsi_implication = rng.choice([
                     f"potentially indicating the sell-off is exhausted and ripe for a rebound.",
                     f"suggesting selling pressure might be depleted, hinting at a possible bounce.",
                     f"potentially signaling that the downside is overdone, setting up for a recovery."
@@ -2438,39 +2548,39 @@ def generate_technical_analysis_summary_html(ticker, rdata):
              sig_fmt = format_html_value(macd_signal, precision=3)
 
              if macd_line > macd_signal:
-                 macd_pos_desc = random.choice([
+                 macd_pos_desc = rng.choice([
                      f"Line ({line_fmt}) above Signal ({sig_fmt}) (Bullish Crossover)",
                      f"Bullish Stance (Line: {line_fmt} > Signal: {sig_fmt})",
                      f"Positive MACD (Line above Signal: {line_fmt} vs {sig_fmt})"
                      ])
                  macd_icon = get_icon('up')
                  if macd_hist > 0:
-                     macd_implication = random.choice([
+                     macd_implication = rng.choice([
                          "with positive Histogram, confirming strengthening bullish momentum.",
                          "and positive Histogram reinforces the upward momentum.",
                          "supported by a positive Histogram, signaling growing bullish strength."
                          ])
                  else:
-                     macd_implication = random.choice([
+                     macd_implication = rng.choice([
                          "though Histogram is negative, suggesting weakening bullish momentum or potential bearish crossover soon.",
                          "but negative Histogram hints bullish strength may be fading or a reversal looms.",
                          "yet negative Histogram warns the bullish signal might weaken or reverse shortly."
                          ])
              else:
-                 macd_pos_desc = random.choice([
+                 macd_pos_desc = rng.choice([
                      f"Line ({line_fmt}) below Signal ({sig_fmt}) (Bearish Crossover)",
                      f"Bearish Stance (Line: {line_fmt} < Signal: {sig_fmt})",
                      f"Negative MACD (Line below Signal: {line_fmt} vs {sig_fmt})"
                      ])
                  macd_icon = get_icon('down')
                  if macd_hist < 0:
-                     macd_implication = random.choice([
+                     macd_implication = rng.choice([
                          "with negative Histogram, confirming strengthening bearish momentum.",
                          "and negative Histogram reinforces the downward momentum.",
                          "supported by a negative Histogram, signaling growing bearish strength."
                          ])
                  else:
-                     macd_implication = random.choice([
+                     macd_implication = rng.choice([
                          "though Histogram is positive, suggesting weakening bearish momentum or potential bullish crossover soon.",
                          "but positive Histogram hints bearish strength may be fading or a reversal looms.",
                          "yet positive Histogram warns the bearish signal might weaken or reverse shortly."
@@ -2481,48 +2591,48 @@ def generate_technical_analysis_summary_html(ticker, rdata):
         # 4. Volatility (Bollinger Bands)
         bb_text = "Volatility (BBands): Data N/A."
         if price_f is not None and bb_lower is not None and bb_upper is not None:
-             bb_pos = random.choice(["within Bands", "inside the Bands", "between the Bands"])
+             bb_pos = rng.choice(["within Bands", "inside the Bands", "between the Bands"])
              bb_icon = get_icon('neutral')
-             bb_implication = random.choice([
+             bb_implication = rng.choice([
                  "currently operating within its typical volatility range.",
                  "suggesting price is within its recent statistical boundaries.",
                  "indicating normal volatility conditions prevail."
                  ])
-             bb_action = random.choice([
+             bb_action = rng.choice([
                  "Monitor for potential breakouts or reversions towards the mean.",
                  "Watch for moves towards the band edges or potential mean reversion.",
                  "Keep an eye on potential breakouts or pullbacks to the middle band."
                  ])
              if price_f > bb_upper:
-                 bb_pos = random.choice([
+                 bb_pos = rng.choice([
                      f"above Upper Band ({format_html_value(bb_upper, 'currency')})",
                      f"piercing the Upper Band ({format_html_value(bb_upper, 'currency')})",
                      f"outside the Upper Band ({format_html_value(bb_upper, 'currency')})"
                      ])
                  bb_icon = get_icon('warning')
-                 bb_implication = random.choice([
+                 bb_implication = rng.choice([
                      "signaling high volatility and a potential short-term overbought condition.",
                      "indicating a volatility spike and possible temporary overextension.",
                      "suggesting increased volatility and raising chances of a near-term pullback."
                      ])
-                 bb_action = random.choice([
+                 bb_action = rng.choice([
                      "Watch for potential pullback or consolidation.",
                      "Monitor for signs of reversal or sideways movement.",
                      "Look for confirmation signals before assuming trend continuation."
                      ])
              elif price_f < bb_lower:
-                 bb_pos = random.choice([
+                 bb_pos = rng.choice([
                      f"below Lower Band ({format_html_value(bb_lower, 'currency')})",
                      f"piercing the Lower Band ({format_html_value(bb_lower, 'currency')})",
                      f"outside the Lower Band ({format_html_value(bb_lower, 'currency')})"
                      ])
                  bb_icon = get_icon('positive')
-                 bb_implication = random.choice([
+                 bb_implication = rng.choice([
                      "indicating high volatility and a potential short-term oversold state.",
                      "signaling a volatility surge and possible temporary overselling.",
                      "suggesting increased volatility and raising chances of a near-term rebound."
                      ])
-                 bb_action = random.choice([
+                 bb_action = rng.choice([
                      "Look for signs of potential rebound or stabilization.",
                      "Monitor for reversal patterns or consolidation near the lows.",
                      "Watch for confirmation signals indicating a potential bottom."
@@ -2539,7 +2649,7 @@ def generate_technical_analysis_summary_html(ticker, rdata):
                 f"Immediate support is estimated near <strong>{support_fmt}</strong>, with resistance around <strong>{resistance_fmt}</strong>. Behavior at these 30-day levels is critical for near-term direction.",
                 f"Potential near-term floor seen at <strong>{support_fmt}</strong>, ceiling near <strong>{resistance_fmt}</strong>. Reactions to these support/resistance levels are key technical events."
                 ]
-            sr_text = f"<strong>Support/Resistance (30d):</strong> {random.choice(sr_options)}"
+            sr_text = f"<strong>Support/Resistance (30d):</strong> {rng.choice(sr_options)}"
         summary_points.append(sr_text)
 
         # --- Assemble HTML ---
@@ -2567,9 +2677,9 @@ def generate_technical_analysis_summary_html(ticker, rdata):
                 f"This technical overview for {ticker} (as of {last_date_fmt}) covers essential trend, momentum, and volatility indicators. Charts offer more detail, but this summarizes the key signals."
                 ]
             }
-        narrative_intro = random.choice(narrative_intro_options.get(site_name, narrative_intro_options['default']))
+        narrative_intro = rng.choice(narrative_intro_options.get(site_name, narrative_intro_options['default']))
 
-        disclaimer_tech = random.choice([
+        disclaimer_tech = rng.choice([
             "Technical analysis uses past price and volume data to identify potential future trends but offers no guarantees. Combine with fundamental analysis and risk management.",
             "Remember, technical analysis looks at past data to find potential patterns; it doesn't predict the future with certainty. Always use it alongside fundamentals and risk control.",
             "Technical signals are based on historical data and aren't foolproof predictors. Integrate technical views with fundamental research and sound risk management."
@@ -2599,6 +2709,7 @@ def generate_technical_analysis_summary_html(ticker, rdata):
 
 def generate_recent_news_html(ticker, rdata):
     """Generates the Recent News section."""
+    rng = _get_rng(rdata)
     # NOTE: This function was commented out in wordpress_reporter.py
     # It depends on 'news_list' being populated in rdata, which currently doesn't happen.
     # You would need to uncomment the line `rdata['news_list'] = fa.extract_news(fundamentals)`
@@ -2638,7 +2749,7 @@ def generate_recent_news_html(ticker, rdata):
             f"Recent headlines related to {ticker} can offer insights into current events and sentiment.",
             f"Below are some recent news items concerning {ticker}."
         ]
-        narrative = random.choice(narrative_options)
+        narrative = rng.choice(narrative_options)
 
         return f'<div class="narrative"><p>{narrative}</p></div><div class="news-container">{items_html}</div>'
 
@@ -2648,6 +2759,7 @@ def generate_recent_news_html(ticker, rdata):
 
 def generate_faq_html(ticker, rdata):
     """Generates the FAQ section with enhanced, nuanced, and site-specific answers."""
+    rng = _get_rng(rdata)
     try:
         site_name = rdata.get('site_name', '').lower()
         # --- Gather data safely ---
@@ -2679,11 +2791,11 @@ def generate_faq_html(ticker, rdata):
             'down_mod': ["decrease moderately", "see modest losses", "trend gently lower"],
             'flat': ["remain relatively stable", "trade sideways", "show minimal change"]
         }
-        if overall_pct_change > 10: up_down_neutral = random.choice(up_down_neutral_options['up_strong'])
-        elif overall_pct_change > 1: up_down_neutral = random.choice(up_down_neutral_options['up_mod'])
-        elif overall_pct_change < -10: up_down_neutral = random.choice(up_down_neutral_options['down_strong'])
-        elif overall_pct_change < -1: up_down_neutral = random.choice(up_down_neutral_options['down_mod'])
-        else: up_down_neutral = random.choice(up_down_neutral_options['flat'])
+        if overall_pct_change > 10: up_down_neutral = rng.choice(up_down_neutral_options['up_strong'])
+        elif overall_pct_change > 1: up_down_neutral = rng.choice(up_down_neutral_options['up_mod'])
+        elif overall_pct_change < -10: up_down_neutral = rng.choice(up_down_neutral_options['down_strong'])
+        elif overall_pct_change < -1: up_down_neutral = rng.choice(up_down_neutral_options['down_mod'])
+        else: up_down_neutral = rng.choice(up_down_neutral_options['flat'])
 
         # Determine risk mention
         risk_count = 0
@@ -2695,7 +2807,7 @@ def generate_faq_html(ticker, rdata):
              f"Be aware that {risk_count} specific risks for {ticker} were highlighted (view Risk Factors)." if risk_count > 0 else "Remember that general market risks are always present.",
              f"It's important to consider the {risk_count} unique risks mentioned for {ticker} (check Risk Factors)." if risk_count > 0 else "Factor in the usual market and industry risks."
         ]
-        risk_mention = random.choice(risk_mention_options)
+        risk_mention = rng.choice(risk_mention_options)
 
         # --- Q1: Forecast ---
         q1_ans_options = [
@@ -2703,7 +2815,7 @@ def generate_faq_html(ticker, rdata):
             f"Our models currently project an average 1-year target price of ≈<strong>{forecast_1y_fmt}</strong> for {ticker}, suggesting a potential {overall_pct_change:+.1f}% move from {current_price_fmt}. Keep in mind that forecasts are probabilistic and subject to change.",
             f"The 1-year forecast average for {ticker} stands at ≈<strong>{forecast_1y_fmt}</strong>, implying a {overall_pct_change:+.1f}% potential change relative to the current {current_price_fmt}. This is an estimate; real-world factors will influence the actual price."
         ]
-        faq_items.append((f"What is the {ticker} stock price prediction for the next year (2025-2026)?", random.choice(q1_ans_options)))
+        faq_items.append((f"What is the {ticker} stock price prediction for the next year (2025-2026)?", rng.choice(q1_ans_options)))
 
         # --- Q2: Rise/Fall ---
         sentiment_str = str(sentiment)
@@ -2712,28 +2824,28 @@ def generate_faq_html(ticker, rdata):
             f"While the long-term model anticipates the price could <strong>{up_down_neutral}</strong> ({overall_pct_change:+.1f}% potential), the immediate path is less clear. Market sentiment ('{sentiment_str}'), news events, and economic shifts play a major role. Check the Technical Analysis section for short-term signals.",
             f"Models indicate a potential to <strong>{up_down_neutral}</strong> over the next year ({overall_pct_change:+.1f}% average). But short-term moves are unpredictable, driven by sentiment ('{sentiment_str}'), news flow, and economic factors. Technicals (view TA Summary) offer hints for the near term."
         ]
-        faq_items.append((f"Will {ticker} stock go up or down?", random.choice(q2_ans_options)))
+        faq_items.append((f"Will {ticker} stock go up or down?", rng.choice(q2_ans_options)))
 
         # --- Q3: Good Buy? (Enhanced Site Variations) ---
         q3_ans = ""; rsi_condition = ""; rsi_level = "neutral"; rsi_suggestion = ""
         if latest_rsi is not None:
              rsi_level_text = f"RSI: {latest_rsi:.1f}"
-             if latest_rsi < 30: rsi_level = "oversold"; rsi_suggestion = random.choice(["potentially indicating a rebound opportunity", "suggesting it might be due for a bounce", "hinting the sell-off might be overdone"])
-             elif latest_rsi > 70: rsi_level = "overbought"; rsi_suggestion = random.choice(["suggesting caution or potential for a pullback", "indicating it might be extended", "warning of possible consolidation"])
-             else: rsi_level = "neutral"; rsi_suggestion = random.choice(["indicating balanced momentum", "showing neither strong buying nor selling pressure", "suggesting a lack of immediate directional bias from this indicator"])
+             if latest_rsi < 30: rsi_level = "oversold"; rsi_suggestion = rng.choice(["potentially indicating a rebound opportunity", "suggesting it might be due for a bounce", "hinting the sell-off might be overdone"])
+             elif latest_rsi > 70: rsi_level = "overbought"; rsi_suggestion = rng.choice(["suggesting caution or potential for a pullback", "indicating it might be extended", "warning of possible consolidation"])
+             else: rsi_level = "neutral"; rsi_suggestion = rng.choice(["indicating balanced momentum", "showing neither strong buying nor selling pressure", "suggesting a lack of immediate directional bias from this indicator"])
              rsi_condition_options = [
                  f"Technically, the RSI indicates {rsi_level} conditions ({rsi_level_text}), {rsi_suggestion}.",
                  f"From a momentum perspective (RSI), the stock is currently {rsi_level} ({rsi_level_text}), {rsi_suggestion}.",
                  f"The RSI reading ({rsi_level_text}) places the stock in {rsi_level} territory, {rsi_suggestion}."
              ]
-             rsi_condition = random.choice(rsi_condition_options)
+             rsi_condition = rng.choice(rsi_condition_options)
 
         disclaimer_options = [
             "This report is informational; consult a financial advisor before investing.",
             "Remember, this analysis is for information only; seek professional advice before making investment decisions.",
             "This content does not constitute investment advice; always consult with a qualified advisor."
         ]
-        disclaimer = random.choice(disclaimer_options)
+        disclaimer = rng.choice(disclaimer_options)
 
         if "finances forecast" in site_name:
             q3_ans_options = [
@@ -2742,7 +2854,7 @@ def generate_faq_html(ticker, rdata):
                 (f"A 'good buy' decision for {ticker} should weigh the forecast ({overall_pct_change:+.1f}% potential) against your risk appetite. Evaluate if the company's growth and financial stability justify the outlook. "
                  f"Technicals are currently '{sentiment_str}'. {risk_mention} {disclaimer}")
             ]
-            q3_ans = random.choice(q3_ans_options)
+            q3_ans = rng.choice(q3_ans_options)
         elif "radar stocks" in site_name:
             q3_ans_options = [
                 (f"For traders, 'good buy' depends on technical signals aligning with strategy. Current sentiment is '{sentiment_str}'. {rsi_condition} Look for confirmation from price action, volume, and other indicators discussed in the TA section near identified support/resistance. "
@@ -2750,7 +2862,7 @@ def generate_faq_html(ticker, rdata):
                 (f"Traders define a 'good buy' based on technical setups. Sentiment is '{sentiment_str}'. {rsi_condition} Confirm signals with price, volume, and key levels (see TA). "
                  f"While the forecast ({overall_pct_change:+.1f}% potential) exists, timing and risk control are paramount for trades. {risk_mention} This isn't a trade recommendation.")
             ]
-            q3_ans = random.choice(q3_ans_options)
+            q3_ans = rng.choice(q3_ans_options)
         elif "bernini capital" in site_name:
             fwd_pe_fmt = format_html_value(valuation_data.get('Forward P/E'), 'ratio')
             q3_ans_options = [
@@ -2759,7 +2871,7 @@ def generate_faq_html(ticker, rdata):
                 (f"Value investors determine a 'good buy' by comparing price ({current_price_fmt}) to intrinsic worth, seeking a safety margin. Examine fundamentals like debt ({debt_equity_fmt}), earnings power, and valuation (e.g., {fwd_pe_fmt} Fwd P/E). "
                  f"Is the potential reward worth the risk? {risk_mention} Fundamentals, not just forecasts ({overall_pct_change:+.1f}% potential), drive long-term value. {disclaimer}")
             ]
-            q3_ans = random.choice(q3_ans_options)
+            q3_ans = rng.choice(q3_ans_options)
         else: # Default
             q3_ans_options = [
                 (f"Determining if {ticker} is a 'good buy' requires evaluating multiple factors. Technical sentiment is '{sentiment_str}', while the 1-year forecast suggests {overall_pct_change:+.1f}% potential. {rsi_condition} "
@@ -2767,16 +2879,16 @@ def generate_faq_html(ticker, rdata):
                 (f"Whether {ticker} is a 'good buy' now involves balancing various elements: '{sentiment_str}' technicals, a {overall_pct_change:+.1f}% forecast potential, and {rsi_condition} "
                  f"Weigh the company's valuation, stability, growth, and {risk_mention} against your own investment goals and risk profile. {disclaimer}")
             ]
-            q3_ans = random.choice(q3_ans_options)
+            q3_ans = rng.choice(q3_ans_options)
         faq_items.append((f"Is {ticker} stock a good investment right now?", q3_ans))
 
         # --- Q4: Volatility ---
         vol_level = "N/A"; vol_comp = ""
         volatility_fmt = format_html_value(volatility, 'percent_direct', 1)
         if volatility is not None:
-            if volatility > 40: vol_level = random.choice(["high", "elevated", "significant"])
-            elif volatility > 20: vol_level = random.choice(["moderate", "average", "typical"])
-            else: vol_level = random.choice(["low", "subdued", "relatively stable"])
+            if volatility > 40: vol_level = rng.choice(["high", "elevated", "significant"])
+            elif volatility > 20: vol_level = rng.choice(["moderate", "average", "typical"])
+            else: vol_level = rng.choice(["low", "subdued", "relatively stable"])
             beta_fmt = format_html_value(rdata.get('stock_price_stats_data',{}).get('Beta'), 'ratio')
             if beta_fmt != 'N/A':
                 vol_comp_options = [
@@ -2784,25 +2896,25 @@ def generate_faq_html(ticker, rdata):
                     f"This is consistent with its market sensitivity (Beta: {beta_fmt}).",
                     f"Its Beta ({beta_fmt}) reflects a similar level of market correlation."
                 ]
-                vol_comp = random.choice(vol_comp_options)
+                vol_comp = rng.choice(vol_comp_options)
 
         q4_ans_options = [
             f"Based on recent 30-day price action, {ticker}'s annualized volatility is ≈<strong>{volatility_fmt}</strong>. This level is currently considered {vol_level}, indicating the degree of recent price fluctuation. {vol_comp} Higher volatility means larger potential price swings (both up and down).",
             f"{ticker}'s recent price swing intensity (annualized 30-day volatility) is measured at ≈<strong>{volatility_fmt}</strong>. This is currently viewed as {vol_level}. {vol_comp} Greater volatility implies wider potential price movements.",
             f"The stock's recent volatility (30d annualized) is approximately <strong>{volatility_fmt}</strong>, considered {vol_level}. {vol_comp} Volatility reflects the potential range of price changes."
         ]
-        faq_items.append((f"How volatile is {ticker} stock?", random.choice(q4_ans_options)))
+        faq_items.append((f"How volatile is {ticker} stock?", rng.choice(q4_ans_options)))
 
         # --- Q5: P/E Ratio ---
         pe_ratio_fmt = format_html_value(valuation_data.get('Trailing P/E'), 'ratio')
         fwd_pe_fmt = format_html_value(valuation_data.get('Forward P/E'), 'ratio')
-        pe_comment = "unavailable"; pe_context = random.choice(["Compare to industry peers and historical levels.", "Benchmark against competitors and its own past ratios.", "Contextualize using industry averages and historical data."])
+        pe_comment = "unavailable"; pe_context = rng.choice(["Compare to industry peers and historical levels.", "Benchmark against competitors and its own past ratios.", "Contextualize using industry averages and historical data."])
         pe_ratio_val = _safe_float(valuation_data.get('Trailing P/E'))
         if pe_ratio_val is not None:
-             if pe_ratio_val <= 0: pe_comment = random.choice(["negative (indicating loss or requires context)", "below zero (suggesting no profit or data anomaly)", "negative (check earnings details)"])
-             elif pe_ratio_val < 15: pe_comment = random.choice(["relatively low (suggesting potential value or low growth expectations)", "quite low (possibly undervalued or facing slow growth)", "modest (could be value or low expectations)"])
-             elif pe_ratio_val < 25: pe_comment = random.choice(["moderate", "average", "in a typical range"])
-             else: pe_comment = random.choice(["relatively high (implying market expects strong growth or potential overvaluation)", "elevated (suggesting high growth hopes or richness)", "high (indicating significant growth factored in or potential premium pricing)"])
+             if pe_ratio_val <= 0: pe_comment = rng.choice(["negative (indicating loss or requires context)", "below zero (suggesting no profit or data anomaly)", "negative (check earnings details)"])
+             elif pe_ratio_val < 15: pe_comment = rng.choice(["relatively low (suggesting potential value or low growth expectations)", "quite low (possibly undervalued or facing slow growth)", "modest (could be value or low expectations)"])
+             elif pe_ratio_val < 25: pe_comment = rng.choice(["moderate", "average", "in a typical range"])
+             else: pe_comment = rng.choice(["relatively high (implying market expects strong growth or potential overvaluation)", "elevated (suggesting high growth hopes or richness)", "high (indicating significant growth factored in or potential premium pricing)"])
 
         q5_ans_options = [
             (f"{ticker}'s Trailing P/E ratio (based on past earnings) is <strong>{pe_ratio_fmt}</strong>, which is considered {pe_comment}. The Forward P/E (based on expected earnings) is {fwd_pe_fmt}. "
@@ -2812,7 +2924,7 @@ def generate_faq_html(ticker, rdata):
             (f"Currently, {ticker}'s Trailing P/E is <strong>{pe_ratio_fmt}</strong>, assessed as {pe_comment}. The Forward P/E multiple is {fwd_pe_fmt}. "
              f"This ratio shows the market price relative to earnings per share. {pe_context} A high P/E might be justified by rapid growth (refer to PEG).")
         ]
-        faq_items.append((f"What is {ticker}'s P/E ratio and what does it mean?", random.choice(q5_ans_options)))
+        faq_items.append((f"What is {ticker}'s P/E ratio and what does it mean?", rng.choice(q5_ans_options)))
 
         # --- Generate HTML ---
         details_html = "".join([f"<details><summary>{q}</summary><p>{a}</p></details>" for q, a in faq_items])
@@ -2822,6 +2934,7 @@ def generate_faq_html(ticker, rdata):
 
 def generate_risk_factors_html(ticker, rdata):
     """Generates the enhanced Risk Factors section."""
+    rng = _get_rng(rdata)
     try:
         risk_items = rdata.get('risk_items', []) # Get pre-calculated risks from helper
         industry = rdata.get('industry', 'the company\'s specific')
@@ -2860,7 +2973,7 @@ def generate_risk_factors_html(ticker, rdata):
                     # Check if the item *starts* with the generic key phrase (or similar)
                     # This is a basic check, might need refinement based on how risk_items are generated
                     if item_str.startswith(generic_key) or generic_key in item_str:
-                        processed_risk_items.append(random.choice(variations))
+                        processed_risk_items.append(rng.choice(variations))
                         processed = True
                         break
                 if not processed:
@@ -2878,15 +2991,16 @@ def generate_risk_factors_html(ticker, rdata):
             f"<p>Potential investors in {ticker} should be aware of several risk factors. The following list highlights key considerations based on data and market dynamics, but may not include all possible risks.</p>",
             f"<p>Understanding the risks associated with {ticker} is crucial. Below are potential risks derived from analysis and market awareness; this overview is not fully comprehensive.</p>"
         ]
-        narrative = f'<div class="narrative">{random.choice(narrative_options)}</div>'
+        narrative = f'<div class="narrative">{rng.choice(narrative_options)}</div>'
 
         return narrative + f"<ul>{risk_list_html}</ul>"
     except Exception as e:
         return _generate_error_html("Risk Factors", str(e))
 
 
-def generate_report_info_disclaimer_html(generation_time):
+def generate_report_info_disclaimer_html(generation_time, rng=None):
     """Generates the final disclaimer and timestamp section (Minor wording tweaks)."""
+    if rng is None: rng = random
     try:
         # Ensure generation_time is a datetime object
         if not isinstance(generation_time, datetime):
@@ -2905,27 +3019,27 @@ def generate_report_info_disclaimer_html(generation_time):
     current_date_str = datetime.now().strftime('%Y-%m-%d')
 
     # Slight variations for intro sentences
-    gen_on = random.choice(["Report Generated On:", "Analysis Compiled:", "Data As Of (Generation Time):"])
-    curr_date = random.choice(["Current Date Context:", "Report Date:", "Date of Viewing:"])
-    sources = random.choice(["Primary Data Sources:", "Data Primarily Sourced From:", "Key Data Inputs:"])
-    limits = random.choice(["Known Limitations:", "Important Caveats:", "Data Constraints:"])
-    disclaimer_title = random.choice(["IMPORTANT DISCLAIMER:", "CRITICAL NOTICE:", "ESSENTIAL DISCLAIMER:"])
-    disclaimer_body1 = random.choice([
+    gen_on = rng.choice(["Report Generated On:", "Analysis Compiled:", "Data As Of (Generation Time):"])
+    curr_date = rng.choice(["Current Date Context:", "Report Date:", "Date of Viewing:"])
+    sources = rng.choice(["Primary Data Sources:", "Data Primarily Sourced From:", "Key Data Inputs:"])
+    limits = rng.choice(["Known Limitations:", "Important Caveats:", "Data Constraints:"])
+    disclaimer_title = rng.choice(["IMPORTANT DISCLAIMER:", "CRITICAL NOTICE:", "ESSENTIAL DISCLAIMER:"])
+    disclaimer_body1 = rng.choice([
         "This report is automatically generated for informational and educational purposes ONLY. It does NOT constitute financial, investment, trading, legal, or tax advice, nor should it be interpreted as a recommendation or solicitation to buy, sell, hold, or otherwise transact in any security mentioned.",
         "Generated automatically, this document serves informational and educational roles exclusively. It is NOT financial, investment, trading, legal, or tax advice, and should not be seen as a suggestion or request to trade any mentioned security.",
         "This automated report is purely for information and education. It provides NO financial, investment, trading, legal, or tax recommendations, nor does it solicit any transactions in the securities discussed."
     ])
-    disclaimer_body2 = random.choice([
+    disclaimer_body2 = rng.choice([
         "All investments carry risk, including the potential loss of principal. Past performance is not indicative or predictive of future results. Market conditions are dynamic and can change rapidly. Financial models and data sources may contain errors or inaccuracies.",
         "Investing involves risk; principal loss is possible. Past results don't predict future outcomes. Markets change quickly. Models and data might have errors.",
         "Risk is inherent in all investments; you could lose money. Past performance doesn't guarantee future results. Markets are volatile. Data and models aren't perfect."
     ])
-    disclaimer_body3 = random.choice([
+    disclaimer_body3 = rng.choice([
         "Readers are strongly urged to conduct their own thorough and independent due diligence. Consult with one or more qualified, licensed financial professionals, investment advisors, and/or tax advisors before making any investment decisions. Understand your own risk tolerance, financial situation, and investment objectives.",
         "Perform your own detailed research. Speak with qualified financial, investment, and tax advisors before investing. Know your risk tolerance, finances, and goals.",
         "Independent due diligence is essential. Consult licensed professionals (financial, investment, tax) prior to any investment action. Assess your personal risk profile, financial status, and objectives."
     ])
-    disclaimer_body4 = random.choice([
+    disclaimer_body4 = rng.choice([
         "The creators, generators, and distributors of this report assume NO liability whatsoever for any actions taken, decisions made, or interpretations drawn based on the information provided herein. Use this information entirely at your own risk.",
         "No liability is accepted by the creators or distributors for any actions or decisions based on this report's content. Use this information at your sole discretion and risk.",
         "Responsibility for any use of this information rests solely with the reader. The report's authors and distributors bear no liability for outcomes resulting from its use."
@@ -0,0 +1,145 @@
+# html_postprocess.py
+# Compact output mode for generated reports: minifies the HTML, moves repeated inline style=""
+# attributes into classes, enforces a per-section byte budget and reports section sizes.
+import os
+import re
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 0 disables the budget. Action when a section exceeds it: 'warn' keeps it, 'drop' removes the section.
+SECTION_BYTE_BUDGET = int(os.getenv("REPORT_SECTION_BYTE_BUDGET", "0"))
+SECTION_BUDGET_ACTION = os.getenv("REPORT_SECTION_BUDGET_ACTION", "warn").lower()
+
+# Elements whose content must be kept byte-for-byte
+_PRESERVE_RE = re.compile(r'<(pre|textarea|script|style)\b.*?</\1>', re.I | re.S)
+# Whitespace around block-level tags is never rendered, so it can be dropped entirely
+_BLOCK_TAGS = r'(?:div|p|section|table|thead|tbody|tfoot|tr|td|th|ul|ol|li|h[1-6]|details|summary|br|hr)'
+_BLOCK_WS_RE = re.compile(r'\s*(</?' + _BLOCK_TAGS + r'\b[^>]*>)\s*', re.I)
+_WS_RE = re.compile(r'\s+')
+_STYLE_ATTR_RE = re.compile(r'''\sstyle\s*=\s*(["'])(.*?)\1''', re.I | re.S)
+_TAG_RE = re.compile(r'<([a-zA-Z][\w-]*)(\s[^<>]*?)?(/?)>', re.S)
+_CLASS_ATTR_RE = re.compile(r'''\sclass\s*=\s*(["'])(.*?)\1''', re.I | re.S)
+
+
+def _stash_preserved(html):
+    """Replaces pre/textarea/script/style elements with placeholders; returns (html, preserved)."""
+    preserved = []
+    def _stash(m):
+        preserved.append(m.group(0))
+        return f"\x00{len(preserved) - 1}\x00"
+    return _PRESERVE_RE.sub(_stash, html), preserved
+
+
+def _restore_preserved(html, preserved):
+    return re.sub(r'\x00(\d+)\x00', lambda m: preserved[int(m.group(1))], html)
+
+
+def minify_html(html):
+    """Collapses whitespace runs and strips whitespace around block tags (pre/textarea/script/style untouched)."""
+    if not html:
+        return html
+    html, preserved = _stash_preserved(html)
+    html = re.sub(r'<!--(?!\[if).*?-->', '', html, flags=re.S) # Drop comments, keep IE conditionals
+    html = _WS_RE.sub(' ', html)
+    html = _BLOCK_WS_RE.sub(r'\1', html)
+    html = _restore_preserved(html, preserved)
+    return html.strip()
+
+
+def _normalize_style(style):
+    decls = [d.strip() for d in style.split(';') if d.strip()]
+    return ';'.join(re.sub(r'\s*:\s*', ':', d) for d in decls)
+
+
+def dedupe_inline_styles(html, class_prefix="rs", style_classes=None):
+    """
+    Replaces style="..." attributes with short content-hashed classes (pre/textarea/script/style untouched).
+    Returns (html, style_classes) where style_classes maps class name -> declarations; pass the
+    same dict across sections to share classes within one report.
+    """
+    if style_classes is None:
+        style_classes = {}
+    if not html or 'style' not in html:
+        return html, style_classes
+
+    def _rewrite_tag(m):
+        tag, attrs, self_close = m.group(1), m.group(2) or '', m.group(3)
+        style_m = _STYLE_ATTR_RE.search(attrs)
+        if not style_m:
+            return m.group(0)
+        style = _normalize_style(style_m.group(2))
+        attrs = attrs[:style_m.start()] + attrs[style_m.end():]
+        if not style:
+            return f"<{tag}{attrs}{self_close}>"
+        cls = f"{class_prefix}-{hashlib.md5(style.encode('utf-8')).hexdigest()[:6]}"
+        style_classes[cls] = style
+        class_m = _CLASS_ATTR_RE.search(attrs)
+        if class_m:
+            merged = f"{class_m.group(2)} {cls}".strip()
+            attrs = f"{attrs[:class_m.start()]} class=\"{merged}\"{attrs[class_m.end():]}"
+        else:
+            attrs = f"{attrs} class=\"{cls}\""
+        return f"<{tag}{attrs}{self_close}>"
+
+    html, preserved = _stash_preserved(html)
+    html = _TAG_RE.sub(_rewrite_tag, html)
+    return _restore_preserved(html, preserved), style_classes
+
+
+def style_block(style_classes):
+    """Single <style> element for the classes produced by dedupe_inline_styles (empty string if none)."""
+    if not style_classes:
+        return ""
+    rules = "".join(f".{cls}{{{decls}}}" for cls, decls in sorted(style_classes.items()))
+    return f"<style>{rules}</style>"
+
+
+def compact_sections(sections, budget_bytes=None, over_budget_action=None):
+    """
+    Compacts a report given as a list of (section_key, html) pairs.
+    Returns (html, size_report) where size_report maps section_key ->
+    {'raw_bytes', 'compact_bytes', 'over_budget', 'dropped'} plus a '_total' entry.
+    """
+    budget_bytes = SECTION_BYTE_BUDGET if budget_bytes is None else budget_bytes
+    over_budget_action = (over_budget_action or SECTION_BUDGET_ACTION).lower()
+
+    style_classes = {}
+    out_parts = []
+    size_report = {}
+    raw_total = 0
+    for key, html in sections:
+        raw_bytes = len(html.encode('utf-8'))
+        compact, section_classes = dedupe_inline_styles(minify_html(html))
+        compact_bytes = len(compact.encode('utf-8'))
+        over_budget = bool(budget_bytes) and compact_bytes > budget_bytes
+        dropped = over_budget and over_budget_action == 'drop'
+        if over_budget:
+            logger.warning(f"Section '{key}' is {compact_bytes} bytes (budget {budget_bytes}). {'Dropped' if dropped else 'Kept'}.")
+        if not dropped: # A dropped section's classes stay out of the style block
+            out_parts.append(compact)
+            style_classes.update(section_classes)
+        size_report[key] = {'raw_bytes': raw_bytes, 'compact_bytes': compact_bytes, 'over_budget': over_budget, 'dropped': dropped}
+        raw_total += raw_bytes
+
+    # Styles go first so they apply before the content is painted
+    final_html = style_block(style_classes) + "".join(out_parts)
+    size_report['_total'] = {'raw_bytes': raw_total, 'compact_bytes': len(final_html.encode('utf-8')),
+                             'style_classes': len(style_classes)}
+    return final_html, size_report
+
+
+def format_size_report(size_report):
+    """One-line-per-section summary suitable for logs."""
+    lines = []
+    for key, info in size_report.items():
+        if key == '_total':
+            continue
+        flag = " DROPPED" if info['dropped'] else (" OVER BUDGET" if info['over_budget'] else "")
+        lines.append(f"  {key:<32} {info['raw_bytes']:>8} -> {info['compact_bytes']:>8} bytes{flag}")
+    total = size_report.get('_total')
+    if total:
+        saved = total['raw_bytes'] - total['compact_bytes']
+        lines.append(f"  {'TOTAL':<32} {total['raw_bytes']:>8} -> {total['compact_bytes']:>8} bytes (saved {saved})")
+    return "\n".join(lines)
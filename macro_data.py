@@ -7,6 +7,9 @@ import pandas_datareader as pdr
 from datetime import datetime
 import logging
 
+import rate_limiter
+import macro_store
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -18,6 +21,18 @@ CACHE_FILENAME = "macro_indicators.csv"
 
 FRED_API_KEY = os.environ.get('FRED_API_KEY')
 
+def _publish_processed(app_root, processed_df, cache_filepath):
+    """Publishes the processed frame as a new macro_store version and returns the shared frame."""
+    try:
+        macro_store.publish(app_root, processed_df, cache_filepath)
+        shared = macro_store.attach(app_root, source_path=cache_filepath)
+        if shared is not None:
+            return shared
+    except Exception as e:
+        logger.warning(f"Could not publish the processed macro dataset: {e}")
+    return processed_df
+
+
 def fetch_macro_indicators(app_root, start_date=None, end_date=None): # Added app_root
     """
     Fetch macroeconomic indicators from FRED, checking local cache first.
@@ -38,6 +53,10 @@ def fetch_macro_indicators(app_root, start_date=None, end_date=None): # Added ap
     logger.info(f"Cache file exists: {cache_exists}") # Log if file exists
 
     if cache_exists:
+        # Processed once per refresh of the CSV and shared read-only by every process (see macro_store)
+        shared = macro_store.attach(app_root, source_path=cache_filepath)
+        if shared is not None:
+            return shared
         logger.info(f"Attempting to load cached macro data from: {CACHE_FILENAME}")
         try:
             macro_data = pd.read_csv(cache_filepath, parse_dates=['Date'])
@@ -67,7 +86,7 @@ def fetch_macro_indicators(app_root, start_date=None, end_date=None): # Added ap
                 # Ensure MAs didn't introduce all NaNs
                 processed_df = macro_data.reset_index().dropna(subset=['Interest_Rate_MA30', 'SP500_MA30'], how='all')
                 logger.info(f"Processed cached macro data, {len(processed_df)} rows remaining.")
-                return processed_df
+                return _publish_processed(app_root, processed_df, cache_filepath)
         except Exception as e:
             logger.warning(f"Failed to load or process cached file {CACHE_FILENAME}: {e}. Re-downloading.")
             # Fall through to download
@@ -86,7 +105,8 @@ def fetch_macro_indicators(app_root, start_date=None, end_date=None): # Added ap
         if start_date is None: start_date = '1954-07-01'
         if end_date is None: end_date = datetime.today().strftime('%Y-%m-%d')
 
-        macro_data = pdr.get_data_fred(['DFF', 'SP500'], start=start_date, end=end_date)
+        with rate_limiter.market_data_call('fred'): # Shared token bucket + circuit breaker
+            macro_data = pdr.get_data_fred(['DFF', 'SP500'], start=start_date, end=end_date)
 
         if macro_data.empty:
             logger.warning("FRED download returned empty data.")
@@ -117,8 +137,9 @@ def fetch_macro_indicators(app_root, start_date=None, end_date=None): # Added ap
             logger.info(f"Saved downloaded macro data to cache: {CACHE_FILENAME}")
         except Exception as e:
             logger.error(f"Failed to save macro data to cache file {CACHE_FILENAME}: {e}")
+            return processed_df
 
-        return processed_df
+        return _publish_processed(app_root, processed_df, cache_filepath)
 
     except Exception as e:
         logger.error(f"Macro data fetch/processing error: {e}")
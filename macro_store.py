@@ -0,0 +1,143 @@
+# macro_store.py
+# Processed macro dataset, built once per data refresh and shared by every process on the host.
+# Each published version is two immutable .npy files in data_cache/macro_store/ (Date as datetime64[ns],
+# the numeric MACRO_COLUMNS as one float64 matrix) plus a pointer file, current.json:
+#   {'version': int, 'source': {'mtime_ns', 'size'}, 'rows', 'columns', 'dates', 'values', 'built_at'}
+# Readers map the arrays read-only (np.load(mmap_mode='r')): the data sits once in the page cache and
+# every worker, CLI run and portal run attaches to the same pages. Frames handed out carry
+# attrs['macro_version']; the version goes up by one per publish, so downstream caches can key on it
+# (the forecast cache does, see forecast_engines.forecast_cache_key).
+# A publish writes new files and then swaps current.json atomically; files of older versions are removed
+# after MACRO_STORE_KEEP_VERSIONS publishes (a process that still maps them keeps reading them).
+#
+# Usage: python macro_store.py    # Show the current version
+import os
+import json
+import time
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl # POSIX only; without it publishers are not serialized (see publish)
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MACRO_COLUMNS = ('Interest_Rate', 'SP500', 'Interest_Rate_MA30', 'SP500_MA30')
+MACRO_STORE_KEEP_VERSIONS = int(os.getenv("MACRO_STORE_KEEP_VERSIONS", "2"))
+
+_attach_lock = threading.Lock()
+_attached = {'key': None, 'frame': None} # Per process: (store dir, version) -> frame over the mapped arrays
+
+
+def store_dir(app_root):
+    return os.path.join(app_root, 'data_cache', 'macro_store')
+
+
+def read_pointer(app_root):
+    """The current.json record, or None when nothing has been published."""
+    try:
+        with open(os.path.join(store_dir(app_root), 'current.json'), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def current_version(app_root):
+    pointer = read_pointer(app_root)
+    return pointer['version'] if pointer else None
+
+
+def _source_signature(source_path):
+    stat = os.stat(source_path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def _save_array(path, array):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def publish(app_root, processed_df, source_path):
+    """
+    Publishes the processed frame as the next version, built from source_path (the macro CSV).
+    Returns the version. If another process already published for the same source, that version is
+    returned instead of writing a duplicate.
+    """
+    directory = store_dir(app_root)
+    os.makedirs(directory, exist_ok=True)
+    source = _source_signature(source_path)
+    with open(os.path.join(directory, '.lock'), 'w') as lock_file:
+        # One publisher at a time across processes. Without flock (Windows) two processes may both publish
+        # for the same source; each version is still complete because every file is swapped in with os.replace.
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        pointer = read_pointer(app_root)
+        if pointer and pointer.get('source') == source:
+            return pointer['version']
+        version = (pointer['version'] if pointer else 0) + 1
+
+        frame = processed_df.dropna(subset=['Date']).sort_values('Date')
+        dates = pd.to_datetime(frame['Date']).to_numpy(dtype='datetime64[ns]')
+        values = np.ascontiguousarray(frame[list(MACRO_COLUMNS)].to_numpy(dtype=np.float64))
+        dates_name, values_name = f"v{version}_dates.npy", f"v{version}_values.npy"
+        _save_array(os.path.join(directory, dates_name), dates)
+        _save_array(os.path.join(directory, values_name), values)
+
+        new_pointer = {'version': version, 'source': source, 'rows': len(dates), 'columns': list(MACRO_COLUMNS),
+                       'dates': dates_name, 'values': values_name, 'built_at': time.time()}
+        tmp_path = os.path.join(directory, f"current.json.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(new_pointer, f)
+        os.replace(tmp_path, os.path.join(directory, 'current.json'))
+
+        for name in os.listdir(directory):
+            if name.startswith('v') and name.endswith('.npy'):
+                try:
+                    if int(name[1:].split('_')[0]) <= version - MACRO_STORE_KEEP_VERSIONS:
+                        os.remove(os.path.join(directory, name))
+                except (ValueError, OSError):
+                    pass
+    logger.info(f"Published macro dataset version {version} ({len(dates)} rows).")
+    return version
+
+
+def attach(app_root, source_path=None):
+    """
+    The current version as a DataFrame over the read-only mapped arrays (attrs['macro_version'] set),
+    or None when nothing is published or, with source_path, when the published version was built from
+    a different state of that file. Each call returns a new shallow frame; the arrays are shared.
+    """
+    pointer = read_pointer(app_root)
+    if not pointer:
+        return None
+    if source_path is not None:
+        try:
+            if pointer.get('source') != _source_signature(source_path):
+                return None
+        except OSError:
+            return None
+    key = (store_dir(app_root), pointer['version'])
+    with _attach_lock:
+        if _attached['key'] != key:
+            directory = store_dir(app_root)
+            try:
+                dates = np.load(os.path.join(directory, pointer['dates']), mmap_mode='r')
+                values = np.load(os.path.join(directory, pointer['values']), mmap_mode='r')
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not attach macro dataset version {pointer['version']}: {e}")
+                return None
+            frame = pd.DataFrame(values, columns=pointer['columns'], copy=False)
+            frame.insert(0, 'Date', dates)
+            frame.attrs['macro_version'] = pointer['version']
+            _attached.update(key=key, frame=frame)
+        return _attached['frame'].copy(deep=False)
+
+
+if __name__ == '__main__':
+    print(read_pointer(os.path.dirname(os.path.abspath(__file__))) or "No macro dataset published.")
@@ -8,6 +8,8 @@ from dotenv import load_dotenv
 import io
 from functools import wraps
 
+import manifest
+
 # --- Firebase Admin Setup ---
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 try:
@@ -40,6 +42,7 @@ except ImportError as e_ap:
                     base_state['posts_today_by_profile'][pid] = 0
                     base_state['processed_tickers_detailed_log_by_profile'][pid] = []
             return base_state
+        def load_tickers_from_uploaded_file(self, file_content, filename): return []
         def trigger_publishing_run(self, user_uid, profiles_to_process_data_list, articles_map, custom_tickers_by_profile_id=None, uploaded_file_details_by_profile_id=None):
             print("MockAutoPublisher.trigger_publishing_run called.")
             profile_ids_list = [p.get('profile_id') for p in profiles_to_process_data_list if p.get('profile_id')]
@@ -103,20 +106,14 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def get_all_report_section_keys():
-    try:
-        from wordpress_reporter import ALL_REPORT_SECTIONS # Assuming this exists
-        return list(ALL_REPORT_SECTIONS.keys())
-    except ImportError:
-        app.logger.warning("Could not import ALL_REPORT_SECTIONS from wordpress_reporter. Using fallback.")
-        return [
-            "introduction", "metrics_summary", "detailed_forecast_table", "company_profile",
-            "valuation_metrics", "total_valuation", "profitability_growth", "analyst_insights",
-            "financial_health", "technical_analysis_summary", "short_selling_info",
-            "stock_price_statistics", "dividends_shareholder_returns", "conclusion_outlook",
-            "risk_factors", "faq"
-        ]
+    return list(manifest.REPORT_SECTION_KEYS) # Light manifest: no analytics imports in the web tier
 ALL_SECTIONS = get_all_report_section_keys()
 
+def get_forecast_engine_names():
+    return list(manifest.FORECAST_ENGINE_NAMES)
+FORECAST_ENGINE_NAMES = get_forecast_engine_names()
+DEFAULT_FORECAST_ENGINE = manifest.DEFAULT_FORECAST_ENGINE
+
 
 # --- Authentication Decorator ---
 def login_required(f):
@@ -295,6 +292,8 @@ def manage_site_profiles():
                            title="Site Profile Dashboard",
                            profiles=profiles,
                            all_report_sections=ALL_SECTIONS,
+                           forecast_engines=FORECAST_ENGINE_NAMES,
+                           default_forecast_engine=DEFAULT_FORECAST_ENGINE,
                            posts_today_by_profile=shared_context.get('posts_today_by_profile'),
                            last_run_date_for_counts=shared_context.get('last_run_date_for_counts'),
                            processed_tickers_log_map=shared_context.get('processed_tickers_log_map'),
@@ -338,13 +337,17 @@ def add_site_profile():
         "max_scheduling_gap_minutes": int(request.form.get('max_scheduling_gap_minutes', 68)),
         "env_prefix_for_feature_image_colors": request.form.get('env_prefix_for_feature_image_colors', '').strip().upper(),
         "authors": authors_data,
-        "report_sections_to_include": request.form.getlist('report_sections_to_include[]')
+        "report_sections_to_include": request.form.getlist('report_sections_to_include[]'),
+        "forecast_engine": request.form.get('forecast_engine', DEFAULT_FORECAST_ENGINE).strip().lower()
         # Timestamps are set by save_user_site_profile_to_firestore
     }
 
     if not new_profile_data["profile_name"] or not new_profile_data["site_url"]:
         flash("Profile Name and Site URL are required.", "error")
         return redirect(url_for('manage_site_profiles'))
+    if new_profile_data["forecast_engine"] not in FORECAST_ENGINE_NAMES:
+        flash(f"Unknown forecast engine '{new_profile_data['forecast_engine']}'. Choose one of: {', '.join(FORECAST_ENGINE_NAMES)}.", "error")
+        return redirect(url_for('manage_site_profiles'))
 
     saved_profile_id = save_user_site_profile_to_firestore(user_uid, new_profile_data)
     if saved_profile_id:
@@ -381,6 +384,10 @@ def edit_site_profile(profile_id_from_firestore):
         profile_data['max_scheduling_gap_minutes'] = int(request.form.get('max_scheduling_gap_minutes', profile_data.get('max_scheduling_gap_minutes',68)))
         profile_data['env_prefix_for_feature_image_colors'] = request.form.get('env_prefix_for_feature_image_colors', profile_data.get('env_prefix_for_feature_image_colors','')).strip().upper()
         profile_data['report_sections_to_include'] = request.form.getlist('report_sections_to_include[]')
+        profile_data['forecast_engine'] = request.form.get('forecast_engine', profile_data.get('forecast_engine') or DEFAULT_FORECAST_ENGINE).strip().lower()
+        if profile_data['forecast_engine'] not in FORECAST_ENGINE_NAMES:
+            flash(f"Unknown forecast engine '{profile_data['forecast_engine']}'. Choose one of: {', '.join(FORECAST_ENGINE_NAMES)}.", "error")
+            return render_template('edit_profile.html', title=f"Edit {profile_data.get('profile_name', 'Profile')}", profile=profile_data, all_report_sections=ALL_SECTIONS, forecast_engines=FORECAST_ENGINE_NAMES, default_forecast_engine=DEFAULT_FORECAST_ENGINE)
 
         updated_authors = []
         author_idx = 0
@@ -419,7 +426,7 @@ def edit_site_profile(profile_id_from_firestore):
         
         if not updated_authors:
             flash("At least one complete WordPress author is required. Profile not updated.", "error")
-            return render_template('edit_profile.html', title=f"Edit {profile_data.get('profile_name', 'Profile')}", profile=profile_data, all_report_sections=ALL_SECTIONS)
+            return render_template('edit_profile.html', title=f"Edit {profile_data.get('profile_name', 'Profile')}", profile=profile_data, all_report_sections=ALL_SECTIONS, forecast_engines=FORECAST_ENGINE_NAMES, default_forecast_engine=DEFAULT_FORECAST_ENGINE)
 
         profile_data['authors'] = updated_authors
         
@@ -433,7 +440,7 @@ def edit_site_profile(profile_id_from_firestore):
             flash(f"Failed to update Site Profile '{profile_data['profile_name']}'.", "error")
         return redirect(url_for('manage_site_profiles'))
 
-    return render_template('edit_profile.html', title=f"Edit {profile_data.get('profile_name', 'Profile')}", profile=profile_data, all_report_sections=ALL_SECTIONS)
+    return render_template('edit_profile.html', title=f"Edit {profile_data.get('profile_name', 'Profile')}", profile=profile_data, all_report_sections=ALL_SECTIONS, forecast_engines=FORECAST_ENGINE_NAMES, default_forecast_engine=DEFAULT_FORECAST_ENGINE)
 
 @app.route('/site-profiles/delete/<profile_id_to_delete>', methods=['POST'])
 @login_required
@@ -505,12 +512,14 @@ def run_automation_now():
                 try:
                     from werkzeug.utils import secure_filename
                     filename = secure_filename(file.filename)
-                    file_content_bytes = file.read()
-                    file.seek(0)
+                    # Streamed from the upload: only the ticker column is read, the file is never held as a whole
+                    uploaded_tickers = auto_publisher.load_tickers_from_uploaded_file(file.stream, filename)
                     uploaded_files_for_run[profile_id] = {
                         "original_filename": filename,
-                        "content_bytes": file_content_bytes
+                        "tickers": uploaded_tickers
                     }
+                    if not uploaded_tickers:
+                        flash(f"No valid tickers found in '{filename}' for profile {profile_data_item.get('profile_name', profile_id)}.", "warning")
                 except Exception as e_upload:
                     app.logger.error(f"Error processing uploaded file '{file.filename}' for profile {profile_id}: {e_upload}", exc_info=True)
                     flash(f"Error processing file for profile {profile_data_item.get('profile_name', profile_id)}.", "error")
@@ -542,6 +551,10 @@ def run_automation_now():
                         flash(f"Profile '{profile_name}': Run completed. Summary: {status_summary}. Processed: {tickers_processed_count} tickers.", "success")
                 else:
                     flash(f"No result data found for profile ID {pid_res} after run.", "warning")
+            run_plan = next((r.get("run_plan") for r in results.values() if r and r.get("run_plan")), None)
+            if run_plan:
+                flash(f"Analyses: {run_plan['planned_computations']} planned for {run_plan['work_items']} profile/ticker items, "
+                      f"{run_plan['actual_computations']} computed for {run_plan['uses']} reports ({run_plan['saved']} shared across profiles).", "info")
         else:
             flash("Automation run did not return a summary. Check logs for details.", "warning")
 
@@ -0,0 +1,32 @@
+# manifest.py
+# Light registry of the names the web tier and the publisher need before any job runs: report
+# sections (key -> html_components generator) and forecast engines. Importing it loads nothing
+# beyond the standard library, so the portal can render forms without pulling in Prophet,
+# yfinance, Plotly or Matplotlib. wordpress_reporter and forecast_engines build their registries
+# from these names, so the two cannot drift apart.
+import os
+
+# Section key -> generator function name in html_components, in report order
+REPORT_SECTIONS = {
+    "introduction": "generate_introduction_html",
+    "metrics_summary": "generate_metrics_summary_html",
+    "detailed_forecast_table": "generate_detailed_forecast_table_html",
+    "company_profile": "generate_company_profile_html",
+    "valuation_metrics": "generate_valuation_metrics_html",
+    "total_valuation": "generate_total_valuation_html",
+    "profitability_growth": "generate_profitability_growth_html",
+    "analyst_insights": "generate_analyst_insights_html",
+    "financial_health": "generate_financial_health_html",
+    "technical_analysis_summary": "generate_technical_analysis_summary_html",
+    "short_selling_info": "generate_short_selling_info_html",
+    "stock_price_statistics": "generate_stock_price_statistics_html",
+    "dividends_shareholder_returns": "generate_dividends_shareholder_returns_html",
+    "conclusion_outlook": "generate_conclusion_outlook_html",
+    "risk_factors": "generate_risk_factors_html",
+    "faq": "generate_faq_html",
+}
+REPORT_SECTION_KEYS = tuple(REPORT_SECTIONS)
+
+# Forecast engine names (the training functions are registered in forecast_engines.FORECAST_ENGINES)
+FORECAST_ENGINE_NAMES = ("prophet", "numpy", "global")
+DEFAULT_FORECAST_ENGINE = os.getenv("FORECAST_ENGINE", "prophet").lower()
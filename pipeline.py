@@ -2,17 +2,14 @@
 import os
 import time
 import traceback
-import re
 import logging # Added for logging within pipeline if needed
 
-import pandas as pd
-import yfinance as yf
-
 from config import TICKERS
-from data_collection import fetch_stock_data
+from data_collection import fetch_stock_data, fetch_fundamentals
 from macro_data import fetch_macro_indicators
 from data_preprocessing import preprocess_data
-from prophet_model import train_prophet_model
+from forecast_engines import train_forecast_result
+import symbol_index
 
 # Configure logging if needed within the pipeline itself
 # logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -23,18 +20,19 @@ def run_pipeline(ticker, ts, app_root):
     """
     Runs the full analysis pipeline for a given stock ticker.
     Relies on fetch functions for caching, passing app_root for path consistency.
+    Returns (forecast_result, report_path, report_html); forecast_result is a slim ForecastResult.
     """
     static_dir_path = os.path.join(app_root, 'static')
     os.makedirs(static_dir_path, exist_ok=True)
 
     processed_csv = report_path = report_html = None
-    model = forecast = None
+    forecast_result = None
 
     try:
         print(f"\n----- Starting ORIGINAL pipeline for {ticker} -----")
-        valid_ticker_pattern = r'^[A-Z0-9\^.-]+$'
-        if not ticker or not re.match(valid_ticker_pattern, ticker):
-             raise ValueError(f"[Original Pipeline] Invalid ticker format: {ticker}.")
+        ticker_ok, ticker_reason = symbol_index.check_symbol(ticker) # Format, delisted, negative cache
+        if not ticker_ok:
+             raise ValueError(f"[Original Pipeline] Unusable ticker {ticker}: {ticker_reason}.")
 
         # --- 1. Data Collection (Pass app_root) ---
         print("Step 1: Fetching stock data (checking cache)...")
@@ -58,37 +56,15 @@ def run_pipeline(ticker, ts, app_root):
 
         # --- 3. Prophet Model Training & Aggregation ---
         print("Step 3: Training Prophet model & predicting...")
-        model, forecast, actual_df, forecast_df = train_prophet_model(
-            processed_data, ticker, forecast_horizon='1y', timestamp=ts
-        )
-        if model is None or forecast is None or actual_df is None or forecast_df is None:
-             raise RuntimeError("Prophet model training or forecasting failed.")
+        forecast_result = train_forecast_result(processed_data, ticker, forecast_horizon='1y', timestamp=ts)
+        actual_df, forecast_df = forecast_result.agg_actual, forecast_result.agg_forecast
         print(f"   Model trained. Forecast generated for {len(forecast_df)} periods.")
 
         # --- 4. Fetch Fundamentals ---
         print("Step 4: Fetching fundamentals via yfinance...")
-        try:
-            yf_ticker = yf.Ticker(ticker)
-            info_data = {}
-            recs_data = pd.DataFrame()
-            news_data = []
-            try: info_data = yf_ticker.info or {}
-            except Exception as info_err: print(f"  Warning: Could not fetch .info: {info_err}")
-            try: recs_data = yf_ticker.recommendations if hasattr(yf_ticker, 'recommendations') and yf_ticker.recommendations is not None else pd.DataFrame()
-            except Exception as rec_err: print(f"  Warning: Could not fetch .recommendations: {rec_err}")
-            try: news_data = yf_ticker.news if hasattr(yf_ticker, 'news') and yf_ticker.news is not None else []
-            except Exception as news_err: print(f"  Warning: Could not fetch .news: {news_err}")
-
-            fundamentals = {
-                'info': info_data,
-                'recommendations': recs_data,
-                'news': news_data
-            }
-            if not fundamentals['info'].get('symbol'):
-                 print(f"Warning: Could not fetch detailed info symbol for {ticker} via yfinance.")
-        except Exception as yf_err:
-             print(f"Warning: Error fetching yfinance fundamentals object for {ticker}: {yf_err}.")
-             fundamentals = {'info': {}, 'recommendations': pd.DataFrame(), 'news': []}
+        fundamentals = fetch_fundamentals(ticker, app_root) # Cached, rate-limited (see data_collection)
+        if not fundamentals['info'].get('symbol'):
+             print(f"Warning: Could not fetch detailed info symbol for {ticker} via yfinance.")
 
 
         # --- 5. Generate FULL HTML Report ---
@@ -106,12 +82,12 @@ def run_pipeline(ticker, ts, app_root):
              print(f"   Report HTML generated, but failed to save file.")
 
         print(f"----- ORIGINAL Pipeline successful for {ticker} -----")
-        return model, forecast, report_path, report_html
+        return forecast_result, report_path, report_html
 
     except (ValueError, RuntimeError) as err:
         print(f"----- ORIGINAL Pipeline Error for {ticker} -----")
         print(f"Error: {err}")
-        return None, None, None, None
+        return None, None, None
     except Exception as e:
         print(f"----- ORIGINAL Pipeline failure for {ticker} -----")
         print(f"Unexpected Error: {e}")
@@ -119,7 +95,7 @@ def run_pipeline(ticker, ts, app_root):
         if processed_csv and os.path.exists(processed_csv):
             try: os.remove(processed_csv)
             except OSError as rm_err: print(f"Error removing file {processed_csv}: {rm_err}")
-        return None, None, None, None
+        return None, None, None
 
 
 # --- WordPress Pipeline Function (MODIFIED) ---
@@ -127,6 +103,7 @@ def run_wp_pipeline(ticker, ts, app_root):
     """
     Runs the analysis pipeline specifically to generate WordPress assets.
     Relies on fetch functions for caching, passing app_root.
+    Returns (forecast_result, text_report_html, image_urls).
     """
     static_dir_path = os.path.join(app_root, 'static')
     os.makedirs(static_dir_path, exist_ok=True)
@@ -134,13 +111,13 @@ def run_wp_pipeline(ticker, ts, app_root):
     processed_csv = None
     text_report_html = None
     image_urls = {}
-    model = forecast = None
+    forecast_result = None
 
     try:
         print(f"\n>>>>> Starting WORDPRESS pipeline for {ticker} <<<<<")
-        valid_ticker_pattern = r'^[A-Z0-9\^.-]+$'
-        if not ticker or not re.match(valid_ticker_pattern, ticker):
-             raise ValueError(f"[WP Pipeline] Invalid ticker format: {ticker}.")
+        ticker_ok, ticker_reason = symbol_index.check_symbol(ticker) # Format, delisted, negative cache
+        if not ticker_ok:
+             raise ValueError(f"[WP Pipeline] Unusable ticker {ticker}: {ticker_reason}.")
 
         # --- Steps 1-4: Data Fetching (Cached), Preprocessing, Model Training, Fundamentals ---
         print("WP Step 1: Fetching stock data (checking cache)...")
@@ -159,35 +136,14 @@ def run_wp_pipeline(ticker, ts, app_root):
         print(f"   Saved WP processed data -> {os.path.basename(processed_csv)}")
 
         print("WP Step 3: Training Prophet model & predicting...")
-        model, forecast, actual_df, forecast_df = train_prophet_model(
-            processed_data, ticker, forecast_horizon='1y', timestamp=ts
-        )
-        if model is None or forecast is None or actual_df is None or forecast_df is None:
-             raise RuntimeError("Prophet model failed.")
+        forecast_result = train_forecast_result(processed_data, ticker, forecast_horizon='1y', timestamp=ts)
+        actual_df, forecast_df = forecast_result.agg_actual, forecast_result.agg_forecast
         print(f"   WP Model trained.")
 
         print("WP Step 4: Fetching fundamentals...")
-        try:
-            yf_ticker = yf.Ticker(ticker)
-            info_data = {}
-            recs_data = pd.DataFrame()
-            news_data = []
-            try: info_data = yf_ticker.info or {}
-            except Exception as info_err: print(f"  Warning: Could not fetch .info: {info_err}")
-            try: recs_data = yf_ticker.recommendations if hasattr(yf_ticker, 'recommendations') and yf_ticker.recommendations is not None else pd.DataFrame()
-            except Exception as rec_err: print(f"  Warning: Could not fetch .recommendations: {rec_err}")
-            try: news_data = yf_ticker.news if hasattr(yf_ticker, 'news') and yf_ticker.news is not None else []
-            except Exception as news_err: print(f"  Warning: Could not fetch .news: {news_err}")
-
-            fundamentals = {
-                'info': info_data,
-                'recommendations': recs_data,
-                'news': news_data
-            }
-            if not fundamentals['info'].get('symbol'): print(f"Warning: Could not fetch detailed info symbol for {ticker}.")
-        except Exception as yf_err:
-             print(f"Warning: Error fetching yfinance fundamentals object for {ticker}: {yf_err}.")
-             fundamentals = {'info': {}, 'recommendations': pd.DataFrame(), 'news': []}
+        fundamentals = fetch_fundamentals(ticker, app_root) # Cached, rate-limited (see data_collection)
+        if not fundamentals['info'].get('symbol'):
+             print(f"Warning: Could not fetch detailed info symbol for {ticker} via yfinance.")
 
 
         # --- Step 5: Generate WORDPRESS Assets ---
@@ -205,12 +161,12 @@ def run_wp_pipeline(ticker, ts, app_root):
         print(f"   Chart image URLs generated: {len(image_urls)} URLs returned.")
 
         print(f">>>>> WORDPRESS Pipeline successful for {ticker} <<<<<")
-        return model, forecast, text_report_html, image_urls
+        return forecast_result, text_report_html, image_urls
 
     except (ValueError, RuntimeError) as err:
         print(f">>>>> WORDPRESS Pipeline Error for {ticker} <<<<<")
         print(f"Error: {err}")
-        return None, None, None, {}
+        return None, None, {}
     except Exception as e:
         print(f">>>>> WORDPRESS Pipeline failure for {ticker} <<<<<")
         print(f"Unexpected Error: {e}")
@@ -218,7 +174,7 @@ def run_wp_pipeline(ticker, ts, app_root):
         if processed_csv and os.path.exists(processed_csv):
             try: os.remove(processed_csv)
             except OSError as rm_err: print(f"Error removing file {processed_csv}: {rm_err}")
-        return None, None, None, {}
+        return None, None, {}
 
 
 # --- Main execution block (Unchanged) ---
@@ -233,7 +189,7 @@ if __name__ == "__main__":
     print("\n--- Running Original Pipeline Batch ---")
     for ticker in TICKERS:
         ts = str(int(time.time()))
-        model, forecast, report_path, report_html = run_pipeline(ticker, ts, APP_ROOT_STANDALONE)
+        forecast_result, report_path, report_html = run_pipeline(ticker, ts, APP_ROOT_STANDALONE)
         if report_path and report_html and "Error Generating Report" not in report_html:
             successful_orig.append(ticker)
             print(f"[✔ Orig] {ticker} - Report HTML generated and saved.")
@@ -252,7 +208,7 @@ if __name__ == "__main__":
     print("\n--- Running WP Asset Pipeline Batch ---")
     for ticker in TICKERS:
         ts_wp = str(int(time.time()))
-        model_wp, forecast_wp, text_html_wp, img_urls_wp = run_wp_pipeline(ticker, ts_wp, APP_ROOT_STANDALONE)
+        forecast_result_wp, text_html_wp, img_urls_wp = run_wp_pipeline(ticker, ts_wp, APP_ROOT_STANDALONE)
         if text_html_wp and "Error Generating Report" not in text_html_wp and isinstance(img_urls_wp, dict):
             successful_wp.append(ticker)
             print(f"[✔ WP] {ticker} - Text HTML generated.")
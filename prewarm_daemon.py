@@ -0,0 +1,225 @@
+# prewarm_daemon.py
+# Off-peak pre-compute for the publishing run. Reads each profile's pending queue (or, when it is
+# empty, the eligible retries + Excel sheet the run would reload from), takes the next N tickers per
+# profile in the order the run will consume them, and runs the site-independent analysis once per
+# (ticker, engine). That fills the price CSV cache, the fundamentals cache and the forecast cache,
+# so "Run now" in the portal mostly renders and publishes.
+#
+# Usage:
+#   python prewarm_daemon.py              # Loop: one pass per day inside PREWARM_WINDOW
+#   python prewarm_daemon.py --once       # One pass now, ignoring the window
+#   python prewarm_daemon.py --dry-run    # Print the selection only
+#   python prewarm_daemon.py --user UID   # Profiles from Firestore for UID (repeatable) instead of profiles_config.json
+import os
+import sys
+import json
+import math
+import time
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from auto_publisher import (APP_ROOT, ABSOLUTE_MAX_POSTS_PER_DAY_ENV_CAP, load_state, load_profiles_config,
+                            build_reload_list, preload_excel_sheets)
+from wordpress_reporter import prepare_report_data
+from manifest import DEFAULT_FORECAST_ENGINE
+import symbol_index
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("PrewarmDaemon")
+
+PREWARM_STATE_FILE = os.path.join(APP_ROOT, "data_cache", "prewarm_state.json")
+PREWARM_WINDOW = os.getenv("PREWARM_WINDOW", "01:00-05:00")          # Local time, may wrap midnight
+PREWARM_HEADROOM = float(os.getenv("PREWARM_HEADROOM", "1.5"))      # Tickers warmed per allowed post
+PREWARM_MAX_TICKERS = int(os.getenv("PREWARM_MAX_TICKERS", "200"))  # Across all profiles, per pass
+# CPU budget: a fraction of the cores, a lower scheduling priority and a cap on CPU seconds per pass
+PREWARM_CPU_FRACTION = float(os.getenv("PREWARM_CPU_FRACTION", "0.5"))
+PREWARM_CPU_SECONDS = float(os.getenv("PREWARM_CPU_SECONDS", "3600"))
+PREWARM_NICE = int(os.getenv("PREWARM_NICE", "10"))
+PREWARM_POLL_SECONDS = int(os.getenv("PREWARM_POLL_SECONDS", "300"))
+
+
+# ------------------ Selection ------------------
+def upcoming_tickers(profile_config, state):
+    """Tickers in the order the next run for this profile will take them (see trigger_publishing_run)."""
+    profile_id = str(profile_config.get("profile_id"))
+    pending = state.get('pending_tickers_by_profile', {}).get(profile_id, [])
+    if pending:
+        return list(pending)
+    return build_reload_list(profile_config, state)
+
+
+def daily_cap(profile_config):
+    """Posts per day the profile can publish: its own max_posts_per_day, never above the global cap."""
+    cap = profile_config.get("max_posts_per_day") or ABSOLUTE_MAX_POSTS_PER_DAY_ENV_CAP
+    return max(0, min(int(cap), ABSOLUTE_MAX_POSTS_PER_DAY_ENV_CAP))
+
+
+def select_prewarm_tickers(profiles, state, max_tickers=None):
+    """
+    {(ticker, engine): [profile_ids]} to warm. Each profile gets ceil(daily cap * PREWARM_HEADROOM)
+    tickers, scaled down proportionally when the total would exceed max_tickers.
+    """
+    max_tickers = PREWARM_MAX_TICKERS if max_tickers is None else max_tickers
+    quotas = {str(p.get("profile_id")): math.ceil(daily_cap(p) * PREWARM_HEADROOM) for p in profiles if p.get("profile_id")}
+    total = sum(quotas.values())
+    if total > max_tickers > 0:
+        quotas = {pid: max(1, int(q * max_tickers / total)) for pid, q in quotas.items()}
+
+    selection = {}
+    for profile_config in profiles:
+        profile_id = str(profile_config.get("profile_id") or "")
+        if not quotas.get(profile_id):
+            continue
+        engine = profile_config.get("forecast_engine") or DEFAULT_FORECAST_ENGINE
+        usable, _rejected = symbol_index.filter_symbols(upcoming_tickers(profile_config, state))
+        for ticker in usable[:quotas[profile_id]]:
+            selection.setdefault((ticker, engine), []).append(profile_id)
+    return selection
+
+
+# ------------------ Warming ------------------
+def _cpu_seconds():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def warm_tickers(selection, workers=None, cpu_budget_seconds=None):
+    """
+    Runs prepare_report_data for each (ticker, engine); the results are dropped, the caches stay.
+    No new work is started once the pass has used cpu_budget_seconds. Returns a summary dict.
+    """
+    workers = workers or max(1, int((os.cpu_count() or 1) * PREWARM_CPU_FRACTION))
+    cpu_budget_seconds = PREWARM_CPU_SECONDS if cpu_budget_seconds is None else cpu_budget_seconds
+    cpu_start, wall_start = _cpu_seconds(), time.time()
+    summary = {'selected': len(selection), 'warmed': 0, 'failed': [], 'skipped_budget': 0}
+
+    def _warm(key):
+        ticker, engine = key
+        prepare_report_data(ticker, APP_ROOT, forecast_engine=engine)
+
+    queue = list(selection)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while queue or running:
+            while queue and len(running) < workers:
+                if _cpu_seconds() - cpu_start >= cpu_budget_seconds:
+                    logger.warning(f"CPU budget of {cpu_budget_seconds:.0f}s used; leaving {len(queue)} tickers for the run.")
+                    summary['skipped_budget'] = len(queue)
+                    queue = []
+                    break
+                key = queue.pop(0)
+                running[pool.submit(_warm, key)] = key
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                ticker, engine = running.pop(future)
+                try:
+                    future.result()
+                    summary['warmed'] += 1
+                    logger.info(f"Warmed {ticker} ({engine}) for profiles {selection[(ticker, engine)]}")
+                except Exception as e:
+                    summary['failed'].append(ticker)
+                    logger.warning(f"Pre-warm failed for {ticker} ({engine}): {e}")
+
+    summary['cpu_seconds'] = round(_cpu_seconds() - cpu_start, 1)
+    summary['wall_seconds'] = round(time.time() - wall_start, 1)
+    return summary
+
+
+# ------------------ Profiles / Schedule ------------------
+def load_daemon_profiles(user_uids=None):
+    """Site profiles to warm for: Firestore profiles of the given users, else profiles_config.json (CLI mode)."""
+    if not user_uids:
+        return load_profiles_config()
+    from firebase_admin_setup import get_firestore_client # Only needed for portal users
+    db = get_firestore_client()
+    if not db:
+        logger.error("Firestore client not available; cannot load portal profiles.")
+        return []
+    profiles = []
+    for uid in user_uids:
+        for doc in db.collection(u'userSiteProfiles').document(uid).collection(u'profiles').stream():
+            profile = doc.to_dict()
+            profile['profile_id'] = doc.id
+            profiles.append(profile)
+    return profiles
+
+
+def in_window(now=None, window=None):
+    """True if now (local time) falls inside 'HH:MM-HH:MM'; windows may wrap past midnight."""
+    now = now or datetime.now()
+    start_str, end_str = (window or PREWARM_WINDOW).split('-')
+    start = datetime.strptime(start_str.strip(), '%H:%M').time()
+    end = datetime.strptime(end_str.strip(), '%H:%M').time()
+    if start <= end:
+        return start <= now.time() < end
+    return now.time() >= start or now.time() < end
+
+
+def load_prewarm_state():
+    try:
+        with open(PREWARM_STATE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_prewarm_state(data):
+    os.makedirs(os.path.dirname(PREWARM_STATE_FILE), exist_ok=True)
+    tmp_path = f"{PREWARM_STATE_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, PREWARM_STATE_FILE)
+
+
+def run_pass(user_uids=None, dry_run=False):
+    """One pre-warm pass over all profiles. The publisher state is read, never written."""
+    profiles = load_daemon_profiles(user_uids)
+    if not profiles:
+        logger.warning("No site profiles to pre-warm for.")
+        return {}
+    symbol_index.refresh_if_stale() # Nightly bulk refresh of listing status
+    state = load_state(current_profile_ids_from_run=[p.get("profile_id") for p in profiles])
+    preload_excel_sheets(profiles)
+    selection = select_prewarm_tickers(profiles, state)
+    logger.info(f"Pre-warm selection: {len(selection)} (ticker, engine) pairs for {len(profiles)} profiles.")
+    if dry_run:
+        for (ticker, engine), profile_ids in selection.items():
+            print(f"{ticker:<12} {engine:<8} {', '.join(profile_ids)}")
+        return {'selected': len(selection)}
+    summary = warm_tickers(selection)
+    logger.info(f"Pre-warm pass finished: {summary}")
+    save_prewarm_state({'last_run_date': datetime.now().strftime('%Y-%m-%d'),
+                        'finished_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'summary': summary})
+    return summary
+
+
+def run_daemon(user_uids=None):
+    """Sleeps until PREWARM_WINDOW and runs one pass per day inside it."""
+    logger.info(f"Pre-warm daemon started (window {PREWARM_WINDOW}, CPU fraction {PREWARM_CPU_FRACTION}, "
+                f"budget {PREWARM_CPU_SECONDS:.0f} CPU s, nice {PREWARM_NICE}).")
+    while True:
+        today = datetime.now().strftime('%Y-%m-%d')
+        if in_window() and load_prewarm_state().get('last_run_date') != today:
+            try:
+                run_pass(user_uids)
+            except Exception as e:
+                logger.error(f"Pre-warm pass failed: {e}", exc_info=True)
+                save_prewarm_state({'last_run_date': today, 'error': str(e)}) # Do not retry in a tight loop
+        time.sleep(PREWARM_POLL_SECONDS)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    uids = [args[i + 1] for i, a in enumerate(args) if a == '--user' and i + 1 < len(args)]
+    if PREWARM_NICE and hasattr(os, 'nice'):
+        try:
+            os.nice(PREWARM_NICE)
+        except OSError as e:
+            logger.warning(f"Could not lower priority: {e}")
+    if '--once' in args or '--dry-run' in args:
+        run_pass(uids, dry_run='--dry-run' in args)
+    else:
+        run_daemon(uids)
@@ -1,34 +1,19 @@
 from prophet import Prophet
+import os
 import pandas as pd
 import re
+# parse_time_period is re-exported here for existing callers
+from forecast_engines import (parse_time_period, aggregate_for_report, report_window_start, get_forecast_engine,
+                              get_tuned_params, DEFAULT_FORECAST_ENGINE)
 
+# 'horizon' predicts only the future rows plus the recent window shown in the report and keeps the
+# core forecast columns; 'full' predicts over the whole history and keeps every Prophet component.
+PROPHET_PREDICT_MODE = os.getenv("PROPHET_PREDICT_MODE", "horizon").lower()
+HORIZON_FORECAST_COLUMNS = ['ds', 'trend', 'yhat_lower', 'yhat_upper', 'yhat']
 
-# ------------------ Helper Function ------------------
-def parse_time_period(time_period: str) -> int:
-    """
-    Converts a custom time-period string into a number of days.
-    See docstring above.
-    """
-    time_period = time_period.lower().strip()
-    pattern = r"(\d+)([dwmy])"
-    match = re.match(pattern, time_period)
-    if not match:
-        raise ValueError("Invalid time period format. Please use e.g., '15d', '1m', '1y'.")
-    value = int(match.group(1))
-    unit = match.group(2)
-    if unit == 'd':
-        return value
-    elif unit == 'w':
-        return value * 7
-    elif unit == 'm':
-        return value * 30
-    elif unit == 'y':
-        return value * 365
-    else:
-        raise ValueError("Unsupported time unit. Supported: d, w, m, y.")
 
 # ------------------ Main Training Function ------------------
-def train_prophet_model(data, ticker='STOCK', forecast_horizon='1y', timestamp=None, macro_data=None):
+def train_prophet_model(data, ticker='STOCK', forecast_horizon='1y', timestamp=None, macro_data=None, engine=None, params=None, predict_mode=None, use_tuned=True):
     """
     Train a Prophet model for stock price forecasting with a custom forecast horizon.
     
@@ -37,12 +22,26 @@ def train_prophet_model(data, ticker='STOCK', forecast_horizon='1y', timestamp=N
         ticker (str): Stock ticker for applying ticker-specific parameter tuning.
         forecast_horizon (str): Forecast period as a string (e.g. '15d', '1m', '3m', '6m', '1y', '2y', '5y').
         timestamp (optional): Used for report generation.
+        engine (str): Forecast backend ('prophet', 'numpy', see forecast_engines). Defaults to the
+                      FORECAST_ENGINE env setting; every engine returns the same tuple.
+        params (dict): Optional overrides for the engine's parameters (for Prophet: cap_multiplier,
+                       changepoint_prior_scale, seasonality_mode), e.g. from a backtest grid.
+                       Without overrides, values tuned by tune_forecast_params.py are used when stored.
+        predict_mode (str): 'horizon' (default, PROPHET_PREDICT_MODE env) or 'full'. Aggregates are the same
+                            in both; only the size of the returned forecast frame differs.
+        use_tuned (bool): False ignores the tuned params store and starts from the built-in defaults
+                          (backtests and tune_forecast_params.py, so 'default' means the defaults).
     
     Returns:
         model (Prophet): The fitted model.
         forecast (pd.DataFrame): Forecasted results.
         report_path (str): Path to the generated report.
     """
+    engine = (engine or DEFAULT_FORECAST_ENGINE).lower()
+    if engine != 'prophet':
+        return get_forecast_engine(engine)(data, ticker=ticker, forecast_horizon=forecast_horizon,
+                                           timestamp=timestamp, macro_data=macro_data, use_tuned=use_tuned, **(params or {}))
+
     # ----- Preliminary Check and Basic Preprocessing -----
     required_columns = ['Date', 'Close']
     missing_columns = [col for col in required_columns if col not in data.columns]
@@ -54,6 +53,7 @@ def train_prophet_model(data, ticker='STOCK', forecast_horizon='1y', timestamp=N
     data = data.dropna(subset=['Date'])
 
     # ----- Parameter Tuning for Different Tickers -----
+    # Built-in defaults < tuned params store (tune_forecast_params.py) < explicit params
     ticker_params = {
         'TSLA': {
             'cap_multiplier': 2.5,
@@ -66,11 +66,11 @@ def train_prophet_model(data, ticker='STOCK', forecast_horizon='1y', timestamp=N
             'seasonality_mode': 'multiplicative'
         }
     }
-    params = ticker_params.get(ticker, {
+    params = {**ticker_params.get(ticker, {
         'cap_multiplier': 2.0,
         'changepoint_prior_scale': 0.08,
         'seasonality_mode': 'multiplicative'
-    })
+    }), **(get_tuned_params('prophet', ticker) if use_tuned else {}), **(params or {})} # use_tuned=False: backtests/tuning
     cap_multiplier = params['cap_multiplier']
     changepoint_prior_scale = params['changepoint_prior_scale']
     seasonality_mode = params['seasonality_mode']
@@ -114,7 +114,15 @@ def train_prophet_model(data, ticker='STOCK', forecast_horizon='1y', timestamp=N
     forecast_days = parse_time_period(forecast_horizon)
     
     # ----- Create Future DataFrame -----
-    future = model.make_future_dataframe(periods=forecast_days)
+    predict_mode = (predict_mode or PROPHET_PREDICT_MODE).lower()
+    if predict_mode == 'full':
+        future = model.make_future_dataframe(periods=forecast_days)
+    else:
+        # Only the report window of history (the forecast from last_date on is what gets aggregated)
+        window_start = report_window_start(df['ds'].max(), forecast_days)
+        future = pd.concat([df.loc[df['ds'] >= window_start, ['ds']],
+                            model.make_future_dataframe(periods=forecast_days, include_history=False)],
+                           ignore_index=True)
     future['cap'] = max_price
     future['floor'] = 0
 
@@ -128,63 +136,14 @@ def train_prophet_model(data, ticker='STOCK', forecast_horizon='1y', timestamp=N
 
     # ----- Forecast and Post-process Predictions -----
     forecast = model.predict(future)
+    if predict_mode != 'full':
+        forecast = forecast[HORIZON_FORECAST_COLUMNS].copy()
     forecast['yhat'] = forecast['yhat'].clip(lower=0)
     forecast['yhat_lower'] = forecast['yhat_lower'].clip(lower=0)
     forecast['yhat_upper'] = forecast['yhat_upper'].clip(lower=0)
 
     # ----- Aggregate Data for Reporting with Custom Grouping -----
-    last_date = df['ds'].max()
-    
-    # Choose aggregation frequency based on forecast period
-    if forecast_days <= 30:
-        # Daily grouping: use last 15 days (for example) from historical data
-        start_date = last_date - pd.Timedelta(days=15)
-        agg_format = 'daily'
-        df_recent = df[df['ds'] >= start_date].copy()
-        df_recent['Period'] = df_recent['ds'].dt.strftime('%Y-%m-%d')
-    elif forecast_days <= 90:
-        # Weekly grouping: use roughly last 3 months
-        start_date = last_date - pd.DateOffset(months=3)
-        agg_format = 'weekly'
-        df_recent = df[df['ds'] >= start_date].copy()
-        df_recent = df_recent.set_index('ds').resample('W').mean().reset_index()
-        df_recent['Period'] = df_recent['ds'].dt.strftime('%Y-%m-%d')
-    else:
-        # Monthly grouping: use roughly last 8 months
-        start_date = last_date - pd.DateOffset(months=8)
-        agg_format = 'monthly'
-        df_recent = df[df['ds'] >= start_date].copy()
-        df_recent['Period'] = df_recent['ds'].dt.to_period('M').dt.strftime('%Y-%m')
-
-    # Aggregate actual historical prices.
-    agg_actual = df_recent.groupby('Period').agg({'y': 'mean'}).reset_index()
-    agg_actual.rename(columns={'y': 'Average'}, inplace=True)
-
-    # Similarly, aggregate the forecasted data.
-    forecast_future = forecast[forecast['ds'] >= last_date].copy()
-    if agg_format == 'daily':
-        forecast_future['Period'] = forecast_future['ds'].dt.strftime('%Y-%m-%d')
-    elif agg_format == 'weekly':
-        forecast_future = forecast_future.set_index('ds').resample('W').mean().reset_index()
-        forecast_future['Period'] = forecast_future['ds'].dt.strftime('%Y-%m-%d')
-    else:  # monthly
-        forecast_future['Period'] = forecast_future['ds'].dt.to_period('M').dt.strftime('%Y-%m')
-    
-    agg_forecast = forecast_future.groupby('Period').agg({
-        'yhat_lower': 'min',
-        'yhat': 'mean',
-        'yhat_upper': 'max'
-    }).reset_index()
-    agg_forecast.rename(columns={
-        'yhat_lower': 'Low',
-        'yhat': 'Average',
-        'yhat_upper': 'High'
-    }, inplace=True)
-    
-    # Smooth the transition: set the first forecast period equal to last actual average.
-    if not agg_actual.empty and not agg_forecast.empty:
-        last_actual_value = agg_actual['Average'].iloc[-1]
-        agg_forecast.loc[agg_forecast.index[0], ['Low', 'Average', 'High']] = last_actual_value
+    agg_actual, agg_forecast = aggregate_for_report(df, forecast, forecast_days)
 
     # ----- Prepare Historical Data for Report Generation -----
     historical_data = data.copy()
@@ -0,0 +1,168 @@
+# rate_limiter.py
+# Shared rate limiting for outbound market-data calls (yfinance, FRED). One token bucket per provider
+# plus a circuit breaker, both kept in a small SQLite file so every thread and process on the host
+# (portal runs, CLI runs, the pre-warm daemon) draws from the same budget. Each state change is a
+# short BEGIN IMMEDIATE transaction, so concurrent callers are serialized without a lock server.
+#
+#   with rate_limiter.market_data_call('yfinance'):
+#       data = yf.download(...)
+#
+# The bucket refills at <PROVIDER>_RATE_PER_SEC up to <PROVIDER>_BURST tokens. Rate-limit errors
+# (HTTP 429 / "Too Many Requests") open the breaker at once; other errors open it after
+# BREAKER_FAILURE_THRESHOLD consecutive failures. While open, calls fail fast with CircuitOpenError.
+# After the cool-down one trial call is let through (half-open). Success closes the breaker; another
+# failure re-opens it with a doubled cool-down (up to BREAKER_MAX_COOLDOWN_SECS).
+import os
+import time
+import random
+import sqlite3
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.getenv("RATE_LIMIT_DB", os.path.join(APP_ROOT, "data_cache", "rate_limits.sqlite3"))
+
+PROVIDERS = {
+    'yfinance': {'rate': float(os.getenv("YFINANCE_RATE_PER_SEC", "2")), 'burst': float(os.getenv("YFINANCE_BURST", "5"))},
+    'fred': {'rate': float(os.getenv("FRED_RATE_PER_SEC", "1")), 'burst': float(os.getenv("FRED_BURST", "2"))},
+}
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_COOLDOWN_SECS = float(os.getenv("BREAKER_COOLDOWN_SECS", "60"))
+BREAKER_MAX_COOLDOWN_SECS = float(os.getenv("BREAKER_MAX_COOLDOWN_SECS", "900"))
+ACQUIRE_TIMEOUT_SECS = float(os.getenv("RATE_LIMIT_ACQUIRE_TIMEOUT", "120"))
+
+
+class CircuitOpenError(RuntimeError):
+    """The provider's circuit breaker is open; the call was not made."""
+
+
+class RateLimitTimeout(RuntimeError):
+    """No token became available within the acquire timeout."""
+
+
+def is_rate_limit_error(error):
+    """True for provider throttling: HTTP 429 or the messages yfinance/pandas_datareader raise for it."""
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        return True
+    message = str(error).lower()
+    return "rate limit" in message or "too many requests" in message or "429" in message
+
+
+def _is_client_error(error):
+    """4xx other than 429 (unknown symbol, bad request): a problem with the request, not the provider."""
+    status_code = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status_code is not None and 400 <= status_code < 500 and status_code != 429
+
+
+# ------------------ Storage ------------------
+def _connect():
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None) # Explicit transactions below
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""CREATE TABLE IF NOT EXISTS limiter (
+        provider TEXT PRIMARY KEY, tokens REAL, updated REAL,
+        failures INTEGER DEFAULT 0, open_until REAL DEFAULT 0, cooldown REAL DEFAULT 0, half_open INTEGER DEFAULT 0)""")
+    return conn
+
+
+@contextmanager
+def _transaction():
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE") # Takes the write lock up front: read-modify-write is atomic across processes
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def _row(conn, provider):
+    row = conn.execute("SELECT tokens, updated, failures, open_until, cooldown, half_open FROM limiter WHERE provider=?",
+                       (provider,)).fetchone()
+    if row is None:
+        burst = PROVIDERS[provider]['burst']
+        conn.execute("INSERT INTO limiter (provider, tokens, updated) VALUES (?, ?, ?)", (provider, burst, time.time()))
+        row = (burst, time.time(), 0, 0.0, 0.0, 0)
+    return dict(zip(('tokens', 'updated', 'failures', 'open_until', 'cooldown', 'half_open'), row))
+
+
+# ------------------ Bucket + Breaker ------------------
+def acquire(provider, tokens=1, timeout=None):
+    """
+    Blocks until `tokens` are available for the provider and takes them. Raises CircuitOpenError while
+    the breaker is open and RateLimitTimeout after `timeout` seconds (RATE_LIMIT_ACQUIRE_TIMEOUT).
+    """
+    config = PROVIDERS[provider]
+    timeout = ACQUIRE_TIMEOUT_SECS if timeout is None else timeout
+    deadline = time.time() + timeout
+    while True:
+        with _transaction() as conn:
+            now = time.time()
+            row = _row(conn, provider)
+            if row['open_until'] > now:
+                raise CircuitOpenError(f"{provider} circuit open for another {row['open_until'] - now:.0f}s")
+            if row['open_until'] and not row['half_open']:
+                # Cool-down over: let exactly this caller through as the trial call (lease = one cool-down)
+                conn.execute("UPDATE limiter SET half_open=1, open_until=? WHERE provider=?", (now + row['cooldown'], provider))
+                logger.info(f"{provider} circuit half-open; trial call.")
+                return
+            available = min(config['burst'], row['tokens'] + (now - row['updated']) * config['rate'])
+            if available >= tokens:
+                conn.execute("UPDATE limiter SET tokens=?, updated=? WHERE provider=?", (available - tokens, now, provider))
+                return
+            conn.execute("UPDATE limiter SET tokens=?, updated=? WHERE provider=?", (available, now, provider))
+            wait = (tokens - available) / config['rate']
+        if time.time() + wait > deadline:
+            raise RateLimitTimeout(f"No {provider} capacity within {timeout:.0f}s")
+        time.sleep(wait + random.uniform(0, 0.05)) # Jitter spreads out waiters that woke together
+
+
+def record_success(provider):
+    with _transaction() as conn:
+        row = _row(conn, provider)
+        if row['failures'] or row['open_until'] or row['half_open']:
+            if row['half_open']:
+                logger.info(f"{provider} circuit closed after a successful trial call.")
+            conn.execute("UPDATE limiter SET failures=0, open_until=0, cooldown=0, half_open=0 WHERE provider=?", (provider,))
+
+
+def record_failure(provider, rate_limited=False):
+    """Counts a failed call; opens (or re-opens, with a doubled cool-down) the breaker when due."""
+    with _transaction() as conn:
+        now = time.time()
+        row = _row(conn, provider)
+        failures = row['failures'] + 1
+        if rate_limited or row['half_open'] or failures >= BREAKER_FAILURE_THRESHOLD:
+            cooldown = min(BREAKER_MAX_COOLDOWN_SECS, row['cooldown'] * 2 if row['cooldown'] else BREAKER_COOLDOWN_SECS)
+            # Drain the bucket as well: the provider wants fewer requests, not a burst after the cool-down
+            conn.execute("UPDATE limiter SET failures=?, open_until=?, cooldown=?, half_open=0, tokens=0, updated=? WHERE provider=?",
+                         (failures, now + cooldown, cooldown, now + cooldown, provider))
+            logger.warning(f"{provider} circuit open for {cooldown:.0f}s ({'rate limited' if rate_limited else f'{failures} failures'}).")
+        else:
+            conn.execute("UPDATE limiter SET failures=? WHERE provider=?", (failures, provider))
+
+
+@contextmanager
+def market_data_call(provider, tokens=1, timeout=None):
+    """Takes tokens, runs the block and feeds the outcome to the breaker. Exceptions propagate."""
+    acquire(provider, tokens, timeout)
+    try:
+        yield
+    except Exception as e:
+        if not _is_client_error(e):
+            record_failure(provider, rate_limited=is_rate_limit_error(e))
+        raise
+    record_success(provider)
+
+
+def status(provider=None):
+    """Current bucket/breaker rows, for logs and debugging."""
+    with _transaction() as conn:
+        providers = [provider] if provider else list(PROVIDERS)
+        return {p: _row(conn, p) for p in providers}
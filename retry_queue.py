@@ -0,0 +1,111 @@
+# retry_queue.py
+# Per-profile retry queue for tickers that failed to publish. Replaces the old
+# failed_tickers_by_profile list (duplicates appended on every failure, all retried every run).
+# Each entry is state['retry_queue_by_profile'][profile_id][ticker]:
+#   {'failure_type': 'data'|'model'|'report'|'wordpress', 'attempts': int, 'next_eligible': epoch,
+#    'first_failed': epoch, 'last_failed': epoch, 'last_error': str, 'parked': bool}
+# A failure waits RETRY_BASE_MINUTES[type] * 2**(attempts-1) (capped) before it is eligible again.
+# Permanent failures (malformed or delisted symbols, or RETRY_MAX_ATTEMPTS reached) are parked: kept for
+# reference but never retried or re-added from the Excel sheet until unparked.
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_MINUTES = {
+    'data': int(os.getenv("RETRY_BASE_MINUTES_DATA", "360")),        # Missing/short price history rarely fixes itself quickly
+    'model': int(os.getenv("RETRY_BASE_MINUTES_MODEL", "120")),
+    'report': int(os.getenv("RETRY_BASE_MINUTES_REPORT", "120")),
+    'wordpress': int(os.getenv("RETRY_BASE_MINUTES_WORDPRESS", "30")), # Usually a transient HTTP error
+}
+RETRY_MAX_DELAY_MINUTES = int(os.getenv("RETRY_MAX_DELAY_MINUTES", str(3 * 24 * 60)))
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+STATE_KEY = 'retry_queue_by_profile'
+
+
+def _queue(state, profile_id):
+    return state.setdefault(STATE_KEY, {}).setdefault(str(profile_id), {})
+
+
+def backoff_seconds(failure_type, attempts):
+    """Exponential back-off for the attempts-th failure of this type."""
+    base = RETRY_BASE_MINUTES.get(failure_type, RETRY_BASE_MINUTES['model'])
+    return min(base * 2 ** max(0, attempts - 1), RETRY_MAX_DELAY_MINUTES) * 60
+
+
+def classify_analysis_error(error):
+    """'data' for fetch/preprocessing failures in prepare_report_data, 'model' for everything after."""
+    message = str(error).lower()
+    if any(word in message for word in ("stock data", "preprocess", "no data", "fetch", "valid closes", "circuit open", "capacity")):
+        return 'data'
+    return 'model'
+
+
+def record_failure(state, profile_id, ticker, failure_type, error=None, permanent=False, now=None, not_before=None):
+    """
+    Adds or updates the ticker's entry; parks it when permanent or out of attempts. not_before (epoch)
+    holds the retry back at least until then, e.g. a symbol's negative-cache expiry. Returns the entry.
+    """
+    now = now or time.time()
+    queue = _queue(state, profile_id)
+    entry = dict(queue.get(ticker) or {'attempts': 0, 'first_failed': now})
+    entry['attempts'] += 1
+    entry.update(failure_type=failure_type, last_failed=now, last_error=str(error or '')[:300],
+                 next_eligible=max(now + backoff_seconds(failure_type, entry['attempts']), not_before or 0))
+    entry['parked'] = bool(permanent or entry['attempts'] >= RETRY_MAX_ATTEMPTS)
+    queue[ticker] = entry
+    if entry['parked']:
+        logger.info(f"Parked {ticker} for profile {profile_id} after {entry['attempts']} attempt(s) ({failure_type}: {entry['last_error']}).")
+    return entry
+
+
+def record_success(state, profile_id, ticker):
+    _queue(state, profile_id).pop(ticker, None)
+
+
+def eligible_tickers(state, profile_id, now=None):
+    """Unparked entries whose back-off has passed: fewest attempts first, then oldest failure."""
+    now = now or time.time()
+    entries = [(t, e) for t, e in _queue(state, profile_id).items() if not e.get('parked') and e.get('next_eligible', 0) <= now]
+    entries.sort(key=lambda item: (item[1].get('attempts', 0), item[1].get('last_failed', 0)))
+    return [t for t, _ in entries]
+
+
+def blocked_tickers(state, profile_id, now=None):
+    """Tickers that must not be picked up from other sources yet (backing off or parked)."""
+    now = now or time.time()
+    return {t for t, e in _queue(state, profile_id).items() if e.get('parked') or e.get('next_eligible', 0) > now}
+
+
+def unpark(state, profile_id, ticker):
+    """Makes a parked ticker eligible again with a fresh attempt count. Returns False if it was not queued."""
+    entry = _queue(state, profile_id).get(ticker)
+    if not entry:
+        return False
+    entry.update(parked=False, attempts=0, next_eligible=0)
+    return True
+
+
+def migrate_failed_list(state, profile_id):
+    """Moves an old failed_tickers_by_profile list into the queue (eligible now, attempts = occurrences)."""
+    failed = state.get('failed_tickers_by_profile', {}).get(profile_id) or []
+    if not failed:
+        return 0
+    queue = _queue(state, profile_id)
+    now = time.time()
+    for ticker in failed:
+        entry = queue.setdefault(ticker, {'failure_type': 'model', 'attempts': 0, 'first_failed': now, 'last_failed': now,
+                                          'last_error': 'migrated from failed list', 'next_eligible': 0, 'parked': False})
+        entry['attempts'] = min(entry['attempts'] + 1, RETRY_MAX_ATTEMPTS - 1)
+    state['failed_tickers_by_profile'][profile_id] = []
+    return len(set(failed))
+
+
+def queue_summary(state, profile_id, now=None):
+    """Counts for logs and the portal: {'eligible', 'backing_off', 'parked'}."""
+    now = now or time.time()
+    entries = _queue(state, profile_id).values()
+    parked = sum(1 for e in entries if e.get('parked'))
+    backing_off = sum(1 for e in entries if not e.get('parked') and e.get('next_eligible', 0) > now)
+    return {'eligible': len(entries) - parked - backing_off, 'backing_off': backing_off, 'parked': parked}
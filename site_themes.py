@@ -0,0 +1,243 @@
+# site_themes.py
+# Site theme registry: report CSS is compiled & minified once per site, content-hashed, and installed
+# into WordPress once. Posts then only carry the wrapper class (e.g. "report-radar-stocks").
+import re
+import base64
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+BASE_CSS = """
+.stock-report-container { /* Base styles for all reports */
+    font-family: sans-serif;
+    line-height: 1.6;
+    color: #333;
+    max-width: 800px;
+    margin: 1em auto;
+    padding: 15px;
+    border: 1px solid #ddd;
+    background-color: #fff;
+    box-shadow: 2px 2px 5px rgba(0,0,0,0.1);
+    border-radius: 5px;
+}
+.stock-report-container h2,
+.stock-report-container h3,
+.stock-report-container h4 {
+    margin-top: 1.5em;
+    margin-bottom: 0.8em;
+    padding-bottom: 0.3em;
+    border-bottom: 1px solid #eee;
+}
+.stock-report-container h2.report-title { text-align: center; border-bottom-width: 2px; padding-bottom: 10px; margin-bottom: 1.5em; }
+.stock-report-container h3 { font-size: 1.4em; }
+.stock-report-container h4 { font-size: 1.2em; }
+.stock-report-container section { margin-bottom: 2em; }
+.stock-report-container p { margin-bottom: 1em; }
+.stock-report-container ul, .stock-report-container ol { margin-left: 20px; margin-bottom: 1em; }
+.stock-report-container li { margin-bottom: 0.5em; }
+.stock-report-container strong { font-weight: bold; }
+.stock-report-container a { text-decoration: none; }
+.stock-report-container a:hover { text-decoration: underline; }
+.stock-report-container .table-container { overflow-x: auto; margin-bottom: 1em; }
+.stock-report-container table { width: 100%; border-collapse: collapse; margin-bottom: 1em; font-size: 0.95em; }
+.stock-report-container th, .stock-report-container td { border: 1px solid #ddd; padding: 8px 10px; text-align: left; vertical-align: top; }
+.stock-report-container th { background-color: #f4f4f4; font-weight: bold; white-space: nowrap; }
+.stock-report-container tr:nth-child(even) { background-color: #f9f9f9; }
+.stock-report-container td:first-child { font-weight: bold; background-color: #fdfdfd; width: 35%; }
+.metrics-summary { display: grid; grid-template-columns: repeat(auto-fit, minmax(180px, 1fr)); gap: 15px; background-color: #f8f8f8; padding: 15px; border-radius: 5px; margin-bottom: 1em; }
+.metric-item { display: flex; flex-direction: column; padding: 10px; background-color: #fff; border: 1px solid #eee; border-radius: 3px; }
+.metric-label { font-size: 0.9em; color: #555; margin-bottom: 5px; }
+.metric-value { font-size: 1.1em; font-weight: bold; }
+.metric-change { margin-left: 5px; font-size: 0.9em; }
+.trend-up, .sentiment-bullish, .action-buy { color: #28a745; }
+.trend-down, .sentiment-bearish, .action-short { color: #dc3545; }
+.trend-neutral, .sentiment-neutral, .sentiment-neutral-bullish, .sentiment-neutral-bearish, .action-hold { color: #ffc107; }
+.icon { display: inline-block; margin-right: 5px; }
+.icon-up { color: #28a745; } .icon-down { color: #dc3545; } .icon-neutral { color: #ffc107; } .icon-warning { color: #ffc107; }
+.profile-grid, .analyst-grid, .ma-summary { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 10px; margin-bottom: 1em; }
+.profile-item span:first-child, .analyst-item span:first-child, .ma-item .label { font-weight: bold; margin-right: 5px; color: #333; }
+.profile-item, .analyst-item, .ma-item { padding: 8px; background-color: #f9f9f9; border: 1px solid #eee; border-radius: 3px; font-size: 0.95em; }
+.news-container { margin-top: 1em; }
+.news-item { border-bottom: 1px dashed #eee; padding-bottom: 1em; margin-bottom: 1em; }
+.news-item:last-child { border-bottom: none; margin-bottom: 0; }
+.news-item h4 { margin-bottom: 0.3em; font-size: 1.1em;}
+.news-meta { font-size: 0.85em; color: #666; } .news-meta span { margin-right: 15px; }
+.narrative { padding: 15px; border-radius: 4px; margin-bottom: 1.5em; font-size: 0.95em; border-left-width: 4px; border-left-style: solid; }
+.narrative p:last-child { margin-bottom: 0; } .narrative ul { list-style-type: disc; padding-left: 20px; }
+.conclusion-columns { display: flex; flex-wrap: wrap; gap: 20px; margin-bottom: 1.5em; }
+.conclusion-column { flex: 1; min-width: 250px; padding: 15px; border-radius: 5px; border: 1px solid #eee; }
+.conclusion-column h3 { margin-top: 0; font-size: 1.2em; border-bottom: 1px solid #ddd; padding-bottom: 0.4em; }
+.conclusion-column ul { padding-left: 0; list-style: none; }
+.conclusion-column li { margin-bottom: 0.7em; display: flex; align-items: flex-start; font-size: 0.95em; }
+.conclusion-column li .icon { margin-right: 8px; margin-top: 2px; }
+#faq details { background: #f9f9f9; border: 1px solid #ddd; border-radius: 4px; margin-bottom: 10px; }
+#faq summary { padding: 10px; font-weight: bold; cursor: pointer; outline: none; }
+#faq details[open] summary { border-bottom: 1px solid #ddd; }
+#faq details p { padding: 10px; margin: 0; border-top: 1px solid #eee; }
+.disclaimer, .general-info p { font-size: 0.85em; color: #555; margin-top: 1.5em; padding-top: 1em; border-top: 1px dashed #ccc; }
+.disclaimer strong { color: #c00; }
+.stock-report-container.error { border: 2px solid #dc3545; background-color: #ffebee; color: #c00; }
+.error-section { border: 1px solid red; padding: 10px; margin: 10px 0; background-color: #ffeeee; }
+.error-detail { font-family: monospace; font-size: 0.9em; }
+.stock-report-container td.empty-row { text-align: center; font-style: italic; font-weight: normal; width: auto; }
+.stock-report-container td.error-row { color: red; font-style: normal; }
+"""
+
+# Colour slots every site theme fills in; "{cls}" is replaced by the theme's wrapper class.
+SITE_CSS_TEMPLATE = """
+.{cls} { border-color: {border}; }
+.{cls} h2, .{cls} h3 { color: {heading}; }
+.{cls} a { color: {link}; }
+.{cls} .narrative { background-color: {narrative_bg}; border-left-color: {border}; }
+.{cls} .conclusion-column { background-color: {conclusion_bg}; border-color: {conclusion_border};}
+.{cls} .metric-value { color: {heading}; }
+"""
+
+# Built-in themes (previously hardcoded in wordpress_reporter). A profile can pick one by name via
+# "theme": "radar-stocks", or define its own with "theme": {"colors": {...}, "extra_css": "..."}.
+BUILTIN_THEMES = {
+    'finances-forecast': {
+        'colors': {'border': '#007bff', 'heading': '#0056b3', 'link': '#007bff', 'narrative_bg': '#e7f3ff',
+                   'conclusion_bg': '#f0f8ff', 'conclusion_border': '#cce5ff'},
+        'extra_css': ".{cls} #detailed-forecast table th { background-color: #b8daff; }",
+    },
+    'radar-stocks': {
+        'colors': {'border': '#28a745', 'heading': '#155724', 'link': '#28a745', 'narrative_bg': '#e2f0e1',
+                   'conclusion_bg': '#f0fff0', 'conclusion_border': '#c3e6cb'},
+        'extra_css': ".{cls} #technical-analysis .ma-summary { background-color: #d4edda; }",
+    },
+    'bernini-capital': {
+        'colors': {'border': '#6f42c1', 'heading': '#4a148c', 'link': '#6f42c1', 'narrative_bg': '#f3e5f5',
+                   'conclusion_bg': '#f9f0ff', 'conclusion_border': '#e9d8fd'},
+        'extra_css': ".{cls} #financial-health table th, .{cls} #dividends table th { background-color: #d1c4e9; }",
+    },
+}
+
+# Markers delimiting our block inside the site's custom CSS so re-installs replace it in place
+CSS_MARKER_START = "/* stock-report-theme:start */"
+CSS_MARKER_END = "/* stock-report-theme:end */"
+
+_THEME_CONFIGS = {}   # slug -> theme config (from profiles or built-ins)
+_COMPILED_THEMES = {} # slug -> {'slug', 'class_name', 'css', 'hash'}
+
+
+def site_slug(site_name):
+    """Slug used for theme lookup and the report wrapper class ('Radar Stocks' -> 'radar-stocks')."""
+    return str(site_name or 'general').strip().lower().replace(" ", "-")
+
+
+def minify_css(css):
+    """Strips comments and collapses whitespace. Good enough for our hand-written rules."""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};:,>])\s*', r'\1', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def register_theme(site_name, theme_config=None):
+    """Registers (or replaces) the theme for a site. theme_config may be a built-in name, a dict or None."""
+    slug = site_slug(site_name)
+    if isinstance(theme_config, str):
+        theme_config = BUILTIN_THEMES.get(site_slug(theme_config))
+        if theme_config is None:
+            logger.warning(f"Unknown built-in theme requested for '{site_name}'. Falling back to base styles.")
+    if theme_config is None:
+        theme_config = BUILTIN_THEMES.get(slug, {})
+    if _THEME_CONFIGS.get(slug) != theme_config:
+        _THEME_CONFIGS[slug] = theme_config
+        _COMPILED_THEMES.pop(slug, None) # Recompile lazily on next use
+    return slug
+
+
+def register_themes_from_profiles(profiles):
+    """Registers themes for every profile dict (uses its optional 'theme' key)."""
+    for profile in profiles or []:
+        if isinstance(profile, dict) and profile.get('profile_name'):
+            register_theme(profile['profile_name'], profile.get('theme'))
+
+
+def get_site_theme(site_name):
+    """Returns the compiled theme for a site, compiling it once on first use."""
+    slug = site_slug(site_name)
+    compiled = _COMPILED_THEMES.get(slug)
+    if compiled is not None:
+        return compiled
+
+    if slug not in _THEME_CONFIGS:
+        register_theme(site_name)
+    theme_config = _THEME_CONFIGS.get(slug) or {}
+    class_name = f"report-{slug}"
+
+    css_parts = [BASE_CSS]
+    colors = theme_config.get('colors')
+    if colors:
+        site_css = SITE_CSS_TEMPLATE
+        for key, value in colors.items():
+            site_css = site_css.replace("{" + key + "}", str(value))
+        css_parts.append(site_css)
+    if theme_config.get('extra_css'):
+        css_parts.append(theme_config['extra_css'])
+    css = minify_css("\n".join(css_parts).replace("{cls}", class_name))
+
+    compiled = {
+        'slug': slug,
+        'class_name': class_name,
+        'css': css,
+        'hash': hashlib.sha256(css.encode('utf-8')).hexdigest()[:16],
+    }
+    _COMPILED_THEMES[slug] = compiled
+    return compiled
+
+
+def get_chart_color(site_name):
+    """Main series colour for the site's static charts (the theme's link colour), or None for the chart defaults."""
+    slug = site_slug(site_name)
+    if slug not in _THEME_CONFIGS:
+        register_theme(site_name)
+    return ((_THEME_CONFIGS.get(slug) or {}).get('colors') or {}).get('link')
+
+
+def install_theme_to_wordpress(site_url, author_details, site_name, timeout=60):
+    """
+    Writes the site's compiled theme CSS into the active theme's global-styles custom CSS
+    (WordPress 6.2+, block themes; needs an account allowed to edit theme options).
+    Our block is wrapped in markers so repeated installs replace it instead of appending.
+    Returns the installed theme hash, or None on failure.
+    """
+    import requests # Only needed for this one-off action
+
+    theme = get_site_theme(site_name)
+    credentials = f"{author_details['wp_username']}:{author_details['app_password']}"
+    token = base64.b64encode(credentials.encode()).decode('utf-8')
+    headers = {"Authorization": f"Basic {token}", "Content-Type": "application/json"}
+    api_root = f"{site_url.rstrip('/')}/wp-json/wp/v2"
+
+    try:
+        # Locate the user global-styles post of the active theme
+        resp = requests.get(f"{api_root}/themes", params={"status": "active"}, headers=headers, timeout=timeout)
+        resp.raise_for_status()
+        active = resp.json()[0] if resp.json() else {}
+        styles_links = active.get('_links', {}).get('wp:user-global-styles', [])
+        if not styles_links:
+            logger.error(f"Active theme on {site_url} exposes no global styles (classic theme?). Install the CSS manually.")
+            return None
+        styles_url = styles_links[0]['href']
+
+        resp = requests.get(styles_url, headers=headers, params={"context": "edit"}, timeout=timeout)
+        resp.raise_for_status()
+        styles = resp.json().get('styles') or {}
+        existing_css = styles.get('css', '') or ''
+        existing_css = re.sub(re.escape(CSS_MARKER_START) + r'.*?' + re.escape(CSS_MARKER_END), '', existing_css, flags=re.S).strip()
+
+        theme_block = f"{CSS_MARKER_START}/* {theme['class_name']} {theme['hash']} */{theme['css']}{CSS_MARKER_END}"
+        styles['css'] = f"{existing_css}\n{theme_block}".strip()
+
+        resp = requests.post(styles_url, headers=headers, json={"styles": styles}, timeout=timeout)
+        resp.raise_for_status()
+        logger.info(f"Installed theme '{theme['class_name']}' ({theme['hash']}) on {site_url}.")
+        return theme['hash']
+    except Exception as e:
+        logger.error(f"Theme install failed for {site_url}: {e}")
+        return None
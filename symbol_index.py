@@ -0,0 +1,237 @@
+# symbol_index.py
+# Local index of ticker symbols, checked before any pipeline work.
+#  - symbols: {SYMBOL: {'exchange', 'name', 'status': 'active'|'delisted', 'last_seen': 'YYYY-MM-DD'}}, refreshed
+#    in bulk from the NASDAQ Trader symbol directory (all US-listed stocks and ETFs), plus 'last_seen'
+#    updates whenever a download returns data. A symbol that disappears from the directory is kept as
+#    'delisted'. Symbols the directory does not cover (indices, FX, non-US suffixes) are not blocked.
+#  - bad: negative cache {SYMBOL: {'reason', 'until'}} for symbols a download found no data for,
+#    so they are not downloaded and retried again until the TTL expires.
+# Stored in data_cache/symbol_index.json (atomic writes, re-read only when the file changes).
+#
+# Usage: python symbol_index.py --refresh | --check AAPL MSFT ...
+import os
+import re
+import sys
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.getenv("SYMBOL_INDEX_PATH", os.path.join(APP_ROOT, "data_cache", "symbol_index.json"))
+BAD_SYMBOL_TTL_HOURS = float(os.getenv("BAD_SYMBOL_TTL_HOURS", "72"))
+SYMBOL_INDEX_MAX_AGE_HOURS = float(os.getenv("SYMBOL_INDEX_MAX_AGE_HOURS", "24"))
+SYMBOL_DIRECTORY_URLS = (
+    "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt",
+    "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt",
+)
+OTHER_EXCHANGES = {'A': 'NYSE American', 'N': 'NYSE', 'P': 'NYSE Arca', 'Z': 'Cboe BZX', 'V': 'IEX'}
+MIN_REFRESH_FRACTION = 0.5 # A refresh smaller than this share of the current index is treated as partial
+
+# Upper-case symbols as yfinance writes them: BRK-B, RDS.A, ^GSPC, EURUSD=X
+SYMBOL_PATTERN = re.compile(r'^[A-Z0-9^][A-Z0-9.\-=^]{0,19}$')
+
+_index_lock = threading.Lock()
+_index_cache = {'mtime': None, 'data': {'symbols': {}, 'bad': {}}}
+
+
+def _today():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+
+# ------------------ Index ------------------
+def load_index():
+    """{'symbols': {...}, 'bad': {...}, 'refreshed_at': epoch}; re-read only when the file changes."""
+    try:
+        mtime = os.path.getmtime(INDEX_PATH)
+    except OSError:
+        return _index_cache['data']
+    if _index_cache['mtime'] != mtime:
+        try:
+            with open(INDEX_PATH, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read symbol index {INDEX_PATH}: {e}")
+            data = {}
+        data.setdefault('symbols', {})
+        data.setdefault('bad', {})
+        _index_cache.update(mtime=mtime, data=data)
+    return _index_cache['data']
+
+
+def _update_index(mutate):
+    """Applies mutate(index) to a copy of the index and swaps the result in atomically."""
+    with _index_lock:
+        current = load_index()
+        index = dict(current, symbols=dict(current['symbols']), bad=dict(current['bad']))
+        mutate(index)
+        os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+        tmp_path = f"{INDEX_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(tmp_path, INDEX_PATH)
+        _index_cache.update(mtime=os.path.getmtime(INDEX_PATH), data=index)
+
+
+# ------------------ Lookups ------------------
+def lookup(symbol):
+    """The index record for a symbol, or None if the directory does not list it."""
+    return load_index()['symbols'].get(symbol)
+
+
+def check_symbol(symbol):
+    """
+    (ok, reason). Rejects a bad format, a symbol inside its negative-cache TTL and a symbol the
+    directory lists as delisted. Unknown symbols pass: the directory only covers US listings.
+    """
+    if not symbol or not SYMBOL_PATTERN.match(symbol):
+        return False, "invalid format"
+    index = load_index()
+    bad = index['bad'].get(symbol)
+    if bad and bad.get('until', 0) > time.time():
+        return False, f"known bad ({bad.get('reason', 'no data')}) until {datetime.fromtimestamp(bad['until'], timezone.utc):%Y-%m-%d %H:%M} UTC"
+    record = index['symbols'].get(symbol)
+    if record and record.get('status') == 'delisted':
+        return False, f"delisted (last seen {record.get('last_seen', 'unknown')})"
+    return True, None
+
+
+def is_permanently_bad(symbol):
+    """True for a malformed symbol or one the directory lists as delisted (the negative cache expires, so it does not count)."""
+    if not symbol or not SYMBOL_PATTERN.match(symbol):
+        return True
+    record = lookup(symbol)
+    return bool(record and record.get('status') == 'delisted')
+
+
+def bad_until(symbol):
+    """Expiry (epoch) of the symbol's negative-cache entry, or None when it is not negative-cached."""
+    bad = load_index()['bad'].get(symbol)
+    return bad['until'] if bad and bad.get('until', 0) > time.time() else None
+
+
+def filter_symbols(symbols):
+    """Splits symbols into (usable, {symbol: reason}) with one index read."""
+    usable, rejected = [], {}
+    for symbol in symbols:
+        ok, reason = check_symbol(symbol)
+        if ok:
+            usable.append(symbol)
+        else:
+            rejected[symbol] = reason
+    return usable, rejected
+
+
+# ------------------ Updates ------------------
+def mark_bad(symbol, reason="no data", ttl_hours=None):
+    """Negative-caches a symbol for ttl_hours (BAD_SYMBOL_TTL_HOURS)."""
+    ttl_hours = BAD_SYMBOL_TTL_HOURS if ttl_hours is None else ttl_hours
+    until = time.time() + ttl_hours * 3600
+    try:
+        _update_index(lambda index: index['bad'].__setitem__(symbol, {'reason': reason, 'until': until}))
+    except OSError as e:
+        logger.warning(f"Could not record bad symbol {symbol}: {e}")
+
+
+def record_seen(symbol):
+    """Marks a symbol as having returned data today (clears any negative-cache entry)."""
+    index = load_index()
+    record = index['symbols'].get(symbol)
+    if symbol not in index['bad'] and record and record.get('last_seen') == _today() and record.get('status') == 'active':
+        return # Nothing to write
+
+    def mutate(index):
+        index['bad'].pop(symbol, None)
+        record = dict(index['symbols'].get(symbol) or {})
+        if record:
+            record.update(status='active', last_seen=_today())
+            index['symbols'][symbol] = record
+    try:
+        _update_index(mutate)
+    except OSError as e:
+        logger.warning(f"Could not record symbol {symbol} as seen: {e}")
+
+
+def _parse_directory(text, source):
+    """Rows of a NASDAQ Trader pipe-delimited file -> {symbol: record}. Test issues are skipped."""
+    lines = [line for line in text.splitlines() if line and not line.startswith('File Creation Time')]
+    if not lines:
+        return {}
+    header = lines[0].split('|')
+    records = {}
+    for line in lines[1:]:
+        row = dict(zip(header, line.split('|')))
+        if row.get('Test Issue') == 'Y':
+            continue
+        if 'nasdaqlisted' in source:
+            symbol, exchange = row.get('Symbol'), 'NASDAQ'
+        else:
+            symbol, exchange = row.get('ACT Symbol'), OTHER_EXCHANGES.get(row.get('Exchange'), row.get('Exchange'))
+        if not symbol:
+            continue
+        symbol = symbol.replace('.', '-') # CQS class suffix (BRK.B) -> Yahoo form (BRK-B)
+        records[symbol] = {'exchange': exchange, 'name': row.get('Security Name', ''), 'etf': row.get('ETF') == 'Y'}
+    return records
+
+
+def refresh_symbol_index(timeout=30):
+    """
+    Bulk refresh from the symbol directory. Listed symbols become 'active' (last_seen today); symbols
+    that were listed before but are missing now become 'delisted'. Returns (listed, newly_delisted).
+    """
+    import requests # Only needed for the refresh
+
+    listed = {}
+    for url in SYMBOL_DIRECTORY_URLS:
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+        listed.update(_parse_directory(response.text, url))
+    previous_active = sum(1 for r in load_index()['symbols'].values() if r.get('status') == 'active')
+    if previous_active and len(listed) < previous_active * MIN_REFRESH_FRACTION:
+        raise ValueError(f"Symbol directory returned {len(listed)} symbols (index has {previous_active}); refusing a partial refresh.")
+
+    today = _today()
+    delisted = []
+
+    def mutate(index):
+        symbols = index['symbols']
+        for symbol, record in symbols.items():
+            if symbol not in listed and record.get('status') == 'active':
+                symbols[symbol] = dict(record, status='delisted', delisted_on=today)
+                delisted.append(symbol)
+        for symbol, record in listed.items():
+            symbols[symbol] = dict(symbols.get(symbol) or {}, **record, status='active', last_seen=today)
+            symbols[symbol].pop('delisted_on', None)
+        now = time.time()
+        index['bad'] = {s: b for s, b in index['bad'].items() if b.get('until', 0) > now}
+        index['refreshed_at'] = now
+
+    _update_index(mutate)
+    logger.info(f"Symbol index refreshed: {len(listed)} listed, {len(delisted)} newly delisted.")
+    return len(listed), len(delisted)
+
+
+def refresh_if_stale(max_age_hours=None):
+    """Refreshes when the index is older than max_age_hours (SYMBOL_INDEX_MAX_AGE_HOURS). Errors are logged, not raised."""
+    max_age_hours = SYMBOL_INDEX_MAX_AGE_HOURS if max_age_hours is None else max_age_hours
+    if time.time() - load_index().get('refreshed_at', 0) < max_age_hours * 3600:
+        return False
+    try:
+        refresh_symbol_index()
+        return True
+    except Exception as e:
+        logger.warning(f"Symbol index refresh failed: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if '--refresh' in sys.argv:
+        print(refresh_symbol_index())
+    if '--check' in sys.argv:
+        for sym in sys.argv[sys.argv.index('--check') + 1:]:
+            ok, reason = check_symbol(sym.upper())
+            print(f"{sym.upper():<12} {'ok' if ok else reason}  {lookup(sym.upper()) or ''}")
@@ -1,6 +1,10 @@
 # technical_analysis.py 
+import os
+import hashlib
+from collections import OrderedDict
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 import numpy as np
 from datetime import timedelta # Import timedelta
@@ -11,6 +15,10 @@ matplotlib.use('Agg') # Use Agg backend for non-interactive plotting
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates # For date formatting
 
+# Point budgets: LTTB for line traces, calendar buckets for volume bars
+from downsampling import (downsample_lines, bucket_ohlcv, bucket_extremes,
+                          LINE_POINT_BUDGET, PLOTLY_POINT_BUDGET, BAR_BUDGET)
+
 # --- Calculation Functions (Keep as before) ---
 def calculate_rsi(data: pd.Series, window: int = 14) -> pd.Series:
     if data.isnull().all() or len(data) < window + 1: return pd.Series(index=data.index, dtype=float)
@@ -87,7 +95,7 @@ def _get_plot_data(df, plot_period_years=3):
     # Ensure 'Date' is datetime and sorted
     try:
         if not pd.api.types.is_datetime64_any_dtype(df['Date']):
-            df['Date'] = pd.to_datetime(df['Date'])
+            df = df.assign(Date=pd.to_datetime(df['Date']))
         df = df.sort_values('Date')
     except Exception as e:
         print(f"Error processing Date column: {e}")
@@ -104,64 +112,68 @@ def _get_plot_data(df, plot_period_years=3):
 
 
 # --- Plotly Helper for common layout elements (Keep as before - Used by Plotly functions) ---
-def _configure_indicator_layout(fig, title):
-    fig.update_layout(
-        title=dict(
-            text=title, y=0.98, x=0.5, xanchor='center', yanchor='top', font=dict(size=14)
-        ),
-        legend=dict(
-            orientation="h", yanchor="top", y=0.92, xanchor="center", x=0.5, font=dict(size=10)
-        ),
+# Shared Plotly layout, registered once as the "stock_report" template instead of being rebuilt per figure.
+# Only the parts of plotly_white these charts use are kept (its per-trace-type defaults and colorscales
+# are several KB that every figure's JSON would otherwise carry).
+REPORT_TEMPLATE_NAME = "stock_report"
+_PLOTLY_WHITE_KEYS = ('annotationdefaults', 'colorway', 'font', 'hoverlabel', 'hovermode', 'paper_bgcolor',
+                      'plot_bgcolor', 'shapedefaults', 'title', 'xaxis', 'yaxis')
+
+
+def _build_report_template():
+    white = pio.templates["plotly_white"].layout.to_plotly_json()
+    template = go.layout.Template(layout={k: v for k, v in white.items() if k in _PLOTLY_WHITE_KEYS})
+    template.layout.update(
+        title=dict(y=0.98, x=0.5, xanchor='center', yanchor='top', font=dict(size=14)),
+        legend=dict(orientation="h", yanchor="top", y=0.92, xanchor="center", x=0.5, font=dict(size=10)),
         margin=dict(l=35, r=25, t=100, b=40),
-        yaxis=dict(domain=[0, 0.78]), # Adjusted domain to leave space for range selector
-        template="plotly_white",
         autosize=True,
-        xaxis_rangeslider_visible=False,
-        xaxis_automargin=True,
-        yaxis_automargin=True
-    )
-    fig.update_xaxes(
-        domain=[0, 1],
-        rangeselector=dict(
-            buttons=list([
-                dict(count=1, label="1M", step="month", stepmode="backward"),
-                dict(count=3, label="3M", step="month", stepmode="backward"),
-                dict(count=6, label="6M", step="month", stepmode="backward"),
-                dict(count=1, label="YTD", step="year", stepmode="todate"),
-                dict(count=1, label="1Y", step="year", stepmode="backward"),
-                dict(count=3, label="3Y", step="year", stepmode="backward"),
-                dict(step="all", label="All") # Add 'All' button back
-            ]),
-            yanchor='top',
-            y=0.84, # Position below legend
-            xanchor='left',
-            x=0.01,
-            font_size=10
+        xaxis=dict(
+            type='date', # x is sent as epoch milliseconds (typed array), see _date_ms
+            domain=[0, 1],
+            rangeslider=dict(visible=False),
+            automargin=True,
+            rangeselector=dict(
+                buttons=[
+                    dict(count=1, label="1M", step="month", stepmode="backward"),
+                    dict(count=3, label="3M", step="month", stepmode="backward"),
+                    dict(count=6, label="6M", step="month", stepmode="backward"),
+                    dict(count=1, label="YTD", step="year", stepmode="todate"),
+                    dict(count=1, label="1Y", step="year", stepmode="backward"),
+                    dict(count=3, label="3Y", step="year", stepmode="backward"),
+                    dict(step="all", label="All")
+                ],
+                yanchor='top', y=0.84, xanchor='left', x=0.01, font_size=10 # Below the legend
+            ),
+            tickfont=dict(size=10)
         ),
-        tickfont=dict(size=10)
+        yaxis=dict(domain=[0, 0.78], automargin=True, tickfont=dict(size=10)) # Leaves room for the range selector
     )
-    fig.update_yaxes(tickfont=dict(size=10))
+    return template
+
+pio.templates[REPORT_TEMPLATE_NAME] = _build_report_template()
+
+
+def _date_ms(dates):
+    """Dates as float64 epoch milliseconds: serialized as a binary typed array instead of ISO strings."""
+    return pd.to_datetime(dates).to_numpy(dtype='datetime64[ms]').astype(np.int64).astype(np.float64)
+
 
-    # Set initial visible range (last 1 year) - Keep this logic for initial zoom
-    if fig.data and len(fig.data[0].x) > 0:
-         last_date_in_data = fig.data[0].x[-1]
-         first_date_in_data = fig.data[0].x[0]
-         # Ensure last_date is a Timestamp for comparison/offset
-         if not isinstance(last_date_in_data, pd.Timestamp):
-             try: last_date_in_data = pd.to_datetime(last_date_in_data)
-             except: pass # Keep original if conversion fails
+def _values(series):
+    """Trace values as float32 typed arrays (half the bytes of float64; no visible difference)."""
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float32)
 
-         default_start = first_date_in_data # Default to start of data
-         if isinstance(last_date_in_data, pd.Timestamp):
-             one_year_back = last_date_in_data - pd.DateOffset(years=1)
-             # Make sure one_year_back is not before first_date
-             default_start = max(first_date_in_data, one_year_back)
 
-         # Ensure start date is not after end date
-         if default_start > last_date_in_data:
-             default_start = first_date_in_data
+def _configure_indicator_layout(fig, title):
+    """Applies the shared template and title, and zooms to the last year of the first trace."""
+    fig.update_layout(template=REPORT_TEMPLATE_NAME, title_text=title)
 
-         fig.update_xaxes(range=[default_start, last_date_in_data])
+    # Set initial visible range (last 1 year); x values are epoch ms
+    if fig.data and fig.data[0].x is not None and len(fig.data[0].x) > 0:
+        first_date_in_data = pd.Timestamp(float(fig.data[0].x[0]), unit='ms')
+        last_date_in_data = pd.Timestamp(float(fig.data[0].x[-1]), unit='ms')
+        default_start = max(first_date_in_data, last_date_in_data - pd.DateOffset(years=1))
+        fig.update_xaxes(range=[default_start.strftime('%Y-%m-%d'), last_date_in_data.strftime('%Y-%m-%d')])
 
     return fig
 
@@ -172,19 +184,22 @@ def plot_price_bollinger(df, ticker, plot_period_years=3):
     """Plots Price and Bollinger Bands for the specified period."""
     if len(df) < 20: return None, "Insufficient data for Bollinger Bands."
     # Calculate on full df first
+    df = df.copy() # Work on a copy so the caller's frame is not modified
     df['BB_Upper'], df['BB_Middle'], df['BB_Lower'] = calculate_bollinger_bands(df['Close'])
     # Get data for the plotting period
     df_plot_range = _get_plot_data(df, plot_period_years)
     df_plot = df_plot_range.dropna(subset=['BB_Upper', 'BB_Middle', 'BB_Lower', 'Close']) # Ensure all needed cols are present
 
     if df_plot.empty: return None, "Bollinger Bands could not be calculated for the selected period."
+    df_plot = downsample_lines(df_plot, 'Date', ['BB_Upper', 'BB_Lower', 'BB_Middle', 'Close'], PLOTLY_POINT_BUDGET)
 
     fig = go.Figure()
+    x_dates = _date_ms(df_plot['Date']) # Shared by all four traces
     # Plot using df_plot (limited range)
-    fig.add_trace(go.Scatter(x=df_plot['Date'], y=df_plot['BB_Upper'], line=dict(color='rgba(211, 211, 211, 0.8)', width=1.5), name='Upper Band'))
-    fig.add_trace(go.Scatter(x=df_plot['Date'], y=df_plot['BB_Lower'], line=dict(color='rgba(211, 211, 211, 0.8)', width=1.5), fill='tonexty', fillcolor='rgba(211, 211, 211, 0.1)', name='Lower Band'))
-    fig.add_trace(go.Scatter(x=df_plot['Date'], y=df_plot['BB_Middle'], name='SMA20', line=dict(color='#ff7f0e', width=1.5, dash='dash')))
-    fig.add_trace(go.Scatter(x=df_plot['Date'], y=df_plot['Close'], name='Close', line=dict(color='#00008B', width=2)))
+    fig.add_trace(go.Scatter(x=x_dates, y=_values(df_plot['BB_Upper']), line=dict(color='rgba(211, 211, 211, 0.8)', width=1.5), name='Upper Band'))
+    fig.add_trace(go.Scatter(x=x_dates, y=_values(df_plot['BB_Lower']), line=dict(color='rgba(211, 211, 211, 0.8)', width=1.5), fill='tonexty', fillcolor='rgba(211, 211, 211, 0.1)', name='Lower Band'))
+    fig.add_trace(go.Scatter(x=x_dates, y=_values(df_plot['BB_Middle']), name='SMA20', line=dict(color='#ff7f0e', width=1.5, dash='dash')))
+    fig.add_trace(go.Scatter(x=x_dates, y=_values(df_plot['Close']), name='Close', line=dict(color='#00008B', width=2)))
 
     fig = _configure_indicator_layout(fig, f'{ticker} Price & Bollinger Bands ({plot_period_years}Y)')
     fig.update_yaxes(title_text="Price")
@@ -204,16 +219,18 @@ def plot_rsi(df, ticker, plot_period_years=3):
     """Plots RSI for the specified period."""
     if len(df) < 15: return None, "Insufficient data for RSI (14)."
     # Calculate on full df
+    df = df.copy() # Work on a copy so the caller's frame is not modified
     df['RSI'] = calculate_rsi(df['Close'])
      # Get data for the plotting period
     df_plot_range = _get_plot_data(df, plot_period_years)
     df_plot = df_plot_range.dropna(subset=['RSI']) # Ensure RSI is present
 
     if df_plot.empty: return None, "RSI could not be calculated for the selected period."
+    df_plot = downsample_lines(df_plot, 'Date', ['RSI'], PLOTLY_POINT_BUDGET)
 
     fig = go.Figure()
     # Plot using df_plot
-    fig.add_trace(go.Scatter(x=df_plot['Date'], y=df_plot['RSI'], name='RSI', line=dict(color='#8A2BE2', width=2)))
+    fig.add_trace(go.Scatter(x=_date_ms(df_plot['Date']), y=_values(df_plot['RSI']), name='RSI', line=dict(color='#8A2BE2', width=2)))
     fig.add_hline(y=70, line_dash="dash", line_color="#DC143C", opacity=0.8, annotation_text="Overbought (70)", annotation_position="bottom right")
     fig.add_hline(y=30, line_dash="dash", line_color="#228B22", opacity=0.8, annotation_text="Oversold (30)", annotation_position="bottom right")
 
@@ -230,17 +247,20 @@ def plot_macd_lines(df, ticker, plot_period_years=3):
     """Plots MACD Line vs Signal Line for the specified period."""
     if len(df) < 35: return None, "Insufficient data for MACD (12, 26, 9)."
     # Calculate on full df
+    df = df.copy() # Work on a copy so the caller's frame is not modified
     df['MACD_Line'], df['MACD_Signal'], df['MACD_Hist'] = calculate_macd(df['Close'])
     # Get data for plotting period
     df_plot_range = _get_plot_data(df, plot_period_years)
     df_plot = df_plot_range.dropna(subset=['MACD_Line', 'MACD_Signal']) # Ensure lines are present
 
     if len(df_plot) < 2: return None, "Insufficient valid MACD Line/Signal data for the selected period."
+    df_plot = downsample_lines(df_plot, 'Date', ['MACD_Line', 'MACD_Signal'], PLOTLY_POINT_BUDGET)
 
     fig = go.Figure()
+    x_dates = _date_ms(df_plot['Date'])
     # Plot using df_plot
-    fig.add_trace(go.Scatter(x=df_plot['Date'], y=df_plot['MACD_Line'], name='MACD Line', line=dict(color='#191970', width=2)))
-    fig.add_trace(go.Scatter(x=df_plot['Date'], y=df_plot['MACD_Signal'], name='Signal Line', line=dict(color='#FF4500', width=2)))
+    fig.add_trace(go.Scatter(x=x_dates, y=_values(df_plot['MACD_Line']), name='MACD Line', line=dict(color='#191970', width=2)))
+    fig.add_trace(go.Scatter(x=x_dates, y=_values(df_plot['MACD_Signal']), name='Signal Line', line=dict(color='#FF4500', width=2)))
     fig.add_hline(y=0, line_dash="dash", line_color="grey", opacity=0.5)
 
     fig = _configure_indicator_layout(fig, f'MACD Line vs Signal Line ({plot_period_years}Y)')
@@ -259,6 +279,7 @@ def plot_macd_histogram(df, ticker, plot_period_years=3):
     """Plots MACD Histogram for the specified period."""
     if len(df) < 35: return None, "Insufficient data for MACD (12, 26, 9)."
     # Ensure MACD is calculated on full df
+    df = df.copy() # Work on a copy so the caller's frame is not modified
     if 'MACD_Hist' not in df.columns:
         df['MACD_Line'], df['MACD_Signal'], df['MACD_Hist'] = calculate_macd(df['Close'])
 
@@ -267,11 +288,14 @@ def plot_macd_histogram(df, ticker, plot_period_years=3):
     df_plot = df_plot_range.dropna(subset=['MACD_Hist']) # Ensure histogram is present
 
     if len(df_plot) < 2: return None, "Insufficient valid MACD Histogram data for the selected period."
+    df_plot = bucket_extremes(df_plot, 'MACD_Hist', PLOTLY_POINT_BUDGET) # Keeps the tallest bar per bucket
 
     fig = go.Figure()
     # Plot using df_plot
-    colors = np.where(df_plot['MACD_Hist'] < 0, '#DC143C', '#228B22') # Red / Green
-    fig.add_trace(go.Bar(x=df_plot['Date'], y=df_plot['MACD_Hist'], name='MACD Hist', marker_color=colors))
+    # Red / Green via a two-colour scale over a uint8 typed array (1 byte per bar instead of a colour string)
+    positive = (df_plot['MACD_Hist'] >= 0).to_numpy(dtype=np.uint8)
+    fig.add_trace(go.Bar(x=_date_ms(df_plot['Date']), y=_values(df_plot['MACD_Hist']), name='MACD Hist',
+                         marker=dict(color=positive, colorscale=[[0, '#DC143C'], [1, '#228B22']], cmin=0, cmax=1)))
 
     fig = _configure_indicator_layout(fig, f'MACD Histogram ({plot_period_years}Y)')
     fig.update_yaxes(title_text="Histogram Value")
@@ -287,17 +311,22 @@ def plot_macd_histogram(df, ticker, plot_period_years=3):
 
 def plot_historical_line_chart(df, ticker):
     """Plots Historical Price and Volume."""
+    df = df.copy() # Work on a copy so the caller's frame is not modified
     df['Date'] = pd.to_datetime(df['Date'])
     df = df.sort_values('Date')
     fig = make_subplots(specs=[[{"secondary_y": True}]])
 
-    fig.add_trace(go.Scatter(x=df['Date'], y=df['Close'], name='Close', line=dict(color='#00008B', width=2)), secondary_y=False)
+    df_close = downsample_lines(df, 'Date', ['Close'], PLOTLY_POINT_BUDGET) # Full history: thin to the budget
+    fig.add_trace(go.Scatter(x=_date_ms(df_close['Date']), y=_values(df_close['Close']), name='Close', line=dict(color='#00008B', width=2)), secondary_y=False)
 
     # Calculate Volume SMA on the full df
     if 'Volume' in df.columns and not df['Volume'].isnull().all():
         df['Volume_SMA20'] = calculate_volume_sma(df, 20) # Calculate on full df
-        fig.add_trace(go.Bar(x=df['Date'], y=df['Volume'], name='Volume', marker_color='#FF8C00', opacity=0.35), secondary_y=True)
-        fig.add_trace(go.Scatter(x=df['Date'], y=df['Volume_SMA20'], name='Volume SMA20', line=dict(color='#8B4513', width=1.5, dash='dot')), secondary_y=True)
+        bars = bucket_ohlcv(df, PLOTLY_POINT_BUDGET) # Mean daily volume per calendar bucket, left-aligned
+        fig.add_trace(go.Bar(x=_date_ms(bars['Date']), y=_values(bars['Volume']), width=(bars['Width'] * 86400000 * 0.9).to_numpy(dtype=np.float32), offset=0,
+                             name='Volume', marker_color='#FF8C00', opacity=0.35), secondary_y=True)
+        df_sma = downsample_lines(df, 'Date', ['Volume_SMA20'], PLOTLY_POINT_BUDGET)
+        fig.add_trace(go.Scatter(x=_date_ms(df_sma['Date']), y=_values(df_sma['Volume_SMA20']), name='Volume SMA20', line=dict(color='#8B4513', width=1.5, dash='dot')), secondary_y=True)
         fig.update_yaxes(title_text="Volume", secondary_y=True, domain=[0, 0.78], showgrid=False, title_font_size=10, tickfont_size=10, automargin=True)
 
     fig.update_yaxes(title_text="Price ($)", secondary_y=False, domain=[0, 0.78], title_font_size=10, tickfont_size=10, automargin=True)
@@ -308,6 +337,48 @@ def plot_historical_line_chart(df, ticker):
 
     return fig
 
+# --- Serialized Plotly figures, cached by data fingerprint ---
+PLOTLY_CHARTS = {
+    'price_bollinger': plot_price_bollinger,
+    'rsi': plot_rsi,
+    'macd_lines': plot_macd_lines,
+    'macd_histogram': plot_macd_histogram,
+    'historical': plot_historical_line_chart, # Whole history; plot_period_years is ignored
+}
+PLOTLY_JSON_CACHE_SIZE = int(os.getenv("PLOTLY_JSON_CACHE_SIZE", "128"))
+_figure_json_cache = OrderedDict() # (chart, ticker, years, fingerprint) -> (json, conclusion), LRU
+
+
+def frame_fingerprint(df, columns=('Date', 'Open', 'High', 'Low', 'Close', 'Volume')):
+    """Short content hash of the price columns a chart is drawn from."""
+    cols = [c for c in columns if c in df.columns]
+    hashed = pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+    return hashlib.sha1(hashed.tobytes()).hexdigest()[:16]
+
+
+def get_figure_json(chart, df, ticker, plot_period_years=3):
+    """
+    Returns (figure_json, conclusion) for a chart in PLOTLY_CHARTS. figure_json is None if the chart
+    cannot be drawn. The same data gives the cached JSON without building or serializing the figure again.
+    """
+    if chart not in PLOTLY_CHARTS:
+        raise ValueError(f"Unknown chart '{chart}'. Available: {', '.join(PLOTLY_CHARTS)}")
+    key = (chart, ticker, plot_period_years, frame_fingerprint(df))
+    cached = _figure_json_cache.get(key)
+    if cached is not None:
+        _figure_json_cache.move_to_end(key)
+        return cached
+
+    if chart == 'historical':
+        fig, conclusion = plot_historical_line_chart(df, ticker), None
+    else:
+        fig, conclusion = PLOTLY_CHARTS[chart](df, ticker, plot_period_years)
+    result = (fig.to_json() if fig is not None else None, conclusion)
+    _figure_json_cache[key] = result
+    while len(_figure_json_cache) > PLOTLY_JSON_CACHE_SIZE:
+        _figure_json_cache.popitem(last=False)
+    return result
+
 # --- Function to calculate additional indicators for summary (Keep as before) ---
 def calculate_detailed_ta(df):
     """Calculates additional indicators for the summary report."""
@@ -414,6 +485,7 @@ def calculate_detailed_ta(df):
 
 def plot_historical_mpl(df, ticker, plot_period_years=3):
     """Plots Historical Price and Volume using Matplotlib."""
+    df = df.copy() # Work on a copy so the caller's frame is not modified
     df['Date'] = pd.to_datetime(df['Date'])
     df = df.sort_values('Date')
 
@@ -430,7 +502,8 @@ def plot_historical_mpl(df, ticker, plot_period_years=3):
     color_price = 'navy' # Dark blue
     ax1.set_xlabel('Date')
     ax1.set_ylabel('Price ($)', color=color_price)
-    ax1.plot(df_plot['Date'], df_plot['Close'], color=color_price, linewidth=1.5, label='Close Price')
+    df_close = downsample_lines(df_plot, 'Date', ['Close'], LINE_POINT_BUDGET)
+    ax1.plot(df_close['Date'], df_close['Close'], color=color_price, linewidth=1.5, label='Close Price')
     ax1.tick_params(axis='y', labelcolor=color_price)
     ax1.grid(True, axis='y', linestyle='--', alpha=0.6)
 
@@ -442,10 +515,12 @@ def plot_historical_mpl(df, ticker, plot_period_years=3):
     # Calculate Volume SMA on the plotted data range
     if 'Volume' in df_plot.columns and not df_plot['Volume'].isnull().all():
         df_plot['Volume_SMA20'] = calculate_volume_sma(df_plot, 20) # Calculate on plot data
-        ax2.bar(df_plot['Date'], df_plot['Volume'], color=color_volume, alpha=0.3, width=1.0, label='Volume') # Adjust width as needed
+        bars = bucket_ohlcv(df_plot, BAR_BUDGET) # Calendar buckets, mean daily volume
+        ax2.bar(bars['Date'], bars['Volume'], color=color_volume, alpha=0.3, width=bars['Width'] * 0.9, align='edge', label='Volume')
         # Plot Volume SMA only if calculated
         if not df_plot['Volume_SMA20'].isnull().all():
-             ax2.plot(df_plot['Date'], df_plot['Volume_SMA20'], color='saddlebrown', linewidth=1, linestyle='dotted', label='Volume SMA20')
+             df_sma = downsample_lines(df_plot, 'Date', ['Volume_SMA20'], LINE_POINT_BUDGET)
+             ax2.plot(df_sma['Date'], df_sma['Volume_SMA20'], color='saddlebrown', linewidth=1, linestyle='dotted', label='Volume SMA20')
     ax2.tick_params(axis='y', labelcolor=color_volume)
     ax2.set_ylim(bottom=0) # Volume starts at 0
 
@@ -467,12 +542,14 @@ def plot_bollinger_mpl(df, ticker, plot_period_years=3):
     """Plots Price and Bollinger Bands using Matplotlib."""
     if len(df) < 20: return None
     # Calculate on full df first
+    df = df.copy() # Work on a copy so the caller's frame is not modified
     df['BB_Upper'], df['BB_Middle'], df['BB_Lower'] = calculate_bollinger_bands(df['Close'])
     # Get data for the plotting period
     df_plot = _get_plot_data(df.copy(), plot_period_years)
     df_plot = df_plot.dropna(subset=['BB_Upper', 'BB_Middle', 'BB_Lower', 'Close'])
 
     if df_plot.empty: return None
+    df_plot = downsample_lines(df_plot, 'Date', ['BB_Upper', 'BB_Lower', 'BB_Middle', 'Close'], LINE_POINT_BUDGET)
 
     fig, ax = plt.subplots(figsize=(12, 6))
 
@@ -500,12 +577,14 @@ def plot_rsi_mpl(df, ticker, plot_period_years=3):
     """Plots RSI using Matplotlib."""
     if len(df) < 15: return None
     # Calculate on full df
+    df = df.copy() # Work on a copy so the caller's frame is not modified
     df['RSI'] = calculate_rsi(df['Close'])
     # Get data for the plotting period
     df_plot = _get_plot_data(df.copy(), plot_period_years)
     df_plot = df_plot.dropna(subset=['RSI'])
 
     if df_plot.empty: return None
+    df_plot = downsample_lines(df_plot, 'Date', ['RSI'], LINE_POINT_BUDGET)
 
     fig, ax = plt.subplots(figsize=(12, 4)) # Smaller height for indicator
 
@@ -532,12 +611,14 @@ def plot_macd_lines_mpl(df, ticker, plot_period_years=3):
     """Plots MACD Line vs Signal Line using Matplotlib."""
     if len(df) < 35: return None
     # Calculate on full df
+    df = df.copy() # Work on a copy so the caller's frame is not modified
     df['MACD_Line'], df['MACD_Signal'], _ = calculate_macd(df['Close'])
     # Get data for plotting period
     df_plot = _get_plot_data(df.copy(), plot_period_years)
     df_plot = df_plot.dropna(subset=['MACD_Line', 'MACD_Signal'])
 
     if len(df_plot) < 2: return None
+    df_plot = downsample_lines(df_plot, 'Date', ['MACD_Line', 'MACD_Signal'], LINE_POINT_BUDGET)
 
     fig, ax = plt.subplots(figsize=(12, 4)) # Smaller height
 
@@ -563,6 +644,7 @@ def plot_macd_hist_mpl(df, ticker, plot_period_years=3):
     """Plots MACD Histogram using Matplotlib."""
     if len(df) < 35: return None
     # Ensure MACD is calculated on full df
+    df = df.copy() # Work on a copy so the caller's frame is not modified
     if 'MACD_Hist' not in df.columns:
         _, _, df['MACD_Hist'] = calculate_macd(df['Close'])
 
@@ -571,6 +653,7 @@ def plot_macd_hist_mpl(df, ticker, plot_period_years=3):
     df_plot = df_plot.dropna(subset=['MACD_Hist'])
 
     if len(df_plot) < 2: return None
+    df_plot = bucket_extremes(df_plot, 'MACD_Hist', BAR_BUDGET)
 
     fig, ax = plt.subplots(figsize=(12, 4)) # Smaller height
 
@@ -579,8 +662,9 @@ def plot_macd_hist_mpl(df, ticker, plot_period_years=3):
     # Use date index directly for bars if 'Date' is datetime
     if pd.api.types.is_datetime64_any_dtype(df_plot['Date']):
         # Estimate bar width based on date frequency (might need adjustment)
-        date_diffs = df_plot['Date'].diff().median()
-        bar_width = date_diffs.days * 0.8 if date_diffs else 0.8 # Adjust factor as needed
+        # Mean spacing: after bucketing the kept bars are unevenly spaced
+        date_span_days = (df_plot['Date'].iloc[-1] - df_plot['Date'].iloc[0]).days
+        bar_width = date_span_days / max(len(df_plot) - 1, 1) * 0.8
         ax.bar(df_plot['Date'], df_plot['MACD_Hist'], color=colors, width=bar_width, label='MACD Histogram')
     else: # Fallback if 'Date' is not datetime
         ax.bar(range(len(df_plot)), df_plot['MACD_Hist'], color=colors, label='MACD Histogram')
@@ -0,0 +1,247 @@
+# ticker_sources.py
+# Index of ticker lists parsed from the Excel workbook (EXCEL_FILE_PATH). Parsing an xlsx through
+# openpyxl is slow, so each sheet's normalized ticker list is stored in
+# data_cache/ticker_source_index.json keyed by (path, mtime, size, ticker column, sheet) and reused
+# until the file changes. Sheets that do need parsing are read in a single workbook open, so a
+# multi-profile run opens the workbook at most once.
+# Uploaded ticker files (portal "Run now") are streamed: only the ticker column is read and symbols
+# are validated and de-duplicated on the fly, so a large upload never becomes a full DataFrame.
+import io
+import os
+import csv
+import json
+import codecs
+import logging
+import threading
+
+from symbol_index import SYMBOL_PATTERN
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.getenv("TICKER_SOURCE_INDEX", os.path.join(APP_ROOT, "data_cache", "ticker_source_index.json"))
+DEFAULT_TICKER_COLUMN = "Keyword"
+
+_index_lock = threading.Lock()
+_index_cache = {'mtime': None, 'data': {}}
+
+
+def normalize_tickers(values):
+    """Same normalization the Excel/upload loaders always used: drop blanks, strip, upper-case."""
+    import pandas as pd # Imported on use: the portal imports this module at startup
+    return pd.Series(values, dtype=object).dropna().astype(str).str.strip().str.upper().tolist()
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return {'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+
+
+# ------------------ Index ------------------
+def load_index():
+    """{abs_path: {'mtime_ns', 'size', 'columns': {column: {sheet: [tickers]}}}}; re-read only when the file changes."""
+    try:
+        mtime = os.path.getmtime(INDEX_PATH)
+    except OSError:
+        return {}
+    if _index_cache['mtime'] != mtime:
+        try:
+            with open(INDEX_PATH, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read ticker source index {INDEX_PATH}: {e}")
+            data = {}
+        _index_cache.update(mtime=mtime, data=data)
+    return _index_cache['data']
+
+
+def _store_sheets(path, signature, column, parsed):
+    """Merges freshly parsed sheets into the index (dropping entries of an older file version) and swaps it in."""
+    with _index_lock:
+        index = dict(load_index())
+        entry = index.get(path)
+        if not entry or entry.get('mtime_ns') != signature['mtime_ns'] or entry.get('size') != signature['size']:
+            entry = dict(signature, columns={})
+        else:
+            entry = dict(entry, columns=dict(entry.get('columns') or {}))
+        entry['columns'][column] = dict(entry['columns'].get(column) or {}, **parsed)
+        index[path] = entry
+        os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+        tmp_path = f"{INDEX_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(tmp_path, INDEX_PATH)
+        _index_cache.update(mtime=os.path.getmtime(INDEX_PATH), data=index)
+
+
+def _indexed_sheets(path, signature, column):
+    entry = load_index().get(path)
+    if not entry or entry.get('mtime_ns') != signature['mtime_ns'] or entry.get('size') != signature['size']:
+        return {}
+    return (entry.get('columns') or {}).get(column) or {}
+
+
+# ------------------ Public API ------------------
+def get_sheet_tickers(sheet_names, excel_path=None, ticker_column=None):
+    """
+    {sheet: [tickers]} for the requested sheets. Unchanged sheets come from the index; the rest are
+    parsed together in one workbook open (only the ticker column is read). Sheets that are missing or
+    lack the column are logged and left out (and not indexed, so a fixed workbook is picked up).
+    """
+    excel_path = excel_path or os.getenv("EXCEL_FILE_PATH")
+    ticker_column = ticker_column or os.getenv("EXCEL_TICKER_COLUMN_NAME", DEFAULT_TICKER_COLUMN)
+    sheet_names = [s for s in dict.fromkeys(sheet_names) if s]
+    if not sheet_names:
+        return {}
+    if not excel_path or not os.path.exists(excel_path):
+        logger.error(f"EXCEL_FILE_PATH not set or file not found: {excel_path}")
+        return {}
+    path = os.path.abspath(excel_path)
+    signature = _file_signature(path)
+    indexed = _indexed_sheets(path, signature, ticker_column)
+    result = {s: indexed[s] for s in sheet_names if s in indexed}
+    missing = [s for s in sheet_names if s not in result]
+    if not missing:
+        return result
+
+    import pandas as pd
+    parsed = {}
+    try:
+        with pd.ExcelFile(path) as workbook:
+            for sheet in missing:
+                if sheet not in workbook.sheet_names:
+                    logger.error(f"Sheet '{sheet}' not found in '{path}'.")
+                    continue
+                df = workbook.parse(sheet, usecols=lambda col: str(col).strip() == ticker_column)
+                if df.shape[1] == 0:
+                    logger.error(f"Ticker column '{ticker_column}' not found in sheet '{sheet}' of '{path}'.")
+                    continue
+                parsed[sheet] = normalize_tickers(df.iloc[:, 0])
+    except Exception as e:
+        logger.error(f"Excel read error for '{path}' (sheets {missing}): {e}")
+    if parsed:
+        if _file_signature(path) == signature: # Not rewritten while we were reading it
+            _store_sheets(path, signature, ticker_column, parsed)
+        logger.info(f"Parsed {len(parsed)} sheet(s) from '{os.path.basename(path)}': "
+                    + ", ".join(f"{s} ({len(t)})" for s, t in parsed.items()))
+    result.update(parsed)
+    return result
+
+
+# ------------------ Uploaded Files ------------------
+UPLOAD_TICKER_COLUMNS = frozenset({'ticker', 'tickers', 'symbol', 'symbols', 'keyword', 'keywords'})
+MAX_UPLOAD_TICKERS = int(os.getenv("MAX_UPLOAD_TICKERS", "5000"))
+UPLOAD_CHUNK_ROWS = 2000
+TICKER_PATTERN = SYMBOL_PATTERN # Format check only; listing status is checked by the run
+
+
+def _ticker_column_index(header):
+    """Position of the first ticker-like column; ValueError if there is none."""
+    for i, name in enumerate(header):
+        if name is not None and str(name).strip().lower() in UPLOAD_TICKER_COLUMNS:
+            return i
+    raise ValueError(f"No ticker column found. Checked for: {sorted(UPLOAD_TICKER_COLUMNS)}; header: {list(header)}")
+
+
+def _text_stream(stream):
+    """Wraps a binary upload as text: utf-8 unless the first block is not valid utf-8, then latin1. No full read."""
+    head = stream.read(64 * 1024)
+    stream.seek(0)
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        encoding = 'latin1'
+    return io.TextIOWrapper(stream, encoding=encoding, errors='replace', newline='')
+
+
+def _iter_csv_column(stream):
+    import pandas as pd
+    text = _text_stream(stream)
+    try:
+        first_line = text.readline()
+        try:
+            delimiter = csv.Sniffer().sniff(first_line, delimiters=',;\t|').delimiter
+        except csv.Error:
+            delimiter = ','
+        header = next(csv.reader([first_line], delimiter=delimiter), [])
+        idx = _ticker_column_index(header)
+        # Only the ticker column is parsed, a chunk of rows at a time
+        for chunk in pd.read_csv(text, header=None, usecols=[idx], sep=delimiter, dtype=str, keep_default_na=False,
+                                 chunksize=UPLOAD_CHUNK_ROWS, on_bad_lines='skip'):
+            yield from chunk.iloc[:, 0]
+    finally:
+        text.detach() # Leave the caller's stream open
+
+
+def _iter_xlsx_column(stream):
+    import pandas as pd
+    try:
+        import openpyxl
+    except ImportError: # pandas needs an Excel engine anyway; fall back to it
+        df = pd.read_excel(stream, dtype=str)
+        idx = _ticker_column_index(df.columns)
+        yield from df.iloc[:, idx]
+        return
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True) # Streams rows, no full sheet in memory
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, ())
+        idx = _ticker_column_index(header)
+        for row in rows:
+            if idx < len(row):
+                yield row[idx]
+    finally:
+        workbook.close()
+
+
+def _iter_xls_column(stream):
+    import pandas as pd
+    df = pd.read_excel(stream, dtype=str) # Legacy .xls: no streaming reader, but these files are small
+    idx = _ticker_column_index(df.columns)
+    yield from df.iloc[:, idx]
+
+
+def read_upload_tickers(stream, filename, max_tickers=None):
+    """
+    Tickers from an uploaded csv/xlsx/xls file object, in file order. Only the ticker column
+    (Ticker/Symbol/Keyword, singular or plural, any case) is read; values are normalized, validated
+    and de-duplicated while streaming. Returns (tickers, stats) with stats
+    {'rows', 'invalid', 'duplicates', 'truncated', 'error'}.
+    """
+    max_tickers = MAX_UPLOAD_TICKERS if max_tickers is None else max_tickers
+    stats = {'rows': 0, 'invalid': 0, 'duplicates': 0, 'truncated': False, 'error': None}
+    name = filename.lower()
+    if name.endswith('.csv'):
+        values = _iter_csv_column(stream)
+    elif name.endswith('.xlsx'):
+        values = _iter_xlsx_column(stream)
+    elif name.endswith('.xls'):
+        values = _iter_xls_column(stream)
+    else:
+        stats['error'] = f"Unsupported file type: {filename}"
+        return [], stats
+
+    tickers, seen = [], set()
+    try:
+        for value in values:
+            if value is None or value == '':
+                continue
+            stats['rows'] += 1
+            ticker = str(value).strip().upper()
+            if not TICKER_PATTERN.match(ticker):
+                stats['invalid'] += 1
+                continue
+            if ticker in seen:
+                stats['duplicates'] += 1
+                continue
+            if len(tickers) >= max_tickers:
+                stats['truncated'] = True
+                break
+            seen.add(ticker)
+            tickers.append(ticker)
+    except Exception as e: # Includes the missing-ticker-column ValueError
+        stats['error'] = f"Could not read '{filename}': {e}"
+    finally:
+        values.close()
+    return tickers, stats
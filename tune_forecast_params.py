@@ -0,0 +1,132 @@
+# tune_forecast_params.py
+# Offline per-ticker hyperparameter search for the forecast engines. Candidates are scored with the
+# rolling-origin backtest (forecast_backtest) and pruned by successive halving: every candidate is
+# fitted at the most recent origin, only the best 1/eta go on to the next (older) origin, and a
+# ticker stops as soon as one candidate is left. The winners go into the params store
+# (forecast_engines.PARAMS_STORE_PATH), which train_prophet_model / the NumPy engine read at runtime.
+# Usage: python tune_forecast_params.py [--engine prophet] [--samples 12] [--origins 3] [--eta 3]
+#                                       [--horizon 3m] [--workers N] [--dry-run] [TICKER ...]
+import math
+import time
+import random
+import argparse
+import logging
+import itertools
+import numpy as np
+
+from forecast_backtest import cached_history_paths, load_history, rolling_origins, run_backtest, DATA_CACHE_DIR
+from forecast_engines import parse_time_period, save_tuned_params, PARAMS_STORE_PATH
+
+logger = logging.getLogger(__name__)
+
+SEARCH_SPACE = {
+    'prophet': {
+        'changepoint_prior_scale': [0.01, 0.03, 0.05, 0.08, 0.15, 0.3],
+        'seasonality_mode': ['additive', 'multiplicative'],
+        'cap_multiplier': [1.5, 2.0, 2.5, 3.0],
+    },
+    'numpy': {
+        'window_days': [365, 730, 1095],
+        'trend_damping': [0.99, 0.995, 0.998, 1.0],
+        'yearly_order': [0, 2, 3],
+        'cap_multiplier': [1.5, 2.0, 3.0],
+    },
+}
+
+
+def candidate_params(space, n_samples=None, seed=0):
+    """Full grid over the search space, or a reproducible random sample of n_samples from it."""
+    keys = sorted(space)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+    if n_samples and n_samples < len(grid):
+        grid = random.Random(seed).sample(grid, n_samples)
+    return grid
+
+
+def tune(paths, engine, candidates, horizon="3m", n_origins=3, step="1m", eta=3, workers=None):
+    """
+    Successive-halving search per ticker. All tickers still in play are evaluated in the same
+    pool round. Returns ticker -> {'params', 'mape', 'coverage', 'fit_seconds', 'origins', 'fits'}.
+    """
+    horizon_days, step_days = parse_time_period(horizon), parse_time_period(step)
+    origins = {t: rolling_origins(load_history(p)['Date'], horizon_days, n_origins, step_days)[::-1] # Newest first
+               for t, p in paths.items()}
+    alive = {t: list(range(len(candidates))) for t in paths if origins[t]}
+    scores = {t: {i: [] for i in range(len(candidates))} for t in alive}
+    fits = {t: 0 for t in alive}
+
+    for round_idx in range(n_origins):
+        tasks = []
+        for ticker, cands in alive.items():
+            if round_idx >= len(origins[ticker]) or (round_idx > 0 and len(cands) == 1):
+                continue # Early stop: out of origins, or a single candidate left
+            origin = origins[ticker][round_idx].strftime('%Y-%m-%d')
+            for i in cands:
+                tasks.append({'path': paths[ticker], 'ticker': ticker, 'engine': engine, 'param_set': str(i),
+                              'params': candidates[i], 'origin': origin, 'horizon': horizon,
+                              'use_tuned': False}) # Candidates must not inherit keys from the previous tuning run
+        if not tasks:
+            break
+        logger.info(f"Round {round_idx + 1}: {len(tasks)} fits across {len({t['ticker'] for t in tasks})} tickers")
+        for row in run_backtest(tasks, workers).to_dict('records'):
+            ticker, i = row['ticker'], int(row['param_set'])
+            fits[ticker] += 1
+            # A failed fit counts as infinitely bad so the candidate is pruned
+            scores[ticker][i].append((np.inf if row['error'] else row['mape'], row['coverage'], row['fit_seconds']))
+
+        for ticker, cands in alive.items():
+            ranked = sorted(cands, key=lambda i: _rank_key(scores[ticker][i]))
+            alive[ticker] = ranked[:max(1, math.ceil(len(ranked) / eta))]
+
+    results = {}
+    for ticker, cands in alive.items():
+        best = min(cands, key=lambda i: _rank_key(scores[ticker][i]))
+        mapes, coverages, seconds = zip(*scores[ticker][best])
+        if not np.isfinite(np.mean(mapes)):
+            logger.warning(f"No successful fit for {ticker}; leaving its params untouched.")
+            continue
+        results[ticker] = {'params': candidates[best], 'mape': float(np.mean(mapes)),
+                           'coverage': float(np.nanmean(coverages)), 'fit_seconds': float(np.nanmean(seconds)),
+                           'origins': len(mapes), 'fits': fits[ticker], 'horizon': horizon}
+    return results
+
+
+def _rank_key(score_list):
+    # Mean MAPE first; faster fits win ties
+    if not score_list:
+        return (np.inf, np.inf)
+    mapes = [s[0] for s in score_list]
+    seconds = [s[2] for s in score_list if s[2] == s[2]]
+    return (float(np.mean(mapes)), float(np.mean(seconds)) if seconds else np.inf)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-ticker forecast hyperparameter search (writes the params store).")
+    parser.add_argument("tickers", nargs="*", help="Tickers to tune (default: all cached)")
+    parser.add_argument("--engine", default="prophet", choices=sorted(SEARCH_SPACE))
+    parser.add_argument("--samples", type=int, default=None, help="Random-search this many candidates instead of the full grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--horizon", default="3m")
+    parser.add_argument("--origins", type=int, default=3, help="Maximum origins (halving rounds) per ticker")
+    parser.add_argument("--step", default="1m")
+    parser.add_argument("--eta", type=float, default=3, help="Keep the best 1/eta candidates after each round")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="Print results without writing the params store")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+
+    paths = cached_history_paths(set(args.tickers) or None)
+    if not paths:
+        raise SystemExit(f"No cached histories found in {DATA_CACHE_DIR}")
+    candidates = candidate_params(SEARCH_SPACE[args.engine], args.samples, args.seed)
+    logger.info(f"Tuning {args.engine} for {len(paths)} tickers over {len(candidates)} candidates")
+    start = time.perf_counter()
+    results = tune(paths, args.engine, candidates, args.horizon, args.origins, args.step, args.eta, args.workers)
+    logger.info(f"Tuning finished in {time.perf_counter() - start:.1f}s")
+
+    for ticker, entry in sorted(results.items()):
+        print(f"{ticker:<8} MAPE {entry['mape']:6.2f}%  coverage {entry['coverage']:5.1f}%  "
+              f"fit {entry['fit_seconds']:.2f}s  fits {entry['fits']:>3}  {entry['params']}")
+    if results and not args.dry_run:
+        save_tuned_params(args.engine, results)
+        print(f"\nSaved {len(results)} tuned entries -> {PARAMS_STORE_PATH}")
@@ -0,0 +1,325 @@
+# worker_pool.py
+# Persistent pool of pre-forked analysis workers. A fresh interpreter pays several seconds importing
+# Prophet/cmdstanpy, yfinance, pandas and Matplotlib before it does any work, so spawn-based pools are
+# throttled by start-up. Here the parent imports the analytics stack, loads the fonts and the processed
+# macro dataset once, freezes those objects out of the garbage collector and then forks the workers, which
+# share the pages copy-on-write. Each worker runs prepare_report_data for jobs taken from a local queue.
+#
+# Jobs and results go through a multiprocessing manager on a Unix socket (WORKER_POOL_SOCKET). Every
+# client gets its own result queue, so the portal, CLI runs and the pre-warm daemon can share one pool.
+# Workers that exit (crash, OOM kill, WORKER_MAX_JOBS reached) are re-forked from the preloaded parent; a job
+# whose worker died mid-analysis is returned to its client as failed rather than left to time out.
+#
+#   results, errors = worker_pool.run_analyses([("AAPL", "prophet"), ...])  # None if no pool is running
+#
+# Usage:
+#   python worker_pool.py               # Serve with WORKER_POOL_SIZE workers (default: CPU count)
+#   python worker_pool.py --status      # Queue length and worker count of the running pool
+import os
+import gc
+import sys
+import time
+import uuid
+import queue
+import signal
+import secrets
+import logging
+import importlib
+import threading
+import multiprocessing
+from multiprocessing.managers import BaseManager
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+WORKER_POOL_SOCKET = os.getenv("WORKER_POOL_SOCKET", os.path.join(APP_ROOT, "data_cache", "worker_pool.sock"))
+# Random per serve() unless WORKER_POOL_AUTHKEY is set; written 0600 for clients of the same user
+WORKER_POOL_AUTHKEY_FILE = os.getenv("WORKER_POOL_AUTHKEY_FILE", os.path.join(APP_ROOT, "data_cache", "worker_pool.key"))
+WORKER_POOL_ENABLED = os.getenv("WORKER_POOL_ENABLED", "true").lower() in ("1", "true", "yes")
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", "0")) or os.cpu_count() or 2
+WORKER_MAX_JOBS = int(os.getenv("WORKER_MAX_JOBS", "200"))          # Re-fork a worker after this many jobs (0 = never)
+WORKER_JOB_TIMEOUT = float(os.getenv("WORKER_JOB_TIMEOUT", "900"))  # Client gives up after this long without a result
+# Imported in the parent before forking; missing optional packages are skipped
+PRELOAD_MODULES = ("numpy", "pandas", "yfinance", "pandas_datareader", "prophet", "cmdstanpy", "matplotlib",
+                   "plotly", "forecast_engines", "prophet_model", "global_forecast", "chart_service", "wordpress_reporter")
+
+
+# ------------------ Manager (job queue + per-client result queues) ------------------
+class _PoolManager(BaseManager):
+    pass
+
+
+_job_queue = queue.Queue()
+_result_queues = {}
+
+
+class _PoolControl:
+    """Bookkeeping in the manager process; its methods return plain values to clients."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.info = {'workers': 0, 'started_at': None}
+        self.in_flight = {} # Worker slot -> job it is running
+
+    def start_job(self, slot, job):
+        with self.lock:
+            self.in_flight[slot] = job
+
+    def put_result(self, client_id, result, slot=None):
+        """Delivers a worker's result (and clears the slot's in-flight job); dropped when the client has already given up."""
+        with self.lock:
+            if slot is not None:
+                self.in_flight.pop(slot, None)
+            result_queue = _result_queues.get(client_id)
+        if result_queue is not None:
+            result_queue.put(result)
+
+    def fail_in_flight(self, slot, error):
+        """Reports the job of a worker that died mid-analysis as failed, so its client does not wait for the timeout."""
+        with self.lock:
+            job = self.in_flight.pop(slot, None)
+        if job is not None:
+            client_id, job_id, ticker, engine = job
+            self.put_result(client_id, (job_id, None, error))
+            return ticker
+        return None
+
+    def drop_results(self, client_id):
+        with self.lock:
+            _result_queues.pop(client_id, None)
+
+    def set_info(self, **info):
+        self.info.update(info)
+
+    def status(self):
+        return dict(self.info, queued=_job_queue.qsize(), clients=len(_result_queues))
+
+
+_control = _PoolControl()
+
+
+def _results_for(client_id):
+    with _control.lock:
+        return _result_queues.setdefault(client_id, queue.Queue())
+
+
+# The callables run in the manager process; clients get proxies
+_PoolManager.register('jobs', callable=lambda: _job_queue)
+_PoolManager.register('results', callable=_results_for)
+_PoolManager.register('control', callable=lambda: _control)
+
+
+def _ignore_stop_signals():
+    # Ctrl+C and systemd's SIGTERM reach the whole process group; the parent drains and stops the children in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+
+def _authkey():
+    """WORKER_POOL_AUTHKEY if set, else the key the running pool wrote. Raises OSError when there is none."""
+    env_key = os.getenv("WORKER_POOL_AUTHKEY")
+    if env_key:
+        return env_key.encode()
+    with open(WORKER_POOL_AUTHKEY_FILE, 'rb') as f:
+        return f.read()
+
+
+def _write_authkey():
+    """A fresh random key, written to WORKER_POOL_AUTHKEY_FILE readable by this user only."""
+    key = secrets.token_hex(32).encode()
+    tmp_path = f"{WORKER_POOL_AUTHKEY_FILE}.{os.getpid()}.tmp"
+    with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+        f.write(key)
+    os.replace(tmp_path, WORKER_POOL_AUTHKEY_FILE)
+    return key
+
+
+def _connect():
+    """A client connection to the running pool. Raises OSError/EOFError when none is listening."""
+    if not os.path.exists(WORKER_POOL_SOCKET):
+        raise FileNotFoundError(WORKER_POOL_SOCKET)
+    manager = _PoolManager(address=WORKER_POOL_SOCKET, authkey=_authkey())
+    manager.connect()
+    return manager
+
+
+# ------------------ Client ------------------
+def run_analyses(keys, timeout=None):
+    """
+    Runs prepare_report_data for each (ticker, engine) on the pool. Returns ({key: report_data or None},
+    {key: error message}) or None when no pool is running (callers fall back to in-process work).
+    timeout is the longest wait for the next result (WORKER_JOB_TIMEOUT); keys still missing count as failed.
+    """
+    if not WORKER_POOL_ENABLED or not keys:
+        return None
+    try:
+        manager = _connect()
+    except (OSError, EOFError, multiprocessing.AuthenticationError) as e:
+        logger.debug(f"Worker pool not available ({e}); analysing in-process.")
+        return None
+    timeout = WORKER_JOB_TIMEOUT if timeout is None else timeout
+    keys = list(keys)
+    client_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    results, errors = {}, {}
+    try:
+        result_queue = manager.results(client_id)
+        jobs = manager.jobs()
+        for job_id, (ticker, engine) in enumerate(keys):
+            jobs.put((client_id, job_id, ticker, engine))
+        logger.info(f"Queued {len(keys)} analyses on the worker pool.")
+        while len(results) < len(keys):
+            try:
+                job_id, report_data, error = result_queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            results[keys[job_id]] = report_data
+            if error:
+                errors[keys[job_id]] = error
+    finally:
+        try:
+            manager.control().drop_results(client_id)
+        except (OSError, EOFError):
+            pass
+    for key in keys:
+        if key not in results:
+            results[key] = None
+            errors[key] = f"No result from the worker pool within {timeout:.0f}s"
+    return results, errors
+
+
+def pool_status():
+    """{'workers', 'queued', 'clients', 'started_at'} of the running pool, or None."""
+    try:
+        return _connect().control().status()
+    except (OSError, EOFError, multiprocessing.AuthenticationError):
+        return None
+
+
+# ------------------ Workers ------------------
+def preload():
+    """Imports the analytics stack, loads fonts and the processed macro dataset into this (parent) process."""
+    started = time.time()
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.warning(f"Preload: could not import {name}: {e}")
+    try:
+        # Font cache and default family lookup, so the first chart in a worker does not rescan fonts
+        import matplotlib
+        from matplotlib import font_manager
+        font_manager.findfont(font_manager.FontProperties(family=matplotlib.rcParams['font.family']))
+    except Exception as e:
+        logger.warning(f"Preload: font setup failed: {e}")
+    try:
+        from macro_data import fetch_macro_indicators
+        fetch_macro_indicators(app_root=APP_ROOT)
+    except Exception as e:
+        logger.warning(f"Preload: macro data not loaded: {e}")
+    gc.collect()
+    gc.freeze() # Preloaded objects stay out of GC passes, so the workers' copies of those pages stay shared
+    logger.info(f"Preloaded analytics stack in {time.time() - started:.1f}s.")
+
+
+def _worker_main(slot):
+    """Worker loop: one job at a time until the shutdown sentinel (None) or WORKER_MAX_JOBS."""
+    _ignore_stop_signals()
+    from wordpress_reporter import prepare_report_data # Already imported by preload(); no cost after fork
+    manager = _connect()
+    jobs, control = manager.jobs(), manager.control()
+    done = 0
+    while WORKER_MAX_JOBS <= 0 or done < WORKER_MAX_JOBS:
+        job = jobs.get()
+        if job is None:
+            break
+        client_id, job_id, ticker, engine = job
+        control.start_job(slot, job) # Failed by the parent if this worker dies before returning a result
+        try:
+            result = (job_id, prepare_report_data(ticker, APP_ROOT, forecast_engine=engine), None)
+        except Exception as e:
+            logger.error(f"Worker {slot}: analysis failed for {ticker} (engine {engine}): {e}", exc_info=True)
+            result = (job_id, None, str(e))
+        try:
+            control.put_result(client_id, result, slot)
+        except Exception as e: # e.g. an unpicklable result
+            control.put_result(client_id, (job_id, None, f"Could not return result: {e}"), slot)
+        done += 1
+
+
+def serve(size=None):
+    """Starts the manager, preloads, forks `size` workers and keeps them alive until SIGTERM/SIGINT."""
+    if sys.platform == 'win32':
+        raise RuntimeError("The worker pool needs fork() and Unix sockets, which Windows does not provide. "
+                           "Publishing runs analyse in-process there.")
+    size = size or WORKER_POOL_SIZE
+    ctx = multiprocessing.get_context('fork')
+    os.makedirs(os.path.dirname(WORKER_POOL_SOCKET), exist_ok=True)
+    if os.path.exists(WORKER_POOL_SOCKET):
+        if pool_status() is not None:
+            raise RuntimeError(f"A worker pool is already serving on {WORKER_POOL_SOCKET}")
+        os.remove(WORKER_POOL_SOCKET) # Left over from a pool that did not shut down cleanly
+    env_key = os.getenv("WORKER_POOL_AUTHKEY")
+    authkey = env_key.encode() if env_key else _write_authkey()
+    manager = _PoolManager(address=WORKER_POOL_SOCKET, authkey=authkey, ctx=ctx)
+    old_umask = os.umask(0o077) # The socket is created 0600 when it is bound, not chmod'ed afterwards
+    try:
+        manager.start(_ignore_stop_signals) # Forked before the preload: the manager process stays small
+    finally:
+        os.umask(old_umask)
+    preload()
+    if 'wordpress_reporter' not in sys.modules:
+        manager.shutdown()
+        raise RuntimeError("wordpress_reporter could not be imported; workers would fail every job.")
+
+    workers = {}
+
+    def spawn(slot):
+        process = ctx.Process(target=_worker_main, args=(slot,), name=f"report-worker-{slot}", daemon=True)
+        process.start()
+        workers[slot] = process
+
+    for slot in range(size):
+        spawn(slot)
+    manager.control().set_info(workers=size, started_at=time.time())
+    logger.info(f"Worker pool serving on {WORKER_POOL_SOCKET} with {size} workers.")
+
+    stopping = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stopping.set())
+    control = manager.control()
+    try:
+        while not stopping.wait(1.0):
+            for slot, process in list(workers.items()):
+                if not process.is_alive():
+                    process.join()
+                    if process.exitcode:
+                        logger.warning(f"Worker {slot} exited with code {process.exitcode}; re-forking.")
+                    # Not re-queued: a job that crashed or OOM-killed its worker would likely do it again
+                    ticker = control.fail_in_flight(slot, f"Worker exited with code {process.exitcode} during the analysis")
+                    if ticker:
+                        logger.warning(f"Worker {slot} died while analysing {ticker}; reported it as failed.")
+                    spawn(slot)
+    finally:
+        logger.info("Stopping worker pool...")
+        jobs = manager.jobs()
+        for _ in workers:
+            jobs.put(None)
+        for process in workers.values():
+            process.join(timeout=30)
+            if process.is_alive():
+                process.kill() # Stop signals are ignored in the workers
+        manager.shutdown()
+        for path in (WORKER_POOL_SOCKET, None if env_key else WORKER_POOL_AUTHKEY_FILE):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(process)d - %(levelname)s - %(message)s')
+    if '--status' in sys.argv:
+        print(pool_status() or "No worker pool running.")
+    else:
+        try:
+            serve()
+        except RuntimeError as e:
+            sys.exit(f"worker_pool: {e}")